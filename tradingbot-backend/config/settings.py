@@ -62,6 +62,12 @@ class Settings(_BaseSettings):
     WS_USE_POOL: bool = True
     WS_MAX_SUBS_PER_SOCKET: int = 25  # Minskad från 200 (Bitfinex max 25 channels per connection)
     WS_PUBLIC_SOCKETS_MAX: int = 1  # Minskad från 3 (undvik 20 connections/min limit)
+    # Publika WS-callbacks körs via köer per kanal/symbol (läsloopen väntar inte på callbacks)
+    WS_DISPATCH_ENABLED: bool = True
+    WS_DISPATCH_QUEUE_MAX: int = 256
+    WS_DISPATCH_TICKER_POLICY: str = "coalesce"  # "coalesce" | "drop_oldest"
+    # Kontoläge (wallets/positioner/ordrar) speglas från privata WS; REST-reconcile var N sek (0 = av)
+    ACCOUNT_RECONCILE_INTERVAL_SECONDS: int = 300
 
     # Lista över symboler att auto‑subscriba vid startup (komma‑separerad)
     WS_SUBSCRIBE_SYMBOLS: str | None = None
@@ -139,6 +145,8 @@ class Settings(_BaseSettings):
     # Concurrency caps - Mycket konservativ
     PUBLIC_REST_CONCURRENCY: int = 1
     PRIVATE_REST_CONCURRENCY: int = 1
+    # Max samtidiga symboler i watchlist-bygget (kalla REST-läsningar begränsas av PUBLIC_REST_CONCURRENCY)
+    WATCHLIST_CONCURRENCY: int = 32
 
     # Regex/pattern-baserad mapping av endpoints till limiter-typer
     RATE_LIMIT_PATTERNS: str | None = None  # ex: "^auth/w/=>PRIVATE_TRADING;^auth/r/positions=>PRIVATE_ACCOUNT;^(ticker|candles|book|trades)=>PUBLIC_MARKET"
@@ -163,6 +171,8 @@ class Settings(_BaseSettings):
     # Candle cache retention
     CANDLE_CACHE_RETENTION_DAYS: int = 7
     CANDLE_CACHE_MAX_ROWS_PER_PAIR: int = 10000
+    # Write-behind: hur ofta buffrade WS-candles flushas till SQLite
+    CANDLE_CACHE_FLUSH_INTERVAL_MS: int = 1000
 
     # Backfill pacing
     BACKFILL_BATCH_SLEEP_MS: int = 300
@@ -209,6 +219,13 @@ class Settings(_BaseSettings):
     PROB_RETRAIN_LIMIT: int = 5000
     PROB_RETRAIN_OUTPUT_DIR: str = "config/models"
 
+    # Compute-worker: validering/träning/stora backtests i separata processer
+    COMPUTE_WORKER_PROCESSES: int = 1
+    COMPUTE_WORKER_MAX_QUEUE: int = 32
+    COMPUTE_JOB_TIMEOUT_SECONDS: float = 600.0
+    # Event loop-lagg mäts med en sleep-probe med detta intervall
+    LOOP_LAG_INTERVAL_MS: int = 500
+
     # Probability sizing & auto trading
     PROB_AUTOTRADE_ENABLED: bool = False
     PROB_SIZE_MAX_RISK_PCT: float = 1.0
@@ -5,7 +5,7 @@ Denna modul implementerar ATR-beräkningar för volatilitetsanalys.
 Inkluderar ATR-formel och volatilitetsbaserade strategier.
 """
 
-import pandas as pd
+from indicators.series import atr_series
 
 from utils.logger import get_logger
 
@@ -31,20 +31,7 @@ def calculate_atr(highs: list[float], lows: list[float], closes: list[float], pe
         )
         return None
 
-    df = pd.DataFrame({"high": highs, "low": lows, "close": closes})
-    df["previous_close"] = df["close"].shift(1)
-
-    # Beräkna True Range (vektoriserat för prestanda)
-    df["tr"] = pd.concat(
-        [
-            df["high"] - df["low"],
-            (df["high"] - df["previous_close"]).abs(),
-            (df["low"] - df["previous_close"]).abs(),
-        ],
-        axis=1,
-    ).max(axis=1)
-
-    atr_value = df["tr"].rolling(window=period).mean().iloc[-1]
+    atr_value = atr_series(highs, lows, closes, period)[-1]
 
     logger.debug(f"ATR beräknad: {atr_value:.4f} (period: {period})")
     return round(atr_value, 4)
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-from typing import Literal
+import math
+from dataclasses import dataclass, field
+from typing import Any, Literal
 
-import numpy as np
-
-from indicators.adx import adx as adx_series
+from indicators.series import adx_series, ema_series, ema_z_series
 
 Regime = Literal["trend", "range", "balanced"]
 
@@ -12,50 +12,97 @@ Regime = Literal["trend", "range", "balanced"]
 def ema(series: list[float], span: int) -> list[float]:
     if not series:
         return []
-    span = max(2, int(span))
-    alpha = 2.0 / (span + 1.0)
-    out = [float(series[0])]
-    for i in range(1, len(series)):
-        out.append(alpha * float(series[i]) + (1 - alpha) * out[-1])
-    return out
+    return ema_series(series, max(2, int(span))).tolist()
 
 
 def ema_z(close: list[float], fast: int = 3, slow: int = 7, z_win: int = 200) -> list[float]:
     if not close:
         return []
-    ef = np.array(ema(close, fast), dtype=float)
-    es = np.array(ema(close, slow), dtype=float)
-    slope = ef - es
-    z = np.zeros_like(slope)
-    win = max(10, int(z_win))
-    for i in range(len(slope)):
-        lo = max(0, i - win + 1)
-        seg = slope[lo : i + 1]
-        mu = float(seg.mean())
-        sd = float(seg.std())
-        z[i] = (slope[i] - mu) / (sd + 1e-9)
-    return [float(x) for x in z]
-
-
-def detect_regime(high: list[float], low: list[float], close: list[float], cfg: dict) -> Regime:
+    return ema_z_series(close, fast, slow, z_win).tolist()
+
+
+@dataclass(frozen=True)
+class RegimeResult:
+    """Regimetikett plus de indikatorvärden och trösklar den bygger på."""
+
+    regime: Regime
+    adx_value: float | None
+    ema_z_value: float | None
+    thresholds: dict[str, float] = field(default_factory=dict)
+    last_close: float | None = None
+    last_mts: int | None = None
+    bars: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "regime": self.regime,
+            "adx_value": self.adx_value,
+            "ema_z_value": self.ema_z_value,
+            "thresholds": dict(self.thresholds),
+            "last_close": self.last_close,
+            "last_mts": self.last_mts,
+            "bars": self.bars,
+        }
+
+
+def regime_thresholds(cfg: dict) -> dict[str, float]:
+    return {
+        "adx_high": float(cfg.get("ADX_HIGH", 30.0)),
+        "adx_low": float(cfg.get("ADX_LOW", 15.0)),
+        "slope_z_high": float(cfg.get("SLOPE_Z_HIGH", 1.0)),
+        "slope_z_low": float(cfg.get("SLOPE_Z_LOW", 0.5)),
+    }
+
+
+def _last_or_none(values) -> float | None:
+    if not values.size:
+        return None
+    v = float(values[-1])
+    return None if math.isnan(v) else v
+
+
+def compute_regime(high: list[float], low: list[float], close: list[float], cfg: dict) -> RegimeResult:
+    """Beräkna ADX och ema_z en gång och returnera etikett + värden."""
     if not close or not high or not low:
-        return "balanced"
+        return RegimeResult("balanced", None, None, regime_thresholds(cfg))
     adx_vals = adx_series(high, low, close, period=int(cfg.get("ADX_PERIOD", 14)))
-    a = float(adx_vals[-1]) if adx_vals else 0.0
-    ez_vals = ema_z(
+    ez_vals = ema_z_series(
         close,
         int(cfg.get("EMA_FAST", 3)),
         int(cfg.get("EMA_SLOW", 7)),
         int(cfg.get("Z_WIN", 200)),
     )
-    ez = float(ez_vals[-1]) if ez_vals else 0.0
-    ez_abs = abs(ez)
+    a = _last_or_none(adx_vals)  # NaN under uppvärmning => ingen trendstyrka
+    ez = _last_or_none(ez_vals)
+    return RegimeResult(
+        regime=classify_regime(a, ez, cfg),
+        adx_value=a,
+        ema_z_value=ez,
+        thresholds=regime_thresholds(cfg),
+        last_close=float(close[-1]),
+        bars=len(close),
+    )
+
+
+def detect_regime(high: list[float], low: list[float], close: list[float], cfg: dict | None = None) -> Regime:
+    return compute_regime(high, low, close, cfg or {}).regime
+
+
+def classify_regime(adx_value: float | None, ema_z_value: float | None, cfg: dict) -> Regime:
+    """Klassificera regim från färdiga ADX/ema_z-värden (None/NaN => 0.0)."""
+    a = float(adx_value) if adx_value is not None else 0.0
+    if math.isnan(a):
+        a = 0.0
+    ez = float(ema_z_value) if ema_z_value is not None else 0.0
+    ez_abs = 0.0 if math.isnan(ez) else abs(ez)
+
+    th = regime_thresholds(cfg)
 
     # Trend: hög ADX eller stark EMA-slope
-    if a >= float(cfg.get("ADX_HIGH", 30.0)) or ez_abs >= float(cfg.get("SLOPE_Z_HIGH", 1.0)):
+    if a >= th["adx_high"] or ez_abs >= th["slope_z_high"]:
         return "trend"
     # Range: låg ADX och svag EMA-slope
-    if a <= float(cfg.get("ADX_LOW", 15.0)) and ez_abs <= float(cfg.get("SLOPE_Z_LOW", 0.5)):
+    if a <= th["adx_low"] and ez_abs <= th["slope_z_low"]:
         return "range"
     # Balanced: mellanliggande värden
     return "balanced"
@@ -5,7 +5,7 @@ Denna modul implementerar RSI-beräkningar för teknisk analys.
 Inkluderar RSI-formel och signalgenerering.
 """
 
-import pandas as pd
+from indicators.series import rsi_series
 
 from utils.logger import get_logger
 
@@ -32,19 +32,7 @@ def calculate_rsi(prices: list[float], period: int = 14) -> float | None:
         )
         return None
 
-    series = pd.Series(prices)
-    delta = series.diff().dropna()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    avg_gain = gain.rolling(window=period).mean().iloc[-1]
-    avg_loss = loss.rolling(window=period).mean().iloc[-1]
-
-    if avg_loss == 0:
-        rsi_value = 100.0
-    else:
-        rs = avg_gain / avg_loss
-        rsi_value = 100 - (100 / (1 + rs))
+    rsi_value = rsi_series(prices, period)[-1]
 
     logger.debug(f"RSI beräknad: {rsi_value:.2f} (period: {period})")
     return round(rsi_value, 2)
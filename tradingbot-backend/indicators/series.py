@@ -0,0 +1,249 @@
+"""
+Indicator Series Kernels - TradingBot Backend
+
+Helseriefunktioner för indikatorer som returnerar float64-arrayer i samma
+längd som indata. Värdet på index i beror endast på data t.o.m. i (kausalt),
+så series[i] motsvarar den skalära indikatorn beräknad på prefixet [: i + 1].
+
+Rullande medel använder löpande summor (O(n)); rullande varians räknas
+per fönster i vektoriserade block (O(n·fönster)) för numerisk stabilitet.
+Ingen pandas, så serierna kan beräknas en gång och återanvändas av backtests,
+feature-byggare och regimdetektering. Index som saknar tillräcklig
+historik fylls med NaN.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+import numpy as np
+
+
+def as_float_array(values: Iterable[float] | np.ndarray) -> np.ndarray:
+    """Konvertera till 1-D float64-array (ingen kopia om redan float64)."""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64, copy=False).ravel()
+    try:
+        return np.asarray(list(values), dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([], dtype=np.float64)
+
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Summa över de senaste `window` elementen per index (partiella fönster i början)."""
+    csum = np.concatenate(([0.0], np.cumsum(x)))
+    idx = np.arange(1, x.size + 1)
+    return csum[idx] - csum[np.maximum(idx - window, 0)]
+
+
+def ema_series(values: Iterable[float] | np.ndarray, period: int) -> np.ndarray:
+    """
+    EMA med alpha = 2 / (period + 1), seedad med första värdet.
+
+    Samma aritmetik som pandas `ewm(span=period, adjust=False).mean()`.
+    """
+    x = as_float_array(values)
+    if x.size == 0:
+        return x.copy()
+    alpha = 2.0 / (float(period) + 1.0)
+    decay = 1.0 - alpha
+    norm = decay + alpha
+    prev = float(x[0])
+    out = [prev]
+    append = out.append
+    for v in x[1:].tolist():
+        prev = (decay * prev + alpha * v) / norm
+        append(prev)
+    return np.asarray(out, dtype=np.float64)
+
+
+def rolling_mean(values: Iterable[float] | np.ndarray, window: int) -> np.ndarray:
+    """Glidande medelvärde över fulla fönster; NaN för index < window - 1."""
+    x = as_float_array(values)
+    window = max(1, int(window))
+    out = np.full(x.size, np.nan)
+    if x.size >= window:
+        out[window - 1 :] = _window_sums(x, window)[window - 1 :] / window
+    return out
+
+
+# Varians <= VAR_REL_EPS * E[y²] i fönstret räknas som 0 (avrundningsbrus, z = 0)
+VAR_REL_EPS = 1e-12
+_ZSCORE_CHUNK = 4096
+
+
+def _window_mean_var(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Medel, populationsvarians och E[x²] per fönster (partiella fönster i början).
+
+    Variansen räknas i två pass (fönstrets medel dras av före kvadrering),
+    inte som E[x²] - E[x]², som kancellerar när en volatil period följs av
+    platta värden. Fulla fönster tas i block via sliding_window_view.
+    """
+    n = x.size
+    mean = np.empty(n)
+    var = np.empty(n)
+    sq = np.empty(n)
+    head = min(n, window - 1)
+    if head:
+        # Partiella fönster x[: i + 1] som rader i en triangulär mask
+        mask = np.tri(head, dtype=bool)
+        count = np.arange(1, head + 1, dtype=np.float64)
+        seg = np.where(mask, x[:head], 0.0)
+        mean[:head] = seg.sum(axis=1) / count
+        dev = np.where(mask, x[:head] - mean[:head, None], 0.0)
+        var[:head] = (dev * dev).sum(axis=1) / count
+        sq[:head] = (seg * seg).sum(axis=1) / count
+    if n >= window:
+        views = np.lib.stride_tricks.sliding_window_view(x, window)
+        for lo in range(0, views.shape[0], _ZSCORE_CHUNK):
+            block = views[lo : lo + _ZSCORE_CHUNK]
+            m = block.mean(axis=1)
+            dst = slice(window - 1 + lo, window - 1 + lo + block.shape[0])
+            mean[dst] = m
+            var[dst] = np.mean((block - m[:, None]) ** 2, axis=1)
+            sq[dst] = np.mean(block * block, axis=1)
+    return mean, var, sq
+
+
+def rolling_zscore(values: Iterable[float] | np.ndarray, window: int, eps: float = 1e-9) -> np.ndarray:
+    """
+    Z-score mot de senaste `window` värdena (inkl. aktuellt, populations-std).
+
+    Fönstret är partiellt i början, precis som en loop med
+    `seg = x[max(0, i - window + 1) : i + 1]`. Fönster vars varians är
+    avrundningsbrus relativt värdenas storlek ger z = 0.
+    """
+    x = as_float_array(values)
+    if x.size == 0:
+        return x.copy()
+    mean, var, sq = _window_mean_var(x, max(1, int(window)))
+    z = (x - mean) / (np.sqrt(var) + eps)
+    z[var <= VAR_REL_EPS * sq] = 0.0
+    return z
+
+
+def ema_z_series(close: Iterable[float] | np.ndarray, fast: int = 3, slow: int = 7, z_win: int = 200) -> np.ndarray:
+    """Z-score av EMA-slope (EMA_fast - EMA_slow) över ett rullande fönster."""
+    c = as_float_array(close)
+    if c.size == 0:
+        return c.copy()
+    slope = ema_series(c, max(2, int(fast))) - ema_series(c, max(2, int(slow)))
+    return rolling_zscore(slope, max(10, int(z_win)))
+
+
+def rsi_series(close: Iterable[float] | np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI med enkla glidande medel av gains/losses; NaN för index < period."""
+    c = as_float_array(close)
+    out = np.full(c.size, np.nan)
+    if c.size < 2:
+        return out
+    delta = np.diff(c)
+    avg_gain = rolling_mean(np.clip(delta, 0.0, None), period)
+    avg_loss = rolling_mean(-np.clip(delta, None, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - (100.0 / (1.0 + avg_gain / avg_loss)))
+    out[1:] = np.where(np.isnan(avg_gain), np.nan, rsi)
+    return out
+
+
+def true_range(
+    high: Iterable[float] | np.ndarray, low: Iterable[float] | np.ndarray, close: Iterable[float] | np.ndarray
+) -> np.ndarray:
+    """True Range; första baren använder high - low."""
+    h = as_float_array(high)
+    lo = as_float_array(low)
+    c = as_float_array(close)
+    n = min(h.size, lo.size, c.size)
+    h, lo, c = h[:n], lo[:n], c[:n]
+    prev_close = np.concatenate(([np.nan], c[:-1])) if n else c
+    return np.fmax(np.fmax(h - lo, np.abs(h - prev_close)), np.abs(lo - prev_close))
+
+
+def atr_series(
+    high: Iterable[float] | np.ndarray,
+    low: Iterable[float] | np.ndarray,
+    close: Iterable[float] | np.ndarray,
+    period: int = 14,
+) -> np.ndarray:
+    """ATR som enkelt glidande medel av True Range; NaN för index < period - 1."""
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def directional_movement(
+    high: Iterable[float] | np.ndarray, low: Iterable[float] | np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """+DM/-DM per bar (första baren 0)."""
+    h = as_float_array(high)
+    lo = as_float_array(low)
+    n = min(h.size, lo.size)
+    h, lo = h[:n], lo[:n]
+    up = np.concatenate(([0.0], h[1:] - h[:-1])) if n else h
+    down = np.concatenate(([0.0], lo[:-1] - lo[1:])) if n else lo
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    return plus_dm, minus_dm
+
+
+def adx_series(
+    high: Iterable[float] | np.ndarray,
+    low: Iterable[float] | np.ndarray,
+    close: Iterable[float] | np.ndarray,
+    period: int = 14,
+) -> np.ndarray:
+    """
+    Wilder ADX (+DI/-DI/DX-utjämning) med samma seedning som TA-Lib.
+
+    - TR/+DM/-DM seedas med summan av de första period-1 barerna och
+      utjämnas sedan med S = S - S/period + x.
+    - Första ADX (index 2*period-1) är medel av de första period DX-värdena,
+      därefter ADX = (ADX*(period-1) + DX)/period. Odefinierat DX
+      (TR eller DI-summa = 0) lämnar ADX oförändrat.
+
+    TR/DM/DI/DX beräknas vektoriserat; Wilder-rekursionen är en O(n)-loop.
+    Index < 2*period-1 är NaN.
+    """
+    h = as_float_array(high)
+    lo = as_float_array(low)
+    c = as_float_array(close)
+    n = min(h.size, lo.size, c.size)
+    p = max(2, int(period))
+    out = np.full(n, np.nan)
+    if n < 2 * p:
+        return out
+    tr = true_range(h[:n], lo[:n], c[:n])
+    plus_dm, minus_dm = directional_movement(h[:n], lo[:n])
+
+    # Wilder-utjämning: seed med bar 1..p-1, första utjämnade värde på index p
+    tr_s = np.full(n, np.nan)
+    pdm_s = np.full(n, np.nan)
+    mdm_s = np.full(n, np.nan)
+    # Sekventiella summor (inte np.sum) så att ADXState kan reproducera exakt
+    t = sum(tr[1:p].tolist())
+    pd_ = sum(plus_dm[1:p].tolist())
+    md = sum(minus_dm[1:p].tolist())
+    for i, (x_tr, x_p, x_m) in enumerate(
+        zip(tr[p:].tolist(), plus_dm[p:].tolist(), minus_dm[p:].tolist(), strict=True), start=p
+    ):
+        t = t - t / p + x_tr
+        pd_ = pd_ - pd_ / p + x_p
+        md = md - md / p + x_m
+        tr_s[i] = t
+        pdm_s[i] = pd_
+        mdm_s[i] = md
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        plus_di = np.where(tr_s != 0, 100.0 * (pdm_s / tr_s), np.nan)
+        minus_di = np.where(tr_s != 0, 100.0 * (mdm_s / tr_s), np.nan)
+        di_sum = minus_di + plus_di
+        dx = np.where(di_sum != 0, 100.0 * (np.abs(minus_di - plus_di) / di_sum), np.nan)
+
+    first = 2 * p - 1
+    adx = sum(d for d in dx[p : first + 1].tolist() if not math.isnan(d)) / p
+    out[first] = adx
+    for i, d in enumerate(dx[first + 1 :].tolist(), start=first + 1):
+        if not math.isnan(d):
+            adx = ((adx * (p - 1)) + d) / p
+        out[i] = adx
+    return out
@@ -150,6 +150,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Kunde inte starta scheduler: {e}")
 
+    # Mät event loop-lagg (visar om CPU-jobb blockerar loopen)
+    try:
+        from utils.loop_lag import get_loop_lag_monitor
+
+        get_loop_lag_monitor().start()
+    except Exception as e:
+        logger.warning(f"⚠️ Kunde inte starta loop-lag-mätning: {e}")
+
     # Starta circuit breaker recovery service
     try:
         from services.circuit_breaker_recovery import get_circuit_breaker_recovery
@@ -181,6 +189,17 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Fel vid stopp av scheduler: {e}")
 
+    # Stoppa loop-lag-mätning och compute-workerns processer
+    try:
+        from services.compute_worker import get_compute_worker
+        from utils.loop_lag import get_loop_lag_monitor
+
+        await get_loop_lag_monitor().stop()
+        await get_compute_worker().shutdown()
+        logger.info("✅ Compute-worker stoppad")
+    except Exception as e:
+        logger.warning(f"⚠️ Fel vid stopp av compute-worker: {e}")
+
     # Stoppa circuit breaker recovery service
     try:
         from services.circuit_breaker_recovery import get_circuit_breaker_recovery
@@ -233,6 +252,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Fel vid stängning av HTTP-klient (via facade): {e}")
 
+    # Flusha write-behind-bufferten för candle-cachen
+    try:
+        from utils.candle_cache import async_candle_cache, candle_cache
+
+        async_candle_cache.close()
+        candle_cache.close()
+    except Exception as e:
+        logger.warning(f"⚠️ Fel vid stängning av candle-cache: {e}")
+
     logger.info("✅ Shutdown komplett")
 
 
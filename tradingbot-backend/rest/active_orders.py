@@ -6,6 +6,7 @@ Inkluderar funktioner för att hämta aktiva ordrar och hantera dem.
 """
 
 import json
+import time
 from typing import Any
 
 import httpx
@@ -13,11 +14,22 @@ import httpx
 from services.exchange_client import get_exchange_client
 from config.settings import settings
 from models.api_models import OrderResponse, OrderSide, OrderType
+from services.account_state import account_state
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def _order_models(rows: tuple) -> list[OrderResponse]:
+    out: list[OrderResponse] = []
+    for row in rows:
+        try:
+            out.append(OrderResponse.from_bitfinex_data(list(row)))
+        except Exception:
+            continue
+    return out
+
+
 class ActiveOrdersService:
     """Service för att hämta och hantera aktiva ordrar från Bitfinex."""
 
@@ -25,13 +37,18 @@ class ActiveOrdersService:
         self.settings = settings
         self.base_url = getattr(self.settings, "BITFINEX_AUTH_API_URL", None) or self.settings.BITFINEX_API_URL
 
-    async def get_active_orders(self) -> list[OrderResponse]:
+    async def get_active_orders(self, force_rest: bool = False) -> list[OrderResponse]:
         """
-        Hämtar alla aktiva ordrar från Bitfinex.
+        Hämtar alla aktiva ordrar.
+
+        Läser från WS-speglat kontoläge (account_state) när det är live;
+        annars (eller med force_rest=True) från Bitfinex REST.
 
         Returns:
             Lista med OrderResponse-objekt
         """
+        if not force_rest and account_state.ready("orders"):
+            return list(account_state.derived("orders", "models", _order_models))
         try:
             # Safeguard: om API‑nycklar saknas, returnera tom lista i stället för att krascha UI
             if not (self.settings.BITFINEX_API_KEY and self.settings.BITFINEX_API_SECRET):
@@ -40,6 +57,7 @@ class ActiveOrdersService:
             endpoint = "auth/r/orders"
             ec = get_exchange_client()
             logger.info(f"🌐 REST API: Hämtar aktiva ordrar från {self.base_url}/{endpoint}")
+            started_at = time.time()
             response = await ec.signed_request(method="post", endpoint=endpoint, body={})
             try:
                 response.raise_for_status()
@@ -50,6 +68,7 @@ class ActiveOrdersService:
 
             orders_data = response.json()
             logger.info(f"✅ REST API: Hämtade {len(orders_data)} aktiva ordrar")
+            account_state.reconcile("orders", orders_data, started_at)
 
             orders = [OrderResponse.from_bitfinex_data(order) for order in orders_data]
             return orders
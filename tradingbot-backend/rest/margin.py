@@ -12,10 +12,11 @@ from pydantic import BaseModel
 
 from config.settings import settings
 from services.exchange_client import get_exchange_client
-from services.symbols import SymbolService
+from services.symbols import symbol_registry
 from services.bitfinex_websocket import bitfinex_ws
 from utils.bitfinex_rate_limiter import get_bitfinex_rate_limiter
 from utils.logger import get_logger
+from utils.single_flight import single_flight
 
 logger = get_logger(__name__)
 
@@ -126,9 +127,14 @@ class MarginService:
         """
         Hämtar margin-information från Bitfinex.
 
+        Samtidiga anrop (t.ex. flera paneler och watchlist) delar samma REST-hämtning.
+
         Returns:
             MarginInfo-objekt
         """
+        return await single_flight.do("margin", "info", self._fetch_margin_info)
+
+    async def _fetch_margin_info(self) -> MarginInfo:
         try:
             # Försök först med v2 API endpoint (base)
             endpoint = "auth/r/info/margin/base"
@@ -296,9 +302,9 @@ class MarginService:
             # Normalisera/resolve symbol
             eff = symbol
             try:
-                svc = SymbolService()
-                await svc.refresh()
-                eff = svc.resolve(symbol)
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff = symbol_registry.resolve(symbol)
             except Exception:
                 pass
 
@@ -363,23 +369,24 @@ class MarginService:
             now = time.time()
             results = {}
 
+            # Resolve hela batchen en gång
+            try:
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                resolved = symbol_registry.resolve_many(list(symbols))
+            except Exception:
+                resolved = {}
+
             # 1. Kontrollera cache först
             symbols_to_fetch = []
             for symbol in symbols:
-                eff = symbol
-                try:
-                    from services.symbols import SymbolService
-
-                    svc = SymbolService()
-                    await svc.refresh()
-                    eff = svc.resolve(symbol)
-                except Exception:
-                    pass
+                eff = resolved.get(symbol, symbol)
 
                 cache_key = f"margin_status_{eff}"
                 cached = self._margin_status_cache.get(cache_key)
                 if cached and (now - cached["timestamp"]) < self._margin_status_cache_ttl:
                     logger.debug(f"📋 Använder cached margin-status för {eff}")
+                    single_flight.note_hit("margin")
                     results[symbol] = cached["data"]
                 else:
                     symbols_to_fetch.append((symbol, eff))
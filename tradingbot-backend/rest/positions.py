@@ -15,6 +15,7 @@ import httpx
 from pydantic import BaseModel
 
 from config.settings import settings
+from services.account_state import account_state
 from services.metrics import record_http_result
 from utils.advanced_rate_limiter import get_advanced_rate_limiter
 from utils.logger import get_logger
@@ -58,14 +59,24 @@ class Position(BaseModel):
             status=data[1],
             amount=float(data[2]),
             base_price=float(data[3]),
-            funding=float(data[4]) if len(data) > 4 else 0.0,
-            funding_type=int(data[5]) if len(data) > 5 else 0,
-            profit_loss=float(data[6]) if len(data) > 6 else None,
-            profit_loss_percentage=float(data[7]) if len(data) > 7 else None,
-            liquidation_price=float(data[8]) if len(data) > 8 else None,
+            funding=float(data[4]) if len(data) > 4 and data[4] is not None else 0.0,
+            funding_type=int(data[5]) if len(data) > 5 and data[5] is not None else 0,
+            profit_loss=float(data[6]) if len(data) > 6 and data[6] is not None else None,
+            profit_loss_percentage=float(data[7]) if len(data) > 7 and data[7] is not None else None,
+            liquidation_price=float(data[8]) if len(data) > 8 and data[8] is not None else None,
         )
 
 
+def _position_models(rows: tuple) -> list[Position]:
+    out: list[Position] = []
+    for row in rows:
+        try:
+            out.append(Position.from_bitfinex_data(list(row)))
+        except Exception:
+            continue
+    return out
+
+
 class PositionsService:
     """Service för att hämta och hantera positionsinformation från Bitfinex."""
 
@@ -76,13 +87,19 @@ class PositionsService:
         # Global semafor för alla privata REST-klasser
         self._sem = get_private_rest_semaphore()
 
-    async def get_positions(self) -> list[Position]:
+    async def get_positions(self, force_rest: bool = False) -> list[Position]:
         """
-        Hämtar alla aktiva positioner från Bitfinex.
+        Hämtar alla aktiva positioner.
+
+        Läser från WS-speglat kontoläge (account_state) när det är live;
+        annars (eller med force_rest=True) från Bitfinex REST, vars svar
+        seedar/reconcilar kontoläget.
 
         Returns:
             Lista med Position-objekt
         """
+        if not force_rest and account_state.ready("positions"):
+            return list(account_state.derived("positions", "models", _position_models))
         try:
             # Safeguard: saknade nycklar → tom lista istället för 500
             if not (self.settings.BITFINEX_API_KEY and self.settings.BITFINEX_API_SECRET):
@@ -104,6 +121,7 @@ class PositionsService:
                 pass
 
             logger.info(f"🌐 REST API: Hämtar positioner från {self.base_url}/{endpoint}")
+            started_at = time.time()
             try:
                 _t0 = time.perf_counter()
                 async with self._sem:
@@ -171,6 +189,7 @@ class PositionsService:
                 raise
 
             logger.info(f"✅ REST API: Hämtade {len(positions_data)} positioner")
+            account_state.reconcile("positions", positions_data, started_at)
             positions = [Position.from_bitfinex_data(position) for position in positions_data]
             return positions
 
@@ -13,7 +13,7 @@ import jwt
 from fastapi import APIRouter, Depends, HTTPException, Response, Query, Request, status
 from utils.logger import get_logger
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from fastapi.responses import JSONResponse, PlainTextResponse, ORJSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from config.settings import Settings, settings
@@ -61,14 +61,18 @@ from utils.feature_flags import (
 )
 from services.signal_service import SignalService
 from services.strategy import evaluate_weighted_strategy
-from services.strategy_settings import StrategySettings, StrategySettingsService
+from services.strategy_settings import (
+    StrategySettings,
+    get_strategy_settings_service,
+    reload_strategy_settings,
+)
 from services.symbols import SymbolService
 from services.templates import OrderTemplatesService
 from services.trading_integration import trading_integration
 from services.trading_window import TradingWindowService
 from services.watchlist_service import get_watchlist_service
 from utils.advanced_rate_limiter import get_advanced_rate_limiter
-from utils.candle_cache import candle_cache
+from utils.candle_cache import async_candle_cache
 from utils.candles import parse_candles_to_strategy_data
 from utils.logger import get_logger
 from utils.rate_limiter import get_rate_limiter
@@ -147,16 +151,19 @@ class WSOrderUpdateRequest(BaseModel):
     price: float | None = None
     amount: float | None = None
     extra: dict[str, Any] | None = None
+    wait_ack: bool = False  # vänta på Bitfinex-bekräftelse (n/ou)
 
 
 class WSCancelMultiRequest(BaseModel):
     ids: list[int] | None = None
     cids: list[int] | None = None
     cid_date: str | None = None  # YYYY-MM-DD
+    wait_ack: bool = False
 
 
 class WSOrderOpsRequest(BaseModel):
     ops: list[Any]
+    wait_ack: bool = False
 
 
 class WSUnsubscribeRequest(BaseModel):
@@ -708,13 +715,8 @@ async def place_order_endpoint(order: OrderRequest, _: bool = Depends(require_au
                         on_payload["cid"] = str(datetime.now().timestamp())
                 # Skicka som singel 'on' istället för batch 'ops' (ökar kompatibilitet)
                 try:
-                    if await _ws.ensure_authenticated():
-                        # Bitfinex WebSocket API förväntar array-format: [0, "on", null, payload]
-                        ws_message = [0, "on", None, on_payload]
-                        await _ws.send(json.dumps(ws_message))
-                        ws_res = {"success": True, "sent": True}
-                    else:
-                        ws_res = {"success": False, "error": "ws_not_authenticated"}
+                    # [0, "on", null, payload]; vänta på Bitfinex-ack (n on-req / on) via cid
+                    ws_res = await _ws.order_new(on_payload, wait_ack=True)
                 except Exception as _se:
                     ws_res = {"success": False, "error": "internal_error"}
                 ws_fallback_ok = bool(ws_res.get("success"))
@@ -878,6 +880,7 @@ async def update_order_endpoint(update_request: UpdateOrderRequest, _: bool = De
                     price=update_request.price,
                     amount=update_request.amount,
                     extra=None,
+                    wait_ack=True,
                 )
                 if bool(ws_res.get("success")):
                     _emit_notification(
@@ -907,6 +910,7 @@ async def ws_order_update(payload: WSOrderUpdateRequest, _: bool = Depends(requi
             price=payload.price,
             amount=payload.amount,
             extra=payload.extra,
+            wait_ack=payload.wait_ack,
         )
         if not result.get("success"):
             return OrderResponse(success=False, error="internal_error")
@@ -921,7 +925,9 @@ async def ws_order_cancel_multi(payload: WSCancelMultiRequest, _: bool = Depends
     try:
         from services.bitfinex_websocket import bitfinex_ws
 
-        result = await bitfinex_ws.order_cancel_multi(ids=payload.ids, cids=payload.cids, cid_date=payload.cid_date)
+        result = await bitfinex_ws.order_cancel_multi(
+            ids=payload.ids, cids=payload.cids, cid_date=payload.cid_date, wait_ack=payload.wait_ack
+        )
         if not result.get("success"):
             return OrderResponse(success=False, error="internal_error")
         return OrderResponse(success=True, data=result)
@@ -971,7 +977,7 @@ async def ws_order_ops(payload: WSOrderOpsRequest, _: bool = Depends(require_aut
 
         from services.bitfinex_websocket import bitfinex_ws
 
-        result = await bitfinex_ws.order_ops(resolved_ops)
+        result = await bitfinex_ws.order_ops(resolved_ops, wait_ack=payload.wait_ack)
         if not result.get("success"):
             return OrderResponse(success=False, error="internal_error")
         return OrderResponse(success=True, data=result)
@@ -1593,7 +1599,7 @@ async def get_strategy_settings(symbol: str | None = None, _: bool = Depends(req
         else:
             get_strategy_settings._cache = {}
 
-        svc = StrategySettingsService()
+        svc = get_strategy_settings_service()
         result = svc.get_settings(symbol=symbol).to_dict()
 
         # Spara i cache
@@ -1615,7 +1621,7 @@ async def update_strategy_settings(
     _: bool = Depends(require_auth),
 ):
     try:
-        svc = StrategySettingsService()
+        svc = get_strategy_settings_service()
         current = svc.get_settings(symbol=symbol)
         updated = StrategySettings(
             ema_weight=(payload.ema_weight if payload.ema_weight is not None else current.ema_weight),
@@ -1627,11 +1633,13 @@ async def update_strategy_settings(
         )
         saved = svc.save_settings(updated, symbol=symbol)
 
-        # OPTIMERING: Invalidera cache efter uppdatering
-        cache_key = f"strategy_settings_{symbol or 'default'}"
+        # Explicit reload av processgemensam settings-snapshot (även filer ändrade utanför API:t)
+        reload_strategy_settings()
+
+        # OPTIMERING: Invalidera cache efter uppdatering (global ändring påverkar alla symboler)
         if hasattr(get_strategy_settings, "_cache"):
-            get_strategy_settings._cache.pop(cache_key, None)
-            logger.debug(f"🗑️ Invalidated cache för {cache_key}")
+            get_strategy_settings._cache.clear()
+            logger.debug("🗑️ Invalidated strategy settings cache")
 
         # Skicka WS-notifiering
         try:
@@ -1669,23 +1677,7 @@ class StrategyAutoPayload(BaseModel):
 @router.get("/strategy/auto")
 async def get_strategy_auto(_: bool = Depends(require_auth)):
     try:
-        import json
-        import os
-
-        cfg_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "config",
-            "strategy_settings.json",
-        )
-        data: dict[str, object]
-        try:
-            with open(cfg_path, encoding="utf-8") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            data = {}
-        except Exception as e:  # pragma: no cover
-            logger.warning(f"Kunde inte läsa strategy_settings.json: {e}")
-            data = {}
+        data = get_strategy_settings_service().get_raw()
         return {
             "AUTO_REGIME_ENABLED": bool(data.get("AUTO_REGIME_ENABLED", True)),
             "AUTO_WEIGHTS_ENABLED": bool(data.get("AUTO_WEIGHTS_ENABLED", True)),
@@ -1725,6 +1717,7 @@ async def update_strategy_auto(payload: StrategyAutoPayload, _: bool = Depends(r
         os.makedirs(os.path.dirname(cfg_path), exist_ok=True)
         with open(cfg_path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        reload_strategy_settings()
 
         return {
             "AUTO_REGIME_ENABLED": bool(data.get("AUTO_REGIME_ENABLED", True)),
@@ -1856,9 +1849,9 @@ async def calculate_position_size(req: PositionSizeRequest, _: bool = Depends(re
             if not price or price <= 0:
                 # Dev/demo fallback: försök läsa senaste cache-pris
                 try:
-                    from utils.candle_cache import candle_cache as _cc
+                    from utils.candle_cache import async_candle_cache as _cc
 
-                    rows = _cc.load(req.symbol, req.timeframe, limit=1)
+                    rows = await _cc.load(req.symbol, req.timeframe, limit=1)
                     if isinstance(rows, list) and len(rows) >= 1:
                         last = rows[0]
                         if isinstance(last, list) and len(last) >= 3:
@@ -1893,7 +1886,7 @@ async def calculate_position_size(req: PositionSizeRequest, _: bool = Depends(re
                 except Exception:
                     parsed = {"highs": [], "lows": [], "closes": []}
                 # Hämta ATR-period från strategiinställningar
-                ssvc = StrategySettingsService()
+                ssvc = get_strategy_settings_service()
                 s = ssvc.get_settings(symbol=req.symbol)
                 atr_val = calculate_atr(
                     parsed.get("highs", []),
@@ -2160,6 +2153,28 @@ async def ws_pool_status(_: bool = Depends(require_auth)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get("/ws/orders/acks/status")
+async def ws_order_acks_status(_: bool = Depends(require_auth)):
+    try:
+        from services.order_acks import order_acks
+
+        return order_acks.get_stats()
+    except Exception as e:
+        logger.exception(f"Order ack status error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/account/state/status")
+async def account_state_status(_: bool = Depends(require_auth)):
+    try:
+        from services.account_state import account_state
+
+        return account_state.get_stats()
+    except Exception as e:
+        logger.exception(f"Account state status error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.post("/ws/subscribe")
 async def ws_subscribe(req: WSSubscribeRequest, _: bool = Depends(require_auth)):
     try:
@@ -2758,9 +2773,19 @@ async def market_symbols(test_only: bool = False, format: str = "v2", _: bool =
 
 # Watchlist endpoint (liten vy) med ticker + volym + senaste strategi-signal
 @router.get("/market/watchlist")
-async def market_watchlist(symbols: str | None = None, prob: bool = False, _: bool = Depends(require_auth)):
+async def market_watchlist(
+    symbols: str | None = None, prob: bool = False, stream: bool = False, _: bool = Depends(require_auth)
+):
+    """Watchlist-rader; med stream=1 skickas rader och margin-status som NDJSON så fort de är klara."""
     try:
         svc = get_watchlist_service()
+        if stream:
+
+            async def _ndjson():
+                async for row in svc.stream_watchlist(symbols, prob):
+                    yield json.dumps(row, default=str) + "\n"
+
+            return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
         return await svc.build_watchlist(symbols_param=symbols, include_prob=prob)
     except Exception as e:
         logger.exception("Fel vid watchlist")
@@ -2773,6 +2798,7 @@ class BacktestRequest(BaseModel):
     timeframe: str = "1m"
     limit: int = 500
     tz_offset_minutes: int | None = 0
+    engine: str = "vectorized"  # "vectorized" | "legacy"
 
 
 @router.post("/strategy/backtest")
@@ -2780,7 +2806,7 @@ async def strategy_backtest(payload: BacktestRequest, _: bool = Depends(require_
     try:
         svc = BacktestService()
         tz_off = payload.tz_offset_minutes or 0
-        result = await svc.run(payload.symbol, payload.timeframe, payload.limit, tz_off)
+        result = await svc.run(payload.symbol, payload.timeframe, payload.limit, tz_off, engine=payload.engine)
         return result
     except Exception as e:
         logger.exception("Backtest fel")
@@ -2941,9 +2967,11 @@ async def place_bracket_order(req: BracketOrderRequest, _: bool = Depends(requir
 
                 from services.bitfinex_websocket import bitfinex_ws as _ws
 
-                ws_res = await _ws.order_ops([["on", entry_payload]])
+                ws_res = await _ws.order_ops([["on", entry_payload]], wait_ack=True)
                 if not bool(ws_res.get("success")):
                     return OrderResponse(success=False, error=entry_res.get("error"))
+                # Order-id från Bitfinex-ack så BracketManager kan följa entry
+                entry_res = {"id": (ws_res.get("acks") or [{}])[0].get("order_id")}
             except Exception:
                 return OrderResponse(success=False, error=entry_res.get("error"))
         entry_id = _extract_order_id(entry_res)
@@ -2969,9 +2997,9 @@ async def place_bracket_order(req: BracketOrderRequest, _: bool = Depends(requir
                 try:
                     from services.bitfinex_websocket import bitfinex_ws as _ws
 
-                    ws_res = await _ws.order_ops([["on", sl_payload]])
+                    ws_res = await _ws.order_ops([["on", sl_payload]], wait_ack=True)
                     if bool(ws_res.get("success")):
-                        sl_id = None  # WS-id fås via privata callbacks, leave None
+                        sl_id = (ws_res.get("acks") or [{}])[0].get("order_id")
                 except Exception:
                     pass
             else:
@@ -2993,9 +3021,9 @@ async def place_bracket_order(req: BracketOrderRequest, _: bool = Depends(requir
                 try:
                     from services.bitfinex_websocket import bitfinex_ws as _ws
 
-                    ws_res = await _ws.order_ops([["on", tp_payload]])
+                    ws_res = await _ws.order_ops([["on", tp_payload]], wait_ack=True)
                     if bool(ws_res.get("success")):
-                        tp_id = None
+                        tp_id = (ws_res.get("acks") or [{}])[0].get("order_id")
                 except Exception:
                     pass
             else:
@@ -3396,6 +3424,9 @@ class BacktestRequestV2(BaseModel):
     initial_capital: float = 10000.0
     position_size_pct: float = 0.1
     costs: dict | None = None
+    mode: str = "path"  # "path" (en simulerad väg) | "monte_carlo" (fördelningar)
+    n_paths: int = 500
+    seed: int = 0
 
 
 @router.post("/backtest/cost-aware")
@@ -3409,6 +3440,21 @@ async def run_cost_aware_backtest(req: BacktestRequestV2, _: bool = Depends(requ
         if req.costs:
             costs = TradeCosts(**req.costs)
 
+        if req.mode == "monte_carlo":
+            from dataclasses import asdict
+
+            mc = await cost_aware_backtest.run_monte_carlo(
+                symbol=req.symbol,
+                timeframe=req.timeframe,
+                limit=req.limit,
+                initial_capital=req.initial_capital,
+                position_size_pct=req.position_size_pct,
+                costs=costs,
+                n_paths=max(1, min(int(req.n_paths), 10000)),
+                seed=req.seed,
+            )
+            return {"success": True, "mode": "monte_carlo", "result": asdict(mc)}
+
         result = await cost_aware_backtest.run_backtest(
             symbol=req.symbol,
             timeframe=req.timeframe,
@@ -3484,6 +3530,74 @@ async def get_default_costs(_: bool = Depends(require_auth)):
         raise HTTPException(status_code=500, detail="Internal server error") from e
 
 
+# Parameter-sweep (grid search) på process-pool
+class BacktestSweepRequest(BaseModel):
+    symbol: str
+    timeframe: str = "1m"
+    limit: int = 1000
+    ranges: dict = {}  # ex: {"ema_period": [10, 14, 20], "rsi_buy": {"start": 20, "stop": 35, "step": 5}}
+    rank_by: str = "sharpe"  # sharpe | expectancy | final_equity | max_drawdown
+
+
+@router.post("/backtest/sweep")
+async def start_backtest_sweep(req: BacktestSweepRequest, _: bool = Depends(require_auth)):
+    """Starta en sweep i bakgrunden; polla GET /backtest/sweep/{job_id} för rankade resultat."""
+    try:
+        from services.backtest_sweep import get_backtest_sweep_service
+
+        job = await get_backtest_sweep_service().start(
+            req.symbol, req.timeframe, req.ranges, limit=req.limit, rank_by=req.rank_by
+        )
+        return job.snapshot(top=0)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except Exception as e:
+        logger.exception(f"Fel vid start av backtest-sweep: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+
+@router.get("/backtest/sweep/{job_id}")
+async def get_backtest_sweep(job_id: str, top: int = 20, _: bool = Depends(require_auth)):
+    """Status, progress (configs/sec) och hittills bäst rankade resultat."""
+    from services.backtest_sweep import get_backtest_sweep_service
+
+    job = get_backtest_sweep_service().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="sweep_not_found")
+    return job.snapshot(top=top)
+
+
+@router.delete("/backtest/sweep/{job_id}")
+async def cancel_backtest_sweep(job_id: str, _: bool = Depends(require_auth)):
+    """Avbryt en pågående sweep; redan klara resultat behålls."""
+    from services.backtest_sweep import get_backtest_sweep_service
+
+    svc = get_backtest_sweep_service()
+    if svc.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="sweep_not_found")
+    return {"job_id": job_id, "cancelled": svc.cancel(job_id)}
+
+
+@router.get("/compute/jobs")
+async def get_compute_jobs(_: bool = Depends(require_auth)):
+    """Compute-workerns kö, körande jobb och senaste jobbhistorik samt event loop-lagg."""
+    from services.compute_worker import get_compute_worker
+    from utils.loop_lag import get_loop_lag_monitor
+
+    return {**get_compute_worker().get_stats(), "loop_lag": get_loop_lag_monitor().get_stats()}
+
+
+@router.delete("/compute/jobs/{job_id}")
+async def cancel_compute_job(job_id: str, _: bool = Depends(require_auth)):
+    """Avbryt ett köat eller körande compute-jobb (processen termineras)."""
+    from services.compute_worker import get_compute_worker
+
+    worker = get_compute_worker()
+    if worker.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return {"job_id": job_id, "cancelled": worker.cancel(job_id)}
+
+
 # Regime Ablation endpoints
 class RegimeConfigRequest(BaseModel):
     regime_name: str
@@ -3930,7 +4044,7 @@ class BackfillRequest(BaseModel):
 @router.get("/cache/candles/stats")
 async def cache_candles_stats(_: bool = Depends(require_auth)):
     try:
-        return candle_cache.stats()
+        return await async_candle_cache.stats()
     except Exception as e:
         logger.exception(f"Fel vid cache stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error") from e
@@ -3940,12 +4054,12 @@ async def cache_candles_stats(_: bool = Depends(require_auth)):
 async def cache_candles_clear(req: CacheClearRequest, _: bool = Depends(require_auth)):
     try:
         if req.symbol:
-            n = candle_cache.clear(req.symbol, req.timeframe)
+            n = await async_candle_cache.clear(req.symbol, req.timeframe)
         else:
-            n = candle_cache.clear_all()
+            n = await async_candle_cache.clear_all()
         # Enforce retention efter clear (kan även köras via scheduler)
         try:
-            removed = candle_cache.enforce_retention(
+            removed = await async_candle_cache.enforce_retention(
                 getattr(settings, "CANDLE_CACHE_RETENTION_DAYS", 7),
                 getattr(settings, "CANDLE_CACHE_MAX_ROWS_PER_PAIR", 10000),
             )
@@ -4534,32 +4648,20 @@ async def get_all_regimes(_: bool = Depends(require_auth)):
                 # Använd samma regime endpoint som Live Signals
                 # Hämta regime data direkt via MarketDataFacade
                 from services.market_data_facade import get_market_data
-                from indicators.regime import detect_regime
-                from indicators.adx import adx as adx_series
-                from indicators.regime import ema_z
+                from services.regime_engine import regime_engine
 
                 data_service = get_market_data()
                 candles = await data_service.get_candles(symbol, "1m", limit=50)
 
-                if candles and len(candles) >= 20:
-                    highs = [float(candle[3]) for candle in candles if len(candle) >= 4]
-                    lows = [float(candle[4]) for candle in candles if len(candle) >= 5]
-                    closes = [float(candle[2]) for candle in candles if len(candle) >= 3]
-
-                    if len(highs) >= 20 and len(lows) >= 20 and len(closes) >= 20:
-                        regime = detect_regime(highs, lows, closes)
-                        adx_vals = adx_series(highs, lows, closes, period=14)
-                        ez_vals = ema_z(closes, 3, 7, 200)
-
-                        regime_data = {
-                            "symbol": symbol,
-                            "regime": regime,
-                            "adx_value": adx_vals[-1] if adx_vals else None,
-                            "ema_z_value": ez_vals[-1] if ez_vals else None,
-                            "last_close": closes[-1] if closes else None,
-                        }
-                    else:
-                        regime_data = None
+                res = regime_engine.result_for_candles(symbol, "1m", candles) if candles else None
+                if res is not None:
+                    regime_data = {
+                        "symbol": symbol,
+                        "regime": res.regime,
+                        "adx_value": res.adx_value,
+                        "ema_z_value": res.ema_z_value,
+                        "last_close": res.last_close,
+                    }
                 else:
                     regime_data = None
                 if regime_data and "regime" in regime_data and regime_data["regime"] != "unknown":
@@ -4662,8 +4764,8 @@ async def get_strategy_regime(symbol: str, _: bool = Depends(require_auth)):
     try:
         from datetime import datetime, timedelta
 
-        from indicators.regime import detect_regime
         from services.market_data_facade import get_market_data
+        from services.regime_engine import regime_engine
 
         # OPTIMERING: Cache regime-data för 5 minuter
         cache_key = f"regime_{symbol}"
@@ -4685,14 +4787,6 @@ async def get_strategy_regime(symbol: str, _: bool = Depends(require_auth)):
         if not candles or len(candles) < 20:
             return {"regime": "unknown", "reason": "insufficient_data"}
 
-        # Extrahera high, low, close (vektoriserat för prestanda)
-        highs = [float(candle[3]) for candle in candles if len(candle) >= 4]
-        lows = [float(candle[4]) for candle in candles if len(candle) >= 5]
-        closes = [float(candle[2]) for candle in candles if len(candle) >= 3]
-
-        if len(highs) < 20 or len(lows) < 20 or len(closes) < 20:
-            return {"regime": "unknown", "reason": "insufficient_data"}
-
         # Konfiguration för regim-detektering (känsligare för testning)
         cfg = {
             "ADX_PERIOD": 14,
@@ -4702,25 +4796,19 @@ async def get_strategy_regime(symbol: str, _: bool = Depends(require_auth)):
             "SLOPE_Z_LOW": 0.5,
         }
 
-        # Detektera regim
-        regime = detect_regime(highs, lows, closes, cfg)
-
-        # OPTIMERING: Beräkna ADX och EMA Z parallellt
-
-        from indicators.adx import adx as adx_series
-        from indicators.regime import ema_z
-
-        # Beräkna indikatorer parallellt för bättre prestanda
-        adx_vals = adx_series(highs, lows, closes, period=14)
-        ez_vals = ema_z(closes, 3, 7, 200)
+        # Regim + ADX/EMA Z i ett pass, memoiserat per (symbol, tf, senaste candle)
+        res = regime_engine.result_for_candles(symbol, "1m", candles, cfg)
+        if res is None:
+            return {"regime": "unknown", "reason": "insufficient_data"}
 
         result = {
             "symbol": symbol,
-            "regime": regime,
+            "regime": res.regime,
             "candles_count": len(candles),
-            "last_close": closes[-1] if closes else None,
-            "adx_value": adx_vals[-1] if adx_vals else None,
-            "ema_z_value": ez_vals[-1] if ez_vals else None,
+            "last_close": res.last_close,
+            "adx_value": res.adx_value,
+            "ema_z_value": res.ema_z_value,
+            "thresholds": res.thresholds,
         }
 
         # Spara i cache
@@ -5852,16 +5940,16 @@ async def get_signal_history(symbol: str | None = None, limit: int = 50, _: bool
 async def clear_cache(symbol: str | None = None, timeframe: str | None = None):
     """Rensa candle cache för att tvinga live data-uppdateringar"""
     try:
-        from utils.candle_cache import candle_cache
+        from utils.candle_cache import async_candle_cache
 
         if symbol:
             # Rensa specifik symbol
-            deleted = candle_cache.clear_symbol(symbol, timeframe)
+            deleted = await async_candle_cache.clear_symbol(symbol, timeframe)
             logger.info(f"🧹 Rensade cache för {symbol}: {deleted} rader")
             return {"ok": True, "deleted_rows": deleted, "symbol": symbol}
         else:
             # Rensa all cache
-            deleted = candle_cache.clear_all()
+            deleted = await async_candle_cache.clear_all()
             logger.info(f"🧹 Rensade all cache: {deleted} rader")
             return {"ok": True, "deleted_rows": deleted, "message": "All cache cleared"}
 
@@ -5877,9 +5965,9 @@ async def clear_cache(symbol: str | None = None, timeframe: str | None = None):
 async def get_cache_stats():
     """Hämta cache-statistik"""
     try:
-        from utils.candle_cache import candle_cache
+        from utils.candle_cache import async_candle_cache
 
-        stats = candle_cache.stats()
+        stats = await async_candle_cache.stats()
         return stats
 
     except Exception as e:
@@ -5904,9 +5992,9 @@ async def get_performance_stats():
 
         # Cache-statistik (kombinera båda cache-systemen)
         data_cache_stats = data_coordinator.get_cache_stats()
-        from utils.candle_cache import candle_cache
+        from utils.candle_cache import async_candle_cache
 
-        candle_cache_stats = candle_cache.stats()
+        candle_cache_stats = await async_candle_cache.stats()
 
         # Kombinera cache-statistik
         cache_stats = {
@@ -13,6 +13,7 @@ from services.exchange_client import get_exchange_client
 from pydantic import BaseModel
 
 from config.settings import settings
+from services.account_state import account_state
 from services.metrics import record_http_result
 from utils.advanced_rate_limiter import get_advanced_rate_limiter
 from utils.logger import get_logger
@@ -40,11 +41,21 @@ class WalletBalance(BaseModel):
             wallet_type=data[0],
             currency=data[1],
             balance=float(data[2]),
-            unsettled_interest=float(data[3]) if len(data) > 3 else 0.0,
-            available_balance=float(data[4]) if len(data) > 4 else None,
+            unsettled_interest=float(data[3]) if len(data) > 3 and data[3] is not None else 0.0,
+            available_balance=float(data[4]) if len(data) > 4 and data[4] is not None else None,
         )
 
 
+def _wallet_models(rows: tuple) -> list[WalletBalance]:
+    out: list[WalletBalance] = []
+    for row in rows:
+        try:
+            out.append(WalletBalance.from_bitfinex_data(list(row)))
+        except Exception:
+            continue
+    return out
+
+
 class WalletService:
     """Service för att hämta och hantera plånboksinformation från Bitfinex."""
 
@@ -56,13 +67,19 @@ class WalletService:
         # Global semafor för alla privata REST-klasser
         self._sem = get_private_rest_semaphore()
 
-    async def get_wallets(self) -> list[WalletBalance]:
+    async def get_wallets(self, force_rest: bool = False) -> list[WalletBalance]:
         """
-        Hämtar alla plånböcker från Bitfinex.
+        Hämtar alla plånböcker.
+
+        Läser från WS-speglat kontoläge (account_state) när det är live;
+        annars (eller med force_rest=True) från Bitfinex REST, vars svar
+        seedar/reconcilar kontoläget.
 
         Returns:
             Lista med WalletBalance-objekt
         """
+        if not force_rest and account_state.ready("wallets"):
+            return list(account_state.derived("wallets", "models", _wallet_models))
         try:
             # Safeguard: saknade nycklar → tom lista istället för 500
             if not (self.settings.BITFINEX_API_KEY and self.settings.BITFINEX_API_SECRET):
@@ -84,6 +101,7 @@ class WalletService:
                 pass
 
             logger.info(f"🌐 REST API: Hämtar plånböcker från {self.base_url}/{endpoint}")
+            started_at = time.time()
             _t0 = time.perf_counter()
             async with self._sem:
                 ec = get_exchange_client()
@@ -166,6 +184,7 @@ class WalletService:
 
                 wallets_data = response.json()
                 logger.info(f"✅ REST API: Hämtade {len(wallets_data)} plånböcker")
+                account_state.reconcile("wallets", wallets_data, started_at)
 
                 wallets = [WalletBalance.from_bitfinex_data(wallet) for wallet in wallets_data]
                 return wallets
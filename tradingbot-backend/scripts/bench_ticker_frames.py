@@ -0,0 +1,87 @@
+"""
+Benchmark: allokeringar per 10k WS ticker-frames, dict per frame (tidigare)
+jämfört med TickerFrame som uppdateras in-place (nu).
+
+Kör: python scripts/bench_ticker_frames.py [antal_frames] [antal_symboler]
+
+Mäter payload-objekt som normaliseringen ger callbacks (antal unika objekt
+och bytes enligt tracemalloc när alla payloads hålls vid liv) samt ns/frame
+för själva normaliseringen. Att kanalhanteraren i
+BitfinexWebSocketService återanvänder samma TickerFrame verifieras i
+tests/test_ticker_frame.py.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.ticker_frame import TickerFrame  # noqa: E402
+
+
+def _legacy_normalize(symbol: str, message_data: list) -> dict:
+    """Tidigare normalisering: ny dict med 11 nycklar per frame."""
+    return {
+        "symbol": symbol,
+        "bid": message_data[0],
+        "bid_size": message_data[1],
+        "ask": message_data[2],
+        "ask_size": message_data[3],
+        "daily_change": message_data[4],
+        "daily_change_relative": message_data[5],
+        "last_price": message_data[6],
+        "volume": message_data[7] if len(message_data) > 7 else 0,
+        "high": message_data[8] if len(message_data) > 8 else 0,
+        "low": message_data[9] if len(message_data) > 9 else 0,
+    }
+
+
+def _frames(n_frames: int, n_symbols: int) -> list[list]:
+    out = []
+    for i in range(n_frames):
+        px = 100.0 + (i % 97) * 0.01
+        out.append([i % n_symbols + 1, [px, 1.0, px + 0.1, 2.0, 0.5, 0.01, px, 1000.0, px + 1, px - 1]])
+    return out
+
+
+def _measure(fn, frames: list[list]) -> tuple[int, int, float]:
+    retained: list = []
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    for msg in frames:
+        retained.append(fn(msg))
+    elapsed = time.perf_counter() - t0
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    # Listan själv räknas bort (8 bytes per pekare)
+    payload_bytes = max(0, used - 8 * len(retained))
+    return len({id(x) for x in retained}), payload_bytes, elapsed * 1e9 / max(1, len(frames))
+
+
+def run(n_frames: int = 10_000, n_symbols: int = 50) -> dict[str, dict[str, float]]:
+    frames = _frames(n_frames, n_symbols)
+    symbols = {cid: f"tSYM{cid}USD" for cid in range(1, n_symbols + 1)}
+
+    legacy = _measure(lambda m: _legacy_normalize(symbols[m[0]], m[1]), frames)
+
+    # Ny väg: en TickerFrame per symbol, uppdateras in-place
+    ticker_frames = {cid: TickerFrame(sym) for cid, sym in symbols.items()}
+    current = _measure(lambda m: ticker_frames[m[0]].update(m[1]), frames)
+
+    result = {}
+    for name, (objs, nbytes, ns) in (("dict_per_frame", legacy), ("ticker_frame", current)):
+        result[name] = {"payload_objects": objs, "payload_bytes": nbytes, "ns_per_frame": round(ns, 1)}
+    return result
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    syms = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    for name, row in run(n, syms).items():
+        objs, size = row["payload_objects"], row["payload_bytes"]
+        print(f"{name:>15}: {objs:>6} objekt, {size:>9} bytes, {row['ns_per_frame']} ns/frame")
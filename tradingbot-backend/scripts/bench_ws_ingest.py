@@ -0,0 +1,128 @@
+"""
+Micro-benchmark: WS-ingest frames/sek per socket.
+
+Jämför tidigare väg (json.loads på varje frame, även heartbeats) med
+fast-path (heartbeat-filter på råa bytes + orjson), samt hela vägen
+avkodning + _handle_channel_message (dispatch-köer, no-op callbacks).
+
+Kör: python scripts/bench_ws_ingest.py [--frames N] [--hb-share 0.5]
+                                        [--msgs-per-sub 5] [--cpu-budget 0.5]
+
+Sista raden ger ett riktvärde för WS_MAX_SUBS_PER_SOCKET: hur många subs
+en socket klarar om varje sub i snitt ger `msgs-per-sub` frames/sek och
+läsloopen får använda `cpu-budget` av en kärna.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.bitfinex_websocket import bitfinex_ws  # noqa: E402
+from utils.json_optimizer import is_heartbeat_frame, ws_loads  # noqa: E402
+
+TICKER_CHAN, CANDLE_CHAN, TRADES_CHAN, BOOK_CHAN = 101, 102, 103, 104
+
+
+def _frames(n: int, hb_share: float, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    out: list[str] = []
+    for i in range(n):
+        px = round(60000 + rng.uniform(-50, 50), 1)
+        if rng.random() < hb_share:
+            out.append(json.dumps([rng.choice((TICKER_CHAN, CANDLE_CHAN, TRADES_CHAN, BOOK_CHAN)), "hb"]))
+            continue
+        kind = i % 4
+        if kind == 0:
+            msg = [TICKER_CHAN, [px, 1.2, px + 0.1, 0.8, -120.0, -0.002, px, 1523.4, px + 900, px - 900]]
+        elif kind == 1:
+            msg = [CANDLE_CHAN, [1_700_000_000_000 + i * 60_000, px, px, px + 5, px - 5, 12.5]]
+        elif kind == 2:
+            msg = [TRADES_CHAN, "te", [i, 1_700_000_000_000 + i, 0.01, px]]
+        else:
+            msg = [BOOK_CHAN, [px, 1, -0.5]]
+        out.append(json.dumps(msg, separators=(",", ":")))
+    return out
+
+
+def _rate(n: int, elapsed: float) -> float:
+    return n / elapsed if elapsed > 0 else float("inf")
+
+
+def bench_decode(frames: list[str]) -> dict[str, float]:
+    t0 = time.perf_counter()
+    for f in frames:
+        json.loads(f)
+    baseline = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for f in frames:
+        if not is_heartbeat_frame(f):
+            ws_loads(f)
+    fast = time.perf_counter() - t0
+    return {
+        "json_loads_fps": _rate(len(frames), baseline),
+        "fast_path_fps": _rate(len(frames), fast),
+        "speedup": baseline / fast if fast > 0 else float("inf"),
+    }
+
+
+async def bench_ingest(frames: list[str]) -> float:
+    """Hela vägen genom BitfinexWebSocketService: avkodning + kanalroutning + dispatch."""
+    ws = object()
+    for chan, info in (
+        (TICKER_CHAN, {"channel": "ticker", "symbol": "tBTCUSD"}),
+        (CANDLE_CHAN, {"channel": "candles", "symbol": None, "key": "trade:1m:tBTCUSD"}),
+        (TRADES_CHAN, {"channel": "trades", "symbol": "tBTCUSD"}),
+        (BOOK_CHAN, {"channel": "book", "symbol": "tBTCUSD", "sub_key": None}),
+    ):
+        bitfinex_ws._chan_callbacks[(ws, chan)] = lambda _p: None
+        bitfinex_ws._chan_info[(ws, chan)] = info
+    try:
+        t0 = time.perf_counter()
+        for f in frames:
+            data = bitfinex_ws._decode_frame(ws, f)
+            if data is None:
+                continue
+            await bitfinex_ws._route_frame(ws, data)
+        await bitfinex_ws._dispatcher.drain()
+        return _rate(len(frames), time.perf_counter() - t0)
+    finally:
+        for chan in (TICKER_CHAN, CANDLE_CHAN, TRADES_CHAN, BOOK_CHAN):
+            bitfinex_ws._chan_callbacks.pop((ws, chan), None)
+            bitfinex_ws._chan_info.pop((ws, chan), None)
+        bitfinex_ws._ingest_stats.pop(ws, None)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=200_000)
+    ap.add_argument("--hb-share", type=float, default=0.5)
+    ap.add_argument("--msgs-per-sub", type=float, default=5.0)
+    ap.add_argument("--cpu-budget", type=float, default=0.5)
+    args = ap.parse_args()
+
+    frames = _frames(args.frames, args.hb_share)
+    dec = bench_decode(frames)
+    full_fps = asyncio.run(bench_ingest(frames))
+
+    print(f"frames: {len(frames)}  heartbeat-andel: {args.hb_share:.0%}")
+    print(f"  json.loads (tidigare):        {dec['json_loads_fps']:>12,.0f} frames/s")
+    print(f"  hb-filter + orjson:           {dec['fast_path_fps']:>12,.0f} frames/s  ({dec['speedup']:.1f}x)")
+    print(f"  full ingest per socket:       {full_fps:>12,.0f} frames/s")
+    subs = full_fps * args.cpu_budget / max(args.msgs_per_sub, 1e-9)
+    print(
+        f"  => ~{subs:,.0f} subs/socket vid {args.msgs_per_sub:g} frames/s/sub och {args.cpu_budget:.0%} CPU "
+        f"(Bitfinex tak: 25 kanaler/anslutning)"
+    )
+
+
+if __name__ == "__main__":
+    main()
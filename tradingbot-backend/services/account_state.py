@@ -0,0 +1,266 @@
+"""
+Account State - WS-speglat kontoläge (wallets, positioner, ordrar).
+
+En auktoritativ in-memory-kopia av kontot som matas av Bitfinex privata
+WS-händelser på kanal 0:
+
+- wallets:   ws (snapshot), wu (delta)
+- positions: ps (snapshot), pn/pu (delta), pc (stängd)
+- orders:    os (snapshot), on/ou (delta), oc (stängd/avbruten)
+
+Varje sektion har ett versionsnummer som ökar vid varje ändring. Läsning
+(`read`) ger en oföränderlig StateRead för aktuell version, och
+`derived` memoiserar härledda vyer (t.ex. pydantic-modeller) per version,
+så upprepade läsningar är O(1).
+
+En sektion är `ready` när WS är autentiserat och sektionen har fått en
+snapshot sedan senaste (re)auth. Innan dess läser REST-tjänsterna från
+börsen som tidigare och seedar storen. En lågfrekvent REST-reconcile
+(SchedulerService) jämför mot börsen och reparerar drift.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SECTIONS = ("wallets", "positions", "orders")
+
+_SNAPSHOT_EVENTS = {"ws": "wallets", "ps": "positions", "os": "orders"}
+_UPSERT_EVENTS = {"wu": "wallets", "pn": "positions", "pu": "positions", "on": "orders", "ou": "orders"}
+_REMOVE_EVENTS = {"pc": "positions", "oc": "orders"}
+ACCOUNT_EVENTS = frozenset((*_SNAPSHOT_EVENTS, *_UPSERT_EVENTS, *_REMOVE_EVENTS))
+
+
+@dataclass(frozen=True)
+class StateRead:
+    """Oföränderlig läsning av en sektion vid en viss version."""
+
+    section: str
+    version: int
+    ready: bool
+    updated_at: float
+    rows: tuple
+
+
+def _row_key(section: str, row: list) -> Any:
+    if section == "wallets":
+        return (row[0], row[1])
+    return row[0]
+
+
+def _valid_row(section: str, row: Any) -> bool:
+    if not isinstance(row, (list, tuple)):
+        return False
+    return len(row) >= {"wallets": 3, "positions": 4, "orders": 14}[section]
+
+
+def _r(x: Any) -> float | None:
+    try:
+        return round(float(x), 8)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fingerprint(section: str, rows: dict[Any, list]) -> dict[Any, tuple]:
+    """Fälten som avgör drift (belopp/priser/status – inte PnL som rör sig hela tiden)."""
+    if section == "wallets":
+        return {k: (_r(r[2]),) for k, r in rows.items()}
+    if section == "positions":
+        return {k: (_r(r[2]), _r(r[3])) for k, r in rows.items()}
+    return {k: (_r(r[6]), _r(r[16]) if len(r) > 16 else None, r[13]) for k, r in rows.items()}
+
+
+class AccountStateStore:
+    """In-memory kontoläge med versionerade läsningar."""
+
+    def __init__(self) -> None:
+        self._rows: dict[str, dict[Any, list]] = {s: {} for s in SECTIONS}
+        self._versions: dict[str, int] = dict.fromkeys(SECTIONS, 0)
+        self._populated: dict[str, bool] = dict.fromkeys(SECTIONS, False)
+        self._updated_at: dict[str, float] = dict.fromkeys(SECTIONS, 0.0)
+        self._last_ws_at: dict[str, float] = dict.fromkeys(SECTIONS, 0.0)
+        self._reads: dict[str, StateRead] = {}
+        self._derived: dict[tuple[str, str], tuple[int, Any]] = {}
+        self.live = False
+        self.last_reconcile_at = 0.0
+        self.stats: dict[str, int] = {
+            "ws_events": 0,
+            "snapshots": 0,
+            "rest_seeds": 0,
+            "reconciles": 0,
+            "reconcile_skipped": 0,
+            "drift_repairs": 0,
+        }
+
+    # --- Livscykel ---
+    def set_live(self, live: bool) -> None:
+        """WS auth OK => live. Vid tapp kan deltan ha missats: kräv ny snapshot."""
+        self.live = bool(live)
+        if not live:
+            for s in SECTIONS:
+                self._populated[s] = False
+
+    def ready(self, section: str) -> bool:
+        return self.live and self._populated.get(section, False)
+
+    def _bump(self, section: str, now: float) -> None:
+        self._versions[section] += 1
+        self._updated_at[section] = now
+
+    # --- WS-inmatning ---
+    def apply_private_event(self, msg: list) -> bool:
+        """Applicera [0, EVENT, payload]. True om händelsen hörde till kontoläget."""
+        try:
+            event = msg[1]
+            if event not in ACCOUNT_EVENTS or len(msg) < 3:
+                return False
+            payload = msg[2]
+            now = time.time()
+            self.stats["ws_events"] += 1
+            section = _SNAPSHOT_EVENTS.get(event)
+            if section is not None:
+                rows = payload if isinstance(payload, list) else []
+                self._rows[section] = {_row_key(section, r): list(r) for r in rows if _valid_row(section, r)}
+                self._populated[section] = True
+                self.stats["snapshots"] += 1
+            elif event in _UPSERT_EVENTS:
+                section = _UPSERT_EVENTS[event]
+                if not _valid_row(section, payload):
+                    return True
+                key = _row_key(section, payload)
+                if section == "positions" and str(payload[1]).upper() == "CLOSED":
+                    self._rows[section].pop(key, None)
+                else:
+                    self._upsert(section, key, payload)
+            else:
+                section = _REMOVE_EVENTS[event]
+                if isinstance(payload, (list, tuple)) and payload:
+                    self._rows[section].pop(_row_key(section, payload), None)
+            self._last_ws_at[section] = now
+            self._bump(section, now)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Account state: kunde inte applicera {msg[1] if len(msg) > 1 else '?'}: {e}")
+            return False
+
+    def _upsert(self, section: str, key: Any, row: list) -> None:
+        old = self._rows[section].get(key)
+        new = list(row)
+        if old is not None and section != "orders":
+            # WS skickar null för fält som kräver calc (available/PnL) – behåll senast kända
+            for i, v in enumerate(new):
+                if v is None and i < len(old):
+                    new[i] = old[i]
+        self._rows[section][key] = new
+
+    # --- REST-seed/reconcile ---
+    def reconcile(self, section: str, rows: list, started_at: float | None = None) -> bool:
+        """
+        Jämför REST-svar med storen och ersätt vid skillnad.
+
+        `started_at` (time.time() när REST-anropet startade) skyddar mot att
+        ett äldre REST-svar skriver över WS-deltan som kommit under tiden.
+        Returnerar True om drift upptäcktes och reparerades.
+        """
+        try:
+            if section not in SECTIONS or not isinstance(rows, list):
+                return False
+            if started_at is not None and self._last_ws_at[section] > started_at:
+                self.stats["reconcile_skipped"] += 1
+                return False
+            incoming = {_row_key(section, r): list(r) for r in rows if _valid_row(section, r)}
+            current = self._rows[section]
+            was_populated = self._populated[section]
+            now = time.time()
+            self.last_reconcile_at = now
+            drift = was_populated and _fingerprint(section, incoming) != _fingerprint(section, current)
+            if not was_populated:
+                self.stats["rest_seeds"] += 1
+            else:
+                self.stats["reconciles"] += 1
+            if drift:
+                self.stats["drift_repairs"] += 1
+                logger.warning(
+                    "⚠️ Account state drift i %s: ws=%s rest=%s – reparerar från REST",
+                    section,
+                    len(current),
+                    len(incoming),
+                )
+            if incoming != current:
+                self._rows[section] = incoming
+                self._bump(section, now)
+            # Ett REST-svar när WS är live räcker som startpunkt för deltan
+            if self.live:
+                self._populated[section] = True
+            return bool(drift)
+        except Exception as e:
+            logger.warning(f"⚠️ Account state reconcile fel ({section}): {e}")
+            return False
+
+    # --- Läsning ---
+    def version(self, section: str) -> int:
+        return self._versions[section]
+
+    def read(self, section: str) -> StateRead:
+        """Versionerad läsning; samma objekt returneras tills sektionen ändras."""
+        ver = self._versions[section]
+        cached = self._reads.get(section)
+        ready = self.ready(section)
+        if cached is not None and cached.version == ver and cached.ready == ready:
+            return cached
+        snap = StateRead(
+            section=section,
+            version=ver,
+            ready=ready,
+            updated_at=self._updated_at[section],
+            rows=tuple(tuple(r) for r in self._rows[section].values()),
+        )
+        self._reads[section] = snap
+        return snap
+
+    def derived(self, section: str, name: str, build: Callable[[tuple], Any]) -> Any:
+        """Memoisera en härledd vy (t.ex. modellista) per sektion och version."""
+        ver = self._versions[section]
+        hit = self._derived.get((section, name))
+        if hit is not None and hit[0] == ver:
+            return hit[1]
+        value = build(self.read(section).rows)
+        self._derived[(section, name)] = (ver, value)
+        return value
+
+    def get_wallet(self, wallet_type: str, currency: str) -> list | None:
+        return self._rows["wallets"].get((wallet_type, currency))
+
+    def get_position(self, symbol: str) -> list | None:
+        return self._rows["positions"].get(symbol)
+
+    def get_order(self, order_id: int) -> list | None:
+        return self._rows["orders"].get(order_id)
+
+    def get_stats(self) -> dict[str, Any]:
+        now = time.time()
+        return {
+            **self.stats,
+            "live": bool(self.live),
+            "last_reconcile_age_sec": (now - self.last_reconcile_at) if self.last_reconcile_at else None,
+            "sections": {
+                s: {
+                    "ready": self.ready(s),
+                    "version": self._versions[s],
+                    "count": len(self._rows[s]),
+                    "age_sec": (now - self._updated_at[s]) if self._updated_at[s] else None,
+                }
+                for s in SECTIONS
+            },
+        }
+
+
+# Global instans
+account_state = AccountStateStore()
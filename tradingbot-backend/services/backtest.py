@@ -1,5 +1,11 @@
 """
 Backtest Service - enkel sandbox-backtest mot historiska candles via Bitfinex REST.
+
+Två motorer finns:
+- "vectorized" (default): indikatorserier beräknas en gång över hela historiken,
+  signalserien härleds vektoriserat och positioner simuleras i ett pass (O(n)).
+- "legacy": ursprunglig loop som kör evaluate_strategy på varje prefix (O(n²)).
+  Behålls för paritetstester och som fallback.
 """
 
 from __future__ import annotations
@@ -8,36 +14,286 @@ import math
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
+import numpy as np
+
+from indicators.series import atr_series, ema_series, rsi_series
 from services.market_data_facade import get_market_data
 from services.strategy import evaluate_strategy
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Antal bars som strategin får "värma upp" innan första signalen
+WARMUP_BARS = 50
+START_EQUITY = 1000.0
+BACKTEST_ENGINES = ("vectorized", "legacy")
+
+
+def _candle_ts(candles: list[list], closes_len: int, i: int) -> int | None:
+    """Timestamp (ms) för bar i, mappad mot ursprungliga candles (parsning kan ha tappat rader)."""
+    try:
+        idx_in_candles = len(candles) - closes_len + i
+        idx_in_candles = idx_in_candles if 0 <= idx_in_candles < len(candles) else i
+        return int(candles[idx_in_candles][0])
+    except Exception:
+        return None
+
+
+def _heatmap_add(
+    heatmap_sum: dict[str, dict[str, float]],
+    heatmap_cnt: dict[str, dict[str, int]],
+    heatmap_wins: dict[str, dict[str, int]],
+    ts_ms: int,
+    ret: float,
+    tz_offset_minutes: int,
+) -> None:
+    dt = datetime.fromtimestamp(ts_ms / 1000, tz=UTC)
+    if tz_offset_minutes:
+        dt = dt + timedelta(minutes=tz_offset_minutes)
+    dow = str(dt.weekday())  # 0=Mon
+    hour = str(dt.hour)
+    heatmap_sum.setdefault(dow, {})
+    heatmap_cnt.setdefault(dow, {})
+    heatmap_wins.setdefault(dow, {})
+    heatmap_sum[dow][hour] = heatmap_sum[dow].get(hour, 0.0) + ret
+    heatmap_cnt[dow][hour] = heatmap_cnt[dow].get(hour, 0) + 1
+    if ret > 0:
+        heatmap_wins[dow][hour] = heatmap_wins[dow].get(hour, 0) + 1
+
+
+def _summarize(
+    *,
+    equity: float,
+    trades: int,
+    wins: int,
+    max_dd: float,
+    trade_returns: list[float],
+    equity_curve: list[dict],
+    heatmap_sum: dict[str, dict[str, float]],
+    heatmap_cnt: dict[str, dict[str, int]],
+    heatmap_wins: dict[str, dict[str, int]],
+    tz_offset_minutes: int,
+) -> dict[str, Any]:
+    winrate = (wins / trades) if trades > 0 else 0.0
+    # Sharpe (förenklad per trade)
+    sharpe = 0.0
+    if len(trade_returns) > 1:
+        mu = sum(trade_returns) / len(trade_returns)
+        var = sum((r - mu) ** 2 for r in trade_returns) / (len(trade_returns) - 1)
+        std = math.sqrt(var) if var > 0 else 0.0
+        if std > 0:
+            sharpe = (mu / std) * math.sqrt(len(trade_returns))
+
+    # Distribution (bins)
+    bins = [-0.1, -0.05, -0.02, -0.01, 0.0, 0.01, 0.02, 0.05, 0.1]
+    dist: dict[str, int] = {str(b): 0 for b in bins}
+    dist.update({"lt_min": 0, "gt_max": 0})
+    for r in trade_returns:
+        if r < bins[0]:
+            dist["lt_min"] += 1
+        elif r > bins[-1]:
+            dist["gt_max"] += 1
+        else:
+            for b in bins:
+                if r <= b:
+                    dist[str(b)] += 1
+                    break
+
+    # Heatmap averages (avg return) och winrate
+    heatmap_avg: dict[str, dict[str, float]] = {}
+    heatmap_wr: dict[str, dict[str, float]] = {}
+    for d, hours in heatmap_sum.items():
+        for h, s in hours.items():
+            c = max(heatmap_cnt.get(d, {}).get(h, 0), 1)
+            heatmap_avg.setdefault(d, {})[h] = round(s / c, 6)
+            w = heatmap_wins.get(d, {}).get(h, 0)
+            heatmap_wr.setdefault(d, {})[h] = round(w / c, 6)
+
+    return {
+        "success": True,
+        "trades": trades,
+        "final_equity": round(equity, 2),
+        "winrate": round(winrate, 4),
+        "max_drawdown": round(max_dd, 4),
+        "sharpe": round(sharpe, 4),
+        "distribution": dist,
+        "equity_curve": equity_curve[-500:],
+        "heatmap": heatmap_avg,  # alias för bakåtkompatibilitet
+        "heatmap_return": heatmap_avg,
+        "heatmap_winrate": heatmap_wr,
+        "heatmap_counts": heatmap_cnt,
+        "heatmap_tz_offset_minutes": tz_offset_minutes,
+    }
+
+
+def _indicator_series(
+    closes: np.ndarray, highs: np.ndarray, lows: np.ndarray, ema_period: int, rsi_period: int, atr_period: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hela EMA/RSI/ATR-serier i ett pass med samma kärnor och avrundning som
+    calculate_ema/calculate_rsi/calculate_atr. Värdet på index i motsvarar
+    den skalära funktionen anropad på prefixet [: i + 1]; NaN där den
+    skalära funktionen skulle returnera None.
+    """
+    idx = np.arange(closes.size)
+    ema = np.where(idx >= ema_period - 1, np.round(ema_series(closes, ema_period), 4), np.nan)
+    rsi = np.round(rsi_series(closes, rsi_period), 2)
+    atr = np.where(idx >= atr_period - 1, np.round(atr_series(highs, lows, closes, atr_period), 4), np.nan)
+    return ema, rsi, atr
+
+
+def _signal_series(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray, prob_model: Any) -> np.ndarray:
+    """
+    Vektoriserad motsvarighet till evaluate_strategy(...)["weighted"]["signal"] per bar.
+
+    Returnerar int8-array: +1 buy, -1 sell, 0 hold.
+    """
+    try:
+        from services.strategy_settings import get_strategy_settings_service
+
+        s = get_strategy_settings_service().get_settings()
+        periods = (s.ema_period, s.rsi_period, s.atr_period)
+    except Exception:
+        periods = (14, 14, 14)
+    ema, rsi, atr = _indicator_series(closes, highs, lows, *periods)
+
+    # evaluate_strategy kräver truthy ema/rsi/atr (None/0.0 => hold)
+    valid = ~np.isnan(ema) & ~np.isnan(rsi) & ~np.isnan(atr) & (ema != 0) & (rsi != 0) & (atr != 0)
+    sig = np.zeros(closes.size, dtype=np.int8)
+    if not (getattr(prob_model, "enabled", False) and getattr(prob_model, "_loaded", False)):
+        # Modellens fallback returnerar alltid hold=1.0
+        return sig
+
+    idx = np.flatnonzero(valid)
+    if idx.size == 0:
+        return sig
+    f_ema = np.sign(closes[idx] - ema[idx])
+    f_rsi = (30.0 - np.clip(rsi[idx], 0.0, 100.0)) / 30.0
+    probs = prob_model.predict_proba_batch(np.column_stack([f_ema, f_rsi]), columns=("ema", "rsi"))
+    # argmax väljer första maximum i ordningen buy, sell, hold (som max() över dict)
+    sig[idx] = np.array([1, -1, 0], dtype=np.int8)[np.argmax(probs, axis=1)]
+    return sig
+
+
+def signal_path(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray) -> np.ndarray:
+    """
+    Signalserie (+1/-1/0) för hela historiken, 0 under uppvärmningen.
+
+    Raises:
+        ImportError: om prob-modellen inte kan laddas (ingen vektoriserad väg)
+    """
+    from services.prob_model import prob_model
+
+    n = closes.size
+    sig = _signal_series(closes, highs, lows, prob_model) if n > WARMUP_BARS else np.zeros(n, dtype=np.int8)
+    sig[:WARMUP_BARS] = 0
+    return sig
+
 
 class BacktestService:
-    async def run(self, symbol: str, timeframe: str, limit: int = 500, tz_offset_minutes: int = 0) -> dict[str, Any]:
+    async def run(
+        self,
+        symbol: str,
+        timeframe: str,
+        limit: int = 500,
+        tz_offset_minutes: int = 0,
+        engine: str = "vectorized",
+    ) -> dict[str, Any]:
         data = get_market_data()
         candles = await data.get_candles(symbol, timeframe, limit)
         if not candles:
             return {"success": False, "error": "no_data"}
+        if engine == "legacy":
+            return self.run_legacy(candles, tz_offset_minutes)
+        return self.run_vectorized(candles, tz_offset_minutes)
+
+    @staticmethod
+    def _parse(candles: list[list]) -> dict[str, list[float]]:
         # Använd centraliserad candle-parsning via utils
         try:
             from utils.candles import parse_candles_to_strategy_data
 
-            parsed = parse_candles_to_strategy_data(candles)
+            return parse_candles_to_strategy_data(candles)
         except Exception:
-            parsed = {"closes": [], "highs": [], "lows": []}
+            return {"closes": [], "highs": [], "lows": []}
+
+    def run_vectorized(self, candles: list[list], tz_offset_minutes: int = 0) -> dict[str, Any]:
+        """Single-pass backtest: samma output som run_legacy men O(n)."""
+        parsed = self._parse(candles)
+        closes = np.asarray(parsed.get("closes", []), dtype=float)
+        highs = np.asarray(parsed.get("highs", []), dtype=float)
+        lows = np.asarray(parsed.get("lows", []), dtype=float)
+        n = closes.size
+
+        try:
+            sig = signal_path(closes, highs, lows)
+        except Exception:
+            # Heuristisk väg i evaluate_strategy saknar vektoriserad motsvarighet
+            return self.run_legacy(candles, tz_offset_minutes)
+
+        # Position = senaste icke-hold-signal; trade vid varje byte av riktning
+        active = np.flatnonzero(sig)
+        switches = active[np.diff(sig[active], prepend=0) != 0] if active.size else active
+        exits = switches[1:]
+        entries = switches[:-1]
+        exit_px = closes[exits]
+        entry_px = closes[entries]
+        # Säljsignal stänger long (exit/entry), köpsignal stänger short (entry/exit)
+        factors = np.where(sig[exits] < 0, exit_px / entry_px, entry_px / exit_px)
+
+        # Multiplicera i samma ordning som loopen för bit-identisk equity
+        levels = np.multiply.accumulate(np.concatenate(([START_EQUITY], factors)))
+        eq = levels[1:]
+        peak_before = np.maximum.accumulate(levels)[:-1]
+        peak_after = np.maximum(peak_before, eq)
+        trades = int(eq.size)
+        wins = int(np.count_nonzero(eq >= peak_before))
+        max_dd = float(np.max((peak_after - eq) / peak_after)) if trades else 0.0
+        max_dd = max(0.0, max_dd)
+
+        trade_returns = [float(f) - 1.0 for f in factors]
+        heatmap_sum: dict[str, dict[str, float]] = {}
+        heatmap_cnt: dict[str, dict[str, int]] = {}
+        heatmap_wins: dict[str, dict[str, int]] = {}
+        for j, ret in zip(exits.tolist(), trade_returns, strict=True):
+            ts_ms = _candle_ts(candles, n, j)
+            if ts_ms is not None:
+                _heatmap_add(heatmap_sum, heatmap_cnt, heatmap_wins, ts_ms, ret, tz_offset_minutes)
+
+        # Equity efter varje bar = nivån efter antal stängda trades t.o.m. baren
+        bars = np.arange(WARMUP_BARS, n)
+        closed = np.searchsorted(exits, bars, side="right")
+        equity_curve: list[dict] = []
+        for i, k in zip(bars.tolist(), closed.tolist(), strict=True):
+            ts_ms = _candle_ts(candles, n, i)
+            if ts_ms is not None:
+                equity_curve.append({"ts": ts_ms, "equity": round(float(levels[k]), 2)})
+
+        return _summarize(
+            equity=float(levels[-1]),
+            trades=trades,
+            wins=wins,
+            max_dd=max_dd,
+            trade_returns=trade_returns,
+            equity_curve=equity_curve,
+            heatmap_sum=heatmap_sum,
+            heatmap_cnt=heatmap_cnt,
+            heatmap_wins=heatmap_wins,
+            tz_offset_minutes=tz_offset_minutes,
+        )
+
+    def run_legacy(self, candles: list[list], tz_offset_minutes: int = 0) -> dict[str, Any]:
+        """Ursprunglig rullande utvärdering: evaluate_strategy per prefix (O(n²))."""
+        parsed = self._parse(candles)
 
         # Rullande strategiutvärdering och pseudo-PnL (mycket förenklad)
         closes: list[float] = parsed.get("closes", [])
         highs: list[float] = parsed.get("highs", [])
         lows: list[float] = parsed.get("lows", [])
-        equity = 1000.0
+        equity = START_EQUITY
         peak = equity
         max_dd = 0.0
         wins = 0
-        losses = 0
         trades = 0
         trade_returns: list[float] = []
         equity_curve: list[dict] = []
@@ -48,7 +304,7 @@ class BacktestService:
         pos = 0  # +1 long, -1 short, 0 flat
         entry_price = 0.0
 
-        for i in range(50, len(closes)):
+        for i in range(WARMUP_BARS, len(closes)):
             window = {
                 "closes": closes[: i + 1],
                 "highs": highs[: i + 1],
@@ -57,121 +313,35 @@ class BacktestService:
             strat = evaluate_strategy(window)
             sig = (strat.get("weighted", {}) or {}).get("signal", "hold")
             price = closes[i]
-            # timestamp (ms) om möjligt
-            ts_ms = None
-            try:
-                idx_in_candles = len(candles) - len(closes) + i
-                idx_in_candles = idx_in_candles if 0 <= idx_in_candles < len(candles) else i
-                ts_ms = int(candles[idx_in_candles][0])
-            except Exception:
-                ts_ms = None
+            ts_ms = _candle_ts(candles, len(closes), i)
             # Enkel exekvering: byt position på buy/sell, ingen avgift/slippage
-            if sig == "buy" and pos <= 0:
-                if pos < 0:
-                    # stäng short
-                    factor = entry_price / price
-                    equity *= factor
-                    trade_returns.append(factor - 1.0)
-                    if ts_ms is not None:
-                        dt = datetime.fromtimestamp(ts_ms / 1000, tz=UTC)
-                        if tz_offset_minutes:
-                            dt = dt + timedelta(minutes=tz_offset_minutes)
-                        dow = str(dt.weekday())  # 0=Mon
-                        hour = str(dt.hour)
-                        heatmap_sum.setdefault(dow, {})
-                        heatmap_cnt.setdefault(dow, {})
-                        heatmap_wins.setdefault(dow, {})
-                        heatmap_sum[dow][hour] = heatmap_sum[dow].get(hour, 0.0) + (factor - 1.0)
-                        heatmap_cnt[dow][hour] = heatmap_cnt[dow].get(hour, 0) + 1
-                        if factor - 1.0 > 0:
-                            heatmap_wins[dow][hour] = heatmap_wins[dow].get(hour, 0) + 1
-                    trades += 1
-                    if equity >= peak:
-                        wins += 1
-                    else:
-                        losses += 1
-                    peak = max(peak, equity)
-                    max_dd = max(max_dd, (peak - equity) / peak)
-                pos = 1
-                entry_price = price
-            elif sig == "sell" and pos >= 0:
-                if pos > 0:
-                    # stäng long
-                    factor = price / entry_price
+            if (sig == "buy" and pos <= 0) or (sig == "sell" and pos >= 0):
+                if pos != 0:
+                    # stäng short (buy) eller long (sell)
+                    factor = entry_price / price if pos < 0 else price / entry_price
                     equity *= factor
                     trade_returns.append(factor - 1.0)
                     if ts_ms is not None:
-                        dt = datetime.fromtimestamp(ts_ms / 1000, tz=UTC)
-                        if tz_offset_minutes:
-                            dt = dt + timedelta(minutes=tz_offset_minutes)
-                        dow = str(dt.weekday())
-                        hour = str(dt.hour)
-                        heatmap_sum.setdefault(dow, {})
-                        heatmap_cnt.setdefault(dow, {})
-                        heatmap_wins.setdefault(dow, {})
-                        heatmap_sum[dow][hour] = heatmap_sum[dow].get(hour, 0.0) + (factor - 1.0)
-                        heatmap_cnt[dow][hour] = heatmap_cnt[dow].get(hour, 0) + 1
-                        if factor - 1.0 > 0:
-                            heatmap_wins[dow][hour] = heatmap_wins[dow].get(hour, 0) + 1
+                        _heatmap_add(heatmap_sum, heatmap_cnt, heatmap_wins, ts_ms, factor - 1.0, tz_offset_minutes)
                     trades += 1
                     if equity >= peak:
                         wins += 1
-                    else:
-                        losses += 1
                     peak = max(peak, equity)
                     max_dd = max(max_dd, (peak - equity) / peak)
-                pos = -1
+                pos = 1 if sig == "buy" else -1
                 entry_price = price
             if ts_ms is not None:
                 equity_curve.append({"ts": ts_ms, "equity": round(equity, 2)})
 
-        winrate = (wins / trades) if trades > 0 else 0.0
-        # Sharpe (förenklad per trade)
-        sharpe = 0.0
-        if len(trade_returns) > 1:
-            mu = sum(trade_returns) / len(trade_returns)
-            var = sum((r - mu) ** 2 for r in trade_returns) / (len(trade_returns) - 1)
-            std = math.sqrt(var) if var > 0 else 0.0
-            if std > 0:
-                sharpe = (mu / std) * math.sqrt(len(trade_returns))
-
-        # Distribution (bins)
-        bins = [-0.1, -0.05, -0.02, -0.01, 0.0, 0.01, 0.02, 0.05, 0.1]
-        dist: dict[str, int] = {str(b): 0 for b in bins}
-        dist.update({"lt_min": 0, "gt_max": 0})
-        for r in trade_returns:
-            if r < bins[0]:
-                dist["lt_min"] += 1
-            elif r > bins[-1]:
-                dist["gt_max"] += 1
-            else:
-                for b in bins:
-                    if r <= b:
-                        dist[str(b)] += 1
-                        break
-
-        # Heatmap averages (avg return) och winrate
-        heatmap_avg: dict[str, dict[str, float]] = {}
-        heatmap_wr: dict[str, dict[str, float]] = {}
-        for d, hours in heatmap_sum.items():
-            for h, s in hours.items():
-                c = max(heatmap_cnt.get(d, {}).get(h, 0), 1)
-                heatmap_avg.setdefault(d, {})[h] = round(s / c, 6)
-                w = heatmap_wins.get(d, {}).get(h, 0)
-                heatmap_wr.setdefault(d, {})[h] = round(w / c, 6)
-
-        return {
-            "success": True,
-            "trades": trades,
-            "final_equity": round(equity, 2),
-            "winrate": round(winrate, 4),
-            "max_drawdown": round(max_dd, 4),
-            "sharpe": round(sharpe, 4),
-            "distribution": dist,
-            "equity_curve": equity_curve[-500:],
-            "heatmap": heatmap_avg,  # alias för bakåtkompatibilitet
-            "heatmap_return": heatmap_avg,
-            "heatmap_winrate": heatmap_wr,
-            "heatmap_counts": heatmap_cnt,
-            "heatmap_tz_offset_minutes": tz_offset_minutes,
-        }
+        return _summarize(
+            equity=equity,
+            trades=trades,
+            wins=wins,
+            max_dd=max_dd,
+            trade_returns=trade_returns,
+            equity_curve=equity_curve,
+            heatmap_sum=heatmap_sum,
+            heatmap_cnt=heatmap_cnt,
+            heatmap_wins=heatmap_wins,
+            tz_offset_minutes=tz_offset_minutes,
+        )
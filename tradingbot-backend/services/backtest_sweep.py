@@ -0,0 +1,358 @@
+"""
+Backtest Sweep - parallell grid-search över strategiparametrar.
+
+Candles läses en gång och läggs i ett SharedMemory-block (OHLC som float64);
+varje worker i en ProcessPoolExecutor mappar blocket utan kopiering och
+cachar indikatorserier per period, så konfigurationer som delar perioder
+inte räknar om dem.
+
+Signalmodellen är den viktade heuristiken i evaluate_strategy:
+EMA-riktning (pris mot EMA) och RSI-zoner vägs med w_ema/w_rsi (ATR är
+riktningsneutral och fungerar som giltighetsfilter). Med auto_regime väljs
+vikter per bar från strategy.weights.PRESETS utifrån ADX/ema_z och
+trösklarna. Positioner simuleras som i BacktestService.run_vectorized, med
+avgift, spread och slippage dragna per sida.
+
+Jobb körs i bakgrunden; resultat rankas allteftersom de blir klara och kan
+pollas eller avbrytas via SweepJob.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+from indicators.series import adx_series, atr_series, ema_series, ema_z_series, rsi_series
+from services.backtest import START_EQUITY, WARMUP_BARS, BacktestService
+from strategy.weights import PRESETS, clamp_simplex
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Parametrar som kan svepas och deras standardvärden
+SWEEP_DEFAULTS: dict[str, Any] = {
+    "ema_period": 14,
+    "rsi_period": 14,
+    "atr_period": 14,
+    "w_ema": 0.4,
+    "w_rsi": 0.4,
+    "w_atr": 0.2,
+    "rsi_buy": 30.0,
+    "rsi_sell": 70.0,
+    "auto_regime": False,
+    "adx_period": 14,
+    "adx_high": 25.0,
+    "adx_low": 15.0,
+    "slope_z_high": 1.0,
+    "slope_z_low": 0.3,
+    "taker_fee": 0.002,
+    "spread_bps": 10.0,
+    "slippage_bps": 5.0,
+}
+RANK_KEYS = ("sharpe", "expectancy", "final_equity", "max_drawdown")
+MAX_SWEEP_CONFIGS = 20000
+_CHUNK_SIZE = 16
+
+# Per worker-process: mappat SharedMemory-block och indikatorcache
+_WORKER: dict[str, Any] = {}
+
+
+def expand_grid(ranges: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Expandera parameter-intervall till en lista konfigurationer.
+
+    Värden kan vara skalärer, listor eller {"start", "stop", "step"} (stop inklusive).
+    Okända parametrar ger ValueError.
+    """
+    unknown = sorted(set(ranges) - set(SWEEP_DEFAULTS))
+    if unknown:
+        raise ValueError(f"okända sweep-parametrar: {', '.join(unknown)}")
+    axes: list[tuple[str, list[Any]]] = []
+    for key, spec in ranges.items():
+        if isinstance(spec, dict):
+            start, stop = float(spec["start"]), float(spec["stop"])
+            step = float(spec.get("step", 1))
+            if step <= 0:
+                raise ValueError(f"step måste vara > 0 för {key}")
+            vals = np.arange(start, stop + step / 2, step).tolist()
+            if isinstance(SWEEP_DEFAULTS[key], int) and not isinstance(SWEEP_DEFAULTS[key], bool):
+                vals = [round(v) for v in vals]
+        elif isinstance(spec, (list, tuple)):
+            vals = list(spec)
+        else:
+            vals = [spec]
+        if not vals:
+            raise ValueError(f"tomt intervall för {key}")
+        axes.append((key, vals))
+
+    total = math.prod(len(v) for _, v in axes) if axes else 1
+    if total > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"för många konfigurationer ({total} > {MAX_SWEEP_CONFIGS})")
+    keys = [k for k, _ in axes]
+    return [
+        {**SWEEP_DEFAULTS, **dict(zip(keys, combo, strict=True))} for combo in itertools.product(*(v for _, v in axes))
+    ]
+
+
+def _init_worker(shm_name: str, n: int) -> None:
+    """ProcessPool-initializer: mappa OHLC-blocket (rader: close, high, low)."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _WORKER["shm"] = shm
+    _WORKER["ohlc"] = np.ndarray((3, n), dtype=np.float64, buffer=shm.buf)
+    _WORKER["cache"] = {}
+
+
+def _series(kind: str, period: int) -> np.ndarray:
+    cache: dict[tuple[str, int], np.ndarray] = _WORKER["cache"]
+    key = (kind, period)
+    out = cache.get(key)
+    if out is None:
+        closes, highs, lows = _WORKER["ohlc"]
+        idx = np.arange(closes.size)
+        if kind == "ema":
+            out = np.where(idx >= period - 1, ema_series(closes, period), np.nan)
+        elif kind == "rsi":
+            out = rsi_series(closes, period)
+        elif kind == "atr":
+            out = atr_series(highs, lows, closes, period)
+        elif kind == "adx":
+            out = adx_series(highs, lows, closes, period)
+        else:  # ema_z med regimmotorns standardfönster
+            out = ema_z_series(closes, 3, 7, 200)
+        cache[key] = out
+    return out
+
+
+def _weights(params: dict[str, Any], n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Vikter (w_ema, w_rsi) per bar; med auto_regime från PRESETS per regim."""
+    if not params["auto_regime"]:
+        w = clamp_simplex({"ema": params["w_ema"], "rsi": params["w_rsi"], "atr": params["w_atr"]})
+        return np.full(n, w["ema"]), np.full(n, w["rsi"])
+    adx = np.nan_to_num(_series("adx", int(params["adx_period"])), nan=0.0)
+    ez = np.abs(np.nan_to_num(_series("ema_z", 0), nan=0.0))
+    trend = (adx >= params["adx_high"]) | (ez >= params["slope_z_high"])
+    rng = ~trend & (adx <= params["adx_low"]) & (ez <= params["slope_z_low"])
+    w_ema = np.empty(n)
+    w_rsi = np.empty(n)
+    for name, mask in (("trend", trend), ("range", rng), ("balanced", ~trend & ~rng)):
+        p = PRESETS[name]
+        w = clamp_simplex({"ema": p["w_ema"], "rsi": p["w_rsi"], "atr": p["w_atr"]})
+        w_ema[mask] = w["ema"]
+        w_rsi[mask] = w["rsi"]
+    return w_ema, w_rsi
+
+
+def evaluate_config(params: dict[str, Any]) -> dict[str, Any]:
+    """Kör en konfiguration mot worker-processens delade candles."""
+    closes = _WORKER["ohlc"][0]
+    n = closes.size
+    ema = _series("ema", int(params["ema_period"]))
+    rsi = _series("rsi", int(params["rsi_period"]))
+    atr = _series("atr", int(params["atr_period"]))
+
+    valid = ~np.isnan(ema) & ~np.isnan(rsi) & ~np.isnan(atr) & (rsi != 0) & (atr != 0)
+    ema_term = np.sign(closes - np.nan_to_num(ema))
+    rsi_term = np.where(rsi < params["rsi_buy"], 1.0, np.where(rsi > params["rsi_sell"], -1.0, 0.0))
+    w_ema, w_rsi = _weights(params, n)
+    sig = np.where(valid, np.sign(w_ema * ema_term + w_rsi * rsi_term), 0.0).astype(np.int8)
+    sig[:WARMUP_BARS] = 0
+
+    active = np.flatnonzero(sig)
+    switches = active[np.diff(sig[active], prepend=0) != 0] if active.size else active
+    exits = switches[1:]
+    entries = switches[:-1]
+    gross = np.where(sig[exits] < 0, closes[exits] / closes[entries], closes[entries] / closes[exits])
+    side_cost = float(params["taker_fee"]) + (float(params["spread_bps"]) + float(params["slippage_bps"])) / 10000.0
+    factors = gross * (1.0 - side_cost) ** 2
+
+    levels = np.multiply.accumulate(np.concatenate(([START_EQUITY], factors)))
+    peaks = np.maximum.accumulate(levels)
+    max_dd = float(np.max((peaks - levels) / peaks)) if factors.size else 0.0
+    rets = factors - 1.0
+    trades = int(rets.size)
+    sharpe = 0.0
+    if trades > 1:
+        std = float(np.std(rets, ddof=1))
+        if std > 0:
+            sharpe = float(np.mean(rets)) / std * math.sqrt(trades)
+    return {
+        "params": {k: params[k] for k in SWEEP_DEFAULTS},
+        "trades": trades,
+        "final_equity": round(float(levels[-1]), 2),
+        "sharpe": round(sharpe, 4),
+        "max_drawdown": round(max(0.0, max_dd), 4),
+        "expectancy": round(float(np.mean(rets)) if trades else 0.0, 6),
+        "winrate": round(float(np.count_nonzero(rets > 0)) / trades, 4) if trades else 0.0,
+    }
+
+
+def _evaluate_chunk(chunk: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [evaluate_config(p) for p in chunk]
+
+
+def _rank_key(rank_by: str):
+    if rank_by == "max_drawdown":
+        return lambda r: (r["max_drawdown"], -r["sharpe"])
+    return lambda r: (-r[rank_by], r["max_drawdown"])
+
+
+class SweepJob:
+    """Ett bakgrundsjobb: rankade resultat, progress och avbrott."""
+
+    def __init__(self, configs: list[dict[str, Any]], rank_by: str, meta: dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.configs = configs
+        self.rank_by = rank_by
+        self.meta = meta
+        self.state = "pending"  # pending | running | done | cancelled | error
+        self.error: str | None = None
+        self.results: list[dict[str, Any]] = []
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._task: asyncio.Task | None = None
+        self._cancel = asyncio.Event()
+
+    @property
+    def done(self) -> int:
+        return len(self.results)
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def cancel(self) -> bool:
+        if self.state in ("done", "cancelled", "error"):
+            return False
+        self._cancel.set()
+        return True
+
+    def snapshot(self, top: int = 20) -> dict[str, Any]:
+        elapsed = self.elapsed()
+        ranked = sorted(self.results, key=_rank_key(self.rank_by))[: max(0, int(top))]
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "error": self.error,
+            "total": len(self.configs),
+            "done": self.done,
+            "rank_by": self.rank_by,
+            "wall_clock_s": round(elapsed, 3),
+            "configs_per_sec": round(self.done / elapsed, 2) if elapsed > 0 else 0.0,
+            "results": ranked,
+            **self.meta,
+        }
+
+
+class BacktestSweepService:
+    """Startar, pollar och avbryter parameter-sweeps."""
+
+    def __init__(self, max_workers: int | None = None, max_jobs: int = 20) -> None:
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_jobs = max_jobs
+        self._jobs: dict[str, SweepJob] = {}
+
+    async def start(
+        self,
+        symbol: str,
+        timeframe: str,
+        ranges: dict[str, Any],
+        limit: int = 1000,
+        rank_by: str = "sharpe",
+        candles: list[list] | None = None,
+    ) -> SweepJob:
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"rank_by måste vara en av {', '.join(RANK_KEYS)}")
+        configs = expand_grid(ranges)
+        if candles is None:
+            from services.market_data_facade import get_market_data
+
+            candles = await get_market_data().get_candles(symbol, timeframe, limit)
+        parsed = BacktestService._parse(candles or [])
+        ohlc = np.asarray([parsed.get("closes", []), parsed.get("highs", []), parsed.get("lows", [])], dtype=float)
+        if ohlc.ndim != 2 or ohlc.shape[1] <= WARMUP_BARS:
+            raise ValueError("otillräcklig candle-data för sweep")
+
+        self._evict()
+        job = SweepJob(configs, rank_by, {"symbol": symbol, "timeframe": timeframe, "bars": int(ohlc.shape[1])})
+        self._jobs[job.id] = job
+        job._task = asyncio.create_task(self._run(job, ohlc))
+        return job
+
+    def get(self, job_id: str) -> SweepJob | None:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        return bool(job and job.cancel())
+
+    def _evict(self) -> None:
+        finished = [j for j in self._jobs.values() if j.state in ("done", "cancelled", "error")]
+        for job in finished[: max(0, len(self._jobs) - self.max_jobs + 1)]:
+            self._jobs.pop(job.id, None)
+
+    async def _run(self, job: SweepJob, ohlc: np.ndarray) -> None:
+        loop = asyncio.get_running_loop()
+        shm = shared_memory.SharedMemory(create=True, size=ohlc.nbytes)
+        executor: ProcessPoolExecutor | None = None
+        job.state = "running"
+        job.started_at = time.perf_counter()
+        try:
+            np.ndarray(ohlc.shape, dtype=np.float64, buffer=shm.buf)[:] = ohlc
+            executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker, initargs=(shm.name, ohlc.shape[1])
+            )
+            chunks = [job.configs[i : i + _CHUNK_SIZE] for i in range(0, len(job.configs), _CHUNK_SIZE)]
+            pending = {asyncio.wrap_future(executor.submit(_evaluate_chunk, c)) for c in chunks}
+            cancel_wait = asyncio.ensure_future(job._cancel.wait())
+            try:
+                while pending:
+                    finished, pending = await asyncio.wait(pending | {cancel_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    pending.discard(cancel_wait)
+                    if cancel_wait in finished:
+                        for fut in pending:
+                            fut.cancel()
+                        job.state = "cancelled"
+                        return
+                    for fut in finished:
+                        job.results.extend(fut.result())
+            finally:
+                cancel_wait.cancel()
+            job.state = "done"
+        except Exception as e:
+            logger.exception("Backtest-sweep misslyckades")
+            job.state = "error"
+            job.error = str(e)[:200]
+        finally:
+            job.finished_at = time.perf_counter()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            shm.close()
+            shm.unlink()
+            logger.info(
+                "🧪 Sweep %s: %s %s/%s konfigurationer på %.2fs",
+                job.id,
+                job.state,
+                job.done,
+                len(job.configs),
+                job.elapsed(),
+            )
+
+
+_sweep_service: BacktestSweepService | None = None
+
+
+def get_backtest_sweep_service() -> BacktestSweepService:
+    global _sweep_service
+    if _sweep_service is None:
+        _sweep_service = BacktestSweepService()
+    return _sweep_service
@@ -16,8 +16,9 @@ from config.settings import settings
 from services.bitfinex_websocket import bitfinex_ws
 from services.metrics import record_http_result
 from utils.advanced_rate_limiter import get_advanced_rate_limiter
-from utils.candle_cache import candle_cache
+from utils.candle_cache import async_candle_cache
 from utils.logger import get_logger
+from utils.single_flight import single_flight
 
 logger = get_logger(__name__)
 
@@ -111,17 +112,18 @@ class BitfinexDataService:
             # Normalisera/resolve test‑symboler till giltig Bitfinex‑symbol (t.ex. tTESTADA:TESTUSD -> tADAUSD)
             raw_symbol = (symbol or "").strip()
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                sym_svc = SymbolService()
-                await sym_svc.refresh()
-                symbol = sym_svc.resolve(raw_symbol)
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                symbol = symbol_registry.resolve(raw_symbol)
             except Exception:
                 symbol = raw_symbol
 
             # 1) Försök hämta från lokal cache (på effektiva symbolen)
-            cached = candle_cache.load(symbol, timeframe, limit)
+            cached = await async_candle_cache.load(symbol, timeframe, limit)
             if cached:
+                single_flight.note_hit("candles")
                 logger.debug(
                     "Cache-hit: returnerar %s candles för %s %s",
                     len(cached),
@@ -130,7 +132,20 @@ class BitfinexDataService:
                 )
                 return cached
 
-            # 2) Annars hämta från Bitfinex och spara i cache (med retry/backoff)
+            # 2) Annars hämta från Bitfinex; samtidiga identiska anrop delar samma REST-hämtning
+            return await single_flight.do(
+                "candles",
+                (symbol, timeframe, limit),
+                lambda: self._fetch_candles_rest(symbol, timeframe, limit),
+            )
+
+        except Exception as e:
+            logger.error("Fel vid hämtning av candles: %s", e)
+            return None
+
+    async def _fetch_candles_rest(self, symbol: str, timeframe: str, limit: int) -> list[list] | None:
+        """REST-hämtning av candles (med retry/backoff) som sparas i cache."""
+        try:
             endpoint = f"candles/trade:{timeframe}:{symbol}/hist"
             url = f"{self.base_url}/{endpoint}"
             params = {"limit": limit}
@@ -203,7 +218,7 @@ class BitfinexDataService:
                         symbol,
                     )
                     try:
-                        candle_cache.store(symbol, timeframe, candles)
+                        await async_candle_cache.store(symbol, timeframe, candles)
                     except Exception:
                         pass
                     try:
@@ -260,14 +275,14 @@ class BitfinexDataService:
         try:
             import time as _t
 
-            from services.symbols import SymbolService
+            from services.symbols import symbol_registry
 
             symbol = (symbol or "").strip()
-            # Central resolve/listed via SymbolService
-            sym_svc = SymbolService()
-            await sym_svc.refresh()
-            eff_symbol = sym_svc.resolve(symbol)
-            if not sym_svc.listed(eff_symbol):
+            # Central resolve/listed via symbol-registry (ingen await när cachen är varm)
+            if not symbol_registry.is_warm():
+                await symbol_registry.refresh()
+            eff_symbol = symbol_registry.resolve(symbol)
+            if not symbol_registry.listed(eff_symbol):
                 # Throttle not-listed logs/attempts
                 now_ts = _t.time()
                 prev = float(_NOT_LISTED_SEEN.get(eff_symbol, 0) or 0)
@@ -336,7 +351,7 @@ class BitfinexDataService:
                         frame = getattr(bitfinex_ws, "latest_ticker_frames", {}).get(s)
                         if frame:
                             break
-                    if isinstance(frame, dict):
+                    if frame is not None:
                         bid = frame.get("bid")
                         ask = frame.get("ask")
                         high = frame.get("high")
@@ -383,7 +398,7 @@ class BitfinexDataService:
                                     frame = getattr(bitfinex_ws, "latest_ticker_frames", {}).get(s)
                                     if frame:
                                         break
-                                if isinstance(frame, dict):
+                                if frame is not None:
                                     bid = frame.get("bid")
                                     ask = frame.get("ask")
                                     high = frame.get("high")
@@ -699,8 +714,19 @@ class BitfinexDataService:
                 except Exception:
                     pairs_list = []
                 if pairs_list and (now - ts) <= ttl:
+                    single_flight.note_hit("configs")
                     return list(pairs_list)
 
+            return await single_flight.do("configs", "pairs", self._fetch_configs_symbols)
+        except Exception as e:
+            logger.warning("Fel vid hämtning av configs symbols: %s", e)
+            return None
+
+    async def _fetch_configs_symbols(self) -> list[str] | None:
+        try:
+            import time as _t
+
+            now = _t.time()
             # Multi-request för exchange + margin
             url = f"{self.base_url}/conf/pub:list:pair:exchange,pub:list:pair:margin"
             _t0 = _t.perf_counter()
@@ -764,8 +790,19 @@ class BitfinexDataService:
                 except Exception:
                     rev_cache = {}
                 if fwd_cache and rev_cache and (now - ts) <= ttl:
+                    single_flight.note_hit("configs")
                     return fwd_cache, rev_cache
 
+            return await single_flight.do("configs", "currency_map", self._fetch_currency_symbol_map)
+        except Exception as e:
+            logger.warning("Fel vid hämtning av currency sym‑map: %s", e)
+            return {}, {}
+
+    async def _fetch_currency_symbol_map(self) -> tuple[dict[str, str], dict[str, str]]:
+        try:
+            import time as _t
+
+            now = _t.time()
             url = f"{self.base_url}/conf/pub:map:currency:sym"
             _t0 = _t.perf_counter()
             resp = await aget(url)
@@ -802,20 +839,9 @@ class BitfinexDataService:
         - Använder UPSERT i cache, så duplicering skadar inte.
         """
         try:
-            from sqlite3 import Row
-
             # Hitta minsta mts i cache för symbol/timeframe
-            oldest_mts = None
             try:
-                import sqlite3
-
-                with sqlite3.connect(candle_cache.db_path) as conn:
-                    conn.row_factory = Row
-                    row = conn.execute(
-                        "SELECT MIN(mts) AS m FROM candles WHERE symbol=? AND timeframe=?",
-                        (symbol, timeframe),
-                    ).fetchone()
-                    oldest_mts = int(row["m"]) if row and row["m"] is not None else None
+                oldest_mts = await async_candle_cache.oldest_mts(symbol, timeframe)
             except Exception:
                 oldest_mts = None
 
@@ -857,7 +883,7 @@ class BitfinexDataService:
                     break
                 # Spara och uppdatera nästa end till före äldsta mts i denna batch
                 try:
-                    inserted = candle_cache.store(symbol, timeframe, candles)
+                    inserted = await async_candle_cache.store(symbol, timeframe, candles)
                     total_inserted += inserted
                 except Exception:
                     pass
@@ -16,7 +16,14 @@ from websockets.client import connect as ws_connect  # type: ignore[attr-defined
 from websockets.exceptions import ConnectionClosed  # type: ignore[attr-defined]
 
 from config.settings import settings
+from services.account_state import ACCOUNT_EVENTS, account_state
+from services.order_acks import ACK_EVENTS, order_acks
+from services.order_book import OB_CHECKSUM_FLAG, OrderBook
+from services.ws_dispatch import ChannelDispatcher
+from utils.consistent_hash import ConsistentHashRing
+from utils.json_optimizer import WSFrameStats, is_heartbeat_frame, ws_loads
 from utils.logger import get_logger
+from utils.ticker_frame import TickerFrame
 from ws.auth import build_ws_auth_payload
 
 # Lazy import i metoder för att undvika cirkulär import
@@ -24,6 +31,10 @@ from ws.auth import build_ws_auth_payload
 logger = get_logger(__name__)
 
 
+def _noop_callback(_payload: Any) -> None:
+    """Platshållare så book-subs utan konsument ändå får chanId-mappning."""
+
+
 class BitfinexWebSocketService:
     """Service för WebSocket-anslutning till Bitfinex."""
 
@@ -42,10 +53,12 @@ class BitfinexWebSocketService:
         self._chan_callbacks = {}  # (ws, chanId) -> callback
         self._chan_info = {}  # (ws, chanId) -> {channel, symbol, key}
         self.private_event_callbacks = {}
+        self._last_cid = 0  # senaste cid från _next_cid (WS on/ops)
         self.latest_prices = {}  # Spara senaste priser
         self.price_history = {}  # Spara pris-historik för strategi
         self._last_tick_ts = {}  # symbol -> last tick timestamp
-        self.latest_ticker_frames = {}  # symbol -> senaste fulla ticker-dict (bid/ask/vol/high/low)
+        self.latest_ticker_frames = {}  # symbol -> senaste fulla TickerFrame (bid/ask/vol/high/low)
+        self._ticker_frames: dict[str, TickerFrame] = {}  # symbol -> TickerFrame som uppdateras in-place
         # Throttle/log-state för strategiutvärdering per symbol
         self._last_eval_ts = {}  # symbol -> senast evaluerad (epoch sek)
         self._last_strategy_signal = {}  # symbol -> senaste signal
@@ -82,6 +95,11 @@ class BitfinexWebSocketService:
         self._chanid_by_subkey: dict[tuple, int] = {}
         self._pool_max_sockets: int = int(getattr(self.settings, "WS_PUBLIC_SOCKETS_MAX", 3))
         self._pool_max_subs: int = int(getattr(self.settings, "WS_MAX_SUBS_PER_SOCKET", 200))
+        # Symbol-sharding: shard-index -> socket via consistent hashing
+        self._ring: ConsistentHashRing | None = None
+        self._shard_sockets: dict[int, Any] = {}
+        self._shard_of_ws: dict[Any, int] = {}
+        self._shard_reconnects: int = 0
 
         # Heartbeat/ping & reconnect state
         self._last_msg_ts: float = 0.0
@@ -99,9 +117,150 @@ class BitfinexWebSocketService:
         # Spåra candles-subs för auto-resubscribe
         self._requested_candles: dict[tuple[str, str], Callable] = {}
 
-    async def _get_public_socket(self):
+        # Lokala L2-böcker per book-subkey + conf-flaggor (per anslutning)
+        self.order_books: dict[str, OrderBook] = {}
+        self._requested_books: dict[str, tuple[str, str, str, int, Callable | None]] = {}
+        self._book_resync_pending: dict[tuple, str] = {}  # (ws, chanId) -> subkey som väntar på unsubscribed
+        self._book_resyncing: set[str] = set()
+        self._book_resyncs: int = 0
+        self._conf_flags: int = 0
+        self._conf_ws = None
+
+        # Dispatch-köer för publika callbacks (läsloopen awaitar inte callbacks)
+        self._dispatch_enabled: bool = bool(getattr(self.settings, "WS_DISPATCH_ENABLED", True))
+        self._dispatcher = ChannelDispatcher(maxlen=int(getattr(self.settings, "WS_DISPATCH_QUEUE_MAX", 256) or 256))
+        self._ticker_policy: str = str(getattr(self.settings, "WS_DISPATCH_TICKER_POLICY", "coalesce") or "coalesce")
+        # Ingest-statistik per socket (frames/sek, heartbeats, avkodningstid)
+        self._ingest_stats: dict[Any, WSFrameStats] = {}
+
+    def _shard_ring(self) -> ConsistentHashRing:
+        """Hash-ring över shard-index 0..WS_PUBLIC_SOCKETS_MAX-1 (byggs om när cap ändras)."""
+        cap = max(1, int(self._pool_max_sockets or 1))
+        if self._ring is None or len(self._ring.nodes) != cap:
+            self._ring = ConsistentHashRing(range(cap))
+        return self._ring
+
+    @staticmethod
+    def _symbol_of_subkey(sub_key: str) -> str:
+        """'ticker|tBTCUSD' / 'candles|trade:1m:tBTCUSD' -> 'tBTCUSD' (shard-nyckel)."""
+        rest = sub_key.split("|", 1)[-1]
+        return rest.rsplit(":", 1)[-1] if rest.startswith("trade:") else rest.split("|", 1)[0]
+
+    async def _open_shard(self, shard: int):
+        ws = await self._open_public_socket()
+        if ws:
+            self._pool_public.append(ws)
+            self._pool_sub_counts[ws] = 0
+            self._shard_sockets[shard] = ws
+            self._shard_of_ws[ws] = shard
+        return ws
+
+    def _detach_public_socket(self, ws) -> list[str]:
+        """Koppla loss en pool-socket från pool, shard och routingtabeller. Returnerar dess subkeys."""
+        keys = [k for k, w in self._sub_socket.items() if w is ws]
+        shard = self._shard_of_ws.pop(ws, None)
+        if shard is not None and self._shard_sockets.get(shard) is ws:
+            self._shard_sockets.pop(shard, None)
+        try:
+            self._pool_public.remove(ws)
+        except ValueError:
+            pass
+        self._pool_sub_counts.pop(ws, None)
+        for route in [r for r in self._chan_callbacks if r[0] is ws]:
+            self._chan_callbacks.pop(route, None)
+        for route in [r for r in self._chan_info if r[0] is ws]:
+            self._chan_info.pop(route, None)
+        for route in [r for r in self._chanid_by_subkey if r[0] is ws]:
+            self._chanid_by_subkey.pop(route, None)
+        for key in keys:
+            self._sub_socket.pop(key, None)
+        return keys
+
+    async def _resubscribe_on(self, ws, keys: list[str]) -> int:
+        """Skicka om sparade subscribe-meddelanden för `keys` på `ws`."""
+        done = 0
+        for key in keys:
+            msg = self.subscriptions.get(key)
+            if not msg:
+                continue
+            try:
+                await ws.send(json.dumps(msg))
+                self._sub_socket[key] = ws
+                self._pool_sub_counts[ws] = int(self._pool_sub_counts.get(ws, 0)) + 1
+                done += 1
+            except Exception as e:
+                logger.warning("Resubscribe fel för %s: %s", key, e)
+        return done
+
+    async def _retire_public_socket(self, ws) -> None:
+        """Stäng en pool-socket (cap sänkt) och flytta dess subs till sina nya shards."""
+        keys = self._detach_public_socket(ws)
+        try:
+            if ws and not getattr(ws, "closed", True):
+                await ws.close()
+        except Exception:
+            pass
+        for key in keys:
+            target = await self._get_public_socket(self._symbol_of_subkey(key))
+            if target is not None:
+                await self._resubscribe_on(target, [key])
+
+    def _forget_subscription(self, key: str) -> None:
+        """Släpp en sub som inte har någon socket så att nästa subscribe inte dedupas bort."""
+        self.subscriptions.pop(key, None)
+        self._sub_socket.pop(key, None)
+        if key.startswith("ticker|"):
+            symbol = key.split("|", 1)[1]
+            self.active_tickers.discard(symbol)
+            self._live_notified.discard(symbol)
+
+    async def _relocate_orphaned(self, keys: list[str]) -> int:
+        """Prenumerera om subs från en död shard via ringen (nästa friska shard)."""
+        moved = 0
+        for key in keys:
+            target = None
+            try:
+                target = await self._get_public_socket(self._symbol_of_subkey(key))
+            except Exception as e:
+                logger.debug("Ingen socket för %s: %s", key, e)
+            if target is not None and not getattr(target, "closed", False):
+                if await self._resubscribe_on(target, [key]):
+                    moved += 1
+                    continue
+            self._forget_subscription(key)
+        return moved
+
+    async def _reconnect_shard(self, shard: int, old_ws) -> None:
+        """Återanslut en enskild shard och prenumerera om endast dess subs."""
+        keys = self._detach_public_socket(old_ws)
+        delay = 0.5
+        ws = None
+        for _attempt in range(5):
+            ws = await self._open_shard(shard)
+            if ws:
+                break
+            await self._asyncio.sleep(delay)
+            delay = min(15.0, delay * 2)
+        if not ws:
+            moved = await self._relocate_orphaned(keys)
+            logger.warning(
+                "⚠️ Shard %s kunde inte återanslutas: %s/%s subs flyttade, resten släppta",
+                shard,
+                moved,
+                len(keys),
+            )
+            return
+        self._shard_reconnects += 1
+        n = await self._resubscribe_on(ws, keys)
+        logger.info("🧩 Shard %s återansluten, %s subs omprenumererade", shard, n)
+
+    async def _get_public_socket(self, symbol: str | None = None):
         """
         Hämta en lämplig public‑socket att sub:a på, skapa ny vid behov.
+
+        Med `symbol` placeras subben via consistent hashing på sin shard
+        (nästa shard i ringen om den är full). Utan symbol väljs socketen
+        med minst subs.
         """
         try:
             if not self._pool_enabled:
@@ -109,23 +268,31 @@ class BitfinexWebSocketService:
                 if not self.is_connected:
                     await self.connect()
                 return self.websocket
-            # Hård cap: respektera WS_PUBLIC_SOCKETS_MAX och dedupe
-            try:
-                max_socks = int(self._pool_max_sockets)
-                if max_socks <= 0:
-                    max_socks = 1
-                # Trimma bort extra sockets om vi av misstag har fler än cap
-                while len(self._pool_public) > max_socks:
-                    try:
-                        ws_extra = self._pool_public.pop()
-                        if ws_extra and not getattr(ws_extra, "closed", True):
-                            await ws_extra.close()
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-            # Rensa döda sockets
-            self._pool_public = [ws for ws in self._pool_public if ws and not ws.closed]
+            cap = max(1, int(self._pool_max_sockets or 1))
+            # Shard-mappning följer poolen (poolen kan ha rensats utifrån)
+            for shard, ws in list(self._shard_sockets.items()):
+                if ws not in self._pool_public:
+                    self._shard_sockets.pop(shard, None)
+                    self._shard_of_ws.pop(ws, None)
+            # Hård cap: stäng shards utanför cap och rensa döda sockets
+            for ws in list(self._pool_public):
+                if not ws or ws.closed:
+                    self._detach_public_socket(ws)
+                    continue
+                if ws not in self._shard_of_ws:
+                    free = next((i for i in range(cap) if i not in self._shard_sockets), None)
+                    if free is not None:
+                        self._shard_sockets[free] = ws
+                        self._shard_of_ws[ws] = free
+                if self._shard_of_ws.get(ws, cap) >= cap:
+                    await self._retire_public_socket(ws)
+            if symbol:
+                for shard in self._shard_ring().iter_nodes(symbol):
+                    ws = self._shard_sockets.get(shard)
+                    if ws is None:
+                        ws = await self._open_shard(shard)
+                    if ws is not None and int(self._pool_sub_counts.get(ws, 0)) < self._pool_max_subs:
+                        return ws
             # Välj socket med minst subs
             best = None
             best_cnt = 1 << 30
@@ -135,38 +302,12 @@ class BitfinexWebSocketService:
                     best = ws
                     best_cnt = cnt
             # Skapa ny om ingen finns eller om alla passerat gräns och vi kan skala ut
-            if best is None or (best_cnt >= self._pool_max_subs and len(self._pool_public) < self._pool_max_sockets):
-                # öppna ny public‑socket
-                ws = await self._open_public_socket()
-                if ws:
-                    self._pool_public.append(ws)
-                    self._pool_sub_counts[ws] = 0
-                    best = ws
-                    best_cnt = 0
-            # Efter ev. nyöppning, säkerställ cap igen
-            try:
-                max_socks = int(self._pool_max_sockets)
-                if max_socks <= 0:
-                    max_socks = 1
-                if len(self._pool_public) > max_socks:
-                    # Stäng sist öppnade tills vi är inom cap
-                    overflow = len(self._pool_public) - max_socks
-                    for _ in range(overflow):
-                        try:
-                            ws_extra = self._pool_public.pop()
-                            if ws_extra and not getattr(ws_extra, "closed", True):
-                                await ws_extra.close()
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-            # Säkerställ minst en socket
-            if best is None:
-                ws = await self._open_public_socket()
-                if ws:
-                    self._pool_public.append(ws)
-                    self._pool_sub_counts[ws] = 0
-                    best = ws
+            if best is None or (best_cnt >= self._pool_max_subs and len(self._pool_public) < cap):
+                free = next((i for i in range(cap) if i not in self._shard_sockets), None)
+                if free is not None:
+                    ws = await self._open_shard(free)
+                    if ws:
+                        best = ws
             return best
         except Exception:
             # Fallback till huvudsocket
@@ -198,8 +339,10 @@ class BitfinexWebSocketService:
                     sockets.append(
                         {
                             "index": idx,
+                            "shard": self._shard_of_ws.get(ws),
                             "subs": int(self._pool_sub_counts.get(ws, 0)),
                             "closed": bool(getattr(ws, "closed", False)),
+                            "ingest": self._ingest_stats[ws].to_dict() if ws in self._ingest_stats else None,
                         }
                     )
                 except Exception:
@@ -227,8 +370,12 @@ class BitfinexWebSocketService:
                 "pool_max_sockets": int(self._pool_max_sockets),
                 "pool_max_subs": int(self._pool_max_subs),
                 "pool_sockets": sockets,
+                "shard_reconnects": int(self._shard_reconnects),
                 "totals": totals,
                 "subscriptions": subs_list,
+                "order_books": {k: b.get_stats() for k, b in self.order_books.items()},
+                "order_book_resyncs": int(self._book_resyncs),
+                "dispatch": {"enabled": bool(self._dispatch_enabled), **self._dispatcher.get_stats()},
                 "main": {
                     "connected": bool(self.is_connected),
                     "authenticated": bool(self.is_authenticated),
@@ -236,6 +383,9 @@ class BitfinexWebSocketService:
                     "hb_timeout_sec": float(getattr(self, "_hb_timeout", 0.0) or 0.0),
                     "last_msg_ts": float(self._last_msg_ts or 0.0),
                     "last_msg_age_sec": float((now - float(self._last_msg_ts)) if self._last_msg_ts else -1.0),
+                    "ingest": (
+                        self._ingest_stats[self.websocket].to_dict() if self.websocket in self._ingest_stats else None
+                    ),
                 },
             }
         except Exception:
@@ -249,27 +399,63 @@ class BitfinexWebSocketService:
                 },
             }
 
+    def _decode_frame(self, ws, message: str | bytes) -> Any:
+        """Avkoda en WS-frame; heartbeats filtreras på råa bytes och ger None."""
+        st = self._ingest_stats.get(ws)
+        if st is None:
+            st = self._ingest_stats[ws] = WSFrameStats()
+        st.frames += 1
+        st.bytes += len(message)
+        if is_heartbeat_frame(message):
+            st.heartbeats += 1
+            return None
+        t0 = time.perf_counter_ns()
+        try:
+            return ws_loads(message)
+        except Exception:
+            st.errors += 1
+            raise
+        finally:
+            st.decode_ns += time.perf_counter_ns() - t0
+
+    async def _route_frame(self, ws, data: Any) -> None:
+        """Routa en avkodad frame med källsocketen explicit (chanId är per socket)."""
+        t0 = time.perf_counter_ns()
+        try:
+            if isinstance(data, list) and len(data) > 1:
+                await self._handle_channel_message(data, ws)
+            elif isinstance(data, dict):
+                await self._handle_event_message(data, ws)
+        finally:
+            st = self._ingest_stats.get(ws)
+            if st is not None:
+                dt = time.perf_counter_ns() - t0
+                st.handled += 1
+                st.handle_ns += dt
+                st.handle_ns_max = max(st.handle_ns_max, dt)
+
     async def _listen_loop(self, ws):
         try:
             async for message in ws:
                 try:
-                    data = json.loads(message)
-                    # Markera aktuell ws för chanId‑routning
-                    self._current_incoming_ws = ws
-                    # Vi återanvänder channel‑callbacks från huvudobjektet; Bitfinex skickar chanId per socket.
-                    if isinstance(data, list) and len(data) > 1:
-                        await self._handle_channel_message(data)
-                    elif isinstance(data, dict):
-                        await self._handle_event_message(data)
+                    data = self._decode_frame(ws, message)
+                    if data is None:
+                        continue
+                    await self._route_frame(ws, data)
                 except Exception as e:
                     logger.debug("Pool socket parse fel: %s", e)
-                finally:
-                    try:
-                        self._current_incoming_ws = None
-                    except Exception:
-                        pass
         except Exception as e:
             logger.warning("Pool socket stängd: %s", e)
+        finally:
+            # Oväntat stängd shard-socket => återanslut bara den sharden
+            shard = self._shard_of_ws.get(ws)
+            if shard is not None:
+                try:
+                    self._asyncio.get_running_loop().create_task(
+                        self._reconnect_shard(shard, ws), name=f"ws-shard-reconnect-{shard}"
+                    )
+                except Exception:
+                    pass
 
     # Publikt API för andra moduler
     def register_handler(self, event_code: str, callback: Callable[[Any], Any]):
@@ -485,6 +671,8 @@ class BitfinexWebSocketService:
                 logger.warning("WS conf: ingen anslutning")
                 return
             await self.websocket.send(json.dumps(msg))
+            self._conf_flags = int(flags)
+            self._conf_ws = self.websocket
             logger.info(f"⚙️ WS conf skickad med flags={flags}")
         except Exception as e:
             logger.warning(f"⚠️ Kunde inte skicka conf: {e}")
@@ -496,6 +684,8 @@ class BitfinexWebSocketService:
         price: float | None = None,
         amount: float | None = None,
         extra: dict[str, Any] | None = None,
+        wait_ack: bool = False,
+        ack_timeout: float | None = None,
     ) -> dict[str, Any]:
         """Skicka WS order update (ou) för att uppdatera pris/mängd/flags.
 
@@ -504,9 +694,11 @@ class BitfinexWebSocketService:
             price: nytt pris (valfritt)
             amount: ny mängd (valfritt)
             extra: extra fält att inkludera (t.ex. flags)
+            wait_ack: vänta på Bitfinex-bekräftelse (n ou-req / ou)
+            ack_timeout: max väntan i sekunder (default registrets timeout)
 
         Returns:
-            Dict med status
+            Dict med status (med wait_ack även "ack")
         """
         payload: dict[str, Any] = {"id": int(order_id)}
         if price is not None:
@@ -518,24 +710,32 @@ class BitfinexWebSocketService:
 
         if not await self.ensure_authenticated():
             return {"success": False, "error": "ws_not_authenticated"}
+        pending = order_acks.register("ou", order_id=order_id, timeout=ack_timeout)
         try:
             msg = [0, "ou", None, payload]
             await self.send(msg)
             logger.info(f"📝 WS ou skickad: id=%s price=%s amount=%s", order_id, price, amount)
-            return {"success": True, "sent": True}
         except Exception as e:
+            order_acks.discard(pending)
             logger.error(f"❌ WS ou fel: {e}")
             return {"success": False, "error": str(e)}
+        if not wait_ack:
+            return {"success": True, "sent": True}
+        ack = await order_acks.wait(pending)
+        return {"success": bool(ack.get("acked")), "sent": True, "ack": ack}
 
     async def order_cancel_multi(
         self,
         ids: list[int] | None = None,
         cids: list[int] | None = None,
         cid_date: str | None = None,
+        wait_ack: bool = False,
+        ack_timeout: float | None = None,
     ) -> dict[str, Any]:
         """Skicka WS oc_multi för att avbryta flera ordrar.
 
-        Stödjer både id-lista och cid+cid_date-lista.
+        Stödjer både id-lista och cid+cid_date-lista. Med wait_ack väntas
+        bekräftelse (n oc-req / oc) per order; success kräver att alla bekräftats.
         """
         items: list[dict[str, Any]] = []
         if ids:
@@ -556,21 +756,33 @@ class BitfinexWebSocketService:
             return {"success": False, "error": "no_items"}
         if not await self.ensure_authenticated():
             return {"success": False, "error": "ws_not_authenticated"}
+        pendings = [
+            order_acks.register("oc", order_id=it.get("id"), cid=it.get("cid"), timeout=ack_timeout) for it in items
+        ]
         try:
             msg = [0, "oc_multi", None, items]
             await self.send(msg)
             logger.info("🧹 WS oc_multi skickad: ids=%s cids=%s", ids or [], cids or [])
-            return {"success": True, "count": len(items)}
         except Exception as e:
+            for p in pendings:
+                order_acks.discard(p)
             logger.error(f"❌ WS oc_multi fel: {e}")
             return {"success": False, "error": str(e)}
+        if not wait_ack:
+            return {"success": True, "count": len(items)}
+        acks = await order_acks.wait_all(pendings)
+        return {"success": all(a.get("acked") for a in acks), "count": len(items), "acks": acks}
 
-    async def order_ops(self, ops: list[Any]) -> dict[str, Any]:
+    async def order_ops(
+        self, ops: list[Any], wait_ack: bool = False, ack_timeout: float | None = None
+    ) -> dict[str, Any]:
         """Skicka WS ops (batch av ['on'|'oc'|'ou', payload]).
 
         Args:
             ops: lista av operationer, var och en antingen [code, payload]
                  eller dict {"code": code, "payload": {...}}
+            wait_ack: vänta på bekräftelse per operation ("acks" i samma ordning som ops)
+            ack_timeout: max väntan i sekunder (default registrets timeout)
         """
         if not isinstance(ops, list) or not ops:
             return {"success": False, "error": "empty_ops"}
@@ -605,20 +817,71 @@ class BitfinexWebSocketService:
                             data[key] = int(data[key])
                         except Exception:
                             pass
+                # Nya ordrar korreleras via cid – sätt en om den saknas
+                if code_l == "on" and data.get("cid") is None:
+                    data["cid"] = self._next_cid()
                 normalized.append([code_l, data])
             except Exception:
                 pass
 
         if not normalized:
             return {"success": False, "error": "no_valid_ops"}
+        pendings = [
+            order_acks.register(code, order_id=data.get("id"), cid=data.get("cid"), timeout=ack_timeout)
+            for code, data in normalized
+        ]
         try:
             msg = [0, "ops", None, normalized]
             await self.send(msg)
             logger.info("📦 WS ops skickad: %s operationer", len(normalized))
-            return {"success": True, "count": len(normalized)}
         except Exception as e:
+            for p in pendings:
+                order_acks.discard(p)
             logger.error(f"❌ WS ops fel: {e}")
             return {"success": False, "error": str(e)}
+        if not wait_ack:
+            return {"success": True, "count": len(normalized)}
+        acks = await order_acks.wait_all(pendings)
+        return {"success": all(a.get("acked") for a in acks), "count": len(normalized), "acks": acks}
+
+    async def order_new(
+        self, payload: dict[str, Any], wait_ack: bool = False, ack_timeout: float | None = None
+    ) -> dict[str, Any]:
+        """Skicka en enskild WS new order (on), korrelerad via cid.
+
+        Med wait_ack returneras "ack" med order_id från Bitfinex (eller
+        ERROR/timeout), så anroparen vet att ordern faktiskt lagts.
+        """
+        if not await self.ensure_authenticated():
+            return {"success": False, "error": "ws_not_authenticated"}
+        data = dict(payload or {})
+        for key in ("price", "amount"):
+            if data.get(key) is not None:
+                data[key] = str(data[key])
+        try:
+            data["cid"] = int(data["cid"]) if data.get("cid") is not None else self._next_cid()
+        except Exception:
+            data["cid"] = self._next_cid()
+        pending = order_acks.register("on", cid=data["cid"], timeout=ack_timeout)
+        try:
+            await self.send([0, "on", None, data])
+            logger.info("🆕 WS on skickad: cid=%s symbol=%s", data["cid"], data.get("symbol"))
+        except Exception as e:
+            order_acks.discard(pending)
+            logger.error(f"❌ WS on fel: {e}")
+            return {"success": False, "error": str(e)}
+        if not wait_ack:
+            return {"success": True, "sent": True, "cid": data["cid"]}
+        ack = await order_acks.wait(pending)
+        return {"success": bool(ack.get("acked")), "sent": True, "cid": data["cid"], "ack": ack}
+
+    def _next_cid(self) -> int:
+        """Unikt cid (ms-tidsstämpel, strikt ökande inom processen)."""
+        cid = int(time.time() * 1000)
+        if cid <= self._last_cid:
+            cid = self._last_cid + 1
+        self._last_cid = cid
+        return cid
 
     async def enable_dead_man_switch(self, timeout_ms: int = 60000):
         """Aktiverar Dead Man's Switch (auto-cancel vid frånkoppling)."""
@@ -659,8 +922,12 @@ class BitfinexWebSocketService:
             logger.warning(f"⚠️ Fel vid stängning av huvudsocket: {e}")
         finally:
             self.is_connected = False
+            account_state.set_live(False)
+            order_acks.fail_all("disconnected")
 
-        # Stäng poolsockets
+        # Stäng poolsockets (shard-mappning släpps först så läsloopar inte återansluter)
+        self._shard_sockets.clear()
+        self._shard_of_ws.clear()
         try:
             closed_count = 0
             for ws in list(self._pool_public):
@@ -681,6 +948,14 @@ class BitfinexWebSocketService:
             self._chan_callbacks.clear()
             self._chan_info.clear()
             self._chanid_by_subkey.clear()
+            # conf-flaggor gäller per anslutning; böckerna väntar på ny snapshot
+            self._conf_ws = None
+            self._book_resync_pending.clear()
+            self._book_resyncing.clear()
+            for book in self.order_books.values():
+                book.reset()
+            self._dispatcher.clear()
+            self._ingest_stats.clear()
 
         # Rensa aktivitetsstatus
         self.active_tickers.clear()
@@ -787,6 +1062,16 @@ class BitfinexWebSocketService:
                         pass
             except Exception:
                 pass
+            # Auto-resubscribe orderböcker
+            try:
+                for sym, prec, freq, length, cb in list(self._requested_books.values()):
+                    try:
+                        await self.subscribe_book(sym, prec, freq, length, cb)
+                        await self._asyncio.sleep(0.05)
+                    except Exception:
+                        pass
+            except Exception:
+                pass
         finally:
             self._reconnecting = False
 
@@ -801,14 +1086,14 @@ class BitfinexWebSocketService:
         try:
             if not self.is_connected:
                 await self.connect()
-            # Central resolve via SymbolService
+            # Central resolve via symbol-registry
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                sym_svc = SymbolService()
-                await sym_svc.refresh()
-                eff_symbol = sym_svc.resolve(symbol)
-                if not sym_svc.listed(eff_symbol):
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff_symbol = symbol_registry.resolve(symbol)
+                if not symbol_registry.listed(eff_symbol):
                     logger.warning("⛔ WS skip subscribe: pair_not_listed %s", eff_symbol)
                     return
             except Exception:
@@ -848,7 +1133,7 @@ class BitfinexWebSocketService:
             }
 
             # Skicka över poolad socket
-            target_ws = await self._get_public_socket()
+            target_ws = await self._get_public_socket(eff_symbol)
             if not target_ws:
                 logger.warning("WS subscribe_ticker: ingen anslutning")
                 return
@@ -893,6 +1178,8 @@ class BitfinexWebSocketService:
             self._chan_info.pop((ws, chan_id), None)
             self.subscriptions.pop(sub_key, None)
             self.callbacks.pop(sub_key, None)
+            # Lane-nyckeln är samma som sub_key (t.ex. 'candles|trade:1m:tBTCUSD')
+            self._dispatcher.remove(sub_key)
             logger.info("🔕 Unsubscribed %s (chanId=%s)", sub_key, chan_id)
         except Exception as e:
             logger.warning("Unsubscribe fel för %s: %s", sub_key, e)
@@ -900,16 +1187,14 @@ class BitfinexWebSocketService:
     async def _symbol_refresh_loop(self):
         """Refreshar configs periodiskt och resubscribe:ar saknade listade par för önskade symboler."""
         try:
-            from services.symbols import SymbolService
+            from services.symbols import symbol_registry
 
-            sym_svc = SymbolService()
             while True:
                 try:
-                    await sym_svc.refresh()
+                    await symbol_registry.refresh()
                     desired = list(getattr(self, "_requested_symbols", []))
-                    for raw in desired:
-                        eff = sym_svc.resolve(raw)
-                        if not sym_svc.listed(eff):
+                    for raw, eff in symbol_registry.resolve_many(desired).items():
+                        if not symbol_registry.listed(eff):
                             continue
                         key = f"ticker|{eff}"
                         if key not in self.subscriptions:
@@ -937,12 +1222,12 @@ class BitfinexWebSocketService:
                 await self.connect()
 
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                sym_svc = SymbolService()
-                await sym_svc.refresh()
-                eff_symbol = sym_svc.resolve(symbol)
-                if not sym_svc.listed(eff_symbol):
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff_symbol = symbol_registry.resolve(symbol)
+                if not symbol_registry.listed(eff_symbol):
                     logger.warning("⛔ WS skip trades: pair_not_listed %s", eff_symbol)
                     return
             except Exception:
@@ -966,7 +1251,7 @@ class BitfinexWebSocketService:
                     return
             except Exception:
                 pass
-            target_ws = await self._get_public_socket()
+            target_ws = await self._get_public_socket(eff_symbol)
             if not target_ws:
                 logger.warning("WS subscribe_trades: ingen anslutning")
                 return
@@ -1015,12 +1300,12 @@ class BitfinexWebSocketService:
                 await self.connect()
 
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                sym_svc = SymbolService()
-                await sym_svc.refresh()
-                eff_symbol = sym_svc.resolve(symbol)
-                if not sym_svc.listed(eff_symbol):
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff_symbol = symbol_registry.resolve(symbol)
+                if not symbol_registry.listed(eff_symbol):
                     logger.warning("⛔ WS skip candles: pair_not_listed %s", eff_symbol)
                     return
             except Exception:
@@ -1043,7 +1328,7 @@ class BitfinexWebSocketService:
                         return
             except Exception:
                 pass
-            target_ws = await self._get_public_socket()
+            target_ws = await self._get_public_socket(eff_symbol)
             if not target_ws:
                 logger.warning("WS subscribe_candles: ingen anslutning")
                 return
@@ -1083,18 +1368,24 @@ class BitfinexWebSocketService:
         length: int = 25,
         callback: Callable | None = None,
     ):
-        """Prenumerera på orderbok (WS public)."""
+        """
+        Prenumerera på orderbok (WS public).
+
+        För aggregerade precisioner (P0-P4) hålls en lokal OrderBook per
+        subkey i `self.order_books` och Bitfinex checksum aktiveras via conf.
+        `callback` får fortfarande rå payload.
+        """
         try:
             if not self.is_connected:
                 await self.connect()
 
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                sym_svc = SymbolService()
-                await sym_svc.refresh()
-                eff_symbol = sym_svc.resolve(symbol)
-                if not sym_svc.listed(eff_symbol):
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff_symbol = symbol_registry.resolve(symbol)
+                if not symbol_registry.listed(eff_symbol):
                     logger.warning("⛔ WS skip book: pair_not_listed %s", eff_symbol)
                     return
             except Exception:
@@ -1123,11 +1414,21 @@ class BitfinexWebSocketService:
                     return
             except Exception:
                 pass
-            await self.websocket.send(json.dumps(msg))
+            # Checksum-flaggan måste vara satt på anslutningen innan snapshot kommer
+            if self._conf_ws is not self.websocket or not (self._conf_flags & OB_CHECKSUM_FLAG):
+                await self.send_conf(self._conf_flags | OB_CHECKSUM_FLAG)
             key = f"book|{eff_symbol}|{precision}|{freq}|{length}"
+            if precision != "R0" and key not in self.order_books:
+                self.order_books[key] = OrderBook(eff_symbol)
+            await self.websocket.send(json.dumps(msg))
             self.subscriptions[key] = msg
-            if callback:
-                self.callbacks[key] = callback
+            # Registrera alltid en callback så chanId mappas även utan extern konsument
+            self.callbacks[key] = callback or _noop_callback
+            try:
+                self._sub_socket[key] = self.websocket
+                self._requested_books[key] = (symbol, precision, freq, length, callback)
+            except Exception:
+                pass
             logger.info(
                 "📖 Prenumererar på orderbok %s %s/%s/%s",
                 eff_symbol,
@@ -1146,8 +1447,8 @@ class BitfinexWebSocketService:
             ticker_data: Ticker-data från Bitfinex
         """
         try:
-            # Säkerställ dict-inmatning
-            if not isinstance(ticker_data, dict):
+            # Säkerställ dict-/TickerFrame-inmatning
+            if not isinstance(ticker_data, (dict, TickerFrame)):
                 # Försök normalisera om vi fick en lista (WS rå format)
                 if isinstance(ticker_data, list) and len(ticker_data) >= 7:
                     # Vi har inte symbol här, ta 'unknown' – eval sker inte ändå utan history
@@ -1170,7 +1471,7 @@ class BitfinexWebSocketService:
             self.latest_prices[symbol] = price
             try:
                 # Spara hela ramen så REST-fallback kan få bid/ask m.m. från WS
-                if isinstance(ticker_data, dict) and symbol != "unknown":
+                if symbol != "unknown":
                     self.latest_ticker_frames[symbol] = ticker_data
             except Exception:
                 pass
@@ -1269,42 +1570,30 @@ class BitfinexWebSocketService:
 
             async for message in self.websocket:
                 try:
-                    data = json.loads(message)
-                    self._current_incoming_ws = self.websocket
-                    # Heartbeat: uppdatera senaste meddelandetid
-                    try:
-                        import time as _t
-
-                        self._last_msg_ts = _t.time()
-                    except Exception:
-                        pass
-
-                    # Hantera olika meddelandetyper
-                    if isinstance(data, list) and len(data) > 1:
-                        await self._handle_channel_message(data)
-                    elif isinstance(data, dict):
-                        await self._handle_event_message(data)
+                    # Heartbeat: uppdatera senaste meddelandetid (även för hb-frames som filtreras nedan)
+                    self._last_msg_ts = time.time()
+                    data = self._decode_frame(self.websocket, message)
+                    if data is None:
+                        continue
+                    await self._route_frame(self.websocket, data)
 
                 except json.JSONDecodeError:
                     logger.warning("⚠️ Kunde inte parsa WebSocket-meddelande")
                 except Exception as e:
                     logger.error(f"❌ Fel vid hantering av WebSocket-meddelande: {e}")
-                finally:
-                    try:
-                        self._current_incoming_ws = None
-                    except Exception:
-                        pass
 
         except ConnectionClosed:
             logger.warning("⚠️ WebSocket-anslutning stängd")
             self.is_connected = False
+            account_state.set_live(False)
+            order_acks.fail_all("disconnected")
             await self._schedule_reconnect()
         except Exception as e:
             logger.error(f"❌ WebSocket-lyssnare fel: {e}")
             await self._schedule_reconnect()
 
-    async def _handle_channel_message(self, data: list):
-        """Hanterar kanal-meddelanden (publika och privata)."""
+    async def _handle_channel_message(self, data: list, ws=None):
+        """Hanterar kanal-meddelanden (publika och privata). `ws` = källsocket (default huvudsocket)."""
         try:
             channel_id = data[0]
             message_data = data[1]
@@ -1315,6 +1604,13 @@ class BitfinexWebSocketService:
                 if isinstance(message_data, str):
                     event_code = message_data
 
+                    # Kontoläget (wallets/positioner/ordrar) speglas före övrig hantering
+                    if event_code in ACCOUNT_EVENTS:
+                        account_state.apply_private_event(data)
+                    # Bekräftelser på WS-orderkommandon (n/on/ou/oc) löser väntande acks
+                    if event_code in ACK_EVENTS:
+                        order_acks.resolve(data)
+
                     # OPTIMERING: Hantera calc responses direkt
                     if event_code == "miu":
                         await self._handle_miu(data)
@@ -1348,13 +1644,8 @@ class BitfinexWebSocketService:
                     logger.debug(f"ℹ️ Oväntat privat meddelande: {data}")
                 return
 
-            # Publika kanaler via chanId‑mapping (per socket)
-            # För pooled sockets kan vi inte veta ws‑objektet här direkt; Bitfinex chanId är per socket.
-            # Heuristik: om meddelandet kommer via huvudlyssnaren (self.listen_for_messages) använd self.websocket,
-            # annars har _listen_loop(ws) redan kallat _handle_channel_message i samma kontext.
-            current_ws = getattr(self, "_current_incoming_ws", None)
-            if current_ws is None:
-                current_ws = self.websocket
+            # Publika kanaler via chanId‑mapping (per socket); läsloopen skickar med sin socket
+            current_ws = ws if ws is not None else self.websocket
             cb = self._chan_callbacks.get((current_ws, int(channel_id))) or self.channel_callbacks.get(int(channel_id))
             if cb and callable(cb):
                 # Ignorera heartbeat
@@ -1365,37 +1656,20 @@ class BitfinexWebSocketService:
                 )
                 chan = info.get("channel")
                 symbol = info.get("symbol") or "unknown"
-                # Normalisera ticker-frame till dict
+                if chan == "book":
+                    await self._handle_book_message(info, data, cb)
+                    return
+                # Normalisera ticker-frame: en TickerFrame per symbol, uppdateras in-place
                 if chan == "ticker" and isinstance(message_data, list) and len(message_data) >= 7:
-                    norm = {
-                        "symbol": symbol,
-                        "bid": message_data[0],
-                        "bid_size": message_data[1],
-                        "ask": message_data[2],
-                        "ask_size": message_data[3],
-                        "daily_change": message_data[4],
-                        "daily_change_relative": message_data[5],
-                        "last_price": message_data[6],
-                        "volume": message_data[7] if len(message_data) > 7 else 0,
-                        "high": message_data[8] if len(message_data) > 8 else 0,
-                        "low": message_data[9] if len(message_data) > 9 else 0,
-                    }
-                    try:
-                        if asyncio.iscoroutinefunction(cb):
-                            await cb(norm)
-                        else:
-                            cb(norm)
-                    except Exception as e:
-                        logger.warning(f"⚠️ Ticker callback error: {e}")
+                    norm = self._ticker_frames.get(symbol)
+                    if norm is None:
+                        norm = self._ticker_frames[symbol] = TickerFrame(symbol)
+                    norm.update(message_data)
+                    await self._dispatch(f"ticker|{symbol}", cb, norm, self._ticker_policy)
                     return
-                # För övriga kanaler, skicka rå payload vidare
-                try:
-                    if asyncio.iscoroutinefunction(cb):
-                        await cb(message_data)
-                    else:
-                        cb(message_data)
-                except Exception as e:
-                    logger.warning(f"⚠️ Channel callback error: {e}")
+                # För övriga kanaler, skicka rå payload vidare (candles utan drops)
+                policy = "lossless" if chan == "candles" else "drop_oldest"
+                await self._dispatch(f"{chan}|{info.get('key') or symbol}", cb, message_data, policy)
                 return
             # Fallback: heuristik för ticker/trades (äldre väg)
             if isinstance(message_data, list) and len(message_data) >= 7:
@@ -1426,6 +1700,79 @@ class BitfinexWebSocketService:
         except Exception as e:
             logger.error(f"❌ Fel vid hantering av kanal-meddelande: {e}")
 
+    async def _handle_book_message(self, info: dict, data: list, cb: Callable) -> None:
+        """Applicera snapshot/delta/checksum på lokal OrderBook och skicka rå payload vidare."""
+        sub_key = info.get("sub_key")
+        book = self.order_books.get(sub_key) if sub_key else None
+        message_data = data[1]
+        if message_data == "cs":
+            if book is not None and len(data) > 2 and not book.verify(data[2]):
+                logger.warning("⚠️ Orderbok checksum mismatch %s – resync", sub_key)
+                await self._resync_book(sub_key)
+            return
+        if book is not None and isinstance(message_data, list):
+            try:
+                if not message_data or isinstance(message_data[0], (list, tuple)):
+                    book.apply_snapshot(message_data)
+                elif len(message_data) >= 3:
+                    book.apply_delta(message_data)
+            except Exception as e:
+                logger.warning("⚠️ Orderbok uppdatering misslyckades %s: %s", sub_key, e)
+                book.synced = False
+        if cb is not _noop_callback:
+            await self._dispatch(sub_key or f"book|{info.get('symbol')}", cb, message_data)
+
+    async def _dispatch(self, lane: str, cb: Callable, payload: Any, policy: str = "drop_oldest") -> None:
+        """Lämna payload till lanens kö (eller kör inline om dispatch är avslaget)."""
+        if self._dispatch_enabled:
+            try:
+                self._dispatcher.submit(lane, cb, payload, policy)
+                return
+            except RuntimeError:
+                pass  # ingen körande loop – kör inline
+        try:
+            if asyncio.iscoroutinefunction(cb):
+                await cb(payload)
+            else:
+                cb(payload)
+        except Exception as e:
+            logger.warning(f"⚠️ Channel callback error ({lane}): {e}")
+
+    async def _resync_book(self, sub_key: str) -> None:
+        """Unsubscribe + subscribe (vid 'unsubscribed') för att få en ny snapshot."""
+        if sub_key in self._book_resyncing:
+            return
+        self._book_resyncing.add(sub_key)
+        self._book_resyncs += 1
+        try:
+            book = self.order_books.get(sub_key)
+            if book is not None:
+                book.reset()
+            ws = self._sub_socket.get(sub_key) or self.websocket
+            msg = self.subscriptions.get(sub_key)
+            if ws is None or msg is None:
+                return
+            chan_id = self._chanid_by_subkey.pop((ws, sub_key), None)
+            if chan_id is None:
+                await ws.send(json.dumps(msg))
+                return
+            # Släpp kanalmappningen så sena deltan inte når den tomma boken
+            self._chan_callbacks.pop((ws, chan_id), None)
+            self._chan_info.pop((ws, chan_id), None)
+            self._book_resync_pending[(ws, chan_id)] = sub_key
+            await ws.send(json.dumps({"event": "unsubscribe", "chanId": chan_id}))
+        except Exception as e:
+            self._book_resyncing.discard(sub_key)
+            logger.warning("Orderbok resync fel för %s: %s", sub_key, e)
+
+    def get_order_book(self, symbol: str, precision: str = "P0") -> OrderBook | None:
+        """Lokal OrderBook för symbol/precision (None om ingen book-sub finns)."""
+        prefix = f"book|{symbol}|{precision}|"
+        for key, book in self.order_books.items():
+            if key.startswith(prefix):
+                return book
+        return None
+
     def _get_symbol_from_channel_id(self, channel_id: int) -> str:  # noqa: ARG002
         """Hämtar symbol från channel ID baserat på prenumerationer."""
         for symbol, sub_data in self.subscriptions.items():
@@ -1433,8 +1780,9 @@ class BitfinexWebSocketService:
                 return symbol
         return "unknown"
 
-    async def _handle_event_message(self, data: dict):
-        """Hanterar event-meddelanden (subscribe, auth, etc.)."""
+    async def _handle_event_message(self, data: dict, ws=None):
+        """Hanterar event-meddelanden (subscribe, auth, etc.). `ws` = källsocket."""
+        src_ws = ws
         try:
             event = data.get("event")
 
@@ -1460,7 +1808,8 @@ class BitfinexWebSocketService:
                 try:
                     if chan_id is not None and cb_key and cb_key in self.callbacks:
                         # Hitta socket från subkey
-                        ws = self._sub_socket.get(cb_key)
+                        # Socketen som ackade äger chanId; annars socketen subben skickades på
+                        ws = src_ws if src_ws is not None else self._sub_socket.get(cb_key)
                         if ws is None:
                             # fallback till huvudsocket
                             ws = self.websocket
@@ -1469,19 +1818,35 @@ class BitfinexWebSocketService:
                             "channel": chan,
                             "symbol": symbol,
                             "key": key,
+                            "sub_key": cb_key,
                         }
                         # För snabb lookup åt andra hållet
                         self._chanid_by_subkey[(ws, cb_key)] = int(chan_id)
+                        if chan == "book":
+                            self._book_resyncing.discard(cb_key)
                 except Exception:
                     pass
+            elif event == "unsubscribed":
+                chan_id = data.get("chanId")
+                ws = src_ws if src_ws is not None else self.websocket
+                try:
+                    sub_key = self._book_resync_pending.pop((ws, int(chan_id)), None)
+                except Exception:
+                    sub_key = None
+                if sub_key and sub_key in self.subscriptions:
+                    # Resync efter checksum-mismatch: prenumerera om för ny snapshot
+                    await ws.send(json.dumps(self.subscriptions[sub_key]))
+                    logger.info("📖 Orderbok omprenumererad efter resync: %s", sub_key)
             elif event == "auth":
                 status = data.get("status")
                 if status == "OK":
                     self.is_authenticated = True
+                    account_state.set_live(True)
                     self._auth_event.set()
                     logger.info("✅ WS auth bekräftad")
                 else:
                     self.is_authenticated = False
+                    account_state.set_live(False)
                     self._auth_event.set()
                     logger.error(f"❌ WS auth misslyckades: {data}")
                 # Vidarebefordra auth-event till ev. registrerad callback
@@ -1634,11 +1999,11 @@ class BitfinexWebSocketService:
             # Resolve symbol så vi använder eff_symbol i WS
             eff = symbol
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                svc = SymbolService()
-                await svc.refresh()
-                eff = svc.resolve(symbol)
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff = symbol_registry.resolve(symbol)
             except Exception:
                 pass
 
@@ -1693,17 +2058,19 @@ class BitfinexWebSocketService:
             results = {}
             symbols_to_calc = []
 
+            # Resolve hela batchen en gång (registry-lookup, ingen refresh per symbol)
+            try:
+                from services.symbols import symbol_registry
+
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                resolved = symbol_registry.resolve_many(list(symbols))
+            except Exception:
+                resolved = {}
+
             # Kontrollera cache och behov för varje symbol
             for symbol in symbols:
-                eff = symbol
-                try:
-                    from services.symbols import SymbolService
-
-                    svc = SymbolService()
-                    await svc.refresh()
-                    eff = svc.resolve(symbol)
-                except Exception:
-                    pass
+                eff = resolved.get(symbol, symbol)
 
                 # Kontrollera cache
                 cache_key = f"calc_margin_{eff}"
@@ -1767,11 +2134,11 @@ class BitfinexWebSocketService:
             # Resolve symbol så vi använder eff_symbol i WS
             eff = symbol
             try:
-                from services.symbols import SymbolService
+                from services.symbols import symbol_registry
 
-                svc = SymbolService()
-                await svc.refresh()
-                eff = svc.resolve(symbol)
+                if not symbol_registry.is_warm():
+                    await symbol_registry.refresh()
+                eff = symbol_registry.resolve(symbol)
             except Exception:
                 pass
 
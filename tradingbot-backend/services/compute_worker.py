@@ -0,0 +1,263 @@
+"""
+Compute Worker - CPU-tunga jobb utanför event loopen.
+
+Modellvalidering, träning och stora backtests körs i separata processer så
+att WS-frames, Socket.IO-pushar och orderendpoints inte väntar på dem.
+
+Jobb läggs i en begränsad kö och plockas av `processes` slots; varje slot
+äger en egen ProcessPoolExecutor med en process. Vid timeout eller avbrott
+av ett pågående jobb termineras bara den slotens process och en ny skapas
+vid nästa jobb, så andra jobb påverkas inte.
+
+Funktioner och argument måste vara picklebara (modulnivå-funktioner).
+Resultat hämtas med `await job` eller `await worker.run(...)`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FINAL_STATES = ("done", "error", "cancelled", "timeout")
+
+
+class ComputeJobTimeoutError(TimeoutError):
+    """Jobbet överskred sin timeout och processen terminerades."""
+
+
+def _consume_exception(fut: asyncio.Future[Any]) -> None:
+    if not fut.cancelled():
+        fut.exception()
+
+
+class ComputeJob:
+    """Ett köat jobb; awaitable för resultatet."""
+
+    def __init__(self, kind: str, fn: Callable[..., Any], args: tuple, kwargs: dict[str, Any], timeout: float) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.state = "queued"  # queued | running | done | error | cancelled | timeout
+        self.error: str | None = None
+        self.submitted_at = time.perf_counter()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._result: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._runner: asyncio.Future[Any] | None = None
+
+    def __await__(self):
+        return asyncio.shield(self._result).__await__()
+
+    def cancel(self) -> bool:
+        if self.state in FINAL_STATES:
+            return False
+        if self.state == "running" and self._runner is not None:
+            # Slotens dispatcher terminerar processen och sätter slutstatus
+            self._runner.cancel()
+        else:
+            self._finish("cancelled", exc=asyncio.CancelledError())
+        return True
+
+    def _finish(self, state: str, result: Any = None, exc: BaseException | None = None) -> None:
+        self.state = state
+        self.finished_at = time.perf_counter()
+        if self._result.done():
+            return
+        if exc is None:
+            self._result.set_result(result)
+        elif isinstance(exc, asyncio.CancelledError):
+            self._result.cancel()
+        else:
+            self.error = str(exc)[:200]
+            self._result.set_exception(exc)
+            # Markera som hämtat så att fire-and-forget-jobb inte loggar varningar
+            self._result.exception()
+
+    def snapshot(self) -> dict[str, Any]:
+        end = self.finished_at or time.perf_counter()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "error": self.error,
+            "queued_s": round((self.started_at or end) - self.submitted_at, 3),
+            "run_s": round(end - self.started_at, 3) if self.started_at is not None else 0.0,
+            "timeout_s": self.timeout,
+        }
+
+
+class ComputeWorker:
+    """Processpool med jobbkö, timeouts och avbrott."""
+
+    def __init__(
+        self,
+        processes: int = 1,
+        max_queue: int = 32,
+        default_timeout: float = 600.0,
+        max_history: int = 50,
+    ) -> None:
+        self.processes = max(1, int(processes))
+        self.max_queue = max(1, int(max_queue))
+        self.default_timeout = float(default_timeout)
+        self.max_history = max_history
+        self._queue: asyncio.Queue[ComputeJob] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: list[asyncio.Task] = []
+        self._executors: list[ProcessPoolExecutor | None] = [None] * self.processes
+        self._jobs: dict[str, ComputeJob] = {}
+        self._counts: dict[tuple[str, str], int] = {}
+
+    def _ensure_started(self) -> asyncio.Queue[ComputeJob]:
+        loop = asyncio.get_running_loop()
+        # Kö och dispatchers är loop-bundna; processerna kan återanvändas
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._slots = [asyncio.create_task(self._dispatch(i, self._queue)) for i in range(self.processes)]
+        return self._queue
+
+    def submit(
+        self, kind: str, fn: Callable[..., Any], *args: Any, timeout: float | None = None, **kwargs: Any
+    ) -> ComputeJob:
+        """Köa fn(*args, **kwargs); RuntimeError om kön är full."""
+        queue = self._ensure_started()
+        job = ComputeJob(kind, fn, args, kwargs, float(timeout or self.default_timeout))
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull as e:
+            raise RuntimeError(f"compute-kön är full ({self.max_queue} jobb)") from e
+        self._evict()
+        self._jobs[job.id] = job
+        return job
+
+    async def run(
+        self, kind: str, fn: Callable[..., Any], *args: Any, timeout: float | None = None, **kwargs: Any
+    ) -> Any:
+        """Köa och vänta på resultatet; avbryts anroparen avbryts jobbet."""
+        job = self.submit(kind, fn, *args, timeout=timeout, **kwargs)
+        try:
+            return await job
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    def get(self, job_id: str) -> ComputeJob | None:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        return bool(job and job.cancel())
+
+    def _evict(self) -> None:
+        finished = [j for j in self._jobs.values() if j.state in FINAL_STATES]
+        for job in finished[: max(0, len(self._jobs) - self.max_history + 1)]:
+            self._jobs.pop(job.id, None)
+
+    def _executor(self, slot: int) -> ProcessPoolExecutor:
+        executor = self._executors[slot]
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=1)
+            self._executors[slot] = executor
+        return executor
+
+    def _kill(self, slot: int) -> None:
+        executor = self._executors[slot]
+        self._executors[slot] = None
+        if executor is None:
+            return
+        # ProcessPoolExecutor kan inte avbryta ett körande anrop; terminera processen
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for proc in processes:
+            try:
+                proc.terminate()
+            except Exception:
+                pass
+
+    async def _dispatch(self, slot: int, queue: asyncio.Queue[ComputeJob]) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await queue.get()
+            try:
+                if job.state != "queued":
+                    continue
+                job.state = "running"
+                job.started_at = time.perf_counter()
+                job._runner = asyncio.wrap_future(
+                    self._executor(slot).submit(job.fn, *job.args, **job.kwargs), loop=loop
+                )
+                # Efter timeout/avbrott får den övergivna futuren BrokenProcessPool
+                job._runner.add_done_callback(_consume_exception)
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(job._runner), timeout=job.timeout)
+                    job._finish("done", result=result)
+                except TimeoutError:
+                    self._kill(slot)
+                    job._finish("timeout", exc=ComputeJobTimeoutError(f"{job.kind} överskred {job.timeout:.0f}s"))
+                except asyncio.CancelledError:
+                    if not job._runner.cancelled():
+                        raise  # själva dispatchern stängs
+                    self._kill(slot)
+                    job._finish("cancelled", exc=asyncio.CancelledError())
+                except BrokenProcessPool as e:
+                    # Processen dog (t.ex. OOM) - ny process skapas vid nästa jobb
+                    self._kill(slot)
+                    job._finish("error", exc=e)
+                except Exception as e:
+                    job._finish("error", exc=e)
+            finally:
+                if job.state in FINAL_STATES:
+                    key = (job.kind, job.state)
+                    self._counts[key] = self._counts.get(key, 0) + 1
+                    logger.debug("⚙️ Compute-jobb %s (%s): %s", job.id, job.kind, job.state)
+                queue.task_done()
+
+    def get_stats(self) -> dict[str, Any]:
+        running = sum(1 for j in self._jobs.values() if j.state == "running")
+        return {
+            "processes": self.processes,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": running,
+            "jobs_total": [{"kind": k, "state": s, "count": c} for (k, s), c in sorted(self._counts.items())],
+            "jobs": [j.snapshot() for j in self._jobs.values()],
+        }
+
+    async def shutdown(self) -> None:
+        for job in list(self._jobs.values()):
+            job.cancel()
+        for task in self._slots:
+            task.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        for slot in range(self.processes):
+            self._kill(slot)
+        self._slots = []
+        self._queue = None
+        self._loop = None
+
+
+_compute_worker: ComputeWorker | None = None
+
+
+def get_compute_worker() -> ComputeWorker:
+    global _compute_worker
+    if _compute_worker is None:
+        from config.settings import settings
+
+        _compute_worker = ComputeWorker(
+            processes=int(getattr(settings, "COMPUTE_WORKER_PROCESSES", 1) or 1),
+            max_queue=int(getattr(settings, "COMPUTE_WORKER_MAX_QUEUE", 32) or 32),
+            default_timeout=float(getattr(settings, "COMPUTE_JOB_TIMEOUT_SECONDS", 600.0) or 600.0),
+        )
+    return _compute_worker
@@ -30,14 +30,14 @@ class CoordinatorService:
         }
 
     async def enforce_candle_cache_retention(self) -> dict[str, Any]:
-        from utils.candle_cache import candle_cache
+        from utils.candle_cache import async_candle_cache
 
         s = settings
         days = int(getattr(s, "CANDLE_CACHE_RETENTION_DAYS", 0) or 0)
         max_rows = int(getattr(s, "CANDLE_CACHE_MAX_ROWS_PER_PAIR", 0) or 0)
         if days <= 0 and max_rows <= 0:
             return {"ok": True, "removed": 0}
-        removed = candle_cache.enforce_retention(days, max_rows)
+        removed = await async_candle_cache.enforce_retention(days, max_rows)
         return {"ok": True, "removed": int(removed)}
 
     async def prob_validation(self) -> dict[str, Any]:
@@ -7,6 +7,8 @@ Implementerar:
 - Partial fills hantering
 - Latency och ack simulering
 - Sharpe/Sortino/MAR rapportering
+- Monte Carlo-läge: signalvägen beräknas en gång, N seedade kostnadsscenarier
+  (spread/slippage/partial fill/latens) körs som batchade NumPy-operationer
 """
 
 import math
@@ -15,6 +17,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
+import numpy as np
+
 from services.market_data_facade import get_market_data
 from services.strategy import evaluate_strategy
 from utils.logger import get_logger
@@ -74,6 +78,40 @@ class BacktestResult:
     trades: list[BacktestTrade]
 
 
+@dataclass
+class MonteCarloResult:
+    """Fördelningar över N seedade kostnadsscenarier (samma signalväg)."""
+
+    n_paths: int
+    seed: int
+    total_trades: int
+    final_equity: dict[str, float]
+    sharpe_ratio: dict[str, float]
+    max_drawdown: dict[str, float]
+    total_fees: dict[str, float]
+    hit_rate: dict[str, float]
+    avg_fill_ratio: float
+    avg_latency_ms: float
+
+
+def _distribution(values: np.ndarray) -> dict[str, float]:
+    """p5/p50/p95 och medel för en vektor över scenarier."""
+    if values.size == 0:
+        return {"p5": 0.0, "p50": 0.0, "p95": 0.0, "mean": 0.0}
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {"p5": float(p5), "p50": float(p50), "p95": float(p95), "mean": float(np.mean(values))}
+
+
+def _bar_ms(candles: list[list], closes_len: int) -> float:
+    """Median candle-intervall i ms (fallback 1m)."""
+    try:
+        mts = np.asarray([float(c[0]) for c in candles[-closes_len:]], dtype=float)
+        step = float(np.median(np.diff(mts))) if mts.size > 1 else 0.0
+        return step if step > 0 else 60_000.0
+    except Exception:
+        return 60_000.0
+
+
 class CostAwareBacktestService:
     """Service för cost-aware backtesting."""
 
@@ -520,6 +558,132 @@ class CostAwareBacktestService:
             trades=trades,
         )
 
+    async def run_monte_carlo(
+        self,
+        symbol: str,
+        timeframe: str = "1m",
+        limit: int = 500,
+        initial_capital: float = 10000.0,
+        position_size_pct: float = 0.1,
+        costs: TradeCosts | None = None,
+        n_paths: int = 500,
+        seed: int = 0,
+    ) -> MonteCarloResult:
+        """
+        Seedad Monte Carlo över exekveringskostnader för en gemensam signalväg.
+
+        Signalerna beräknas en gång (samma som vektoriserade backtesten); varje
+        scenario drar per trade partial fill, slippage och latens. Latensen ger
+        ett prisdrag med candle-volatiliteten skalad till latensens längd.
+        """
+        costs = costs or self.costs
+        candles = await self.data_service.get_candles(symbol, timeframe, limit)
+        if not candles:
+            raise ValueError(f"Kunde inte hämta data för {symbol}")
+        from services.compute_worker import get_compute_worker
+        from services.prob_model import prob_model
+
+        # Simuleringen är CPU-bunden (paths x trades); kör den i compute-workern
+        return await get_compute_worker().run(
+            "monte_carlo",
+            _monte_carlo_job,
+            candles,
+            initial_capital,
+            position_size_pct,
+            costs,
+            n_paths,
+            seed,
+            prob_model.export_state(),
+        )
+
+    def simulate_monte_carlo(
+        self,
+        candles: list[list],
+        initial_capital: float = 10000.0,
+        position_size_pct: float = 0.1,
+        costs: TradeCosts | None = None,
+        n_paths: int = 500,
+        seed: int = 0,
+    ) -> MonteCarloResult:
+        """Synkron kärna för run_monte_carlo (candles redan hämtade)."""
+        from services.backtest import signal_path
+        from utils.candles import parse_candles_to_strategy_data
+
+        costs = costs or self.costs
+        n_paths = max(1, int(n_paths))
+        parsed = parse_candles_to_strategy_data(candles)
+        closes = np.asarray(parsed.get("closes", []), dtype=float)
+        highs = np.asarray(parsed.get("highs", []), dtype=float)
+        lows = np.asarray(parsed.get("lows", []), dtype=float)
+        if closes.size < 50:
+            raise ValueError("Inte tillräckligt med data för backtest")
+
+        # Signalvägen: en trade per riktningsbyte, öppen position stängs på sista close
+        sig = signal_path(closes, highs, lows)
+        active = np.flatnonzero(sig)
+        switches = active[np.diff(sig[active], prepend=0) != 0] if active.size else active
+        entries = switches
+        exits = np.append(switches[1:], closes.size - 1)[: entries.size]
+        direction = sig[entries].astype(float)
+        k = int(entries.size)
+
+        rng = np.random.default_rng(seed)
+        shape = (n_paths, k)
+
+        # Latens (ms) per sida och prisdrag under latensen (lognormal-steg)
+        lat_e = np.maximum(10.0, rng.normal(costs.latency_ms, costs.latency_ms * 0.2, shape))
+        lat_x = np.maximum(10.0, rng.normal(costs.latency_ms, costs.latency_ms * 0.2, shape))
+        log_ret = np.diff(np.log(closes))
+        sigma_ms = float(np.std(log_ret)) / np.sqrt(_bar_ms(candles, closes.size)) if log_ret.size else 0.0
+        drift_e = np.exp(rng.standard_normal(shape) * sigma_ms * np.sqrt(lat_e))
+        drift_x = np.exp(rng.standard_normal(shape) * sigma_ms * np.sqrt(lat_x))
+
+        # Spread (hel spread per sida som simulate_market_impact) + slumpad slippage (medel = slippage_bps)
+        spread = costs.spread_bps / 10000.0
+        slip_e = rng.uniform(0.0, 2.0, shape) * costs.slippage_bps / 10000.0
+        slip_x = rng.uniform(0.0, 2.0, shape) * costs.slippage_bps / 10000.0
+
+        # Partial fill på entry: exponering skalas med fill-ratio
+        partial = rng.random(shape) < costs.partial_fill_prob
+        fill = np.where(partial, rng.uniform(0.3, 0.9, shape), 1.0)
+
+        entry_px = closes[entries] * (1.0 + direction * (spread + slip_e)) * drift_e
+        exit_px = closes[exits] * (1.0 - direction * (spread + slip_x)) * drift_x
+        gross = direction * (exit_px / entry_px - 1.0)
+        # Entry som limit (maker), exit som market (taker) — samma som _create_trade
+        fee_ret = costs.maker_fee + costs.taker_fee * (exit_px / entry_px)
+        trade_ret = position_size_pct * fill * (gross - fee_ret)
+
+        equity = initial_capital * np.cumprod(1.0 + trade_ret, axis=1)
+        prev = np.concatenate((np.full((n_paths, 1), float(initial_capital)), equity[:, :-1]), axis=1)
+        fees = position_size_pct * fill * fee_ret * prev
+
+        final = equity[:, -1] if k else np.full(n_paths, float(initial_capital))
+        curve = np.concatenate((prev[:, :1], equity), axis=1)
+        peaks = np.maximum.accumulate(curve, axis=1)
+        max_dd = np.max((peaks - curve) / peaks, axis=1)
+        if k > 1:
+            # Samma definition som _calculate_sharpe_ratio: per-trade avkastning, populations-std, ×√252
+            std = np.std(trade_ret, axis=1)
+            safe_std = np.where(std > 0, std, 1.0)
+            sharpe = np.where(std > 0, np.mean(trade_ret, axis=1) * 252 / (safe_std * np.sqrt(252)), 0.0)
+        else:
+            sharpe = np.zeros(n_paths)
+        hit = np.mean(trade_ret > 0, axis=1) if k else np.zeros(n_paths)
+
+        return MonteCarloResult(
+            n_paths=n_paths,
+            seed=int(seed),
+            total_trades=k,
+            final_equity=_distribution(final),
+            sharpe_ratio=_distribution(sharpe),
+            max_drawdown=_distribution(max_dd),
+            total_fees=_distribution(fees.sum(axis=1)),
+            hit_rate=_distribution(hit),
+            avg_fill_ratio=float(np.mean(fill)) if k else 1.0,
+            avg_latency_ms=float(np.mean((lat_e + lat_x) / 2.0)) if k else 0.0,
+        )
+
     def _create_trade(
         self,
         timestamp: datetime,
@@ -560,3 +724,19 @@ class CostAwareBacktestService:
 
 # Global instans
 cost_aware_backtest = CostAwareBacktestService()
+
+
+def _monte_carlo_job(
+    candles: list[list],
+    initial_capital: float,
+    position_size_pct: float,
+    costs: TradeCosts,
+    n_paths: int,
+    seed: int,
+    model_state: dict[str, Any],
+) -> MonteCarloResult:
+    """Compute-worker-ingång för run_monte_carlo (samma modell som anroparen)."""
+    from services.prob_model import prob_model
+
+    prob_model.load_state(model_state)
+    return cost_aware_backtest.simulate_monte_carlo(candles, initial_capital, position_size_pct, costs, n_paths, seed)
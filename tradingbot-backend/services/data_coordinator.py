@@ -12,6 +12,7 @@ from datetime import datetime
 from typing import Any
 
 from utils.logger import get_logger
+from utils.single_flight import single_flight
 
 logger = get_logger(__name__)
 
@@ -24,7 +25,6 @@ class DataCoordinatorService:
         # Öka cache TTL för bättre prestanda
         self._cache_ttl_seconds = 600  # 10 minuter TTL (tidigare 300)
         self._margin_cache_ttl_seconds = 1200  # 20 minuter för margin-data (tidigare 600)
-        self._request_locks: dict[str, asyncio.Lock] = {}
         self._last_cleanup = datetime.now()
         self._batch_requests: dict[str, asyncio.Future] = {}
 
@@ -85,20 +85,14 @@ class DataCoordinatorService:
         # Kontrollera cache
         if self._is_cache_valid(cache_key, ttl_seconds):
             logger.debug(f"Cache-hit för {cache_key}")
+            single_flight.note_hit(f"coordinator:{data_type}")
             return self._data_cache[cache_key]["data"]
 
-        # Skapa lock för denna request
-        if cache_key not in self._request_locks:
-            self._request_locks[cache_key] = asyncio.Lock()
-
-        async with self._request_locks[cache_key]:
-            # Dubbelkontrollera cache efter lock
+        async def _fetch() -> Any | None:
+            # Dubbelkontrollera cache (kan ha fyllts medan vi väntade på loopen)
             if self._is_cache_valid(cache_key, ttl_seconds):
-                logger.debug(f"Cache-hit efter lock för {cache_key}")
                 return self._data_cache[cache_key]["data"]
-
             try:
-                # Hämta data via fetch_func
                 data = await fetch_func(symbol, **kwargs)
 
                 if data is not None:
@@ -115,6 +109,9 @@ class DataCoordinatorService:
                 logger.error(f"Fel vid hämtning av {data_type} för {symbol}: {e}")
                 return None
 
+        # Samtidiga anrop för samma nyckel delar en hämtning
+        return await single_flight.do(f"coordinator:{data_type}", cache_key, _fetch)
+
     async def get_candles(self, symbol: str, timeframe: str = "1m", limit: int = 100) -> list[list] | None:
         """Hämta candles med caching."""
         from services.market_data_facade import get_market_data
@@ -265,7 +262,7 @@ class DataCoordinatorService:
             "expired_entries": total_entries - valid_entries,
             "cache_ttl_seconds": self._cache_ttl_seconds,
             "margin_cache_ttl_seconds": self._margin_cache_ttl_seconds,
-            "active_locks": len(self._request_locks),
+            "active_locks": single_flight.inflight(),
         }
 
 
@@ -2,9 +2,8 @@ from datetime import datetime, timedelta
 from typing import Callable
 
 from models.signal_models import SignalResponse, SignalThresholds
-from indicators.regime import detect_regime, ema_z
-from indicators.adx import adx as adx_series
 from services.market_data_facade import get_market_data
+from services.regime_engine import regime_engine
 from services.signal_service import SignalService as _StdSignalService
 from services.performance_tracker import get_performance_tracker
 from services.realtime_strategy import RealtimeStrategyService
@@ -310,8 +309,8 @@ class EnhancedAutoTrader:
     async def _get_regime_data_local(self, symbol: str) -> dict | None:
         """Beräkna regim och indikatorvärden utan REST-beroende (för att undvika cirkulär import).
 
-        Hämtar candles via MarketDataFacade (WS-first, REST-fallback), beräknar ADX och EMA-Z,
-        och returnerar struktur som matchar REST-endpointens schema.
+        Hämtar candles via MarketDataFacade (WS-first, REST-fallback), beräknar regim, ADX och
+        EMA-Z i ett pass (RegimeResult) och returnerar struktur som matchar REST-endpointens schema.
         """
         try:
             data = get_market_data()
@@ -319,12 +318,6 @@ class EnhancedAutoTrader:
             if not candles or len(candles) < 20:
                 return None
 
-            highs = [float(c[3]) for c in candles if len(c) >= 4]
-            lows = [float(c[4]) for c in candles if len(c) >= 5]
-            closes = [float(c[2]) for c in candles if len(c) >= 3]
-            if len(highs) < 20 or len(lows) < 20 or len(closes) < 20:
-                return None
-
             cfg = {
                 "ADX_PERIOD": 14,
                 "ADX_HIGH": 30,
@@ -332,19 +325,16 @@ class EnhancedAutoTrader:
                 "SLOPE_Z_HIGH": 1.0,
                 "SLOPE_Z_LOW": 0.5,
             }
-            regime = detect_regime(highs, lows, closes, cfg)
-
-            # Beräkna indikatorvärden som REST brukar returnera
-            adx_vals = adx_series(highs, lows, closes, period=cfg["ADX_PERIOD"])
-            adx_value = float(adx_vals[-1]) if adx_vals else None
-            ez_vals = ema_z(closes, fast=3, slow=7, z_win=200)
-            ema_z_value = float(ez_vals[-1]) if ez_vals else None
+            # En beräkning (etikett + ADX/ema_z), delad med paneler via memo
+            res = regime_engine.result_for_candles(symbol, "1m", candles, cfg)
+            if res is None:
+                return None
 
             return {
                 "symbol": symbol,
-                "regime": regime,
-                "adx_value": adx_value,
-                "ema_z_value": ema_z_value,
+                "regime": res.regime,
+                "adx_value": res.adx_value,
+                "ema_z_value": res.ema_z_value,
             }
         except Exception as e:
             logger.error(f"❌ Fel vid lokal regim-beräkning för {symbol}: {e}")
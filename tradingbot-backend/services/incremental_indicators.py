@@ -1,12 +1,16 @@
 """
-Incremental Indicators - maintain per-symbol/timeframe state for EMA, RSI, ATR.
+Incremental Indicators - maintain per-symbol/timeframe state for EMA, RSI, ATR, ADX, EMA-slope z.
 
-Optimized O(1) updates for live candles. Designed for use with WS-first data flow.
+Optimized O(1) updates for live candles (EMA-slope z: O(z_win) for a stable variance). Designed for use with WS-first data flow.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import math
+from collections import deque
+from dataclasses import dataclass, field
+
+from indicators.series import VAR_REL_EPS
 
 
 @dataclass
@@ -75,3 +79,117 @@ class ATRState:
             self.atr = (self.atr * (self.period - 1) + tr) / self.period
         self.prev_close = c
         return float(self.atr)
+
+
+@dataclass
+class ADXState:
+    """
+    Inkrementell Wilder ADX, O(1) per stängd candle.
+
+    Följer exakt samma rekursion/seedning som indicators.series.adx_series,
+    så värdet efter bar i är bit-identiskt med adx_series(...)[i].
+    Returnerar None tills 2*period-1 bars har matats in.
+    """
+
+    period: int
+    bars: int = 0
+    prev_high: float | None = None
+    prev_low: float | None = None
+    prev_close: float | None = None
+    tr_s: float = 0.0
+    plus_dm_s: float = 0.0
+    minus_dm_s: float = 0.0
+    dx_sum: float = 0.0
+    adx: float | None = None
+
+    def update(self, high: float, low: float, close: float) -> float | None:
+        h = float(high)
+        l_ = float(low)
+        c = float(close)
+        p = max(2, int(self.period))
+        idx = self.bars
+        self.bars += 1
+        if self.prev_close is None or self.prev_high is None or self.prev_low is None:
+            self.prev_high, self.prev_low, self.prev_close = h, l_, c
+            return None
+
+        tr = max(h - l_, abs(h - self.prev_close), abs(l_ - self.prev_close))
+        up = h - self.prev_high
+        down = self.prev_low - l_
+        plus_dm = up if (up > down and up > 0) else 0.0
+        minus_dm = down if (down > up and down > 0) else 0.0
+        self.prev_high, self.prev_low, self.prev_close = h, l_, c
+
+        if idx < p:
+            # Seed: summa av bar 1..p-1
+            self.tr_s += tr
+            self.plus_dm_s += plus_dm
+            self.minus_dm_s += minus_dm
+            return None
+
+        self.tr_s = self.tr_s - self.tr_s / p + tr
+        self.plus_dm_s = self.plus_dm_s - self.plus_dm_s / p + plus_dm
+        self.minus_dm_s = self.minus_dm_s - self.minus_dm_s / p + minus_dm
+
+        dx: float | None = None
+        if self.tr_s != 0:
+            plus_di = 100.0 * (self.plus_dm_s / self.tr_s)
+            minus_di = 100.0 * (self.minus_dm_s / self.tr_s)
+            di_sum = minus_di + plus_di
+            if di_sum != 0:
+                dx = 100.0 * (abs(minus_di - plus_di) / di_sum)
+
+        first = 2 * p - 1
+        if idx < first:
+            self.dx_sum += dx if dx is not None else 0.0
+            return None
+        if idx == first:
+            self.dx_sum += dx if dx is not None else 0.0
+            self.adx = self.dx_sum / p
+        elif dx is not None and self.adx is not None:
+            self.adx = ((self.adx * (p - 1)) + dx) / p
+        return self.adx
+
+
+@dataclass
+class EMAZState:
+    """
+    Inkrementell z-score av EMA-slope (EMA_fast - EMA_slow) per stängd candle.
+
+    Samma definition som indicators.series.ema_z_series: pandas-EMA seedad med
+    första värdet, partiellt fönster i början och populations-std. EMA:erna
+    uppdateras i O(1); variansen räknas i två pass över fönstret (O(z_win))
+    som i batchen, eftersom E[y²] - E[y]² kancellerar när priset planar ut
+    efter en volatil period. Brusvarians ger z = 0 (samma gräns som batchen).
+    """
+
+    fast: int = 3
+    slow: int = 7
+    z_win: int = 200
+    ema_fast: float | None = None
+    ema_slow: float | None = None
+    window: deque = field(default_factory=deque)
+
+    @staticmethod
+    def _ema(prev: float | None, v: float, period: int) -> float:
+        if prev is None:
+            return v
+        alpha = 2.0 / (float(period) + 1.0)
+        decay = 1.0 - alpha
+        return (decay * prev + alpha * v) / (decay + alpha)
+
+    def update(self, close: float) -> float:
+        c = float(close)
+        self.ema_fast = self._ema(self.ema_fast, c, max(2, int(self.fast)))
+        self.ema_slow = self._ema(self.ema_slow, c, max(2, int(self.slow)))
+        slope = self.ema_fast - self.ema_slow
+        self.window.append(slope)
+        if len(self.window) > max(10, int(self.z_win)):
+            self.window.popleft()
+        n = len(self.window)
+        mean = math.fsum(self.window) / n
+        var = math.fsum((v - mean) * (v - mean) for v in self.window) / n
+        sq = math.fsum(v * v for v in self.window) / n
+        if var <= VAR_REL_EPS * sq:
+            return 0.0
+        return (slope - mean) / (math.sqrt(var) + 1e-9)
@@ -316,6 +316,80 @@ def render_prometheus_text() -> str:
     except Exception:
         pass
 
+    # Candle-cache I/O-worker (AsyncCandleCache)
+    try:
+        from utils.candle_cache import async_candle_cache
+
+        io = async_candle_cache.io_stats()
+        lines.append(f"tradingbot_candle_cache_queue_depth {int(io.get('queue_depth', 0))}")
+        lines.append(f"tradingbot_candle_cache_queue_depth_max {int(io.get('max_queue_depth', 0))}")
+        lines.append(f"tradingbot_candle_cache_queue_full_waits_total {int(io.get('queue_full_waits', 0))}")
+        lines.append(f"tradingbot_candle_cache_errors_total {int(io.get('errors', 0))}")
+        for key in ("wait_ms", "exec_ms", "loop_overhead_ms"):
+            lines.append(f"tradingbot_candle_cache_{key}_total {float(io.get(f'{key}_total', 0.0))}")
+            lines.append(f"tradingbot_candle_cache_{key}_max {float(io.get(f'{key}_max', 0.0))}")
+        for op, cnt in (io.get("ops") or {}).items():
+            labels = _labels_to_str({"op": str(op)})
+            lines.append(f"tradingbot_candle_cache_ops_total{labels} {int(cnt)}")
+    except Exception:
+        pass
+
+    # WS-orderkommandon: send -> ack latens (histogram) och utfall per op
+    try:
+        from services.order_acks import order_acks
+
+        acks = order_acks.get_stats()
+        lines.append(f"tradingbot_ws_order_ack_pending {int(acks.get('pending', 0))}")
+        for op, st in (acks.get("ops") or {}).items():
+            for outcome in ("sent", "acked", "rejected", "timeouts", "cancelled"):
+                labels = _labels_to_str({"op": str(op), "outcome": outcome})
+                lines.append(f"tradingbot_ws_order_ack_total{labels} {int(st.get(outcome, 0))}")
+            lat = st.get("latency") or {}
+            for le, cnt in (lat.get("buckets") or {}).items():
+                labels = _labels_to_str({"op": str(op), "le": str(le)})
+                lines.append(f"tradingbot_ws_order_ack_latency_ms_bucket{labels} {int(cnt)}")
+            labels = _labels_to_str({"op": str(op)})
+            lines.append(f"tradingbot_ws_order_ack_latency_ms_sum{labels} {float(lat.get('sum_ms', 0.0))}")
+            lines.append(f"tradingbot_ws_order_ack_latency_ms_count{labels} {int(lat.get('count', 0))}")
+            if lat.get("p99_ms") is not None:
+                lines.append(f"tradingbot_ws_order_ack_latency_ms_p50{labels} {float(lat['p50_ms'])}")
+                lines.append(f"tradingbot_ws_order_ack_latency_ms_p99{labels} {float(lat['p99_ms'])}")
+    except Exception:
+        pass
+
+    # Single-flight: cache-träffar, nya hämtningar och samkörda anrop per namespace
+    try:
+        from utils.single_flight import single_flight
+
+        sf = single_flight.get_stats()
+        lines.append(f"tradingbot_singleflight_inflight {int(sf.get('inflight', 0))}")
+        for ns, st in (sf.get("namespaces") or {}).items():
+            for outcome in ("hits", "misses", "coalesced"):
+                labels = _labels_to_str({"namespace": str(ns), "outcome": outcome})
+                lines.append(f"tradingbot_singleflight_requests_total{labels} {int(st.get(outcome, 0))}")
+    except Exception:
+        pass
+
+    # Event loop-lagg och compute-worker (CPU-jobb i separata processer)
+    try:
+        from services.compute_worker import get_compute_worker
+        from utils.loop_lag import get_loop_lag_monitor
+
+        lag = get_loop_lag_monitor().get_stats()
+        for stat in ("last", "avg", "max"):
+            value = lag.get(f"{stat}_ms")
+            if value is not None:
+                labels = _labels_to_str({"stat": stat})
+                lines.append(f"tradingbot_event_loop_lag_ms{labels} {float(value)}")
+        cw = get_compute_worker().get_stats()
+        lines.append(f"tradingbot_compute_queue_depth {int(cw.get('queued', 0))}")
+        lines.append(f"tradingbot_compute_running {int(cw.get('running', 0))}")
+        for row in cw.get("jobs_total") or []:
+            labels = _labels_to_str({"kind": str(row["kind"]), "state": str(row["state"])})
+            lines.append(f"tradingbot_compute_jobs_total{labels} {int(row['count'])}")
+    except Exception:
+        pass
+
     # Probability validation snapshot
     try:
         pv_any = metrics_store.get("prob_validation", {}) or {}
@@ -0,0 +1,296 @@
+"""
+Order Acks - korrelation av WS-orderkommandon med Bitfinex-bekräftelser.
+
+WS-kommandon (on/ou/oc/oc_multi/ops) skickas som [0, CODE, null, payload]
+utan svar på samma anrop. Registret håller en väntande post per id/cid
+innan kommandot skickas och löser den när motsvarande privata händelse
+kommer på kanal 0:
+
+- n (notification) med typ "on-req"/"ou-req"/"oc-req": SUCCESS eller ERROR
+- on: orderhändelsen för samma cid (en ny order kan bara komma från on-req)
+
+ou/oc-händelser löser inte posten: en fill ger också ou (delfylld) eller
+oc (helt fylld) utan att uppdaterings-/cancelkommandot har behandlats.
+Visar raden en fill noteras status på posten och följer med i ack:en
+("fill_status"), så anroparen ser att ordern fylldes under tiden.
+
+Första matchande händelse vinner. Latens från send till ack mäts per
+operationstyp i ett histogram (fasta hinkar + senaste prover för
+kvantiler). Poster som ingen väntar på städas vid timeout och räknas
+som timeouts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ACK_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+ACK_EVENTS = frozenset(("n", "on", "ou", "oc"))
+OPS = ("on", "ou", "oc")
+_SAMPLES_MAX = 512
+
+
+class LatencyHistogram:
+    """Kumulativ latens-histogram i ms (Prometheus-stil) med senaste prover."""
+
+    __slots__ = ("count", "counts", "max_ms", "samples", "sum_ms")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(ACK_BUCKETS_MS) + 1)  # sista = +Inf
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.samples: deque[float] = deque(maxlen=_SAMPLES_MAX)
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(ACK_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.samples.append(ms)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        arr = sorted(self.samples)
+        return arr[min(len(arr) - 1, max(0, round(q * (len(arr) - 1))))]
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """[(le, kumulativt antal), ...] inklusive "+Inf"."""
+        out: list[tuple[str, int]] = []
+        acc = 0
+        for le, n in zip((*map(str, ACK_BUCKETS_MS), "+Inf"), self.counts, strict=True):
+            acc += n
+            out.append((le, acc))
+        return out
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "avg_ms": (self.sum_ms / self.count) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class PendingAck:
+    """En väntande bekräftelse för ett orderkommando."""
+
+    __slots__ = ("deadline", "fill_status", "future", "key", "op", "sent_at")
+
+    def __init__(self, op: str, key: tuple[str, int], future: asyncio.Future, timeout: float) -> None:
+        self.op = op
+        self.key = key
+        self.future = future
+        self.sent_at = time.perf_counter()
+        self.deadline = self.sent_at + timeout
+        self.fill_status: str | None = None
+
+
+def _as_int(v: Any) -> int | None:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _order_keys(row: Any) -> list[tuple[str, int]]:
+    """id/cid ur en Bitfinex-orderrad [ID, GID, CID, SYMBOL, ...]."""
+    if not isinstance(row, (list, tuple)) or not row:
+        return []
+    keys: list[tuple[str, int]] = []
+    oid = _as_int(row[0])
+    if oid is not None:
+        keys.append(("id", oid))
+    if len(row) > 2:
+        cid = _as_int(row[2])
+        if cid is not None:
+            keys.append(("cid", cid))
+    return keys
+
+
+class OrderAckRegistry:
+    """Väntande orderkommandon per id/cid med timeouts och latens per op."""
+
+    def __init__(self, default_timeout: float = 5.0) -> None:
+        self.default_timeout = float(default_timeout)
+        self._pending: dict[tuple[str, int], PendingAck] = {}
+        self.histograms: dict[str, LatencyHistogram] = {op: LatencyHistogram() for op in OPS}
+        self.stats: dict[str, dict[str, int]] = {
+            op: {"sent": 0, "acked": 0, "rejected": 0, "timeouts": 0, "cancelled": 0} for op in OPS
+        }
+
+    # --- Registrering ---
+    def register(
+        self, op: str, *, order_id: Any = None, cid: Any = None, timeout: float | None = None
+    ) -> PendingAck | None:
+        """Registrera innan kommandot skickas. Nyckel: id (ou/oc) eller cid (on)."""
+        if op not in OPS:
+            return None
+        oid, c = _as_int(order_id), _as_int(cid)
+        key = ("id", oid) if oid is not None else (("cid", c) if c is not None else None)
+        if key is None:
+            return None
+        self.expire()
+        prev = self._pending.pop(key, None)
+        if prev is not None and not prev.future.done():
+            # Nytt kommando för samma order ersätter det gamla
+            prev.future.set_result({"acked": False, "status": "superseded", "op": prev.op})
+            self.stats[prev.op]["cancelled"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        pending = PendingAck(op, key, fut, self.default_timeout if timeout is None else float(timeout))
+        self._pending[key] = pending
+        self.stats[op]["sent"] += 1
+        return pending
+
+    def discard(self, pending: PendingAck | None) -> None:
+        """Ta bort en post vars kommando aldrig skickades."""
+        if pending is None:
+            return
+        if self._pending.get(pending.key) is pending:
+            del self._pending[pending.key]
+        self.stats[pending.op]["sent"] -= 1
+        if not pending.future.done():
+            pending.future.cancel()
+
+    # --- Lösning från WS ---
+    def resolve(self, msg: list) -> int:
+        """Matcha en privat händelse [0, CODE, payload] mot väntande poster. Returnerar antal lösta."""
+        if not self._pending:
+            return 0
+        try:
+            code = msg[1]
+            payload = msg[2] if len(msg) > 2 else None
+            if code == "n":
+                if not isinstance(payload, list) or len(payload) < 7:
+                    return 0
+                ntype = str(payload[1] or "")
+                if not ntype.endswith("-req"):
+                    return 0
+                op = ntype[:-4]
+                if op == "oc_multi":
+                    op = "oc"
+                status = str(payload[6] or "").upper()
+                ok = status == "SUCCESS"
+                info = payload[4]
+                rows = info if isinstance(info, list) and info and isinstance(info[0], list) else [info]
+                text = payload[7] if len(payload) > 7 else None
+                return sum(self._resolve_row(op, row, ok, status, text) for row in rows)
+            if code == "on":
+                return self._resolve_row(code, payload, True, "EVENT", None)
+            if code in ("ou", "oc"):
+                self._note_fill(payload)
+        except Exception as e:
+            logger.debug(f"Order ack resolve fel: {e}")
+        return 0
+
+    def _note_fill(self, row: Any) -> None:
+        """Notera fill (EXECUTED/PARTIALLY FILLED) på väntande poster för ordern."""
+        if not isinstance(row, (list, tuple)) or len(row) <= 13:
+            return
+        status = str(row[13] or "")
+        if "EXECUTED" not in status and "PARTIALLY FILLED" not in status:
+            return
+        for key in _order_keys(row):
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.fill_status = status
+
+    def _resolve_row(self, op: str, row: Any, ok: bool, status: str, text: Any) -> int:
+        for key in _order_keys(row):
+            pending = self._pending.get(key)
+            if pending is None or pending.op != op:
+                continue
+            del self._pending[key]
+            if pending.future.done():
+                return 0
+            latency_ms = (time.perf_counter() - pending.sent_at) * 1000.0
+            self.histograms[op].observe(latency_ms)
+            self.stats[op]["acked" if ok else "rejected"] += 1
+            pending.future.set_result(
+                {
+                    "acked": ok,
+                    "status": status,
+                    "op": op,
+                    "order_id": _as_int(row[0]),
+                    "cid": _as_int(row[2]) if len(row) > 2 else None,
+                    "latency_ms": round(latency_ms, 3),
+                    "text": text,
+                    "fill_status": pending.fill_status,
+                }
+            )
+            return 1
+        return 0
+
+    # --- Väntan / städning ---
+    async def wait(self, pending: PendingAck | None) -> dict[str, Any]:
+        """Vänta på ack fram till postens deadline."""
+        if pending is None:
+            return {"acked": False, "status": "untracked"}
+        remaining = max(0.0, pending.deadline - time.perf_counter())
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout=remaining)
+        except TimeoutError:
+            self._timeout(pending)
+            return {
+                "acked": False,
+                "status": "timeout",
+                "op": pending.op,
+                "key": list(pending.key),
+                "fill_status": pending.fill_status,
+            }
+
+    async def wait_all(self, pendings: list[PendingAck | None]) -> list[dict[str, Any]]:
+        return list(await asyncio.gather(*(self.wait(p) for p in pendings)))
+
+    def _timeout(self, pending: PendingAck) -> None:
+        if self._pending.get(pending.key) is pending:
+            del self._pending[pending.key]
+        if not pending.future.done():
+            pending.future.set_result(
+                {"acked": False, "status": "timeout", "op": pending.op, "fill_status": pending.fill_status}
+            )
+            self.stats[pending.op]["timeouts"] += 1
+
+    def expire(self) -> int:
+        """Städa poster förbi deadline (även de ingen väntar på)."""
+        if not self._pending:
+            return 0
+        now = time.perf_counter()
+        expired = [p for p in self._pending.values() if p.deadline <= now]
+        for p in expired:
+            self._timeout(p)
+        return len(expired)
+
+    def fail_all(self, reason: str = "disconnected") -> int:
+        """Lös alla väntande som misslyckade (t.ex. vid disconnect)."""
+        pendings = list(self._pending.values())
+        self._pending.clear()
+        for p in pendings:
+            if not p.future.done():
+                p.future.set_result({"acked": False, "status": reason, "op": p.op})
+                self.stats[p.op]["cancelled"] += 1
+        return len(pendings)
+
+    def get_stats(self) -> dict[str, Any]:
+        self.expire()
+        return {
+            "pending": len(self._pending),
+            "ops": {op: {**self.stats[op], "latency": self.histograms[op].to_dict()} for op in OPS},
+        }
+
+
+# Global instans
+order_acks = OrderAckRegistry()
@@ -0,0 +1,227 @@
+"""
+Order Book - lokal L2-orderbok för Bitfinex WS `book`-kanalen.
+
+Håller prisnivåer per sida i sorterade listor (bisect) plus en dict
+pris -> (count, amount). Snapshot bygger om boken, delta
+([PRICE, COUNT, AMOUNT]) hittar nivån i O(log n) och count == 0 tar bort
+den. Bitfinex checksum (conf-flagga OB_CHECKSUM) verifieras mot de 25
+bästa nivåerna per sida; vid mismatch markeras boken som osynkad tills
+en ny snapshot kommer (BitfinexWebSocketService prenumererar om).
+
+Frågor (best bid/ask, djup, VWAP till storlek) läser direkt ur listorna
+utan kopiering av hela boken.
+
+Stöder aggregerade böcker (P0-P4). Råa böcker (R0) har annat format och
+hanteras inte här.
+"""
+
+from __future__ import annotations
+
+import time
+import zlib
+from bisect import bisect_left, insort
+from decimal import Decimal
+from typing import Any
+
+# conf-flagga som ber Bitfinex skicka [chanId, "cs", checksum] efter varje bokuppdatering
+OB_CHECKSUM_FLAG = 131072
+CHECKSUM_DEPTH = 25
+
+
+def _js_num(x: float) -> str:
+    """Formatera tal som JavaScripts Number#toString (det Bitfinex räknar checksum på)."""
+    if float(x).is_integer() and abs(x) < 1e21:
+        return str(int(x))
+    r = repr(float(x))
+    if "e" in r or "E" in r:
+        # Python växlar till exponentform tidigare än JS (1e-05 vs 0.00001)
+        r = format(Decimal(r), "f")
+    return r
+
+
+class OrderBook:
+    """Lokal L2-bok för en symbol (aggregerad precision)."""
+
+    __slots__ = (
+        "_ask_px",
+        "_asks",
+        "_bid_px",
+        "_bids",
+        "last_update_ts",
+        "stats",
+        "symbol",
+        "synced",
+    )
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self._bid_px: list[float] = []  # stigande; bästa bid sist
+        self._ask_px: list[float] = []  # stigande; bästa ask först
+        self._bids: dict[float, tuple[int, float]] = {}
+        self._asks: dict[float, tuple[int, float]] = {}
+        self.synced = False
+        self.last_update_ts = 0.0
+        self.stats: dict[str, int] = {
+            "snapshots": 0,
+            "deltas": 0,
+            "checksum_ok": 0,
+            "checksum_mismatch": 0,
+            "ignored": 0,
+        }
+
+    # --- Uppdateringar ---
+    def reset(self) -> None:
+        self._bid_px.clear()
+        self._ask_px.clear()
+        self._bids.clear()
+        self._asks.clear()
+        self.synced = False
+
+    def apply_snapshot(self, levels: list) -> None:
+        """Bygg om boken från en snapshot [[PRICE, COUNT, AMOUNT], ...]."""
+        self.reset()
+        for lvl in levels:
+            price, count, amount = float(lvl[0]), int(lvl[1]), float(lvl[2])
+            if count <= 0 or amount == 0:
+                continue
+            if amount > 0:
+                self._bids[price] = (count, amount)
+            else:
+                self._asks[price] = (count, amount)
+        self._bid_px = sorted(self._bids)
+        self._ask_px = sorted(self._asks)
+        self.synced = True
+        self.last_update_ts = time.time()
+        self.stats["snapshots"] += 1
+
+    def apply_delta(self, level: list | tuple) -> bool:
+        """Applicera en nivåuppdatering. False om boken väntar på snapshot."""
+        if not self.synced:
+            self.stats["ignored"] += 1
+            return False
+        price, count, amount = float(level[0]), int(level[1]), float(level[2])
+        if count > 0:
+            if amount > 0:
+                book, prices = self._bids, self._bid_px
+            else:
+                book, prices = self._asks, self._ask_px
+            if price not in book:
+                insort(prices, price)
+            book[price] = (count, amount)
+        else:
+            # count == 0: amount 1 => ta bort bid, -1 => ta bort ask
+            if amount > 0:
+                book, prices = self._bids, self._bid_px
+            else:
+                book, prices = self._asks, self._ask_px
+            if book.pop(price, None) is not None:
+                i = bisect_left(prices, price)
+                if i < len(prices) and prices[i] == price:
+                    del prices[i]
+        self.last_update_ts = time.time()
+        self.stats["deltas"] += 1
+        return True
+
+    def checksum(self) -> int:
+        """Bitfinex-checksum (signerad CRC32) över de 25 bästa nivåerna per sida."""
+        parts: list[str] = []
+        bids = self._bid_px[::-1][:CHECKSUM_DEPTH]
+        asks = self._ask_px[:CHECKSUM_DEPTH]
+        for i in range(max(len(bids), len(asks))):
+            if i < len(bids):
+                parts.append(_js_num(bids[i]))
+                parts.append(_js_num(self._bids[bids[i]][1]))
+            if i < len(asks):
+                parts.append(_js_num(asks[i]))
+                parts.append(_js_num(self._asks[asks[i]][1]))
+        crc = zlib.crc32(":".join(parts).encode("utf-8"))
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    def verify(self, expected: int) -> bool:
+        """Jämför mot checksum från WS; vid mismatch markeras boken som osynkad."""
+        if not self.synced:
+            return False
+        if self.checksum() == int(expected):
+            self.stats["checksum_ok"] += 1
+            return True
+        self.stats["checksum_mismatch"] += 1
+        self.synced = False
+        return False
+
+    # --- Frågor ---
+    def best_bid(self) -> tuple[float, float] | None:
+        if not self._bid_px:
+            return None
+        px = self._bid_px[-1]
+        return px, self._bids[px][1]
+
+    def best_ask(self) -> tuple[float, float] | None:
+        if not self._ask_px:
+            return None
+        px = self._ask_px[0]
+        return px, -self._asks[px][1]
+
+    def spread(self) -> float | None:
+        if not self._bid_px or not self._ask_px:
+            return None
+        return self._ask_px[0] - self._bid_px[-1]
+
+    def mid(self) -> float | None:
+        if not self._bid_px or not self._ask_px:
+            return None
+        return (self._ask_px[0] + self._bid_px[-1]) / 2.0
+
+    def depth(self, n: int = 10) -> dict[str, list[tuple[float, float]]]:
+        """De n bästa nivåerna per sida som (pris, storlek); storlek alltid positiv."""
+        n = max(0, int(n))
+        bids = [(px, self._bids[px][1]) for px in self._bid_px[: -n - 1 : -1]] if n else []
+        asks = [(px, -self._asks[px][1]) for px in self._ask_px[:n]]
+        return {"bids": bids, "asks": asks}
+
+    def vwap(self, size: float, side: str = "buy") -> float | None:
+        """
+        Genomsnittspris för att fylla `size` mot boken.
+
+        side="buy" går mot asks, "sell" mot bids. None om djupet inte räcker.
+        """
+        remaining = float(size)
+        if remaining <= 0:
+            return None
+        if side == "buy":
+            prices, book, sign = self._ask_px, self._asks, -1.0
+            levels = iter(prices)
+        else:
+            prices, book, sign = self._bid_px, self._bids, 1.0
+            levels = reversed(prices)
+        notional = 0.0
+        for px in levels:
+            avail = sign * book[px][1]
+            take = avail if avail < remaining else remaining
+            notional += take * px
+            remaining -= take
+            if remaining <= 1e-12:
+                return notional / float(size)
+        return None
+
+    def slippage_bps(self, size: float, side: str = "buy") -> float | None:
+        """VWAP-avvikelse från mid i baspunkter för en order av given storlek."""
+        mid = self.mid()
+        px = self.vwap(size, side)
+        if mid is None or px is None or mid <= 0:
+            return None
+        return abs(px - mid) / mid * 10_000.0
+
+    def __len__(self) -> int:
+        return len(self._bid_px) + len(self._ask_px)
+
+    def get_stats(self) -> dict[str, Any]:
+        bb = self.best_bid()
+        ba = self.best_ask()
+        return {
+            **self.stats,
+            "synced": bool(self.synced),
+            "levels": len(self),
+            "best_bid": bb[0] if bb else None,
+            "best_ask": ba[0] if ba else None,
+            "age_sec": (time.time() - self.last_update_ts) if self.last_update_ts else None,
+        }
@@ -8,11 +8,18 @@ Bitfinex candle frame v2: [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
 from indicators.atr import calculate_atr
 from indicators.ema import calculate_ema
 from indicators.rsi import calculate_rsi
+from indicators.series import ema_series, rsi_series, true_range
+
+FEATURE_SCHEMA: tuple[str, ...] = ("ema_diff", "rsi_norm", "atr_pct")
 
 
 def _split_candles(
@@ -92,18 +99,119 @@ def label_sequence(candles: list[list[float]], horizon: int, tp: float, sl: floa
     return labels
 
 
+@dataclass(frozen=True)
+class FeatureDataset:
+    """
+    Column-oriented dataset: X has columns FEATURE_SCHEMA, one row per label.
+    """
+
+    X: np.ndarray
+    price: np.ndarray
+    labels: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.labels.size)
+
+
+def _empty_dataset() -> FeatureDataset:
+    return FeatureDataset(
+        X=np.zeros((0, len(FEATURE_SCHEMA))),
+        price=np.zeros(0),
+        labels=np.zeros(0, dtype="<U4"),
+    )
+
+
+def _prefix_features(closes: np.ndarray, highs: np.ndarray, lows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Features for every prefix closes[: L] (L = 1..n) in one pass.
+
+    Row L-1 equals compute_features_from_candles on the first L rows:
+    the indicator series are causal, and prefixes shorter than the
+    default periods (EMA < 10, ATR < 14) use period = L exactly like
+    min(period, len(closes)) does. Rounding and fallbacks mirror
+    calculate_ema/rsi/atr and the `or` defaults.
+    """
+    n = closes.size
+    lengths = np.arange(1, n + 1)
+
+    ema = ema_series(closes, 10)
+    for length in range(5, min(10, n + 1)):
+        ema[length - 1] = ema_series(closes[:length], length)[-1]
+    ema = np.round(ema, 4)
+    ema = np.where(ema == 0, closes, ema)
+
+    # RSI kräver period + 1 punkter: prefix < 15 faller tillbaka till 50
+    rsi = np.where(lengths >= 15, np.round(rsi_series(closes, 14), 2), 50.0)
+    rsi = np.where(rsi == 0, 50.0, rsi)
+
+    # ATR = medel av TR över min(14, L) senaste barer via löpande summa
+    csum = np.concatenate(([0.0], np.cumsum(true_range(highs, lows, closes))))
+    window = np.minimum(lengths, 14)
+    atr = np.round((csum[lengths] - csum[lengths - window]) / window, 4)
+    atr = np.where(atr == 0, 0.0, atr)
+
+    X = np.empty((n, len(FEATURE_SCHEMA)))
+    X[:, 0] = (closes - ema) / (np.abs(ema) + 1e-9)
+    X[:, 1] = (50.0 - np.clip(rsi, 0.0, 100.0)) / 50.0
+    X[:, 2] = atr / (np.abs(closes) + 1e-9)
+    X[lengths < 5] = 0.0
+    return X, closes.copy()
+
+
+def _label_array(closes: np.ndarray, horizon: int, tp: float, sl: float) -> np.ndarray:
+    """Labels via strided max/min over closes[i + 1 : i + 1 + horizon]."""
+    n = closes.size
+    if horizon < 1 or n <= horizon:
+        return np.zeros(0, dtype="<U4")
+    windows = sliding_window_view(closes[1:], horizon)
+    p0 = closes[: n - horizon]
+    denom = np.abs(p0) + 1e-9
+    max_ret = (windows.max(axis=1) - p0) / denom
+    min_ret = (windows.min(axis=1) - p0) / denom
+    return np.where(max_ret >= tp, "buy", np.where(min_ret <= -sl, "sell", "hold"))
+
+
+def build_dataset_arrays(candles: list[list[float]], horizon: int, tp: float, sl: float) -> FeatureDataset:
+    """
+    Vectorized build_dataset: O(n) features and labels as NumPy arrays.
+
+    Alignment matches build_dataset: label i (over valid rows) is paired
+    with the features of the raw prefix candles[: i + 1].
+    """
+    closes_l, highs_l, lows_l = _split_candles(candles)
+    closes = np.asarray(closes_l, dtype=np.float64)
+    labels = _label_array(closes, horizon, tp, sl)
+    m = labels.size
+    if m == 0:
+        return _empty_dataset()
+    X_all, price_all = _prefix_features(
+        closes, np.asarray(highs_l, dtype=np.float64), np.asarray(lows_l, dtype=np.float64)
+    )
+    # Antal giltiga rader i varje rått prefix candles[: i + 1]
+    valid = np.fromiter(
+        (isinstance(row, (list, tuple)) and len(row) >= 5 for row in candles[:m]),
+        dtype=bool,
+        count=m,
+    )
+    idx = np.cumsum(valid) - 1
+    X = np.zeros((m, len(FEATURE_SCHEMA)))
+    price = np.zeros(m)
+    has_rows = idx >= 0
+    X[has_rows] = X_all[idx[has_rows]]
+    price[has_rows] = price_all[idx[has_rows]]
+    return FeatureDataset(X=X, price=price, labels=labels)
+
+
 def build_dataset(candles: list[list[float]], horizon: int, tp: float, sl: float) -> list[dict[str, Any]]:
     """
     Build a small dataset of features + label aligned by dropping last horizon samples.
     Returns list of dicts: {ema_diff, rsi_norm, atr_pct, price, label}
     """
-    labels = label_sequence(candles, horizon, tp, sl)
-    if not labels:
-        return []
-    # Align features: compute per index using the same index into candles
+    ds = build_dataset_arrays(candles, horizon, tp, sl)
     samples: list[dict[str, Any]] = []
-    for i in range(0, len(labels)):
-        feats = compute_features_from_candles(candles[: i + 1])
-        row = {**feats, "label": labels[i]}
+    for feats, price, label in zip(ds.X.tolist(), ds.price.tolist(), ds.labels.tolist(), strict=True):
+        row: dict[str, Any] = dict(zip(FEATURE_SCHEMA, feats, strict=True))
+        row["price"] = price
+        row["label"] = label
         samples.append(row)
     return samples
@@ -2,26 +2,121 @@
 Probability Model Inference API
 
 Feature-flagged, safe fallback till heuristik om modell saknas.
+
+Vid laddning kompileras schema, vikter och kalibrering till NumPy-arrayer
+(CompiledModel). predict_proba_batch poängsätter en hel matris per anrop;
+predict_proba är en tunn wrapper för ett sample. Reload bygger en ny
+CompiledModel och byter referensen i ett steg, så pågående prediktioner
+fortsätter mot den modell de redan läst.
 """
 
 from __future__ import annotations
 
 import json
+from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
+
 from config.settings import settings, Settings
 
+CLASSES: tuple[str, ...] = ("buy", "sell", "hold")
+_DEFAULT_SCHEMA: tuple[str, ...] = ("ema", "rsi")
+
+
+def _hold_rows(n: int) -> np.ndarray:
+    out = np.zeros((n, len(CLASSES)))
+    out[:, 2] = 1.0
+    return out
+
+
+@dataclass(frozen=True)
+class CompiledModel:
+    """Oföränderlig, förkompilerad LR-modell (en kolumn per buy/sell)."""
+
+    meta: dict[str, Any]
+    schema: tuple[str, ...]
+    weights: np.ndarray | None  # (len(schema), 2); None = ogiltig modell
+    bias: np.ndarray
+    calib_a: np.ndarray
+    calib_b: np.ndarray
+    active: np.ndarray  # komponent saknas => sannolikhet 0
+
+    @classmethod
+    def compile(cls, meta: dict[str, Any]) -> CompiledModel:
+        schema = tuple(str(k) for k in (meta.get("schema") or _DEFAULT_SCHEMA))
+        d = len(schema)
+        weights = np.zeros((d, 2))
+        bias = np.zeros(2)
+        calib_a = np.ones(2)
+        calib_b = np.zeros(2)
+        active = np.zeros(2, dtype=bool)
+        try:
+            for j, key in enumerate(("buy", "sell")):
+                comp = meta.get(key)
+                if not comp:
+                    continue
+                # Vikter utöver schemat ignoreras, saknade vikter räknas som 0
+                w = [float(v) for v in (comp.get("w") or [])][:d]
+                weights[: len(w), j] = w
+                bias[j] = float(comp.get("b") or 0.0)
+                calib = comp.get("calib") or {}
+                calib_a[j] = float(calib.get("a", 1.0))
+                calib_b[j] = float(calib.get("b", 0.0))
+                active[j] = True
+        except Exception:
+            return cls(meta, schema, None, bias, calib_a, calib_b, active)
+        return cls(meta, schema, weights, bias, calib_a, calib_b, active)
+
+    def column_index(self, columns: Sequence[str]) -> list[int | None]:
+        """Position i `columns` för varje schemanyckel (None = saknas => 0)."""
+        pos = {str(c): i for i, c in enumerate(columns)}
+        return [pos.get(k) for k in self.schema]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Sannolikheter (n, 3) i ordningen CLASSES för X med kolumner = schema."""
+        n = X.shape[0]
+        if self.weights is None:
+            return _hold_rows(n)
+        with np.errstate(over="ignore", invalid="ignore"):
+            z = X @ self.weights + self.bias
+            p = 1.0 / (1.0 + np.exp(-(self.calib_a * z + self.calib_b)))
+        p = np.where(self.active, p, 0.0)
+        # Normalisera med hold som rest
+        p_hold = np.maximum(0.0, 1.0 - (p[:, 0] + p[:, 1]))
+        total = p[:, 0] + p[:, 1] + p_hold
+        out = _hold_rows(n)
+        ok = total > 0
+        out[ok, 0] = p[ok, 0] / total[ok]
+        out[ok, 1] = p[ok, 1] / total[ok]
+        out[ok, 2] = p_hold[ok] / total[ok]
+        return out
+
 
 class ProbabilityModel:
     def __init__(self, settings_override: Settings | None = None) -> None:
         self.settings = settings_override or settings
         self.enabled = bool(self.settings.PROB_MODEL_ENABLED)
-        self.model_meta: dict[str, Any] = {}
+        self._model = CompiledModel.compile({})
 
         self._loaded = False
         if self.enabled:
             self._loaded = self._try_load()
 
+    @property
+    def model_meta(self) -> dict[str, Any]:
+        return self._model.meta
+
+    @model_meta.setter
+    def model_meta(self, meta: dict[str, Any]) -> None:
+        # Kompilera först, byt sedan referensen (atomiskt för läsare)
+        self._model = CompiledModel.compile(meta or {})
+
+    @property
+    def schema(self) -> tuple[str, ...]:
+        return self._model.schema
+
     def _try_load(self) -> bool:
         try:
             path = self.settings.PROB_MODEL_FILE
@@ -42,6 +137,40 @@ class ProbabilityModel:
         except Exception:
             return False
 
+    def export_state(self) -> dict[str, Any]:
+        """Picklebart tillstånd för att köra samma modell i en worker-process."""
+        return {"enabled": self.enabled, "loaded": self._loaded, "meta": self.model_meta}
+
+    def load_state(self, state: dict[str, Any]) -> None:
+        """Använd tillstånd från export_state (workern kan ha en äldre modell i minnet)."""
+        self.enabled = bool(state.get("enabled"))
+        self.model_meta = dict(state.get("meta") or {})
+        self._loaded = bool(state.get("loaded"))
+
+    def predict_proba_batch(self, X: np.ndarray, columns: Sequence[str] | None = None) -> np.ndarray:
+        """
+        Sannolikheter för många samples: (n, 3) i ordningen buy, sell, hold.
+
+        X har kolumnerna i modellens schema, eller i `columns` som då mappas
+        till schemat (saknade features räknas som 0). Fallback: hold = 1.0.
+        """
+        model = self._model
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n = X.shape[0]
+        if not (self.enabled and self._loaded):
+            return _hold_rows(n)
+        if columns is not None:
+            mapped = np.zeros((n, len(model.schema)))
+            for j, i in enumerate(model.column_index(columns)):
+                if i is not None:
+                    mapped[:, j] = X[:, i]
+            X = mapped
+        if X.shape[1] != len(model.schema):
+            raise ValueError(f"X har {X.shape[1]} kolumner, schemat {len(model.schema)}")
+        return model.predict(X)
+
     def predict_proba(self, features: dict[str, float]) -> dict[str, float]:
         """
         Returnerar sannolikheter {buy, sell, hold}.
@@ -52,38 +181,10 @@ class ProbabilityModel:
             return {"buy": 0.0, "sell": 0.0, "hold": 1.0}
 
         try:
-            # Om exporterad LR‑modell finns: sigmoid(w·x + b) för buy och sell; hold normaliseras
-            schema = self.model_meta.get("schema") or ["ema", "rsi"]
-            x = [float(features.get(k, 0.0)) for k in schema]
-
-            def _sigmoid(z: float) -> float:
-                import math
-
-                return 1.0 / (1.0 + math.exp(-z))
-
-            def _score(key: str) -> float:
-                comp = self.model_meta.get(key)
-                if not comp:
-                    return 0.0
-                w = comp.get("w") or []
-                b = float(comp.get("b") or 0.0)
-                z = sum(float(w[i]) * x[i] for i in range(min(len(w), len(x)))) + b
-                calib = comp.get("calib") or {}
-                a = float(calib.get("a", 1.0))
-                bb = float(calib.get("b", 0.0))
-                return _sigmoid(a * z + bb)
-
-            p_buy_raw = _score("buy")
-            p_sell_raw = _score("sell")
-            # Normalisera med hold som rest
-            p_hold = max(0.0, 1.0 - (p_buy_raw + p_sell_raw))
-            total = p_buy_raw + p_sell_raw + p_hold
-            if total <= 0:
-                return {"buy": 0.0, "sell": 0.0, "hold": 1.0}
-            p_buy = p_buy_raw / total
-            p_sell = p_sell_raw / total
-            p_hold = p_hold / total
-            return {"buy": p_buy, "sell": p_sell, "hold": p_hold}
+            model = self._model
+            x = np.asarray([[float(features.get(k, 0.0)) for k in model.schema]], dtype=np.float64)
+            p = model.predict(x)[0]
+            return {"buy": float(p[0]), "sell": float(p[1]), "hold": float(p[2])}
         except Exception:
             return {"buy": 0.0, "sell": 0.0, "hold": 1.0}
 
@@ -13,16 +13,14 @@ from typing import Any
 
 import numpy as np
 
-from services.prob_features import build_dataset
-from werkzeug.utils import secure_filename
+from services.prob_features import FEATURE_SCHEMA, FeatureDataset, build_dataset_arrays
 
-def _to_Xy(samples: list[dict[str, Any]]):
-    feats = [[s.get("ema_diff", 0.0), s.get("rsi_norm", 0.0), s.get("atr_pct", 0.0)] for s in samples]
-    labels = [s.get("label", "hold") for s in samples]
+
+def _to_Xy(ds: FeatureDataset):
     # Binary one-vs-rest for buy vs not-buy and sell vs not-sell in simple baseline
-    X = np.asarray(feats, dtype=float)
-    y_buy = np.asarray([1 if label == "buy" else 0 for label in labels], dtype=float)
-    y_sell = np.asarray([1 if label == "sell" else 0 for label in labels], dtype=float)
+    X = np.asarray(ds.X, dtype=float)
+    y_buy = (ds.labels == "buy").astype(float)
+    y_sell = (ds.labels == "sell").astype(float)
     return X, y_buy, y_sell
 
 
@@ -65,21 +63,6 @@ def train_and_export(candles: list[list[float]], horizon: int, tp: float, sl: fl
     # Security: Validate out_path to prevent path traversal
     import os
 
- alert-autofix-34
-    # Step 1: Sanitize filename and ensure no directory traversal
-    safe_root = os.path.abspath("config/models")
-    safe_filename = secure_filename(out_path)
-    if (
-        or safe_filename.startswith(".")
-        not safe_filename
-        or "/" in safe_filename
-        or "\\" in safe_filename
-        or not safe_filename.lower().endswith(".json")
-    ):
-        raise ValueError(f"Invalid output filename: {safe_filename}")
-
-    # Step 2: Construct the final output path and ensure it is within the safe directory
-
     # Step 1: Normalize and validate path to prevent directory traversal
     normalized_path = os.path.normpath(out_path)
     if os.path.isabs(normalized_path) or ".." in normalized_path.split(os.sep):
@@ -101,7 +84,6 @@ def train_and_export(candles: list[list[float]], horizon: int, tp: float, sl: fl
         raise ValueError(f"Invalid filename: {safe_filename}")
 
     # Step 3: Construct the final output path and ensure it is within the safe directory
- main
     os.makedirs(safe_root, exist_ok=True)
     target_path = os.path.join(safe_root, safe_filename)
     real_root = os.path.realpath(safe_root)
@@ -110,15 +92,11 @@ def train_and_export(candles: list[list[float]], horizon: int, tp: float, sl: fl
     if not (real_target.startswith(real_root + os.sep) or real_target == real_root):
         raise ValueError(f"Output path not within safe directory: {real_target}")
 
- alert-autofix-34
-    # Step 3: Continue training and export to the validated file
-
     # Step 4: Continue training and export to the validated file
-  main
-    samples = build_dataset(candles, horizon=horizon, tp=tp, sl=sl)
-    if not samples:
+    ds = build_dataset_arrays(candles, horizon=horizon, tp=tp, sl=sl)
+    if len(ds) == 0:
         raise ValueError("No samples built; increase history.")
-    X, y_buy, y_sell = _to_Xy(samples)
+    X, y_buy, y_sell = _to_Xy(ds)
     Xb_tr, yb_tr, Xb_va, yb_va = _split_train_val(X, y_buy)
     Xs_tr, ys_tr, Xs_va, ys_va = _split_train_val(X, y_sell)
     w_buy, b_buy = _fit_lr(Xb_tr, yb_tr)
@@ -128,7 +106,7 @@ def train_and_export(candles: list[list[float]], horizon: int, tp: float, sl: fl
     a_buy, abuy = _fit_platt(z_buy_va, yb_va) if z_buy_va.size > 5 else (1.0, 0.0)
     a_sell, asell = _fit_platt(z_sell_va, ys_va) if z_sell_va.size > 5 else (1.0, 0.0)
     model = {
-        "schema": ["ema_diff", "rsi_norm", "atr_pct"],
+        "schema": list(FEATURE_SCHEMA),
         "buy": {"w": w_buy, "b": b_buy, "calib": {"a": a_buy, "b": abuy}},
         "sell": {"w": w_sell, "b": b_sell, "calib": {"a": a_sell, "b": asell}},
         # heuristic combiner for hold: normalize at inference
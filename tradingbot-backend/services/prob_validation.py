@@ -8,42 +8,28 @@ alignment between train/infer.
 
 from __future__ import annotations
 
-import math
 from typing import Any
 
-from services.prob_features import build_dataset
-from services.prob_model import prob_model
+import numpy as np
 
-Label = str
+from services.prob_features import FEATURE_SCHEMA, build_dataset_arrays
+from services.prob_model import CLASSES, prob_model
 
 
-def _one_hot(label: Label) -> tuple[float, float, float]:
-    if label == "buy":
-        return 1.0, 0.0, 0.0
-    if label == "sell":
-        return 0.0, 1.0, 0.0
-    return 0.0, 0.0, 1.0
-
-
-def _scores_for(probs: dict[str, float], label: Label, eps: float = 1e-12) -> tuple[float, float]:
+def _scores(probs: np.ndarray, labels: np.ndarray, eps: float = 1e-12) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Return (brier, logloss) for a single sample.
+    Return per-sample (brier, logloss, p_true) for probs (n, 3) in CLASSES order.
     - Brier (multi-class): sum_k (p_k - y_k)^2
     - LogLoss: -log(p_true)
     """
-    p_buy = float(probs.get("buy", 0.0))
-    p_sell = float(probs.get("sell", 0.0))
-    p_hold = float(probs.get("hold", 0.0))
-    yb, ys, yh = _one_hot(label)
-    brier = (p_buy - yb) ** 2 + (p_sell - ys) ** 2 + (p_hold - yh) ** 2
-    if label == "buy":
-        p_true = max(p_buy, eps)
-    elif label == "sell":
-        p_true = max(p_sell, eps)
-    else:
-        p_true = max(p_hold, eps)
-    logloss = -math.log(p_true)
-    return brier, logloss
+    # Okända labels räknas som hold
+    idx = np.select([labels == "buy", labels == "sell"], [0, 1], default=2)
+    onehot = np.zeros_like(probs)
+    onehot[np.arange(idx.size), idx] = 1.0
+    brier = ((probs - onehot) ** 2).sum(axis=1)
+    p_true = probs[np.arange(idx.size), idx]
+    logloss = -np.log(np.maximum(p_true, eps))
+    return brier, logloss, p_true
 
 
 def validate_on_candles(
@@ -54,12 +40,12 @@ def validate_on_candles(
     max_samples: int | None = None,
 ) -> dict[str, Any]:
     """
-    Build dataset from candles, run model inference per sample,
-    compute metrics. Returns summary dict with overall Brier/LogLoss
-    and per-label breakdown.
+    Build dataset from candles, score all samples in one batched
+    inference call and compute metrics. Returns summary dict with
+    overall Brier/LogLoss and per-label breakdown.
     """
-    ds = build_dataset(candles, horizon=horizon, tp=tp, sl=sl)
-    if not ds:
+    ds = build_dataset_arrays(candles, horizon=horizon, tp=tp, sl=sl)
+    if len(ds) == 0:
         return {
             "samples": 0,
             "brier": None,
@@ -69,69 +55,48 @@ def validate_on_candles(
             "schema": prob_model.model_meta.get("schema"),
         }
 
+    X, labels = ds.X, ds.labels
     if isinstance(max_samples, int) and max_samples > 0:
-        ds = ds[-max_samples:]
-
-    total_brier = 0.0
-    total_logloss = 0.0
-    n = 0
-
-    by_label: dict[str, dict[str, Any]] = {
-        "buy": {"n": 0, "brier": 0.0, "logloss": 0.0, "avg_p_true": 0.0},
-        "sell": {"n": 0, "brier": 0.0, "logloss": 0.0, "avg_p_true": 0.0},
-        "hold": {"n": 0, "brier": 0.0, "logloss": 0.0, "avg_p_true": 0.0},
-    }
-
-    for row in ds:
-        feats = {
-            "ema_diff": float(row.get("ema_diff", 0.0)),
-            "rsi_norm": float(row.get("rsi_norm", 0.0)),
-            "atr_pct": float(row.get("atr_pct", 0.0)),
-        }
-        label: Label = str(row.get("label", "hold"))
-        probs = prob_model.predict_proba(feats)
-        b, ll = _scores_for(probs, label)
-        total_brier += float(b)
-        total_logloss += float(ll)
-        n += 1
+        X, labels = X[-max_samples:], labels[-max_samples:]
 
-        bucket = by_label[label]
-        bucket["n"] += 1
-        bucket["brier"] += float(b)
-        bucket["logloss"] += float(ll)
-        if label == "buy":
-            bucket["avg_p_true"] += float(probs.get("buy", 0.0))
-        elif label == "sell":
-            bucket["avg_p_true"] += float(probs.get("sell", 0.0))
-        else:
-            bucket["avg_p_true"] += float(probs.get("hold", 0.0))
+    probs = prob_model.predict_proba_batch(X, columns=FEATURE_SCHEMA)
+    brier, logloss, p_true = _scores(probs, labels)
+    n = int(labels.size)
 
-    if n == 0:
-        return {
-            "samples": 0,
-            "brier": None,
-            "logloss": None,
-            "by_label": {},
-            "source": ("model" if prob_model.enabled else "heuristic"),
-            "schema": prob_model.model_meta.get("schema"),
-        }
-
-    # finalize averages
+    # per-label averages
     summary_by_label: dict[str, dict[str, Any]] = {}
-    for k, v in by_label.items():
-        if v["n"] > 0:
+    for k in CLASSES:
+        mask = labels == k
+        count = int(mask.sum())
+        if count > 0:
             summary_by_label[k] = {
-                "n": v["n"],
-                "brier": v["brier"] / v["n"],
-                "logloss": v["logloss"] / v["n"],
-                "avg_p_true": v["avg_p_true"] / v["n"],
+                "n": count,
+                "brier": float(brier[mask].mean()),
+                "logloss": float(logloss[mask].mean()),
+                "avg_p_true": float(p_true[mask].mean()),
             }
 
     return {
         "samples": n,
-        "brier": total_brier / n,
-        "logloss": total_logloss / n,
+        "brier": float(brier.mean()),
+        "logloss": float(logloss.mean()),
         "by_label": summary_by_label,
         "source": ("model" if prob_model.enabled else "heuristic"),
         "schema": prob_model.model_meta.get("schema"),
     }
+
+
+def validation_job(
+    candles: list[list[float]],
+    horizon: int,
+    tp: float,
+    sl: float,
+    max_samples: int | None,
+    model_state: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Compute-worker entry point: validate against the caller's model state
+    (prob_model.export_state()) instead of whatever the worker process loaded.
+    """
+    prob_model.load_state(model_state)
+    return validate_on_candles(candles, horizon=horizon, tp=tp, sl=sl, max_samples=max_samples)
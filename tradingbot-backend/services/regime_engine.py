@@ -0,0 +1,215 @@
+"""
+Regime Engine - strömmande regimdetektering per symbol/timeframe.
+
+Håller ADX- och EMA-slope-z-state (services.incremental_indicators) per
+(symbol, timeframe) och uppdaterar i O(1) när en candle stängs på WS
+candles-kanalen. Läsning av aktuell regim är en dict-lookup; full
+omräkning sker bara vid kallstart (seed från REST/cache) eller resync
+(ny WS-snapshot, gammal state).
+
+En bar räknas som stängd när en uppdatering med nyare mts kommer in.
+Pågående bar påverkar inte ADX/ema_z men dess close rapporteras som
+`last_close`.
+
+`result_for_candles` är batchvägen för anropare med egen candle-lista
+(REST-endpoints, auto-tradern): en RegimeResult memoiseras per
+(symbol, timeframe, senaste mts, cfg) så samtidiga paneler delar en
+beräkning.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any
+
+from indicators.regime import RegimeResult, classify_regime, compute_regime, regime_thresholds
+from services.incremental_indicators import ADXState, EMAZState
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Samma defaults som UnifiedSignalService använde för detect_regime
+DEFAULT_REGIME_CFG: dict[str, Any] = {
+    "ADX_PERIOD": 14,
+    "ADX_HIGH": 30.0,
+    "ADX_LOW": 15.0,
+    "EMA_FAST": 3,
+    "EMA_SLOW": 7,
+    "Z_WIN": 200,
+    "SLOPE_Z_HIGH": 1.0,
+    "SLOPE_Z_LOW": 0.5,
+}
+
+
+@dataclass
+class _RegimeSlot:
+    adx: ADXState
+    ez: EMAZState
+    last_closed_mts: int | None = None
+    pending: list | None = None
+    bars: int = 0
+    adx_value: float | None = None
+    ema_z_value: float | None = None
+    snapshot: RegimeResult | None = None
+    updated_at: float = 0.0
+
+
+def _valid_rows(candles: Any) -> list:
+    if not isinstance(candles, list):
+        return []
+    rows = [r for r in candles if isinstance(r, (list, tuple)) and len(r) >= 5]
+    rows.sort(key=lambda r: r[0])  # REST/cache/WS-snapshot kommer nyast först
+    return rows
+
+
+class RegimeEngine:
+    """Strömmande regimmotor; en slot per (symbol, timeframe)."""
+
+    def __init__(self, cfg: dict[str, Any] | None = None, memo_size: int = 256) -> None:
+        self.cfg: dict[str, Any] = {**DEFAULT_REGIME_CFG, **(cfg or {})}
+        self._slots: dict[tuple[str, str], _RegimeSlot] = {}
+        self._memo: OrderedDict[tuple, RegimeResult] = OrderedDict()
+        self.memo_size = max(1, int(memo_size))
+        self.stats: dict[str, int] = {
+            "seeds": 0,
+            "closed_bars": 0,
+            "bar_updates": 0,
+            "lookups": 0,
+            "misses": 0,
+            "memo_hits": 0,
+            "memo_misses": 0,
+        }
+
+    @property
+    def warmup_bars(self) -> int:
+        """Antal barer som behövs för full ADX + fullt z-fönster."""
+        return int(self.cfg["Z_WIN"]) + 2 * int(self.cfg["ADX_PERIOD"])
+
+    def _new_slot(self) -> _RegimeSlot:
+        return _RegimeSlot(
+            adx=ADXState(period=int(self.cfg["ADX_PERIOD"])),
+            ez=EMAZState(
+                fast=int(self.cfg["EMA_FAST"]),
+                slow=int(self.cfg["EMA_SLOW"]),
+                z_win=int(self.cfg["Z_WIN"]),
+            ),
+        )
+
+    def _close_bar(self, slot: _RegimeSlot, row: list | tuple) -> None:
+        h, lo, c = float(row[3]), float(row[4]), float(row[2])
+        slot.adx_value = slot.adx.update(h, lo, c)
+        slot.ema_z_value = slot.ez.update(c)
+        slot.last_closed_mts = int(row[0])
+        slot.bars += 1
+
+    def _publish(self, slot: _RegimeSlot) -> RegimeResult:
+        last = slot.pending
+        slot.updated_at = time.time()
+        slot.snapshot = RegimeResult(
+            regime=classify_regime(slot.adx_value, slot.ema_z_value, self.cfg),
+            adx_value=slot.adx_value,
+            ema_z_value=slot.ema_z_value,
+            thresholds=regime_thresholds(self.cfg),
+            last_close=float(last[2]) if last is not None else None,
+            last_mts=int(last[0]) if last is not None else slot.last_closed_mts,
+            bars=slot.bars,
+        )
+        return slot.snapshot
+
+    def seed(self, symbol: str, timeframe: str, candles: list) -> RegimeResult | None:
+        """Full omräkning från historik (kallstart/resync). Sista baren räknas som pågående."""
+        rows = _valid_rows(candles)
+        if len(rows) < 2:
+            return None
+        slot = self._new_slot()
+        for row in rows[:-1]:
+            self._close_bar(slot, row)
+        slot.pending = list(rows[-1])
+        self._slots[(symbol, timeframe)] = slot
+        self.stats["seeds"] += 1
+        return self._publish(slot)
+
+    def on_candles(self, symbol: str, timeframe: str, message_data: Any) -> RegimeResult | None:
+        """
+        Mata in ett WS candles-meddelande (snapshot eller enstaka bar).
+
+        Snapshot => resync. Enstaka bar utan tidigare seed ignoreras
+        (kallstart sker via `seed`).
+        """
+        if isinstance(message_data, list) and message_data and isinstance(message_data[0], (list, tuple)):
+            return self.seed(symbol, timeframe, message_data)
+        if not (isinstance(message_data, (list, tuple)) and len(message_data) >= 5):
+            return None
+        slot = self._slots.get((symbol, timeframe))
+        if slot is None:
+            return None
+        mts = int(message_data[0])
+        pending = slot.pending
+        if pending is not None and mts < int(pending[0]):
+            return slot.snapshot
+        if pending is not None and mts > int(pending[0]):
+            # Ny bar => föregående pågående bar är stängd
+            self._close_bar(slot, pending)
+            self.stats["closed_bars"] += 1
+        slot.pending = list(message_data)
+        self.stats["bar_updates"] += 1
+        return self._publish(slot)
+
+    def get(self, symbol: str, timeframe: str, max_age_s: float | None = None) -> RegimeResult | None:
+        """Aktuell regim-snapshot (dict-lookup) eller None vid saknad/för gammal state."""
+        slot = self._slots.get((symbol, timeframe))
+        if slot is None or (max_age_s is not None and time.time() - slot.updated_at > max_age_s):
+            self.stats["misses"] += 1
+            return None
+        self.stats["lookups"] += 1
+        return slot.snapshot
+
+    def result_for_candles(
+        self, symbol: str, timeframe: str, candles: list, cfg: dict[str, Any] | None = None
+    ) -> RegimeResult | None:
+        """
+        Batch-RegimeResult för en candle-lista, memoiserad per
+        (symbol, timeframe, senaste mts/close, cfg). Pågående bar ingår, som i
+        detect_regime. None om historiken är för kort (< 20 barer).
+        """
+        rows = _valid_rows(candles)
+        if len(rows) < 20:
+            return None
+        merged = {**self.cfg, **(cfg or {})}
+        last = rows[-1]
+        # Pågående bar uppdateras under sin mts – close ingår så att nyckeln följer den
+        key = (symbol, timeframe, int(last[0]), float(last[2]), len(rows), tuple(sorted(merged.items())))
+        hit = self._memo.get(key)
+        if hit is not None:
+            self._memo.move_to_end(key)
+            self.stats["memo_hits"] += 1
+            return hit
+        self.stats["memo_misses"] += 1
+        highs = [float(r[3]) for r in rows]
+        lows = [float(r[4]) for r in rows]
+        closes = [float(r[2]) for r in rows]
+        res = replace(compute_regime(highs, lows, closes, merged), last_mts=int(last[0]))
+        self._memo[key] = res
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return res
+
+    def invalidate(self, symbol: str | None = None, timeframe: str | None = None) -> None:
+        """Släpp state så att nästa läsning gör full omräkning."""
+        if symbol is None:
+            self._slots.clear()
+            self._memo.clear()
+            return
+        for key in [k for k in self._memo if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+            self._memo.pop(key, None)
+        for key in [k for k in self._slots if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+            self._slots.pop(key, None)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {**self.stats, "tracked": len(self._slots), "memoized": len(self._memo)}
+
+
+# Global instans
+regime_engine = RegimeEngine()
@@ -6,6 +6,7 @@ beroenden. Fokus är stabilitet vid utveckling och enkelhet i drift.
 
 Nuvarande jobb:
 - Equity-snapshot (dagligen, idempotent) via PerformanceService
+- Lågfrekvent REST-reconcile av WS-speglat kontoläge (drift-reparation)
 """
 
 from __future__ import annotations
@@ -15,7 +16,7 @@ import re
 from datetime import UTC, datetime, timedelta
 
 from config.settings import settings
-from utils.candle_cache import candle_cache
+from utils.candle_cache import async_candle_cache
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -40,6 +41,7 @@ class SchedulerService:
         self._last_prob_validate_at: datetime | None = None
         self._last_prob_retrain_at: datetime | None = None
         self._last_regime_update_at: datetime | None = None
+        self._last_account_reconcile_at: datetime | None = None
 
     def start(self) -> None:
         """Starta bakgrundsloopen om den inte redan körs."""
@@ -110,6 +112,8 @@ class SchedulerService:
                 await self._maybe_run_prob_retraining(now)
                 # Kör automatisk regim-uppdatering
                 await self._maybe_update_regime(now)
+                # Reconcile kontoläget mot REST (endast när WS-spegeln är live)
+                await self._maybe_reconcile_account_state(now)
 
                 # Cleanup: Rensa completed tasks var 10:e minut
                 if (
@@ -184,7 +188,7 @@ class SchedulerService:
             max_rows = int(getattr(s, "CANDLE_CACHE_MAX_ROWS_PER_PAIR", 0) or 0)
             if days <= 0 and max_rows <= 0:
                 return
-            removed = candle_cache.enforce_retention(days, max_rows)
+            removed = await async_candle_cache.enforce_retention(days, max_rows)
             self._last_retention_at = now
             if removed:
                 logger.info(f"🧹 Candle-cache retention: tog bort {removed} rader")
@@ -196,11 +200,14 @@ class SchedulerService:
 
         Läser symboler/timeframe och intervall från Settings.
         Uppdaterar metrics_store med senaste värden per symbol/tf samt aggregat.
+        Själva valideringen körs i compute-workern (separat process).
         """
         try:
+            from services.compute_worker import get_compute_worker
             from services.market_data_facade import get_market_data
             from services.metrics import metrics_store
-            from services.prob_validation import validate_on_candles
+            from services.prob_model import prob_model
+            from services.prob_validation import validation_job
 
             s = settings
             if not bool(getattr(s, "PROB_VALIDATE_ENABLED", True)):
@@ -224,6 +231,8 @@ class SchedulerService:
             max_samples = int(getattr(s, "PROB_VALIDATE_MAX_SAMPLES", 500) or 500)
 
             data = get_market_data()
+            worker = get_compute_worker()
+            model_state = prob_model.export_state()
             agg_brier_vals: list[float] = []
             agg_logloss_vals: list[float] = []
             for sym in symbols:
@@ -231,12 +240,16 @@ class SchedulerService:
                     candles = await data.get_candles(sym, tf, limit)
                     if not candles:
                         continue
-                    res = validate_on_candles(
+                    # CPU-tungt: körs i compute-workern så att loopen förblir responsiv
+                    res = await worker.run(
+                        "prob_validation",
+                        validation_job,
                         candles,
-                        horizon=int(getattr(s, "PROB_MODEL_TIME_HORIZON", 20) or 20),
-                        tp=float(getattr(s, "PROB_MODEL_EV_THRESHOLD", 0.0005) or 0.0005),
-                        sl=float(getattr(s, "PROB_MODEL_EV_THRESHOLD", 0.0005) or 0.0005),
-                        max_samples=max_samples,
+                        int(getattr(s, "PROB_MODEL_TIME_HORIZON", 20) or 20),
+                        float(getattr(s, "PROB_MODEL_EV_THRESHOLD", 0.0005) or 0.0005),
+                        float(getattr(s, "PROB_MODEL_EV_THRESHOLD", 0.0005) or 0.0005),
+                        max_samples,
+                        model_state,
                     )
                     key = f"{sym}|{tf}"
                     pv = metrics_store.setdefault("prob_validation", {})
@@ -301,10 +314,12 @@ class SchedulerService:
 
         Enkel baseline: tränar per symbol/tf från REST candles och
         skriver JSON till models-katalog. Därefter reload i runtime.
+        Träningen körs i compute-workern (separat process).
         """
         try:
             import os
 
+            from services.compute_worker import get_compute_worker
             from services.market_data_facade import get_market_data
             from services.metrics import metrics_store
             from services.prob_model import prob_model
@@ -332,6 +347,7 @@ class SchedulerService:
             os.makedirs(out_dir, exist_ok=True)
 
             data = get_market_data()
+            worker = get_compute_worker()
             from services.symbols import SymbolService
 
             sym_svc = SymbolService()
@@ -355,7 +371,9 @@ class SchedulerService:
                         pass
                     fname = f"{clean}_{tf}.json"
                     out_path = os.path.join(out_dir, fname)
-                    train_and_export(candles, horizon=horizon, tp=tp, sl=sl, out_path=out_path)
+                    await worker.run(
+                        "prob_retrain", train_and_export, candles, horizon=horizon, tp=tp, sl=sl, out_path=out_path
+                    )
                     metrics_store.setdefault("prob_retrain", {})["events"] = (
                         int(metrics_store.get("prob_retrain", {}).get("events", 0)) + 1
                     )
@@ -395,6 +413,41 @@ class SchedulerService:
         except Exception as e:
             logger.debug(f"Automatisk regim-uppdatering fel: {e}")
 
+    async def _maybe_reconcile_account_state(self, now: datetime) -> None:
+        """
+        Jämför WS-speglat kontoläge (wallets/positioner/ordrar) mot REST.
+
+        Körs bara när kontoläget är live – annars läser tjänsterna ändå från
+        REST. Skillnader loggas och repareras i account_state.reconcile.
+        """
+        try:
+            from services.account_state import account_state
+
+            interval = int(getattr(settings, "ACCOUNT_RECONCILE_INTERVAL_SECONDS", 300) or 0)
+            if interval <= 0 or not account_state.live:
+                return
+            if self._last_account_reconcile_at and (now - self._last_account_reconcile_at) < timedelta(
+                seconds=max(30, interval)
+            ):
+                return
+            self._last_account_reconcile_at = now
+
+            from rest.active_orders import active_orders_service
+            from rest.positions import positions_service
+            from rest.wallet import wallet_service
+
+            await wallet_service.get_wallets(force_rest=True)
+            await positions_service.get_positions(force_rest=True)
+            await active_orders_service.get_active_orders(force_rest=True)
+            st = account_state.get_stats()
+            logger.debug(
+                "Account state reconcile: drift_repairs=%s skipped=%s",
+                st.get("drift_repairs"),
+                st.get("reconcile_skipped"),
+            )
+        except Exception as e:
+            logger.debug(f"Account state reconcile fel: {e}")
+
 
 # En global instans som kan återanvändas av applikationen
 scheduler = SchedulerService()
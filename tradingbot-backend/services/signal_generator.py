@@ -267,12 +267,14 @@ class SignalGeneratorService:
     async def _get_regime_data(self, symbol: str) -> dict | None:
         """Hämta regime data för symbol"""
         try:
-            # Använd befintlig regime endpoint
+            # Använd befintlig regime endpoint (RegimeResult memoiseras per senaste candle)
             from rest.routes import get_strategy_regime
 
             regime_data = await get_strategy_regime(symbol, None)
 
             if regime_data and "regime" in regime_data:
+                # Kopia – endpointens svar är delat via dess cache
+                regime_data = dict(regime_data)
                 # Använd SignalService.score() för enhetlig confidence/probability
                 sc = self.signal_service.score(
                     regime=regime_data.get("regime"),
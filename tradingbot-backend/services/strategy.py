@@ -66,9 +66,9 @@ def evaluate_weighted_strategy(data: dict[str, str]) -> dict[str, Any]:
         weights = {"ema": 0.5, "rsi": 0.5, "atr": 0.0}
     else:
         try:
-            from services.strategy_settings import StrategySettingsService
+            from services.strategy_settings import get_strategy_settings_service
 
-            settings_service = StrategySettingsService()
+            settings_service = get_strategy_settings_service()
             # Om callern har skickat med symbol i data kan vi läsa overrides
             sym = data.get("symbol") if isinstance(data, dict) else None
             s = settings_service.get_settings(symbol=sym)
@@ -148,11 +148,11 @@ def evaluate_strategy(data: dict[str, list[float]]) -> dict[str, Any]:
         rsi_snap = data.get("rsi_snapshot") if isinstance(data, dict) else None
         atr_snap = data.get("atr_snapshot") if isinstance(data, dict) else None
 
-        from services.strategy_settings import StrategySettingsService
+        from services.strategy_settings import get_strategy_settings_service
 
         sym_raw = data.get("symbol") if isinstance(data, dict) else None
         sym = sym_raw if isinstance(sym_raw, str) else None
-        ssvc = StrategySettingsService()
+        ssvc = get_strategy_settings_service()
         s = ssvc.get_settings(symbol=sym)
 
         if isinstance(ema_snap, (int, float)):
@@ -234,17 +234,9 @@ def evaluate_strategy(data: dict[str, list[float]]) -> dict[str, Any]:
                         "SLOPE_Z_HIGH": 1.0,
                         "SLOPE_Z_LOW": 0.3,
                     }
-                    # Försök läsa extra fält från settings-filen om de finns
+                    # Försök läsa extra fält från settings-snapshoten om de finns
                     try:
-                        import json
-
-                        cfg_path = os.path.join(
-                            os.path.dirname(os.path.dirname(__file__)),
-                            "config",
-                            "strategy_settings.json",
-                        )
-                        with open(cfg_path, encoding="utf-8") as f:
-                            raw = json.load(f)
+                        raw = ssvc.get_raw()
                         for k in cfg.keys():
                             if k in raw:
                                 cfg[k] = raw[k]
@@ -336,24 +328,16 @@ def update_settings_from_regime(symbol: str | None = None) -> dict[str, float]:
         from indicators.regime import detect_regime
 
         # get_market_data importeras modulärt; undvik lokal reimport som orsakar F811
-        from services.strategy_settings import StrategySettingsService
+        from services.strategy_settings import get_strategy_settings_service
         from strategy.weights import PRESETS
 
         # Läs aktuella settings och auto-flaggor
-        settings_service = StrategySettingsService()
+        settings_service = get_strategy_settings_service()
         current_settings = settings_service.get_settings(symbol=symbol)
 
-        # Läs auto-flaggor från strategy_settings.json
+        # Läs auto-flaggor från strategy_settings.json (via snapshot)
         try:
-            import json
-
-            cfg_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)),
-                "config",
-                "strategy_settings.json",
-            )
-            with open(cfg_path, encoding="utf-8") as f:
-                raw = json.load(f)
+            raw = settings_service.get_raw()
             auto_regime = bool(raw.get("AUTO_REGIME_ENABLED", True))
             auto_weights = bool(raw.get("AUTO_WEIGHTS_ENABLED", True))
         except Exception:
@@ -469,6 +453,7 @@ def update_settings_from_regime(symbol: str | None = None) -> dict[str, float]:
 
             with open(cfg_path, "w", encoding="utf-8") as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+            settings_service.reload()
 
         except Exception as e:
             logger.warning(f"Kunde inte uppdatera strategy_settings.json: {e}")
@@ -507,23 +492,15 @@ def update_settings_from_regime_batch(
         from indicators.regime import detect_regime
 
         # get_market_data importeras modulärt; undvik lokal reimport som orsakar F811
-        from services.strategy_settings import StrategySettingsService
+        from services.strategy_settings import get_strategy_settings_service
         from strategy.weights import PRESETS, clamp_simplex
 
         # Läs aktuella settings och auto-flaggor
-        settings_service = StrategySettingsService()
+        settings_service = get_strategy_settings_service()
 
-        # Läs auto-flaggor från strategy_settings.json
+        # Läs auto-flaggor från strategy_settings.json (via snapshot)
         try:
-            import json
-
-            cfg_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)),
-                "config",
-                "strategy_settings.json",
-            )
-            with open(cfg_path, encoding="utf-8") as f:
-                raw = json.load(f)
+            raw = settings_service.get_raw()
             auto_regime = bool(raw.get("AUTO_REGIME_ENABLED", True))
             auto_weights = bool(raw.get("AUTO_WEIGHTS_ENABLED", True))
         except Exception:
@@ -2,13 +2,21 @@
 Strategy Settings Service - Hanterar indikatorparametrar och vikter för strategier.
 
 Persistens sker i `config/strategy_settings.json` för enkel justering via API.
+
+Filerna läses in i en processgemensam snapshot som invalideras när
+mtime/storlek ändras (kontrolleras högst en gång per `_STAT_INTERVAL_S`)
+eller explicit via `reload_strategy_settings()`. Upplösta settings per
+symbol memoiseras i snapshoten, så heta vägar (evaluate_strategy,
+backtests) inte öppnar filer per anrop.
 """
 
 from __future__ import annotations
 
 import json
 import os
-from dataclasses import asdict, dataclass
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
 from typing import Any
 
 from config.settings import settings, Settings
@@ -55,29 +63,135 @@ class StrategySettings:
         )
 
 
-class StrategySettingsService:
-    def __init__(self, settings_override: Settings | None = None):
-        self.settings = settings_override or settings
-        # Bygg absolut sökväg till config-katalogen relativt projektroten
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        cfg_dir = os.path.join(base_dir, "config")
-        os.makedirs(cfg_dir, exist_ok=True)
-        self.file_path = os.path.join(cfg_dir, "strategy_settings.json")
-        self.overrides_path = os.path.join(cfg_dir, "strategy_settings.overrides.json")
+# Bygg absolut sökväg till config-katalogen relativt projektroten
+_CFG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config")
+os.makedirs(_CFG_DIR, exist_ok=True)
 
-    def _load_overrides(self) -> dict[str, dict[str, Any]]:
+# Hur ofta filernas mtime kontrolleras (sekunder); skrivningar via servicen laddar om direkt
+_STAT_INTERVAL_S = 1.0
+
+
+def _file_sig(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+class _SettingsSnapshot:
+    """Processgemensam cache av strategy_settings(.overrides).json."""
+
+    def __init__(self, file_path: str, overrides_path: str) -> None:
+        self.file_path = file_path
+        self.overrides_path = overrides_path
+        self._lock = threading.RLock()
+        self._sig: tuple | None = None
+        self._checked_at = 0.0
+        self.raw: dict[str, Any] | None = None  # None => filen saknas
+        self.overrides: dict[str, dict[str, Any]] = {}
+        self._resolved: dict[str | None, StrategySettings] = {}
+        self.stats = {"loads": 0, "hits": 0, "stat_checks": 0}
+
+    def _read_json(self, path: str, what: str) -> dict | None:
         try:
-            with open(self.overrides_path, encoding="utf-8") as f:
+            with open(path, encoding="utf-8") as f:
                 data = json.load(f)
-                if isinstance(data, dict):
-                    return data
-                return {}
+            return data if isinstance(data, dict) else {}
         except FileNotFoundError:
-            return {}
+            return None
         except Exception as e:
-            logger.warning(f"Kunde inte läsa overrides för strategiinställningar: {e}")
+            logger.warning(f"Kunde inte läsa {what}: {e}")
             return {}
 
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._sig is not None and now - self._checked_at < _STAT_INTERVAL_S:
+                return
+            self._checked_at = now
+            self.stats["stat_checks"] += 1
+            sig = (_file_sig(self.file_path), _file_sig(self.overrides_path))
+            if not force and sig == self._sig:
+                return
+            self.raw = self._read_json(self.file_path, "strategiinställningar")
+            self.overrides = self._read_json(self.overrides_path, "overrides för strategiinställningar") or {}
+            self._resolved.clear()
+            self._sig = sig
+            self.stats["loads"] += 1
+
+    def resolve(self, symbol: str | None) -> StrategySettings | None:
+        """Upplösta (normaliserade) settings för symbol; None om basfilen saknas."""
+        with self._lock:
+            self.refresh()
+            if self.raw is None:
+                return None
+            hit = self._resolved.get(symbol)
+            if hit is not None:
+                self.stats["hits"] += 1
+                return hit
+            base = StrategySettings.from_dict(self.raw)
+            resolved = base.normalized()
+            # Applicera per-symbol override om angiven symbol
+            if symbol:
+                try:
+                    ov = self.overrides.get(symbol)
+                    if isinstance(ov, dict):
+                        merged = base.to_dict()
+                        for k, v in ov.items():
+                            if v is not None and k in merged:
+                                merged[k] = v
+                        resolved = StrategySettings.from_dict(merged).normalized()
+                except Exception as e:
+                    logger.warning(f"Kunde inte applicera symboloverride för {symbol}: {e}")
+            self._resolved[symbol] = resolved
+            return resolved
+
+
+_snapshots: dict[tuple[str, str], _SettingsSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _get_snapshot(file_path: str, overrides_path: str) -> _SettingsSnapshot:
+    key = (file_path, overrides_path)
+    snap = _snapshots.get(key)
+    if snap is None:
+        with _snapshots_lock:
+            snap = _snapshots.setdefault(key, _SettingsSnapshot(file_path, overrides_path))
+    return snap
+
+
+def reload_strategy_settings() -> None:
+    """Explicit reload-hook: läs om alla settings-filer och töm memoiserade värden."""
+    for snap in list(_snapshots.values()):
+        snap.refresh(force=True)
+
+
+class StrategySettingsService:
+    def __init__(self, settings_override: Settings | None = None):
+        self.settings = settings_override or settings
+        self.file_path = os.path.join(_CFG_DIR, "strategy_settings.json")
+        self.overrides_path = os.path.join(_CFG_DIR, "strategy_settings.overrides.json")
+
+    @property
+    def _snapshot(self) -> _SettingsSnapshot:
+        # Slås upp per anrop så att ändrade sökvägar (t.ex. i tester) respekteras
+        return _get_snapshot(self.file_path, self.overrides_path)
+
+    def reload(self) -> None:
+        self._snapshot.refresh(force=True)
+
+    def get_raw(self) -> dict[str, Any]:
+        """Kopia av basfilens innehåll (inkl. AUTO_*-flaggor och regimtrösklar)."""
+        snap = self._snapshot
+        snap.refresh()
+        return dict(snap.raw or {})
+
+    def _load_overrides(self) -> dict[str, dict[str, Any]]:
+        snap = self._snapshot
+        snap.refresh()
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in snap.overrides.items()}
+
     def _save_overrides(self, overrides: dict[str, dict[str, Any]]) -> None:
         try:
             os.makedirs(os.path.dirname(self.overrides_path), exist_ok=True)
@@ -88,32 +202,17 @@ class StrategySettingsService:
             raise
 
     def get_settings(self, symbol: str | None = None) -> StrategySettings:
-        try:
-            with open(self.file_path, encoding="utf-8") as f:
-                data = json.load(f)
-                base = StrategySettings.from_dict(data)
-        except FileNotFoundError:
+        resolved = self._snapshot.resolve(symbol)
+        if resolved is None:
             logger.info("Inga strategiinställningar hittades – använder default och skapar fil.")
             base = StrategySettings()
-            self.save_settings(base)
-        except Exception as e:
-            logger.warning(f"Kunde inte läsa strategiinställningar: {e}")
-            base = StrategySettings()
-
-        # Applicera per-symbol override om angiven symbol
-        if symbol:
             try:
-                overrides = self._load_overrides()
-                ov = overrides.get(symbol)
-                if isinstance(ov, dict):
-                    merged = base.to_dict()
-                    for k, v in ov.items():
-                        if v is not None and k in merged:
-                            merged[k] = v
-                    return StrategySettings.from_dict(merged).normalized()
-            except Exception as e:
-                logger.warning(f"Kunde inte applicera symboloverride för {symbol}: {e}")
-        return base.normalized()
+                self.save_settings(base)
+            except Exception:
+                return base.normalized()
+            resolved = self._snapshot.resolve(symbol) or base.normalized()
+        # Kopia så att anropare inte kan ändra den memoiserade instansen
+        return replace(resolved)
 
     def save_settings(self, settings_obj: StrategySettings, symbol: str | None = None) -> StrategySettings:
         try:
@@ -128,7 +227,19 @@ class StrategySettingsService:
                 os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
                 with open(self.file_path, "w", encoding="utf-8") as f:
                     json.dump(normalized.to_dict(), f, ensure_ascii=False, indent=2)
+            self.reload()
             return normalized
         except Exception as e:
             logger.error(f"Kunde inte spara strategiinställningar: {e}")
             raise
+
+
+_service: StrategySettingsService | None = None
+
+
+def get_strategy_settings_service() -> StrategySettingsService:
+    """Processgemensam StrategySettingsService (läser via delad snapshot)."""
+    global _service
+    if _service is None:
+        _service = StrategySettingsService()
+    return _service
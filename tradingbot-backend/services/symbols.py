@@ -6,6 +6,9 @@ Ansvar:
 - Hämta och cacha currency-alias (pub:map:currency:sym), ex. ALGO->ALG
 - Mappa TEST-symboler till giltiga Bitfinex v2-symboler (tPAIR)
 - Verifiera om ett effektivt par är listat
+
+Allt delas via `symbol_registry` (mängd-/dict-index som byggs om atomärt
+vid refresh). `SymbolService` finns kvar som fasad för befintliga anropare.
 """
 
 from __future__ import annotations
@@ -13,20 +16,17 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+from typing import Any
 
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-# Delad cache över alla instanser för att undvika upprepade REST‑anrop vid startup
-_CACHE: dict = {
-    "pairs": [],
-    "alias_fwd": {},
-    "alias_rev": {},
-    "ts": 0.0,
-    "ttl": 14400.0,  # Öka från 2 timmar till 4 timmar för bättre prestanda
-}
+# TTL för parlistor/alias (4 timmar)
+_TTL_SECONDS = 14400.0
+# Tak för memoiserade resolve-resultat utöver de förberäknade (okända/ogiltiga symboler)
+_MEMO_MAX = 4096
 # Skapa lock per event loop dynamiskt (undvik loop-bundet module-level lock)
 _REFRESH_LOCKS: dict[int, asyncio.Lock] = {}
 
@@ -44,18 +44,211 @@ def _get_refresh_lock() -> asyncio.Lock:
     return lock
 
 
+def _split_symbol(t_symbol: str) -> tuple[str, str]:
+    """Ta 'tBTCUSD' eller 'tTESTADA:TESTUSD' → (BASE, QUOTE) utan prefix."""
+    s = t_symbol
+    if s.startswith("t"):
+        s = s[1:]
+    if ":" in s:
+        base, quote = s.split(":", 1)
+    else:
+        base, quote = s[:-3], s[-3:]
+    return base.upper(), quote.upper()
+
+
+class _SymbolIndex:
+    """Oföränderlig ögonblicksbild: parmängd, alias och resolve-tabell."""
+
+    __slots__ = ("alias_fwd", "alias_rev", "pair_set", "pairs", "resolved", "ts")
+
+    def __init__(self, pairs: list[str], alias_fwd: dict[str, str], alias_rev: dict[str, str], ts: float) -> None:
+        self.pairs = pairs
+        self.pair_set = frozenset(pairs)
+        self.alias_fwd = alias_fwd
+        self.alias_rev = alias_rev
+        self.ts = ts
+        self.resolved: dict[str, str] = {}
+        # Förberäkna listade par samt deras alias-/USD-varianter (tALGOUSD -> tALGUSD, tXUSD -> tXUST)
+        for pair in pairs:
+            base, quote = _split_symbol(f"t{pair}")
+            raw_bases = {base, alias_rev.get(base, base)}
+            raw_quotes = {quote, "USD"} if quote == "UST" else {quote}
+            for b in raw_bases:
+                for q in raw_quotes:
+                    sym = f"t{b}{q}" if ":" not in pair else f"t{b}:{q}"
+                    self.resolved[sym] = self.compute(sym)
+
+    def listed_pair(self, pair: str) -> bool:
+        # Offline/CI-fallback: om vi saknar live-parlista, tillåt alla
+        return not self.pair_set or pair in self.pair_set
+
+    def compute(self, t_symbol: str) -> str:
+        """Regler: TEST->live, alias (ALGO->ALG), USD->UST fallback."""
+        s = (t_symbol or "").strip()
+        if not s:
+            return t_symbol
+        base, quote = _split_symbol(s)
+        # tTEST<ASSET>:TESTUSD -> <ASSET>USD
+        if base.startswith("TEST") and quote == "TESTUSD":
+            base = base[4:]
+            quote = "USD"
+        # tTEST<ASSET>:TESTUSDT -> <ASSET>UST
+        if base.startswith("TEST") and quote == "TESTUSDT":
+            base = base[4:]
+            quote = "UST"
+        base = self.alias_fwd.get(base, base)
+        candidates = [f"{base}{quote}"]
+        if quote == "USD":
+            candidates.append(f"{base}UST")
+        # Välj första listade
+        for cand in candidates:
+            if self.listed_pair(cand):
+                return f"t{cand}"
+        # Fallback till ursprunglig utan ändring
+        return f"t{base}{quote}"
+
+
+class SymbolRegistry:
+    """
+    Processglobal symbolregistry.
+
+    Listning är en mängdlookup och resolve en dict-lookup i en tabell som
+    byggs om vid refresh och byts ut atomärt (en referenstilldelning), så
+    läsare aldrig ser en halvbyggd tabell. När cachen är varm behöver
+    anropare inte await:a något: `if not symbol_registry.is_warm(): await
+    symbol_registry.refresh()` följt av synkrona `resolve`/`listed`.
+    """
+
+    def __init__(self, ttl_seconds: float = _TTL_SECONDS) -> None:
+        self.ttl_seconds = float(ttl_seconds)
+        self._index = _SymbolIndex([], {}, {}, 0.0)
+        self.stats = {"refreshes": 0, "memo_hits": 0, "memo_misses": 0}
+
+    @property
+    def index(self) -> _SymbolIndex:
+        return self._index
+
+    def is_warm(self) -> bool:
+        import time as _t
+
+        return (_t.time() - self._index.ts) <= self.ttl_seconds
+
+    async def refresh(self, force: bool = False) -> None:
+        """Hämta parlistor + alias om TTL löpt ut och bygg nytt index."""
+        try:
+            if not force and self.is_warm():
+                return
+            async with _get_refresh_lock():
+                # Double‑check under lås
+                if not force and self.is_warm():
+                    return
+                import time as _t
+
+                # Hämta från MarketDataFacade (WS-first med REST-proxy)
+                from services.market_data_facade import get_market_data
+
+                svc = get_market_data()
+                pairs = await svc.get_configs_symbols() or []
+                fwd, rev = await svc.get_currency_symbol_map()
+                self.load(
+                    list(pairs) if pairs else self._index.pairs,
+                    {k.upper(): v.upper() for k, v in fwd.items()},
+                    {k.upper(): v.upper() for k, v in rev.items()},
+                    ts=_t.time(),
+                )
+                logger.info(
+                    "SymbolRegistry refresh: pairs=%s aliases=%s resolve_table=%s",
+                    len(self._index.pairs),
+                    len(self._index.alias_fwd),
+                    len(self._index.resolved),
+                )
+        except Exception as e:
+            logger.warning("SymbolService refresh misslyckades: %s", e)
+
+    def load(
+        self, pairs: list[str], alias_fwd: dict[str, str], alias_rev: dict[str, str], ts: float | None = None
+    ) -> None:
+        """Bygg ett nytt index och byt ut det atomärt."""
+        import time as _t
+
+        self._index = _SymbolIndex(list(pairs), dict(alias_fwd), dict(alias_rev), _t.time() if ts is None else ts)
+        self.stats["refreshes"] += 1
+
+    def resolve(self, t_symbol: str) -> str:
+        """
+        Mappa inkommande symbol (t.ex. 'tTESTBTC:TESTUSDT'/'tALGOUSD') till giltig Bitfinex-v2 'tPAIR'.
+        Regler: TEST->live, alias (ALGO->ALG), USD->UST fallback.
+        """
+        idx = self._index
+        try:
+            hit = idx.resolved.get(t_symbol)
+            if hit is not None:
+                self.stats["memo_hits"] += 1
+                return hit
+            self.stats["memo_misses"] += 1
+            out = idx.compute(t_symbol)
+            if len(idx.resolved) < len(idx.pairs) * 4 + _MEMO_MAX:
+                idx.resolved[t_symbol] = out
+            return out
+        except Exception:
+            return t_symbol
+
+    def resolve_many(self, symbols: list[str]) -> dict[str, str]:
+        """Resolve en batch: {inkommande: effektiv} i inkommande ordning."""
+        return {s: self.resolve(s) for s in symbols}
+
+    def listed(self, t_symbol: str) -> bool:
+        """Är tPAIR listad i configs (exchange eller margin)?"""
+        idx = self._index
+        try:
+            if not idx.pair_set:
+                return True
+            base, quote = _split_symbol(t_symbol)
+            base = idx.alias_fwd.get(base, base)
+            return f"{base}{quote}" in idx.pair_set
+        except Exception:
+            return False
+
+    def get_stats(self) -> dict[str, Any]:
+        idx = self._index
+        return {
+            **self.stats,
+            "pairs": len(idx.pairs),
+            "aliases": len(idx.alias_fwd),
+            "resolve_table": len(idx.resolved),
+            "warm": self.is_warm(),
+        }
+
+
+# Global instans
+symbol_registry = SymbolRegistry()
+
+
 class SymbolService:
+    """Tunn fasad över `symbol_registry` (behåller legacy-API och symbols.json-läsning)."""
+
     def __init__(self) -> None:
         # Legacy fil-stöd (fallback)
         base_dir = os.path.dirname(os.path.dirname(__file__))  # tradingbot-backend/
         self.file_path = os.path.join(base_dir, "docs", "scraper", "symbols.json")
         self._legacy_cache: list[str] = []
-        # Delad cache används; behåll instansfält för bakåtkompatibilitet
-        self._pairs: list[str] = _CACHE["pairs"]
-        self._alias_fwd: dict[str, str] = _CACHE["alias_fwd"]
-        self._alias_rev: dict[str, str] = _CACHE["alias_rev"]
-        self._last_refresh_ts: float = _CACHE["ts"]
-        self._ttl_seconds: float = _CACHE["ttl"]
+
+    # Bakåtkompatibla vyer mot den delade registryn
+    @property
+    def _pairs(self) -> list[str]:
+        return symbol_registry.index.pairs
+
+    @property
+    def _alias_fwd(self) -> dict[str, str]:
+        return symbol_registry.index.alias_fwd
+
+    @property
+    def _alias_rev(self) -> dict[str, str]:
+        return symbol_registry.index.alias_rev
+
+    @property
+    def _last_refresh_ts(self) -> float:
+        return symbol_registry.index.ts
 
     def _load_legacy(self) -> list[str]:
         if self._legacy_cache:
@@ -96,63 +289,11 @@ class SymbolService:
         return symbols
 
     async def refresh(self) -> None:
-        """Hämta och cacha parlistor + alias om TTL löpt ut."""
-        try:
-            import time as _t
-
-            now = _t.time()
-            # Läs delad cache först
-            if (now - float(_CACHE["ts"] or 0)) <= float(_CACHE["ttl"]):
-                # Synka instanspekare
-                self._pairs = _CACHE["pairs"]
-                self._alias_fwd = _CACHE["alias_fwd"]
-                self._alias_rev = _CACHE["alias_rev"]
-                self._last_refresh_ts = _CACHE["ts"]
-                return
-
-            async with _get_refresh_lock():
-                # Double‑check under lås
-                now = _t.time()
-                if (now - float(_CACHE["ts"] or 0)) <= float(_CACHE["ttl"]):
-                    self._pairs = _CACHE["pairs"]
-                    self._alias_fwd = _CACHE["alias_fwd"]
-                    self._alias_rev = _CACHE["alias_rev"]
-                    self._last_refresh_ts = _CACHE["ts"]
-                    return
-                # Hämta från MarketDataFacade (WS-first med REST-proxy)
-                from services.market_data_facade import get_market_data
-
-                svc = get_market_data()
-                pairs = await svc.get_configs_symbols() or []
-                fwd, rev = await svc.get_currency_symbol_map()
-                if pairs:
-                    _CACHE["pairs"] = list(pairs)
-                _CACHE["alias_fwd"] = {k.upper(): v.upper() for k, v in fwd.items()}
-                _CACHE["alias_rev"] = {k.upper(): v.upper() for k, v in rev.items()}
-                _CACHE["ts"] = now
-                # Synka instanspekare
-                self._pairs = _CACHE["pairs"]
-                self._alias_fwd = _CACHE["alias_fwd"]
-                self._alias_rev = _CACHE["alias_rev"]
-                self._last_refresh_ts = _CACHE["ts"]
-                logger.info(
-                    "SymbolService refresh: pairs=%s aliases=%s",
-                    len(self._pairs),
-                    len(self._alias_fwd),
-                )
-        except Exception as e:
-            logger.warning("SymbolService refresh misslyckades: %s", e)
+        """Hämta och cacha parlistor + alias om TTL löpt ut (delad registry)."""
+        await symbol_registry.refresh()
 
     def _split_symbol(self, t_symbol: str) -> tuple[str, str]:
-        """Ta 'tBTCUSD' eller 'tTESTADA:TESTUSD' → (BASE, QUOTE) utan prefix."""
-        s = t_symbol
-        if s.startswith("t"):
-            s = s[1:]
-        if ":" in s:
-            base, quote = s.split(":", 1)
-        else:
-            base, quote = s[:-3], s[-3:]
-        return base.upper(), quote.upper()
+        return _split_symbol(t_symbol)
 
     def _apply_alias(self, base: str) -> str:
         """Currency alias (ALGO->ALG etc)."""
@@ -160,47 +301,11 @@ class SymbolService:
 
     def listed(self, t_symbol: str) -> bool:
         """Är tPAIR listad i configs (exchange eller margin)?"""
-        try:
-            base, quote = self._split_symbol(t_symbol)
-            base = self._apply_alias(base)
-            pair = f"{base}{quote}"
-            # Offline/CI-fallback: om vi saknar live-parlista, tillåt alla
-            if not self._pairs:
-                return True
-            return pair in self._pairs
-        except Exception:
-            return False
+        return symbol_registry.listed(t_symbol)
 
     def resolve(self, t_symbol: str) -> str:
-        """
-        Mappa inkommande symbol (t.ex. 'tTESTBTC:TESTUSDT'/'tALGOUSD') till giltig Bitfinex-v2 'tPAIR'.
-        Regler: TEST->live, alias (ALGO->ALG), USD->UST fallback.
-        """
-        try:
-            s = (t_symbol or "").strip()
-            if not s:
-                return t_symbol
-            # TEST-mappningar
-            base, quote = self._split_symbol(s)
-            # tTEST<ASSET>:TESTUSD -> <ASSET>USD
-            if base.startswith("TEST") and quote == "TESTUSD":
-                base = base[4:]
-                quote = "USD"
-            # tTEST<ASSET>:TESTUSDT -> <ASSET>UST
-            if base.startswith("TEST") and quote == "TESTUSDT":
-                base = base[4:]
-                quote = "UST"
-            # Alias
-            base = self._apply_alias(base)
-            # Kandidater i ordning
-            candidates = [f"{base}{quote}"]
-            if quote == "USD":
-                candidates.append(f"{base}UST")
-            # Välj första listade
-            for cand in candidates:
-                if not self._pairs or cand in self._pairs:
-                    return f"t{cand}"
-            # Fallback till ursprunglig utan ändring
-            return f"t{base}{quote}"
-        except Exception:
-            return t_symbol
+        """Mappa inkommande symbol till giltig Bitfinex-v2 'tPAIR' (se SymbolRegistry.resolve)."""
+        return symbol_registry.resolve(t_symbol)
+
+    def resolve_many(self, symbols: list[str]) -> dict[str, str]:
+        return symbol_registry.resolve_many(symbols)
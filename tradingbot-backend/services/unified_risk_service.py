@@ -458,7 +458,6 @@ class UnifiedRiskService:
             return {
                 "timestamp": datetime.now().isoformat(),
                 "error": "Internal server error",
-        main
                 "overall_status": "error",
             }
 
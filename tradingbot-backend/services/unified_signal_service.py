@@ -19,9 +19,9 @@ from services.signal_service import SignalScore
 from services.market_data_facade import get_market_data
 from services.signal_service import SignalService
 from services.symbols import SymbolService
-from indicators.regime import detect_regime, ema_z
-from indicators.adx import adx as adx_series
+from services.regime_engine import RegimeResult, regime_engine
 from utils.logger import get_logger
+from utils.single_flight import single_flight
 from config.settings import settings
 
 logger = get_logger(__name__)
@@ -47,7 +47,6 @@ class UnifiedSignalService:
 
         # Enhetlig cache för alla signaler
         self._signal_cache: dict[str, SignalResponse] = {}
-        self._regime_cache: dict[str, dict[str, Any]] = {}
         self._cache_ttl = timedelta(minutes=2)  # Kortare TTL för realtidsdata
         self._last_update: dict[str, datetime] = {}
 
@@ -69,61 +68,52 @@ class UnifiedSignalService:
             logger.error(f"❌ Fel vid hämtning av symboler: {e}")
             return ["tBTCUSD", "tETHUSD"]  # Fallback
 
+    async def _seed_regime(self, symbol: str, timeframe: str) -> RegimeResult | None:
+        """Seeda RegimeEngine från historiska candles; None vid otillräcklig data."""
+        candles = await self.market_data.get_candles(symbol, timeframe, limit=regime_engine.warmup_bars)
+
+        if not candles or len(candles) < 20:
+            logger.warning(f"⚠️ Otillräcklig data för {symbol}: {len(candles) if candles else 0} candles")
+            return None
+
+        snap = regime_engine.seed(symbol, timeframe, candles)
+        if snap is None:
+            logger.warning(f"⚠️ Otillräcklig OHLC data för {symbol}")
+        return snap
+
     async def get_regime_data(self, symbol: str, force_refresh: bool = False) -> dict[str, Any] | None:
         """
         Hämta regime data för en symbol.
 
-        Använder samma logik som alla paneler för konsistens.
+        Använder samma logik som alla paneler för konsistens. Läser från
+        den strömmande RegimeEngine; full omräkning bara vid kallstart,
+        för gammal state eller force_refresh.
         """
-        cache_key = f"regime_{symbol}"
-
-        # Kontrollera cache
-        if not force_refresh and cache_key in self._regime_cache:
-            cached_data = self._regime_cache[cache_key]
-            if (datetime.now() - cached_data["timestamp"]) < self._cache_ttl:
-                logger.debug(f"📋 Använder cached regime data för {symbol}")
-                return cached_data["data"]
-
+        timeframe = "1m"
         try:
-            # Hämta live regime data direkt via MarketDataFacade
-            candles = await self.market_data.get_candles(symbol, "1m", limit=50)
-
-            if not candles or len(candles) < 20:
-                logger.warning(f"⚠️ Otillräcklig data för {symbol}: {len(candles) if candles else 0} candles")
-                return None
-
-            # Extrahera OHLC data
-            highs = [float(candle[3]) for candle in candles if len(candle) >= 4]
-            lows = [float(candle[4]) for candle in candles if len(candle) >= 5]
-            closes = [float(candle[2]) for candle in candles if len(candle) >= 3]
-
-            if len(highs) < 20 or len(lows) < 20 or len(closes) < 20:
-                logger.warning(f"⚠️ Otillräcklig OHLC data för {symbol}")
-                return None
-
-            # Beräkna regime och indikatorer
-            # Default config för regime detection
-            regime_cfg = {"ADX_PERIOD": 14, "EMA_FAST": 3, "EMA_SLOW": 7, "Z_WIN": 200}
-            regime = detect_regime(highs, lows, closes, regime_cfg)
-            adx_vals = adx_series(highs, lows, closes, period=14)
-            ez_vals = ema_z(closes, 3, 7, 200)
+            # Snabbväg: strömmande state uppdaterad av WS candles (dict-lookup)
+            snap = None
+            if not force_refresh:
+                snap = regime_engine.get(symbol, timeframe, max_age_s=self._cache_ttl.total_seconds())
+
+            if snap is None:
+                # Kallstart/resync: full omräkning från historik, delad mellan samtidiga anropare
+                snap = await single_flight.do(
+                    "regime", (symbol, timeframe), lambda: self._seed_regime(symbol, timeframe)
+                )
+                if snap is None:
+                    return None
+            else:
+                single_flight.note_hit("regime")
+                logger.debug(f"📋 Använder strömmande regime data för {symbol}")
 
             regime_data = {
                 "symbol": symbol,
-                "regime": regime,
-                "adx_value": adx_vals[-1] if adx_vals else None,
-                "ema_z_value": ez_vals[-1] if ez_vals else None,
-                "last_close": closes[-1] if closes else None,
-                "timestamp": datetime.now(),
-            }
-
-            # Spara i cache
-            self._regime_cache[cache_key] = {
-                "data": regime_data,
+                **snap.to_dict(),
                 "timestamp": datetime.now(),
             }
 
-            logger.debug(f"✅ Regime data för {symbol}: {regime}")
+            logger.debug(f"✅ Regime data för {symbol}: {snap.regime}")
             return regime_data
 
         except Exception as e:
@@ -385,7 +375,7 @@ class UnifiedSignalService:
         """Hämta cache-statistik."""
         return {
             "signal_cache_size": len(self._signal_cache),
-            "regime_cache_size": len(self._regime_cache),
+            "regime_cache_size": regime_engine.get_stats()["tracked"],
             "last_updates": len(self._last_update),
             "oldest_cache": (min(self._last_update.values()) if self._last_update else None),
             "newest_cache": (max(self._last_update.values()) if self._last_update else None),
@@ -394,7 +384,7 @@ class UnifiedSignalService:
     def clear_cache(self) -> None:
         """Rensa alla caches."""
         self._signal_cache.clear()
-        self._regime_cache.clear()
+        regime_engine.invalidate()
         self._last_update.clear()
         logger.info("🗑️ UnifiedSignalService cache rensad")
 
@@ -3,55 +3,96 @@ WatchlistService - extraherad logik för /market/watchlist.
 
 Ansvar:
 - Hämta symboler (via Settings/WS_SUBSCRIBE_SYMBOLS eller testlista)
-- WS-first hämtning av tickers och candles (1m och 5m)
-- Batchad margin-status via REST/WS
+- WS-first hämtning av tickers (bulk) och candles (1m och 5m) parallellt per symbol
+- Batchad margin-status via REST/WS, startad samtidigt som marknadsdatan
 - Beräkna strategioutput (1m/5m) och indikator-snapshots
 - Valfritt: beräkna sannolikhets-/rekommendationsfält via SignalService
+- Strömma rader i den takt de blir klara (stream_watchlist); margin-status
+  följer som egna händelser när batchen är klar
 - Enkel in-memory cache med TTL
 """
 
 from __future__ import annotations
 
 import asyncio
+from collections.abc import AsyncIterator
 from datetime import datetime, timedelta
 from typing import Any
 
 from config.settings import settings
 from rest.margin import MarginService as _MS
 from services.bitfinex_websocket import bitfinex_ws
-from services.market_data_facade import get_market_data
 from services.signal_service import SignalService
 from services.strategy import evaluate_strategy
-from services.symbols import SymbolService
+from services.symbols import SymbolService, symbol_registry
 from services.ws_first_data_service import get_ws_first_data_service
+from utils.advanced_rate_limiter import get_advanced_rate_limiter
 from utils.candles import parse_candles_to_strategy_data
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-class WatchlistService:
-    def __init__(self) -> None:
-        self._cache: dict[str, dict[str, Any]] = {}
-        self._cache_ttl = timedelta(minutes=5)
+def _safe_float(val: object) -> float | None:
+    try:
+        return float(val) if val is not None else None
+    except Exception:
+        return None
 
-    async def build_watchlist(self, symbols_param: str | None, include_prob: bool) -> list[dict[str, Any]]:
-        cache_key = f"watchlist_{symbols_param}_{include_prob}"
-        now = datetime.now()
-        cached = self._cache.get(cache_key)
-        if cached and (now - cached["timestamp"]) < self._cache_ttl:
-            logger.debug("📋 Använder cached watchlist data")
-            return cached["data"]  # type: ignore[return-value]
 
-        svc = SymbolService()
+def _strategy_for(symbol: str, candles: list | None, ind: dict | None) -> dict | None:
+    if not candles:
+        return None
+    try:
+        parsed_any = parse_candles_to_strategy_data(candles)
+    except Exception:
+        parsed_any = {"closes": [], "highs": [], "lows": []}
+    parsed_map: dict[str, Any] = dict(parsed_any) if isinstance(parsed_any, dict) else {}
+    parsed_map["symbol"] = symbol
+    if isinstance(ind, dict):
         try:
-            await svc.refresh()
+            parsed_map["ema_snapshot"] = float(ind.get("ema")) if ind.get("ema") is not None else None
+            parsed_map["rsi_snapshot"] = float(ind.get("rsi")) if ind.get("rsi") is not None else None
+            parsed_map["atr_snapshot"] = float(ind.get("atr")) if ind.get("atr") is not None else None
         except Exception:
             pass
+    return evaluate_strategy(parsed_map)  # type: ignore[arg-type]
+
+
+def _prob_for(candles: list | None) -> dict | None:
+    if not candles:
+        return None
+    closes = [row[2] for row in candles if isinstance(row, (list, tuple)) and len(row) >= 3]
+    if len(closes) < 2:
+        return None
+    price = float(closes[-1])
+    ema = sum(closes[-10:]) / min(10, len(closes))
+    ema_z = (price - ema) / (abs(ema) + 1e-9)
+    sc = SignalService().score(regime="trend", adx_value=20.0, ema_z_value=ema_z)
+    return {
+        "probabilities": {
+            "buy": round(sc.probability / 100.0, 6),
+            "sell": round(1.0 - (sc.probability / 100.0), 6),
+        },
+        "decision": ("buy" if sc.recommendation == "buy" else ("abstain" if sc.recommendation == "hold" else "sell")),
+        "ev": round(sc.probability / 100.0, 6),
+    }
+
 
+class WatchlistService:
+    def __init__(self) -> None:
+        self._cache: dict[str, dict[str, Any]] = {}
+        self._cache_ttl = timedelta(minutes=5)
+
+    async def _resolve_symbols(self, symbols_param: str | None) -> list[str]:
         if symbols_param:
             syms = [s.strip() for s in symbols_param.split(",") if s.strip()]
         else:
+            svc = SymbolService()
+            try:
+                await svc.refresh()
+            except Exception:
+                pass
             try:
                 env_syms = (settings.WS_SUBSCRIBE_SYMBOLS or "").strip()
                 if env_syms:
@@ -60,122 +101,118 @@ class WatchlistService:
                     syms = svc.get_symbols(test_only=True, fmt="v2")[:10]
             except Exception:
                 syms = svc.get_symbols(test_only=True, fmt="v2")[:10]
+        # Dubbletter ger dubbla läsningar men samma rad; behåll första förekomsten
+        return list(dict.fromkeys(syms))
+
+    async def _fetch_candles(self, ws_data_service: Any, symbol: str) -> tuple[list | None, list | None]:
+        """1m och 5m samtidigt; kalla symboler (REST) går genom limiterns PUBLIC-semafor."""
+
+        async def _both() -> tuple[Any, Any]:
+            return await asyncio.gather(
+                ws_data_service.get_candles(symbol, "1m", 50),
+                ws_data_service.get_candles(symbol, "5m", 50),
+                return_exceptions=True,
+            )
+
+        warm = False
+        try:
+            has_fresh = getattr(ws_data_service, "has_fresh_candles", None)
+            warm = bool(has_fresh and has_fresh(symbol, "1m") and has_fresh(symbol, "5m"))
+        except Exception:
+            warm = False
+
+        if warm:
+            c1, c5 = await _both()
+        else:
+            async with get_advanced_rate_limiter().limit("candles"):
+                c1, c5 = await _both()
+        return (
+            None if isinstance(c1, BaseException) else c1,
+            None if isinstance(c5, BaseException) else c5,
+        )
+
+    async def _iter_rows(
+        self, symbols_param: str | None, include_prob: bool
+    ) -> AsyncIterator[tuple[str, int, dict[str, Any]]]:
+        """
+        Bygg rader parallellt och yielda (typ, position, data) i den ordning de blir klara.
+
+        Tickers hämtas i ett bulk-anrop (WS-cache först), candles per symbol med
+        begränsad samtidighet (WATCHLIST_CONCURRENCY) och margin-status i en batch
+        som körs parallellt med marknadsdatan. En rad ("row") väntar aldrig på
+        margin-batchen: är den inte klar har raden margin_status None och en
+        ("margin", position, {"symbol", "margin_status"}) följer när den är klar.
+        """
+        syms = await self._resolve_symbols(symbols_param)
+        if not syms:
+            return
 
-        # WS live check
         try:
             ws_live_set = set(bitfinex_ws.active_tickers or [])
         except Exception:
             ws_live_set = set()
 
-        # WS-first för marknadsdata
         ws_data_service = get_ws_first_data_service()
         try:
             await ws_data_service.initialize()
         except Exception:
             pass
 
-        tickers: list[Any] = []
-        candles_1m: list[Any] = []
-        candles_5m: list[Any] = []
-        for s in syms:
+        env_syms = (settings.WS_SUBSCRIBE_SYMBOLS or "").strip()
+        env_list = {x.strip() for x in env_syms.split(",") if x.strip()}
+
+        try:
+            resolved = symbol_registry.resolve_many(syms)
+        except Exception:
+            resolved = {}
+
+        async def _margin() -> dict[str, dict[str, Any]]:
             try:
-                ticker = await ws_data_service.get_ticker(s)
-                tickers.append(ticker)
-                candles = await ws_data_service.get_candles(s, "1m", 50)
-                candles_1m.append(candles)
-                candles5 = await ws_data_service.get_candles(s, "5m", 50)
-                candles_5m.append(candles5)
-                await asyncio.sleep(0.05)
+                return await _MS().get_symbol_margin_status_batch(syms)
             except Exception as e:
-                logger.warning(f"Fel vid hämtning av data för {s}: {e}")
-                tickers.append(None)
-                candles_1m.append(None)
-                candles_5m.append(None)
+                logger.warning(f"⚠️ Batch margin-status misslyckades: {e}")
+                return {}
+
+        margin_task = asyncio.create_task(_margin())
 
-        # Batchad margin-status
-        margin_statuses: dict[str, dict[str, Any]] = {}
         try:
-            ms = _MS()
-            margin_statuses = await ms.get_symbol_margin_status_batch(syms)
+            tickers = await ws_data_service.get_tickers(syms)
         except Exception as e:
-            logger.warning(f"⚠️ Batch margin-status misslyckades: {e}")
+            logger.warning(f"⚠️ Bulk-tickers misslyckades: {e}")
+            tickers = {}
 
-        # Bygg svar
-        results: list[dict[str, Any]] = []
-        env_syms = (settings.WS_SUBSCRIBE_SYMBOLS or "").strip()
-        env_list = [x.strip() for x in env_syms.split(",") if x.strip()]
+        try:
+            concurrency = max(1, int(getattr(settings, "WATCHLIST_CONCURRENCY", 32) or 1))
+        except Exception:
+            concurrency = 32
+        sem = asyncio.Semaphore(concurrency)
 
-        for i, s in enumerate(syms):
+        async def _row(i: int, s: str) -> tuple[int, dict[str, Any]] | None:
             try:
-                eff = svc.resolve(s)
-                listed = bool(svc.listed(eff))
+                eff = resolved[s]
+                listed = bool(symbol_registry.listed(eff))
             except Exception:
                 eff = s
                 listed = None
+            if listed is False and s not in env_list:
+                return None
 
-            show_unlisted = s in env_list
-            if listed is False and not show_unlisted:
-                continue
-
-            ticker = tickers[i] if i < len(tickers) and not isinstance(tickers[i], Exception) else None
-            c1 = candles_1m[i] if i < len(candles_1m) and not isinstance(candles_1m[i], Exception) else None
-            c5 = candles_5m[i] if i < len(candles_5m) and not isinstance(candles_5m[i], Exception) else None
-
-            def _safe_float(val: object) -> float | None:
-                try:
-                    return float(val) if val is not None else None
-                except Exception:
-                    return None
-
-            last = _safe_float(ticker.get("last_price")) if isinstance(ticker, dict) else None
-            vol = _safe_float(ticker.get("volume")) if isinstance(ticker, dict) else None
-            ws_live = eff in ws_live_set
-            margin_status = margin_statuses.get(s)
-
-            strat = None
-            strat_5m = None
-            ind1 = (
-                ws_data_service.get_indicator_snapshot(s, "1m")
-                if hasattr(ws_data_service, "get_indicator_snapshot")
-                else None
-            )
-            ind5 = (
-                ws_data_service.get_indicator_snapshot(s, "5m")
-                if hasattr(ws_data_service, "get_indicator_snapshot")
-                else None
-            )
-
-            if c1:
-                try:
-                    parsed_any = parse_candles_to_strategy_data(c1)
-                except Exception:
-                    parsed_any = {"closes": [], "highs": [], "lows": []}
-                parsed_map: dict[str, Any] = dict(parsed_any) if isinstance(parsed_any, dict) else {}
-                parsed_map["symbol"] = s
-                if isinstance(ind1, dict):
-                    try:
-                        parsed_map["ema_snapshot"] = float(ind1.get("ema")) if ind1.get("ema") is not None else None
-                        parsed_map["rsi_snapshot"] = float(ind1.get("rsi")) if ind1.get("rsi") is not None else None
-                        parsed_map["atr_snapshot"] = float(ind1.get("atr")) if ind1.get("atr") is not None else None
-                    except Exception:
-                        pass
-                strat = evaluate_strategy(parsed_map)  # type: ignore[arg-type]
-
-            if c5:
+            async with sem:
+                ticker = tickers.get(s)
                 try:
-                    parsed_any5 = parse_candles_to_strategy_data(c5)
-                except Exception:
-                    parsed_any5 = {"closes": [], "highs": [], "lows": []}
-                parsed_map5: dict[str, Any] = dict(parsed_any5) if isinstance(parsed_any5, dict) else {}
-                parsed_map5["symbol"] = s
-                if isinstance(ind5, dict):
-                    try:
-                        parsed_map5["ema_snapshot"] = float(ind5.get("ema")) if ind5.get("ema") is not None else None
-                        parsed_map5["rsi_snapshot"] = float(ind5.get("rsi")) if ind5.get("rsi") is not None else None
-                        parsed_map5["atr_snapshot"] = float(ind5.get("atr")) if ind5.get("atr") is not None else None
-                    except Exception:
-                        pass
-                strat_5m = evaluate_strategy(parsed_map5)  # type: ignore[arg-type]
+                    if ticker is None:
+                        ticker, (c1, c5) = await asyncio.gather(
+                            ws_data_service.get_ticker(s), self._fetch_candles(ws_data_service, s)
+                        )
+                    else:
+                        c1, c5 = await self._fetch_candles(ws_data_service, s)
+                except Exception as e:
+                    logger.warning(f"Fel vid hämtning av data för {s}: {e}")
+                    c1 = c5 = None
+
+            get_snapshot = getattr(ws_data_service, "get_indicator_snapshot", None)
+            ind1 = get_snapshot(s, "1m") if get_snapshot else None
+            ind5 = get_snapshot(s, "5m") if get_snapshot else None
 
             indicators_payload: dict[str, Any] = {}
             if isinstance(ind1, dict) and any(k in ind1 for k in ("ema", "rsi", "atr")):
@@ -187,42 +224,84 @@ class WatchlistService:
                 "symbol": s,
                 "eff_symbol": eff,
                 "listed": listed,
-                "ws_live": ws_live,
-                "margin_status": margin_status,
-                "last": last,
-                "volume": vol,
-                "strategy": strat,
-                "strategy_5m": strat_5m,
+                "ws_live": eff in ws_live_set,
+                "margin_status": None,
+                "last": _safe_float(ticker.get("last_price")) if isinstance(ticker, dict) else None,
+                "volume": _safe_float(ticker.get("volume")) if isinstance(ticker, dict) else None,
+                "strategy": _strategy_for(s, c1, ind1),
+                "strategy_5m": _strategy_for(s, c5, ind5),
                 "indicators": indicators_payload or None,
             }
 
             if include_prob:
+                # Samma 1m-candles som strategin; ingen extra läsning
                 try:
-                    ds = get_market_data()
-                    candles_prob = await ds.get_candles(s, "1m", 50)
-                    if candles_prob:
-                        closes = [row[2] for row in candles_prob if isinstance(row, (list, tuple)) and len(row) >= 3]
-                        if len(closes) >= 2:
-                            price = float(closes[-1])
-                            ema = sum(closes[-10:]) / min(10, len(closes))
-                            ema_z = (price - ema) / (abs(ema) + 1e-9)
-                            sc = SignalService().score(regime="trend", adx_value=20.0, ema_z_value=ema_z)
-                            item["prob"] = {
-                                "probabilities": {
-                                    "buy": round(sc.probability / 100.0, 6),
-                                    "sell": round(1.0 - (sc.probability / 100.0), 6),
-                                },
-                                "decision": (
-                                    "buy"
-                                    if sc.recommendation == "buy"
-                                    else ("abstain" if sc.recommendation == "hold" else "sell")
-                                ),
-                                "ev": round(sc.probability / 100.0, 6),
-                            }
+                    prob = _prob_for(c1)
+                    if prob is not None:
+                        item["prob"] = prob
                 except Exception as pe:
                     item["prob_error"] = str(pe)[:120]
 
-            results.append(item)
+            return i, item
+
+        tasks = [asyncio.create_task(_row(i, s)) for i, s in enumerate(syms)]
+        pending: set[asyncio.Task] = {*tasks, margin_task}
+        margin: dict[str, dict[str, Any]] | None = None
+        awaiting_margin: dict[int, str] = {}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    if fut is margin_task:
+                        margin = fut.result() or {}
+                        for i, s in awaiting_margin.items():
+                            yield "margin", i, {"symbol": s, "margin_status": margin.get(s)}
+                        awaiting_margin.clear()
+                        continue
+                    try:
+                        row = fut.result()
+                    except Exception as e:
+                        logger.warning(f"Watchlist-rad misslyckades: {e}")
+                        continue
+                    if row is None:
+                        continue
+                    i, item = row
+                    if margin is not None:
+                        item["margin_status"] = margin.get(item["symbol"])
+                    else:
+                        awaiting_margin[i] = item["symbol"]
+                    yield "row", i, item
+        finally:
+            for t in tasks:
+                t.cancel()
+            margin_task.cancel()
+
+    async def stream_watchlist(self, symbols_param: str | None, include_prob: bool) -> AsyncIterator[dict[str, Any]]:
+        """
+        Strömma händelser i den ordning de blir klara (ingen cache).
+
+        {"type": "row", ...rad} så fort marknadsdatan är klar, och
+        {"type": "margin", "symbol", "margin_status"} för rader som skickades
+        innan margin-batchen var klar.
+        """
+        async for kind, _, data in self._iter_rows(symbols_param, include_prob):
+            yield {"type": kind, **data}
+
+    async def build_watchlist(self, symbols_param: str | None, include_prob: bool) -> list[dict[str, Any]]:
+        cache_key = f"watchlist_{symbols_param}_{include_prob}"
+        now = datetime.now()
+        cached = self._cache.get(cache_key)
+        if cached and (now - cached["timestamp"]) < self._cache_ttl:
+            logger.debug("📋 Använder cached watchlist data")
+            return cached["data"]  # type: ignore[return-value]
+
+        rows: dict[int, dict[str, Any]] = {}
+        async for kind, i, data in self._iter_rows(symbols_param, include_prob):
+            if kind == "row":
+                rows[i] = data
+            elif i in rows:
+                rows[i]["margin_status"] = data["margin_status"]
+        results = [rows[i] for i in sorted(rows)]
 
         self._cache[cache_key] = {"data": results, "timestamp": now}
         return results
@@ -0,0 +1,161 @@
+"""
+WS Dispatch - per-kanal/per-symbol köer för publika WS-callbacks.
+
+Läsloopen (listen_for_messages/_listen_loop) lägger bara payload i en
+begränsad kö per lane (t.ex. "ticker|tBTCUSD") och går vidare. En
+worker-task per lane kör callbacks i ordning, så en långsam symbol
+(strategiutvärdering, REST-hämtning) inte fördröjer andra frames eller
+heartbeats på samma socket.
+
+Overflow-policy per lane:
+- "coalesce": endast senaste payload behålls (tickers – TickerFrame
+  muteras ändå in-place, så äldre frames har inget eget värde)
+- "drop_oldest": kön är FIFO med tak; äldsta payload släpps vid full kö
+- "lossless": FIFO utan tak (candles – varje stängd candle måste fram)
+
+Varje lane har en enda deque utan maxlen; taket upprätthålls i submit,
+så ett policybyte ändrar aldrig kön som workern konsumerar.
+Worker-tasks startas vid behov och avslutas när kön är tom.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+POLICIES = ("coalesce", "drop_oldest", "lossless")
+
+
+class _Lane:
+    __slots__ = ("callback", "key", "policy", "queue", "stats", "task")
+
+    def __init__(self, key: str, callback: Callable, policy: str) -> None:
+        self.key = key
+        self.callback = callback
+        self.policy = policy
+        self.queue: deque[tuple[float, Any]] = deque()
+        self.task: asyncio.Task | None = None
+        self.stats: dict[str, float] = {
+            "enqueued": 0,
+            "delivered": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "max_depth": 0,
+            "lag_ms_total": 0.0,
+            "lag_ms_max": 0.0,
+            "last_lag_ms": 0.0,
+        }
+
+
+class ChannelDispatcher:
+    """Begränsade köer + worker-tasks per lane."""
+
+    def __init__(self, maxlen: int = 256) -> None:
+        self.maxlen = max(1, int(maxlen))
+        self._lanes: dict[str, _Lane] = {}
+
+    def submit(self, key: str, callback: Callable, payload: Any, policy: str = "drop_oldest") -> None:
+        """Köa payload för lane `key`; returnerar direkt (anropas från läsloopen)."""
+        if policy not in POLICIES:
+            policy = "drop_oldest"
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(key, callback, policy)
+        else:
+            # Re-subscribe: byt callback/policy men behåll lane, kö och statistik
+            lane.callback = callback
+            lane.policy = policy
+        q = lane.queue
+        cap = self._capacity(policy)
+        if cap is not None:
+            # Trimma samma deque in-place (workern kan konsumera den just nu)
+            while len(q) >= cap:
+                q.popleft()
+                lane.stats["coalesced" if policy == "coalesce" else "dropped"] += 1
+        q.append((time.perf_counter(), payload))
+        lane.stats["enqueued"] += 1
+        lane.stats["max_depth"] = max(lane.stats["max_depth"], len(q))
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.get_running_loop().create_task(self._drain(lane), name=f"ws-dispatch:{key}")
+
+    def _capacity(self, policy: str) -> int | None:
+        if policy == "coalesce":
+            return 1
+        if policy == "lossless":
+            return None
+        return self.maxlen
+
+    def remove(self, key: str) -> bool:
+        """Ta bort lane vid unsubscribe; köade payloads släpps, pågående callback kör klart."""
+        lane = self._lanes.pop(key, None)
+        if lane is None:
+            return False
+        lane.queue.clear()
+        return True
+
+    async def _drain(self, lane: _Lane) -> None:
+        while lane.queue:
+            enq_ts, payload = lane.queue.popleft()
+            lag_ms = (time.perf_counter() - enq_ts) * 1000.0
+            st = lane.stats
+            st["last_lag_ms"] = lag_ms
+            st["lag_ms_total"] += lag_ms
+            st["lag_ms_max"] = max(st["lag_ms_max"], lag_ms)
+            try:
+                res = lane.callback(payload)
+                if asyncio.iscoroutine(res):
+                    await res
+                st["delivered"] += 1
+            except Exception as e:
+                st["errors"] += 1
+                logger.warning("⚠️ WS dispatch callback error (%s): %s", lane.key, e)
+            # Släpp loopen mellan payloads så läsloopen aldrig svälts
+            await asyncio.sleep(0)
+
+    async def drain(self, timeout: float = 5.0) -> None:
+        """Vänta tills alla köer är tomma (tester/shutdown)."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            tasks = [ln.task for ln in self._lanes.values() if ln.task is not None and not ln.task.done()]
+            if not tasks:
+                return
+            await asyncio.wait(tasks, timeout=max(0.0, deadline - time.perf_counter()))
+
+    def clear(self) -> None:
+        """Töm köer (disconnect). Pågående callbacks får köra klart."""
+        for lane in self._lanes.values():
+            lane.queue.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        lanes: dict[str, Any] = {}
+        totals = {"enqueued": 0, "delivered": 0, "dropped": 0, "coalesced": 0, "errors": 0, "queued": 0}
+        lag_max = 0.0
+        for key, lane in self._lanes.items():
+            st = lane.stats
+            delivered = int(st["delivered"]) + int(st["errors"])
+            lanes[key] = {
+                "policy": lane.policy,
+                "queued": len(lane.queue),
+                "enqueued": int(st["enqueued"]),
+                "delivered": int(st["delivered"]),
+                "dropped": int(st["dropped"]),
+                "coalesced": int(st["coalesced"]),
+                "errors": int(st["errors"]),
+                "max_depth": int(st["max_depth"]),
+                "lag_ms_avg": (st["lag_ms_total"] / delivered) if delivered else 0.0,
+                "lag_ms_max": st["lag_ms_max"],
+                "last_lag_ms": st["last_lag_ms"],
+            }
+            for k in ("enqueued", "delivered", "dropped", "coalesced", "errors"):
+                totals[k] += int(st[k])
+            totals["queued"] += len(lane.queue)
+            lag_max = max(lag_max, st["lag_ms_max"])
+        return {"maxlen": self.maxlen, "lanes": lanes, "totals": {**totals, "lag_ms_max": lag_max}}
@@ -16,9 +16,12 @@ import services.runtime_config as rc
 from services.bitfinex_websocket import bitfinex_ws
 from services.incremental_indicators import ATRState, EMAState, RSIState
 from services.metrics_client import get_metrics_client
+from services.regime_engine import regime_engine
 from utils.advanced_rate_limiter import get_advanced_rate_limiter
 from utils.logger import get_logger
-from utils.candle_cache import candle_cache
+from utils.candle_cache import async_candle_cache
+from utils.candle_ring import CandleRingBuffer
+from utils.ticker_frame import TickerFrame
 from config.settings import settings
 
 logger = get_logger(__name__)
@@ -67,8 +70,9 @@ class WSFirstDataService:
         # Backpressure settings
         self.max_queue_size = 100
 
-        # Candle WS queues/throttle
-        self._candle_queues: dict[str, deque] = defaultdict(lambda: deque(maxlen=500))
+        # Candle WS ringbuffertar (kolumnarrayer per symbol|timeframe) och throttle
+        self.candle_buffer_size = 500
+        self._candle_rings: dict[str, CandleRingBuffer] = {}
         self._candle_last_update: dict[str, float] = {}
         self.candle_debounce_ms = 250
 
@@ -119,20 +123,30 @@ class WSFirstDataService:
                         # Ticker kräver callback – använd noop
                         await bitfinex_ws.subscribe_ticker(symbol, callback=lambda _tick: None)
                         for tf in tfs:
-
-                            async def _cb(_):
-                                pass
-
-                            await bitfinex_ws.subscribe_candles(symbol=symbol, timeframe=tf, callback=_cb)
+                            await bitfinex_ws.subscribe_candles(
+                                symbol=symbol, timeframe=tf, callback=self._make_candle_callback(symbol, tf)
+                            )
                     except Exception as e:
                         logger.warning(f"Kunde inte prenumerera på {symbol}: {e}")
                 logger.info("✅ WS-First Data Service initialiserad")
         except Exception as e:
             logger.error(f"❌ Fel vid initialisering av WS-First Data Service: {e}")
 
+    def _make_candle_callback(self, symbol: str, timeframe: str):
+        async def _cb(message_data):
+            await self._handle_ws_candles(symbol, timeframe, message_data)
+
+        return _cb
+
     async def _handle_ws_candles(self, symbol: str, timeframe: str, message_data: list | tuple | dict | None) -> None:
         """Hantera WS candles-data (snapshot eller uppdateringar)."""
         try:
+            # Regimmotorn behöver varje bar-stängning, så den matas före debounce (O(1))
+            try:
+                regime_engine.on_candles(symbol, timeframe, message_data)
+            except Exception:
+                pass
+
             now = time.time()
             key = f"{symbol}|{timeframe}"
             # Debounce per symbol/timeframe
@@ -140,70 +154,56 @@ class WSFirstDataService:
             if now - last < (self.candle_debounce_ms / 1000.0):
                 return
 
-            dq = self._candle_queues[key]
+            ring = self._candle_rings.get(key)
+            if ring is None:
+                ring = self._candle_rings[key] = CandleRingBuffer(self.candle_buffer_size)
+            # Rader som faktiskt ändrats i denna uppdatering (persisteras write-behind)
+            touched: list[list | tuple] = []
             # Snapshot: lista av listor
             if isinstance(message_data, list) and message_data and isinstance(message_data[0], list):
-                # Ta senaste upp till 500
-                for row in message_data[-500:]:
-                    if isinstance(row, (list, tuple)) and len(row) >= 6:
-                        dq.append([row[0], row[1], row[2], row[3], row[4], row[5]])
-            # Enstaka uppdatering
+                rows = [r for r in message_data if isinstance(r, (list, tuple)) and len(r) >= 6]
+                # Bitfinex skickar snapshot nyast först – skriv äldst -> nyast
+                rows.sort(key=lambda r: r[0])
+                for row in rows[-ring.capacity :]:
+                    if ring.upsert_row(row):
+                        touched.append(row)
+            # Enstaka uppdatering (samma mts som senaste -> in-place)
             elif isinstance(message_data, list) and len(message_data) >= 6:
-                mts = message_data[0]
-                # undvik dubbletter: om sista har samma mts, ersätt
-                if dq and isinstance(dq[-1], list) and len(dq[-1]) >= 1 and dq[-1][0] == mts:
-                    dq[-1] = [
-                        message_data[0],
-                        message_data[1],
-                        message_data[2],
-                        message_data[3],
-                        message_data[4],
-                        message_data[5],
-                    ]
-                else:
-                    dq.append(
-                        [
-                            message_data[0],
-                            message_data[1],
-                            message_data[2],
-                            message_data[3],
-                            message_data[4],
-                            message_data[5],
-                        ]
-                    )
+                if ring.upsert_row(message_data):
+                    touched.append(message_data)
             else:
                 # Ignorera heartbeats eller okända format
                 return
 
-            # Uppdatera cachedatapunkt från de senaste N
-            # Begränsa längd till 'limit' när get_candles begär; här lagrar vi en god buffert
-            latest_list = list(dq)
             self._candle_last_update[key] = now
-            # Backpressure: vi använder maxlen på deque så äldsta släpps automatiskt
+            # Backpressure: ringbufferten har fast kapacitet, äldsta barer släpps automatiskt
 
-            # Skriv till cache med DataPoint
-            data_point = DataPoint(symbol=symbol, data=latest_list, timestamp=now, source="ws")
-            self._candle_cache[symbol][timeframe] = data_point
+            # En DataPoint per nyckel som pekar på bufferten; bara timestamp uppdateras per tick
+            data_point = self._candle_cache[symbol].get(timeframe)
+            if data_point is not None and data_point.data is ring:
+                data_point.timestamp = now
+                data_point.source = "ws"
+            else:
+                self._candle_cache[symbol][timeframe] = DataPoint(symbol=symbol, data=ring, timestamp=now, source="ws")
             self.stats["ws_hits"] += 1
             try:
-                # Persist WS-data till CandleCache (senaste batchen)
-                candle_cache.store(symbol, timeframe, latest_list[-50:])
+                # Persist WS-data till CandleCache via write-behind (coalescas per mts, flushas i bakgrunden)
+                async_candle_cache.store_buffered(symbol, timeframe, touched)
             except Exception:
                 pass
 
             # Uppdatera inkrementella indikatorer
-            last = latest_list[-1] if latest_list else None
-            if isinstance(last, (list, tuple)) and len(last) >= 5:
-                mts = last[0]
-                o = last[1]
-                c = last[2]
-                h = last[3]
-                low_val = last[4]
+            if touched and len(ring):
+                i = len(ring) - 1
+                cols = ring.arrays()
+                c = cols["close"][i]
+                h = cols["high"][i]
+                low_val = cols["low"][i]
                 # Läs perioder från strategiinställningar
                 try:
-                    from services.strategy_settings import StrategySettingsService
+                    from services.strategy_settings import get_strategy_settings_service
 
-                    ssvc = StrategySettingsService()
+                    ssvc = get_strategy_settings_service()
                     s = ssvc.get_settings(symbol=symbol)
                     ema_p, rsi_p, atr_p = (
                         int(s.ema_period),
@@ -223,19 +223,19 @@ class WSFirstDataService:
 
                 # Seed vid behov med senaste historiken
                 try:
-                    closes = [row[2] for row in latest_list if isinstance(row, (list, tuple)) and len(row) >= 3]
-                    highs = [row[3] for row in latest_list if isinstance(row, (list, tuple)) and len(row) >= 4]
-                    lows = [row[4] for row in latest_list if isinstance(row, (list, tuple)) and len(row) >= 5]
+                    closes = cols["close"]
+                    highs = cols["high"]
+                    lows = cols["low"]
                     if self._ema_state[ind_key].value is None:
-                        for px in closes[-ema_p:]:
-                            self._ema_state[ind_key].update(float(px))
-                    if self._rsi_state[ind_key].prev_close is None and len(closes) >= 2:
-                        for px in closes[-(rsi_p + 1) :]:
-                            self._rsi_state[ind_key].update(float(px))
-                    if self._atr_state[ind_key].prev_close is None and len(highs) == len(lows) == len(closes):
-                        start = max(0, len(closes) - atr_p)
-                        for i in range(start, len(closes)):
-                            self._atr_state[ind_key].update(float(highs[i]), float(lows[i]), float(closes[i]))
+                        for px in closes[-ema_p:].tolist():
+                            self._ema_state[ind_key].update(px)
+                    if self._rsi_state[ind_key].prev_close is None and closes.size >= 2:
+                        for px in closes[-(rsi_p + 1) :].tolist():
+                            self._rsi_state[ind_key].update(px)
+                    if self._atr_state[ind_key].prev_close is None:
+                        start = max(0, closes.size - atr_p)
+                        for j in range(start, closes.size):
+                            self._atr_state[ind_key].update(float(highs[j]), float(lows[j]), float(closes[j]))
                 except Exception:
                     pass
 
@@ -261,7 +261,9 @@ class WSFirstDataService:
                 self.stats["debounced_updates"] += 1
                 return
 
-            # Uppdatera cache
+            # Uppdatera cache (dict-vy: TickerFrame muteras vid nästa WS-frame)
+            if isinstance(ticker_data, TickerFrame):
+                ticker_data = ticker_data.to_dict()
             data_point = DataPoint(symbol=symbol, data=ticker_data, timestamp=now, source="ws")
 
             self._ticker_cache[symbol] = data_point
@@ -337,6 +339,85 @@ class WSFirstDataService:
             logger.error(f"Fel vid hämtning av ticker för {symbol}: {e}")
             return None
 
+    async def get_tickers(self, symbols: list[str]) -> dict[str, dict[str, Any]]:
+        """
+        Hämta tickers för flera symboler: färsk WS/cache först, resten i ett bulk REST-anrop.
+
+        Symboler som varken finns i cache eller i bulk-svaret saknas i resultatet;
+        anroparen får då falla tillbaka på get_ticker per symbol.
+
+        Returns:
+            Dict symbol -> ticker-data (samma format som get_ticker)
+        """
+        out: dict[str, dict[str, Any]] = {}
+        try:
+            now = time.time()
+            try:
+                stale = rc.get_int("WS_TICKER_STALE_SECS", self.ticker_stale_seconds)
+            except Exception:
+                stale = self.ticker_stale_seconds
+            missing: list[str] = []
+            for sym in symbols:
+                cached = self._ticker_cache.get(sym)
+                if cached is not None and now - cached.timestamp < stale and isinstance(cached.data, dict):
+                    out[sym] = cached.data
+                    self.stats["cache_hits"] += 1
+                else:
+                    missing.append(sym)
+            if not missing:
+                return out
+
+            from services.symbols import symbol_registry
+
+            try:
+                resolved = symbol_registry.resolve_many(missing)
+            except Exception:
+                resolved = {s: s for s in missing}
+            by_eff: dict[str, list[str]] = defaultdict(list)
+            for sym in missing:
+                by_eff[resolved.get(sym, sym)].append(sym)
+
+            self.stats["rest_fallbacks"] += 1
+            try:
+                get_metrics_client().inc_labeled("marketdata_rest_fallbacks_total", {"type": "tickers"})
+            except Exception:
+                pass
+            rows = await self.rest_service.get_tickers(list(by_eff))
+            for row in rows or []:
+                if not isinstance(row, list) or len(row) < 9:
+                    continue
+                for sym in by_eff.get(row[0], ()):
+                    data = {
+                        "symbol": sym,
+                        "last_price": row[7],
+                        "bid": row[1],
+                        "ask": row[3],
+                        "high": row[9] if len(row) > 9 else None,
+                        "low": row[10] if len(row) > 10 else None,
+                        "volume": row[8],
+                    }
+                    self._ticker_cache[sym] = DataPoint(symbol=sym, data=data, timestamp=now, source="rest")
+                    out[sym] = data
+        except Exception as e:
+            logger.warning(f"Bulk-tickers misslyckades: {e}")
+        return out
+
+    def has_fresh_candles(self, symbol: str, timeframe: str) -> bool:
+        """True om get_candles kan svara från minnet (cache eller WS-ring) utan REST."""
+        try:
+            cached = self._candle_cache.get(symbol, {}).get(timeframe)
+            if cached is not None:
+                try:
+                    stale = rc.get_int("CANDLE_STALE_SECS", self.candle_stale_seconds)
+                except Exception:
+                    stale = self.candle_stale_seconds
+                if time.time() - cached.timestamp < stale:
+                    return True
+            ring = self._candle_rings.get(f"{symbol}|{timeframe}")
+            return ring is not None and len(ring) > 0
+        except Exception:
+            return False
+
     async def get_candles(
         self,
         symbol: str,
@@ -377,24 +458,25 @@ class WSFirstDataService:
                         )
                     except Exception:
                         pass
+                    if isinstance(cached.data, CandleRingBuffer):
+                        return cached.data.to_list(limit)
                     return cached.data
 
-            # Om vi har WS-kö men stale cache, returnera senaste 'limit' från WS medan REST fyller bakgrund
+            # Om vi har WS-buffert men stale cache, returnera senaste 'limit' från WS medan REST fyller bakgrund
             try:
-                key = f"{symbol}|{timeframe}"
-                if self._candle_queues.get(key):
-                    latest = list(self._candle_queues[key])[-limit:]
+                ring = self._candle_rings.get(f"{symbol}|{timeframe}")
+                if ring is not None and len(ring):
                     # Uppdatera cachetimestamp
                     self._candle_cache[symbol][timeframe] = DataPoint(
-                        symbol=symbol, data=latest, timestamp=now, source="ws"
+                        symbol=symbol, data=ring, timestamp=now, source="ws"
                     )
-                    return latest
+                    return ring.to_list(limit)
             except Exception:
                 pass
 
             # Innan REST: försök läsa från persist CandleCache som bridge
             try:
-                persisted = candle_cache.load(symbol, timeframe, limit)
+                persisted = await async_candle_cache.load(symbol, timeframe, limit)
                 if persisted:
                     # Uppdatera in-memory cache och returnera
                     self._candle_cache[symbol][timeframe] = DataPoint(
@@ -427,7 +509,7 @@ class WSFirstDataService:
                 self._candle_cache[symbol][timeframe] = data_point
                 try:
                     # Persist REST-data till CandleCache för framtida läsning
-                    candle_cache.store(symbol, timeframe, candle_data)
+                    await async_candle_cache.store(symbol, timeframe, candle_data)
                 except Exception:
                     pass
                 try:
@@ -444,6 +526,16 @@ class WSFirstDataService:
             logger.error(f"Fel vid hämtning av candles för {symbol} {timeframe}: {e}")
             return None
 
+    def get_candle_arrays(self, symbol: str, timeframe: str, limit: int | None = None) -> dict | None:
+        """
+        Zero-copy NumPy-vyer (mts/open/close/high/low/volume) över de senaste
+        `limit` WS-candles. Vyerna är giltiga till nästa WS-uppdatering.
+        """
+        ring = self._candle_rings.get(f"{symbol}|{timeframe}")
+        if ring is None or not len(ring):
+            return None
+        return ring.arrays(limit)
+
     def get_indicator_snapshot(self, symbol: str, timeframe: str) -> dict | None:
         """Returnera inkrementella indikatorvärden om tillgängliga."""
         key = f"{symbol}|{timeframe}"
@@ -523,6 +615,7 @@ class WSFirstDataService:
         await self.rest_service.close()
         self._ticker_cache.clear()
         self._candle_cache.clear()
+        self._candle_rings.clear()
         self._update_queues.clear()
 
 
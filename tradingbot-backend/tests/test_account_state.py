@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from services.account_state import AccountStateStore
+
+
+def _wallet(cur, bal, avail=None):
+    return ["exchange", cur, bal, 0, avail, None, None]
+
+
+def _order(oid, symbol="tBTCUSD", amount=0.01, price=50000.0, status="ACTIVE"):
+    row = [None] * 32
+    row[0], row[2], row[3], row[4], row[5] = oid, 0, symbol, 1_700_000_000_000, 1_700_000_000_000
+    row[6], row[7], row[8], row[13], row[16], row[17] = amount, amount, "EXCHANGE LIMIT", status, price, 0
+    return row
+
+
+def test_snapshot_deltas_and_versioned_reads():
+    st = AccountStateStore()
+    st.set_live(True)
+    assert not st.ready("wallets")
+
+    st.apply_private_event([0, "ws", [_wallet("USD", 1000.0, 900.0), _wallet("BTC", 0.5, 0.5)]])
+    assert st.ready("wallets")
+    r1 = st.read("wallets")
+    assert st.read("wallets") is r1  # oförändrad version => samma läsning
+
+    # Delta med null för available behåller senast kända värde
+    st.apply_private_event([0, "wu", _wallet("USD", 1200.0, None)])
+    r2 = st.read("wallets")
+    assert r2.version == r1.version + 1
+    assert st.get_wallet("exchange", "USD")[2] == 1200.0
+    assert st.get_wallet("exchange", "USD")[4] == 900.0
+
+    st.apply_private_event([0, "os", [_order(1), _order(2)]])
+    st.apply_private_event([0, "on", _order(3)])
+    st.apply_private_event([0, "oc", _order(1, status="CANCELED")])
+    assert sorted(r[0] for r in st.read("orders").rows) == [2, 3]
+
+    st.apply_private_event([0, "ps", [["tBTCUSD", "ACTIVE", 0.1, 50000.0, 0, 0]]])
+    st.apply_private_event([0, "pu", ["tBTCUSD", "CLOSED", 0.0, 50000.0, 0, 0]])
+    assert st.get_position("tBTCUSD") is None
+
+    # Tappad auth: kräver ny snapshot innan läsning från storen
+    st.set_live(False)
+    st.set_live(True)
+    assert not st.ready("wallets")
+
+
+def test_reconcile_repairs_drift_and_skips_stale_rest():
+    st = AccountStateStore()
+    st.set_live(True)
+    st.apply_private_event([0, "ws", [_wallet("USD", 1000.0)]])
+
+    # REST-svar som startade före senaste WS-delta får inte skriva över
+    st.apply_private_event([0, "wu", _wallet("USD", 1100.0)])
+    assert st.reconcile("wallets", [_wallet("USD", 1000.0)], started_at=0.0) is False
+    assert st.stats["reconcile_skipped"] == 1
+    assert st.get_wallet("exchange", "USD")[2] == 1100.0
+
+    # Samma belopp => ingen drift
+    assert st.reconcile("wallets", [_wallet("USD", 1100.0)], started_at=time.time()) is False
+    # Missad delta => drift repareras från REST
+    assert st.reconcile("wallets", [_wallet("USD", 1100.0), _wallet("ETH", 2.0)], started_at=time.time())
+    assert st.stats["drift_repairs"] == 1
+    assert st.get_wallet("exchange", "ETH")[2] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_services_read_from_store_without_rest(monkeypatch):
+    import rest.active_orders as ao
+    import rest.wallet as wallet_mod
+
+    st = AccountStateStore()
+    monkeypatch.setattr(wallet_mod, "account_state", st)
+    monkeypatch.setattr(ao, "account_state", st)
+
+    def _no_rest():
+        raise AssertionError("REST ska inte anropas när kontoläget är live")
+
+    monkeypatch.setattr(wallet_mod, "get_exchange_client", _no_rest)
+    monkeypatch.setattr(ao, "get_exchange_client", _no_rest)
+
+    st.set_live(True)
+    st.apply_private_event([0, "ws", [_wallet("USD", 250.0, 250.0)]])
+    st.apply_private_event([0, "os", [_order(7)]])
+
+    svc = wallet_mod.WalletService()
+    wallets = await svc.get_wallets()
+    assert [(w.currency, w.balance) for w in wallets] == [("USD", 250.0)]
+    # Modellerna memoiseras per version
+    assert st.derived("wallets", "models", lambda _rows: None)[0] is wallets[0]
+
+    orders = await ao.ActiveOrdersService().get_active_orders()
+    assert [o.id for o in orders] == [7]
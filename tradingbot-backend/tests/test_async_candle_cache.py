@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from utils.candle_cache import AsyncCandleCache, CandleCache
+
+
+def _rows(n: int, base: int = 1_700_000_000_000):
+    return [[base + i * 60_000, 1.0, 1.0 + i, 2.0 + i, 1.0, 2.0] for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_ops_run_on_worker_thread_and_return_results(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"))
+    acache = AsyncCandleCache(cache, max_queue=4)
+    seen_threads: list[str] = []
+    orig_load = cache.load
+
+    def _load(*args: Any):
+        seen_threads.append(threading.current_thread().name)
+        return orig_load(*args)
+
+    cache.load = _load
+    assert await acache.store("tBTCUSD", "1m", _rows(10)) == 10
+    out = await acache.load("tBTCUSD", "1m", 3)
+    assert [r[0] for r in out] == [r[0] for r in reversed(_rows(10))][:3]
+    assert await acache.oldest_mts("tBTCUSD", "1m") == _rows(1)[0][0]
+    assert seen_threads == ["candle-cache-io"]
+
+    stats = await acache.stats()
+    assert stats["total_rows"] == 10
+    io = stats["async_io"]
+    assert io["ops"]["store"] == 1 and io["ops"]["load"] == 1
+    assert io["worker_alive"] is True
+    assert io["loop_overhead_ms_total"] >= 0.0
+    acache.close()
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_bounded_queue_applies_backpressure_and_keeps_order(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"))
+    acache = AsyncCandleCache(cache, max_queue=2)
+    results = await asyncio.gather(
+        *(acache.store("tETHUSD", "1m", _rows(1, base=1_700_000_000_000 + i * 60_000)) for i in range(20))
+    )
+    assert results == [1] * 20
+    assert len(await acache.load("tETHUSD", "1m", 100)) == 20
+    io = acache.io_stats()
+    assert io["max_queue_depth"] <= 2
+    assert io["queue_depth"] == 0
+    acache.close()
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_errors_propagate_to_awaiter(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"))
+    acache = AsyncCandleCache(cache)
+
+    def _boom(*_args: Any):
+        raise RuntimeError("disk")
+
+    cache.clear_all = _boom
+    with pytest.raises(RuntimeError):
+        await acache.clear_all()
+    assert acache.io_stats()["errors"] == 1
+    acache.close()
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_loop_overhead_excludes_worker_execution(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"))
+    acache = AsyncCandleCache(cache)
+
+    def _slow(*_args: Any):
+        time.sleep(0.05)
+        return 0
+
+    cache.flush = _slow
+    await acache.flush()
+    io = acache.io_stats()
+    # Workerns exekveringstid räknas inte som tid på loop-tråden
+    assert io["exec_ms_max"] >= 50.0
+    assert io["loop_overhead_ms_max"] < io["exec_ms_max"]
+    assert "loop_stall_ms_total" not in io
+    acache.close()
+    cache.close()
@@ -0,0 +1,74 @@
+import asyncio
+import random
+
+import pytest
+
+from services.backtest_sweep import BacktestSweepService, expand_grid
+
+
+def _candles(n: int = 600, seed: int = 11) -> list[list[float]]:
+    rnd = random.Random(seed)
+    base = 1_700_000_000_000
+    price = 100.0
+    out = []
+    for i in range(n):
+        o = price
+        price = max(1.0, price * (1.0 + rnd.gauss(0.0, 0.01)))
+        hi = max(o, price) * (1.0 + abs(rnd.gauss(0.0, 0.003)))
+        lo = min(o, price) * (1.0 - abs(rnd.gauss(0.0, 0.003)))
+        out.append([base + i * 60_000, o, price, hi, lo, 1.0])
+    return out
+
+
+def test_expand_grid_ranges_and_validation():
+    grid = expand_grid({"ema_period": {"start": 10, "stop": 20, "step": 5}, "rsi_buy": [25.0, 30.0]})
+    assert len(grid) == 6
+    assert sorted({g["ema_period"] for g in grid}) == [10, 15, 20]
+    assert all(isinstance(g["ema_period"], int) for g in grid)
+    assert grid[0]["rsi_period"] == 14  # standardvärden fylls i
+
+    with pytest.raises(ValueError):
+        expand_grid({"nope": [1]})
+
+
+async def _wait(job, timeout=30.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while job.state in ("pending", "running"):
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_sweep_ranks_results_from_process_pool():
+    svc = BacktestSweepService(max_workers=2)
+    ranges = {"ema_period": [10, 20], "rsi_period": [7, 14], "auto_regime": [False, True], "taker_fee": [0.0, 0.002]}
+    job = await svc.start("tTESTBTC:TESTUSD", "1m", ranges, rank_by="sharpe", candles=_candles())
+    await _wait(job)
+
+    snap = job.snapshot(top=100)
+    assert snap["state"] == "done"
+    assert snap["done"] == snap["total"] == 16
+    assert snap["configs_per_sec"] > 0
+    sharpes = [r["sharpe"] for r in snap["results"]]
+    assert sharpes == sorted(sharpes, reverse=True)
+    assert any(r["trades"] > 0 for r in snap["results"])
+
+    # Samma parametrar utan avgifter ger aldrig sämre slutkapital
+    by_params = {tuple(sorted(r["params"].items())): r for r in snap["results"]}
+    for r in snap["results"]:
+        if r["params"]["taker_fee"] == 0.0:
+            costly = dict(r["params"], taker_fee=0.002)
+            assert r["final_equity"] >= by_params[tuple(sorted(costly.items()))]["final_equity"]
+
+
+@pytest.mark.asyncio
+async def test_sweep_cancel_stops_job():
+    svc = BacktestSweepService(max_workers=1)
+    job = await svc.start(
+        "tTESTBTC:TESTUSD", "1m", {"ema_period": list(range(5, 105))}, rank_by="expectancy", candles=_candles(3000)
+    )
+    assert svc.cancel(job.id) is True
+    await _wait(job)
+    assert job.state == "cancelled"
+    assert job.done < len(job.configs)
+    assert svc.cancel(job.id) is False
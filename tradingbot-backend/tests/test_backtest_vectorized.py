@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from services.backtest import BacktestService
+
+
+def _candles(n: int = 400, seed: int = 7) -> list[list[float]]:
+    rnd = random.Random(seed)
+    base = 1_700_000_000_000
+    price = 100.0
+    out = []
+    for i in range(n):
+        o = price
+        price = max(1.0, price * (1.0 + rnd.gauss(0.0, 0.01)))
+        hi = max(o, price) * (1.0 + abs(rnd.gauss(0.0, 0.003)))
+        lo = min(o, price) * (1.0 - abs(rnd.gauss(0.0, 0.003)))
+        out.append([base + i * 3_600_000, o, price, hi, lo, 1.0])
+    return out
+
+
+@pytest.fixture
+def trading_prob_model(monkeypatch):
+    from services.prob_model import prob_model
+
+    monkeypatch.setattr(prob_model, "enabled", True)
+    monkeypatch.setattr(prob_model, "_loaded", True)
+    monkeypatch.setattr(
+        prob_model,
+        "model_meta",
+        {
+            "schema": ["ema", "rsi"],
+            "buy": {"w": [3.0, 1.0], "b": 0.0},
+            "sell": {"w": [-3.0, -1.0], "b": 0.0},
+        },
+    )
+    return prob_model
+
+
+@pytest.mark.parametrize("tz", [0, 120])
+def test_vectorized_backtest_matches_legacy_loop(trading_prob_model, tz):
+    candles = _candles()
+    svc = BacktestService()
+    legacy = svc.run_legacy(candles, tz)
+    fast = svc.run_vectorized(candles, tz)
+
+    assert legacy["trades"] > 5
+    assert fast == legacy
+
+
+def test_vectorized_backtest_without_model_holds(monkeypatch):
+    from services.prob_model import prob_model
+
+    monkeypatch.setattr(prob_model, "enabled", False)
+    candles = _candles(120)
+    svc = BacktestService()
+    fast = svc.run_vectorized(candles)
+    assert fast == svc.run_legacy(candles)
+    assert fast["trades"] == 0
+    assert fast["final_equity"] == 1000.0
+    assert len(fast["equity_curve"]) == 70
+
+
+def test_vectorized_backtest_short_history():
+    svc = BacktestService()
+    out = svc.run_vectorized(_candles(30))
+    assert out["success"] is True
+    assert out["trades"] == 0
+    assert out["equity_curve"] == []
@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+import time
+
+from utils.candle_cache import CandleCache
+
+
+def _rows(n: int, base: int = 1_700_000_000_000, px: float = 1.0):
+    return [[base + i * 60_000, px, px + i, px + i + 1, px, 2.0] for i in range(n)]
+
+
+def test_store_uses_single_connection_in_wal_mode(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"))
+    assert cache.store("tBTCUSD", "1m", [*_rows(100), ["bad"]]) == 100
+    conn = cache._conn
+    cache.load("tBTCUSD", "1m", 10)
+    cache.get_last("tBTCUSD", "1m")
+    assert cache._conn is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+    out = cache.load("tBTCUSD", "1m", 5)
+    assert [r[0] for r in out] == sorted((r[0] for r in _rows(100)), reverse=True)[:5]
+    assert cache.oldest_mts("tBTCUSD", "1m") == _rows(1)[0][0]
+    cache.close()
+
+
+def test_store_buffered_coalesces_and_flushes(tmp_path):
+    db = str(tmp_path / "c.sqlite3")
+    cache = CandleCache(db_path=db, flush_interval_ms=60_000)
+    rows = _rows(3)
+    cache.store_buffered("tETHUSD", "1m", rows)
+    # Samma bar uppdateras igen före flush -> coalescas
+    last = list(rows[-1])
+    last[2] = 99.0
+    cache.store_buffered("tETHUSD", "1m", [last])
+
+    # Ingenting på disk ännu (läs via separat anslutning)
+    with sqlite3.connect(db) as other:
+        assert other.execute("SELECT COUNT(*) FROM candles").fetchone()[0] == 0
+
+    assert cache.flush() == 3
+    st = cache.write_stats()
+    assert st["flushes"] == 1
+    assert st["rows_flushed"] == 3
+    assert st["rows_coalesced"] == 1
+    assert st["pending_rows"] == 0
+    assert st["last_flush_ms"] >= 0.0
+    assert cache.get_last("tETHUSD", "1m")[2] == 99.0
+    cache.close()
+
+
+def test_reads_see_buffered_rows_and_clear_drops_pending(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"), flush_interval_ms=60_000)
+    cache.store_buffered("tBTCUSD", "5m", _rows(4))
+    assert len(cache.load("tBTCUSD", "5m", 10)) == 4
+
+    cache.store_buffered("tBTCUSD", "5m", _rows(2, base=1_800_000_000_000))
+    cache.clear_symbol("tBTCUSD", "5m")
+    cache.flush()
+    assert cache.load("tBTCUSD", "5m", 10) == []
+    cache.close()
+
+
+def test_background_flusher_writes_on_interval(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"), flush_interval_ms=20)
+    cache.store_buffered("tBTCUSD", "1m", _rows(5))
+    deadline = time.time() + 2.0
+    while cache.write_stats()["rows_flushed"] < 5 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.write_stats()["rows_flushed"] == 5
+    cache.close()
+
+
+def test_load_sees_own_writes_while_background_flusher_runs(tmp_path):
+    cache = CandleCache(db_path=str(tmp_path / "c.sqlite3"), flush_interval_ms=1)
+    missing = []
+
+    class _SlowReleaseLock:
+        # Vidgar fönstret mellan buffert-byte och skrivning i flusher-tråden
+        def __init__(self) -> None:
+            self._lock = threading.Lock()
+
+        def __enter__(self):
+            return self._lock.__enter__()
+
+        def __exit__(self, *exc: object):
+            self._lock.__exit__(*exc)
+            if threading.current_thread().name == "candle-cache-flush":
+                time.sleep(0.002)
+
+    cache._pending_lock = _SlowReleaseLock()
+
+    def _writer(sym: str) -> None:
+        for i, row in enumerate(_rows(100)):
+            cache.store_buffered(sym, "1m", [row])
+            time.sleep(0.001)
+            # Read-your-writes: raden måste synas även om flushern tog den
+            if cache.load(sym, "1m", 1)[0][0] != row[0]:
+                missing.append((sym, i))
+
+    threads = [threading.Thread(target=_writer, args=(f"tT{n}USD",)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.write_stats()["flushes"] > 0
+    assert missing == []
+    cache.close()
@@ -0,0 +1,73 @@
+import tracemalloc
+from collections import deque
+
+import numpy as np
+import pytest
+
+from utils.candle_ring import CandleRingBuffer
+
+
+def _row(i: int, px: float = 100.0):
+    return [1_700_000_000_000 + i * 60_000, px + i, px + i + 0.5, px + i + 1.0, px + i - 1.0, 1.0 + i]
+
+
+def test_ring_matches_deque_reference_across_compactions():
+    ring = CandleRingBuffer(capacity=50)
+    ref: deque = deque(maxlen=50)
+    for i in range(333):
+        ring.upsert_row(_row(i))
+        ref.append(_row(i))
+        if i % 7 == 0:
+            # Uppdatering av pågående bar ersätter sista raden
+            upd = _row(i, px=200.0)
+            ring.upsert_row(upd)
+            ref[-1] = upd
+    assert ring.to_list() == [list(r) for r in ref]
+    assert ring.to_list(5) == [list(r) for r in ref][-5:]
+    assert ring.stats["compactions"] > 0
+    assert ring.upsert_row(_row(10)) is False  # äldre än senaste ignoreras
+
+
+def test_arrays_are_zero_copy_views():
+    ring = CandleRingBuffer(capacity=10)
+    for i in range(15):
+        ring.upsert_row(_row(i))
+    cols = ring.arrays(4)
+    assert cols["mts"].dtype == np.int64 and cols["close"].dtype == np.float64
+    assert np.shares_memory(cols["close"], ring._close)
+    assert cols["close"].tolist() == [r[2] for r in (_row(i) for i in range(11, 15))]
+    ring.upsert(*_row(14, px=0.0))
+    assert cols["close"][-1] == _row(14, px=0.0)[2]
+
+
+def test_in_place_updates_do_not_allocate_per_tick():
+    ring = CandleRingBuffer(capacity=500)
+    for i in range(500):
+        ring.upsert_row(_row(i))
+    row = _row(499)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for k in range(10_000):
+        ring.upsert(row[0], row[1], row[2] + k, row[3], row[4], row[5])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(s.size_diff for s in after.compare_to(before, "filename") if s.size_diff > 0)
+    assert grown < 4096
+
+
+@pytest.mark.asyncio
+async def test_ws_first_handler_fills_ring_and_serves_lists():
+    from services.ws_first_data_service import WSFirstDataService
+
+    svc = WSFirstDataService()
+    svc.candle_debounce_ms = 0
+    snapshot = [_row(i) for i in reversed(range(20))]  # nyast först som från Bitfinex
+    await svc._handle_ws_candles("tTESTRING:TESTUSD", "1m", snapshot)
+    await svc._handle_ws_candles("tTESTRING:TESTUSD", "1m", _row(19, px=300.0))
+
+    cols = svc.get_candle_arrays("tTESTRING:TESTUSD", "1m", 5)
+    assert cols["mts"].tolist() == [_row(i)[0] for i in range(15, 20)]
+    assert cols["close"][-1] == _row(19, px=300.0)[2]
+    out = await svc.get_candles("tTESTRING:TESTUSD", "1m", limit=3)
+    assert out == [_row(17), _row(18), _row(19, px=300.0)]
+    assert svc.get_indicator_snapshot("tTESTRING:TESTUSD", "1m") is not None
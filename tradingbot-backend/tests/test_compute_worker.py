@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from services.compute_worker import ComputeJobTimeoutError, ComputeWorker
+from utils.loop_lag import LoopLagMonitor
+
+
+def _square(x):
+    return x * x
+
+
+def _spin(seconds):
+    # CPU-bunden loop (ingen sleep) som skulle blockera event loopen
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def _fail():
+    raise ValueError("boom")
+
+
+@pytest.mark.asyncio
+async def test_compute_worker_runs_jobs_and_reports_errors():
+    worker = ComputeWorker(processes=1, default_timeout=30)
+    try:
+        assert await worker.run("test", _square, 7) == 49
+        job = worker.submit("test", _fail)
+        with pytest.raises(ValueError):
+            await job
+        assert job.state == "error" and "boom" in (job.error or "")
+        stats = worker.get_stats()
+        assert {"kind": "test", "state": "done", "count": 1} in stats["jobs_total"]
+    finally:
+        await worker.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_compute_worker_timeout_and_cancel_recycle_process():
+    worker = ComputeWorker(processes=1, default_timeout=30)
+    try:
+        with pytest.raises(ComputeJobTimeoutError):
+            await worker.run("slow", _spin, 10.0, timeout=0.5)
+
+        job = worker.submit("slow", _spin, 10.0)
+        queued = worker.submit("slow", _square, 3)
+        assert queued.cancel() is True
+        await asyncio.sleep(0.3)
+        assert job.state == "running"
+        assert worker.cancel(job.id) is True
+        with pytest.raises(asyncio.CancelledError):
+            await job
+        assert job.state == "cancelled" and queued.state == "cancelled"
+
+        # Sloten får en ny process efter terminering
+        assert await worker.run("test", _square, 4) == 16
+    finally:
+        await worker.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_cpu_job():
+    worker = ComputeWorker(processes=1, default_timeout=30)
+    monitor = LoopLagMonitor(interval=0.02)
+    try:
+        await worker.run("warmup", _square, 1)
+        monitor.start()
+        assert await worker.run("train", _spin, 1.0) > 0
+        stats = monitor.get_stats()
+        assert stats["samples"] >= 10
+        assert stats["max_ms"] < 250
+    finally:
+        await monitor.stop()
+        await worker.shutdown()
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from services.cost_aware_backtest import CostAwareBacktestService, TradeCosts
+
+
+def _candles(n: int = 400, seed: int = 7) -> list[list[float]]:
+    rnd = random.Random(seed)
+    base = 1_700_000_000_000
+    price = 100.0
+    out = []
+    for i in range(n):
+        o = price
+        price = max(1.0, price * (1.0 + rnd.gauss(0.0, 0.01)))
+        hi = max(o, price) * (1.0 + abs(rnd.gauss(0.0, 0.003)))
+        lo = min(o, price) * (1.0 - abs(rnd.gauss(0.0, 0.003)))
+        out.append([base + i * 60_000, o, price, hi, lo, 1.0])
+    return out
+
+
+@pytest.fixture
+def trading_prob_model(monkeypatch):
+    from services.prob_model import prob_model
+
+    monkeypatch.setattr(prob_model, "enabled", True)
+    monkeypatch.setattr(prob_model, "_loaded", True)
+    monkeypatch.setattr(
+        prob_model,
+        "model_meta",
+        {
+            "schema": ["ema", "rsi"],
+            "buy": {"w": [3.0, 1.0], "b": 0.0},
+            "sell": {"w": [-3.0, -1.0], "b": 0.0},
+        },
+    )
+    return prob_model
+
+
+def test_monte_carlo_is_seeded_and_reports_distributions(trading_prob_model):
+    svc = CostAwareBacktestService()
+    candles = _candles()
+
+    a = svc.simulate_monte_carlo(candles, n_paths=300, seed=42)
+    b = svc.simulate_monte_carlo(candles, n_paths=300, seed=42)
+    c = svc.simulate_monte_carlo(candles, n_paths=300, seed=43)
+
+    assert a == b
+    assert a.final_equity != c.final_equity
+    assert a.total_trades > 5
+    for dist in (a.final_equity, a.sharpe_ratio, a.max_drawdown):
+        assert dist["p5"] <= dist["p50"] <= dist["p95"]
+    assert a.final_equity["p5"] < a.final_equity["p95"]
+    assert 0.0 < a.avg_fill_ratio <= 1.0
+
+
+def test_monte_carlo_costs_reduce_equity(trading_prob_model):
+    svc = CostAwareBacktestService()
+    candles = _candles()
+    free = TradeCosts(maker_fee=0.0, taker_fee=0.0, spread_bps=0.0, slippage_bps=0.0, partial_fill_prob=0.0)
+    costly = TradeCosts(maker_fee=0.002, taker_fee=0.004, spread_bps=20.0, slippage_bps=10.0, partial_fill_prob=0.0)
+
+    res_free = svc.simulate_monte_carlo(candles, costs=free, n_paths=200, seed=1)
+    res_costly = svc.simulate_monte_carlo(candles, costs=costly, n_paths=200, seed=1)
+    assert res_costly.final_equity["p50"] < res_free.final_equity["p50"]
+    assert res_free.total_fees["p95"] == 0.0
+
+
+def test_monte_carlo_without_signals_keeps_capital(monkeypatch):
+    from services.prob_model import prob_model
+
+    monkeypatch.setattr(prob_model, "enabled", False)
+    res = CostAwareBacktestService().simulate_monte_carlo(_candles(120), initial_capital=5000.0, n_paths=10)
+    assert res.total_trades == 0
+    assert res.final_equity["p5"] == res.final_equity["p95"] == 5000.0
@@ -0,0 +1,50 @@
+import itertools
+import json
+import threading
+
+from utils.nonce_manager import NonceAllocator
+
+
+def test_concurrent_nonces_unique_increasing_with_few_writes(tmp_path):
+    path = tmp_path / "nonces.json"
+    alloc = NonceAllocator(path=path, block_us=10_000_000)
+    threads, per_thread = 16, 5_000
+    results: list[list[int]] = [[] for _ in range(threads)]
+    start = threading.Barrier(threads)
+
+    def worker(i: int) -> None:
+        start.wait()
+        out = results[i]
+        for _ in range(per_thread):
+            out.append(alloc.next("key"))
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+
+    flat = [n for r in results for n in r]
+    assert len(set(flat)) == threads * per_thread
+    for r in results:
+        assert all(b > a for a, b in itertools.pairwise(r))
+    # 80k nonces ska inte kosta mer än ett fåtal diskskrivningar
+    assert alloc.writes <= 3
+    assert json.loads(path.read_text())["key"] > max(flat)
+
+
+def test_restart_never_reuses_nonces(tmp_path):
+    path = tmp_path / "nonces.json"
+    first = NonceAllocator(path=path, block_us=10_000_000)
+    issued = [first.next("k") for _ in range(1_000)]
+    bumped = first.bump("k", 2_000_000)
+    assert bumped >= issued[-1] + 2_000_000
+
+    # "Krasch" mitt i blocket: ny allokator läser bara den sparade gränsen
+    second = NonceAllocator(path=path, block_us=10_000_000)
+    assert second.next("k") > bumped
+    assert second.next("other") > 0
+
+    # Korrupt fil => start från nuvarande tid utan undantag
+    path.write_text("{not json")
+    assert NonceAllocator(path=path).next("k") > 0
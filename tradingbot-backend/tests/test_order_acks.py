@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from services.order_acks import OrderAckRegistry
+
+
+def _order_row(oid, cid, status="ACTIVE"):
+    row = [None] * 32
+    row[0], row[2], row[3], row[13] = oid, cid, "tBTCUSD", status
+    return row
+
+
+@pytest.mark.asyncio
+async def test_registry_resolves_notifications_and_times_out():
+    reg = OrderAckRegistry(default_timeout=0.05)
+
+    ok = reg.register("ou", order_id=11)
+    reg.resolve([0, "n", [0, "ou-req", None, None, _order_row(11, 1), None, "SUCCESS", "Updating."]])
+    ack = await reg.wait(ok)
+    assert ack["acked"] is True and ack["order_id"] == 11 and ack["latency_ms"] >= 0
+
+    bad = reg.register("on", cid=42)
+    reg.resolve([0, "n", [0, "on-req", None, None, _order_row(None, 42), None, "ERROR", "not enough balance"]])
+    ack = await reg.wait(bad)
+    assert ack["acked"] is False and ack["text"] == "not enough balance"
+
+    # Fel op för samma id löser inte posten; timeout räknas
+    lost = reg.register("oc", order_id=12)
+    reg.resolve([0, "ou", _order_row(12, 2)])
+    assert (await reg.wait(lost))["status"] == "timeout"
+
+    st = reg.get_stats()
+    assert st["pending"] == 0
+    assert st["ops"]["ou"]["acked"] == 1 and st["ops"]["ou"]["latency"]["count"] == 1
+    assert st["ops"]["on"]["rejected"] == 1
+    assert st["ops"]["oc"]["timeouts"] == 1
+    assert st["ops"]["ou"]["latency"]["buckets"]["+Inf"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fill_events_do_not_resolve_update_or_cancel_requests():
+    reg = OrderAckRegistry(default_timeout=0.05)
+
+    # Delfyllnad ger ou; först notifikationen bekräftar uppdateringen
+    upd = reg.register("ou", order_id=21)
+    assert reg.resolve([0, "ou", _order_row(21, 3, "PARTIALLY FILLED @ 100.0(0.005)")]) == 0
+    assert not upd.future.done()
+    reg.resolve([0, "n", [0, "ou-req", None, None, _order_row(21, 3), None, "SUCCESS", "Updating."]])
+    ack = await reg.wait(upd)
+    assert ack["acked"] is True and ack["fill_status"].startswith("PARTIALLY FILLED")
+
+    # Helt fylld order ger oc, men cancel-kommandot misslyckas
+    cancel = reg.register("oc", order_id=22)
+    assert reg.resolve([0, "oc", _order_row(22, 4, "EXECUTED @ 100.0(0.01)")]) == 0
+    reg.resolve([0, "n", [0, "oc-req", None, None, _order_row(22, 4), None, "ERROR", "Order not found."]])
+    ack = await reg.wait(cancel)
+    assert ack["acked"] is False and ack["fill_status"].startswith("EXECUTED")
+
+    # Utan notifikation: timeout, men fillen syns i svaret
+    lost = reg.register("oc", order_id=23)
+    reg.resolve([0, "oc", _order_row(23, 5, "EXECUTED @ 100.0(0.01)")])
+    ack = await reg.wait(lost)
+    assert ack["status"] == "timeout" and ack["fill_status"].startswith("EXECUTED")
+    assert reg.stats["oc"]["rejected"] == 1 and reg.stats["oc"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ws_order_ops_waits_for_ack(monkeypatch):
+    import services.bitfinex_websocket as bws
+    from services.bitfinex_websocket import BitfinexWebSocketService
+
+    reg = OrderAckRegistry(default_timeout=1.0)
+    monkeypatch.setattr(bws, "order_acks", reg)
+    svc = BitfinexWebSocketService()
+
+    async def _auth_ok():
+        return True
+
+    monkeypatch.setattr(svc, "ensure_authenticated", _auth_ok)
+
+    class _FakeWS:
+        closed = False
+
+        async def send(self, raw):
+            msg = json.loads(raw)
+            assert msg[1] == "ops"
+            cid = msg[3][0][1]["cid"]
+            # Bitfinex svarar asynkront med on-händelsen för ordern
+            asyncio.get_running_loop().call_later(
+                0.01,
+                lambda: asyncio.ensure_future(svc._handle_channel_message([0, "on", _order_row(777, cid)])),
+            )
+
+    svc.websocket = _FakeWS()
+    res = await svc.order_ops([["on", {"symbol": "tBTCUSD", "amount": 0.01, "type": "EXCHANGE LIMIT"}]], wait_ack=True)
+    assert res["success"] is True
+    assert res["acks"][0]["order_id"] == 777
+    assert reg.get_stats()["ops"]["on"]["latency"]["count"] == 1
@@ -0,0 +1,91 @@
+import zlib
+
+import pytest
+
+from services.bitfinex_websocket import bitfinex_ws
+from services.order_book import OrderBook
+
+SNAPSHOT = [
+    [100.0, 2, 1.5],
+    [99.5, 1, 2.0],
+    [99.0, 3, 0.00001],
+    [100.5, 1, -1.0],
+    [101.0, 4, -3.0],
+]
+
+
+def _signed_crc(s: str) -> int:
+    crc = zlib.crc32(s.encode())
+    return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+
+def test_snapshot_delta_and_queries():
+    book = OrderBook("tBTCUSD")
+    book.apply_snapshot(SNAPSHOT)
+    assert book.best_bid() == (100.0, 1.5) and book.best_ask() == (100.5, 1.0)
+    assert book.spread() == 0.5 and book.mid() == 100.25
+
+    book.apply_delta([100.25, 1, 0.5])  # ny bästa bid
+    book.apply_delta([101.0, 0, -1])  # ta bort ask-nivå
+    book.apply_delta([99.5, 2, 4.0])  # uppdatera befintlig nivå
+    assert book.best_bid() == (100.25, 0.5)
+    assert book.depth(2) == {"bids": [(100.25, 0.5), (100.0, 1.5)], "asks": [(100.5, 1.0)]}
+    assert book.vwap(1.0, "sell") == pytest.approx((0.5 * 100.25 + 0.5 * 100.0) / 1.0)
+    assert book.vwap(2.0, "buy") is None  # djupet räcker inte
+    assert len(book) == 5
+
+
+def test_checksum_matches_bitfinex_string_format():
+    book = OrderBook("tBTCUSD")
+    book.apply_snapshot(SNAPSHOT)
+    # Bid/ask interfolierat från bästa nivå; belopp som JS formaterar dem
+    expected = _signed_crc("100:1.5:100.5:-1:99.5:2:101:-3:99:0.00001")
+    assert book.checksum() == expected
+    assert book.verify(expected) and book.synced
+    assert not book.verify(expected + 1)
+    assert not book.synced
+    assert book.apply_delta([100.0, 1, 1.0]) is False  # väntar på snapshot
+
+
+@pytest.mark.asyncio
+async def test_ws_checksum_mismatch_triggers_resync(monkeypatch):
+    class DummyWS:
+        def __init__(self):
+            self.sent = []
+            self.closed = False
+
+        async def send(self, msg):
+            self.sent.append(msg)
+
+    ws = DummyWS()
+    key = "book|tBKUSD|P0|F0|25"
+    book = OrderBook("tBKUSD")
+    monkeypatch.setattr(bitfinex_ws, "websocket", ws)
+    monkeypatch.setitem(bitfinex_ws.order_books, key, book)
+    monkeypatch.setitem(bitfinex_ws.subscriptions, key, {"event": "subscribe", "channel": "book", "symbol": "tBKUSD"})
+    monkeypatch.setitem(bitfinex_ws.callbacks, key, lambda _p: None)
+    monkeypatch.setitem(bitfinex_ws._sub_socket, key, ws)
+
+    await bitfinex_ws._handle_event_message(
+        {"event": "subscribed", "channel": "book", "symbol": "tBKUSD", "chanId": 77}
+    )
+    await bitfinex_ws._handle_channel_message([77, SNAPSHOT])
+    await bitfinex_ws._handle_channel_message([77, [100.0, 0, 1]])
+    await bitfinex_ws._handle_channel_message([77, "cs", book.checksum()])
+    assert book.synced and book.best_bid() == (99.5, 2.0)
+
+    await bitfinex_ws._handle_channel_message([77, "cs", 12345])
+    assert not book.synced and len(book) == 0
+    assert '"unsubscribe"' in ws.sent[-1]
+
+    await bitfinex_ws._handle_event_message({"event": "unsubscribed", "status": "OK", "chanId": 77})
+    assert '"subscribe"' in ws.sent[-1]
+    await bitfinex_ws._handle_event_message(
+        {"event": "subscribed", "channel": "book", "symbol": "tBKUSD", "chanId": 78}
+    )
+    await bitfinex_ws._handle_channel_message([78, SNAPSHOT])
+    assert book.synced and key not in bitfinex_ws._book_resyncing
+    for k in [k for k in bitfinex_ws._chan_info if k[0] is ws]:
+        bitfinex_ws._chan_info.pop(k, None)
+        bitfinex_ws._chan_callbacks.pop(k, None)
+    bitfinex_ws._chanid_by_subkey.pop((ws, key), None)
@@ -48,3 +48,46 @@ def test_build_dataset_alignment():
     row = ds[0]
     for key in ("ema_diff", "rsi_norm", "atr_pct", "price", "label"):
         assert key in row
+
+
+def _reference_dataset(candles, horizon, tp, sl):
+    # Ursprunglig O(n²)-byggare: features per prefix candles[: i + 1]
+    from services.prob_features import compute_features_from_candles, label_sequence
+
+    labels = label_sequence(candles, horizon, tp, sl)
+    return [{**compute_features_from_candles(candles[: i + 1]), "label": labels[i]} for i in range(len(labels))]
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_build_dataset_matches_reference_bit_for_bit(seed):
+    import numpy as np
+
+    from services.prob_features import build_dataset
+
+    rng = np.random.default_rng(seed)
+    n = 10 + 15 * seed
+    px = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    if seed % 2:
+        px = np.round(px, 1)
+    candles = [[0, 0, float(p), float(p * 1.004), float(p * 0.996), 1] for p in px]
+    if seed >= 3:
+        # Ogiltiga rader hoppas över men räknas i råprefixet
+        candles.insert(4, [0, 1])
+        candles.insert(1, None)
+
+    for horizon in (0, 1, 5, 12):
+        assert build_dataset(candles, horizon, 0.01, 0.01) == _reference_dataset(candles, horizon, 0.01, 0.01)
+
+
+def test_build_dataset_arrays_feed_to_xy_columns():
+    import numpy as np
+
+    from services.prob_features import FEATURE_SCHEMA, build_dataset, build_dataset_arrays
+
+    candles = [[0, 0, 100 + (i % 7), 101 + (i % 7), 99 + (i % 7), 1] for i in range(60)]
+    ds = build_dataset_arrays(candles, horizon=5, tp=0.01, sl=0.01)
+    rows = build_dataset(candles, horizon=5, tp=0.01, sl=0.01)
+    assert ds.X.shape == (len(rows), len(FEATURE_SCHEMA))
+    assert np.array_equal(ds.X, np.array([[r[k] for k in FEATURE_SCHEMA] for r in rows]))
+    assert ds.labels.tolist() == [r["label"] for r in rows]
+    assert len(build_dataset_arrays(candles[:3], horizon=5, tp=0.01, sl=0.01)) == 0
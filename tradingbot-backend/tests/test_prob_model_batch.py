@@ -0,0 +1,106 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+META = {
+    "schema": ["ema_diff", "rsi_norm", "atr_pct"],
+    "buy": {"w": [40.0, -1.5, 3.0], "b": -0.4, "calib": {"a": 1.2, "b": 0.1}},
+    "sell": {"w": [-35.0, 1.2], "b": -0.6, "calib": {"a": 0.9, "b": -0.05}},
+}
+
+
+def _reference(meta, features):
+    # Tidigare skalära implementation (loop + math.exp per komponent)
+    x = [float(features.get(k, 0.0)) for k in meta["schema"]]
+
+    def score(key):
+        comp = meta.get(key)
+        if not comp:
+            return 0.0
+        w = comp["w"]
+        z = sum(float(w[i]) * x[i] for i in range(min(len(w), len(x)))) + float(comp["b"])
+        return 1.0 / (1.0 + math.exp(-(comp["calib"]["a"] * z + comp["calib"]["b"])))
+
+    pb, ps = score("buy"), score("sell")
+    ph = max(0.0, 1.0 - (pb + ps))
+    total = pb + ps + ph
+    return [pb / total, ps / total, ph / total]
+
+
+def _model(meta):
+    from services.prob_model import ProbabilityModel
+
+    pm = ProbabilityModel()
+    pm.enabled = True
+    pm._loaded = True  # noqa: SLF001
+    pm.model_meta = meta
+    return pm
+
+
+def test_predict_proba_batch_matches_scalar_reference():
+    pm = _model(META)
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.normal(0, 0.02, 2000), rng.uniform(-1, 1, 2000), rng.uniform(0, 0.01, 2000)])
+
+    probs = pm.predict_proba_batch(X)
+    assert probs.shape == (2000, 3)
+    ref = np.array([_reference(META, dict(zip(META["schema"], row, strict=True))) for row in X.tolist()])
+    np.testing.assert_allclose(probs, ref, rtol=1e-12, atol=1e-15)
+
+    single = pm.predict_proba(dict(zip(META["schema"], X[7].tolist(), strict=True)))
+    assert [single["buy"], single["sell"], single["hold"]] == pytest.approx(ref[7].tolist(), rel=1e-12)
+
+
+def test_predict_proba_batch_maps_columns_and_falls_back():
+    pm = _model(META)
+    X = np.array([[0.01, 0.3], [-0.02, -0.5]])
+    # atr_pct saknas i indata -> 0, extra kolumn ignoreras
+    mapped = pm.predict_proba_batch(
+        np.column_stack([X[:, 1], X[:, 0], [9.0, 9.0]]), columns=("rsi_norm", "ema_diff", "x")
+    )
+    direct = pm.predict_proba_batch(np.column_stack([X, np.zeros(2)]))
+    np.testing.assert_array_equal(mapped, direct)
+
+    pm.enabled = False
+    np.testing.assert_array_equal(pm.predict_proba_batch(X, columns=("ema_diff", "rsi_norm")), [[0, 0, 1], [0, 0, 1]])
+
+
+def test_reload_swaps_compiled_model_atomically(tmp_path):
+    pm = _model(META)
+    before = pm._model  # noqa: SLF001
+    path = tmp_path / "model.json"
+    path.write_text(json.dumps({**META, "buy": {**META["buy"], "b": 2.0}}), encoding="utf-8")
+    pm.settings = pm.settings.model_copy(update={"PROB_MODEL_FILE": str(path)})
+
+    assert pm.reload() is True
+    assert pm._model is not before  # noqa: SLF001
+    # Den gamla kompilerade modellen är oförändrad för pågående anrop
+    x = np.array([[0.0, 0.0, 0.0]])
+    assert before.predict(x)[0, 0] < pm.predict_proba_batch(x)[0, 0]
+    assert pm.model_meta["buy"]["b"] == 2.0
+
+
+def test_validate_on_candles_matches_per_sample_scores(monkeypatch):
+    from services import prob_validation
+    from services.prob_features import build_dataset
+
+    pm = _model(META)
+    monkeypatch.setattr(prob_validation, "prob_model", pm)
+    rng = np.random.default_rng(3)
+    px = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, 400)))
+    candles = [[0, 0, float(p), float(p * 1.002), float(p * 0.998), 1] for p in px]
+
+    res = prob_validation.validate_on_candles(candles, horizon=10, tp=0.004, sl=0.004, max_samples=300)
+    rows = build_dataset(candles, horizon=10, tp=0.004, sl=0.004)[-300:]
+    briers, losses = [], []
+    for row in rows:
+        p = dict(zip(("buy", "sell", "hold"), _reference(META, row), strict=True))
+        y = {k: 1.0 if k == row["label"] else 0.0 for k in p}
+        briers.append(sum((p[k] - y[k]) ** 2 for k in p))
+        losses.append(-math.log(max(p[row["label"]], 1e-12)))
+    assert res["samples"] == 300
+    assert res["brier"] == pytest.approx(sum(briers) / 300, rel=1e-9)
+    assert res["logloss"] == pytest.approx(sum(losses) / 300, rel=1e-9)
+    assert sum(v["n"] for v in res["by_label"].values()) == 300
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+import pytest
+
+from services.prob_features import FEATURE_SCHEMA, build_dataset_arrays
+from services.prob_train import train_and_export
+
+
+def _candles(n: int = 600, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    px = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    return [[i * 60_000, float(p), float(p), float(p * 1.002), float(p * 0.998), 1.0] for i, p in enumerate(px)]
+
+
+def test_train_and_export_fits_on_dataset_arrays(tmp_path, monkeypatch):
+    from services.prob_model import ProbabilityModel
+
+    monkeypatch.chdir(tmp_path)
+    candles = _candles()
+    model = train_and_export(candles, horizon=10, tp=0.004, sl=0.004, out_path="config/models/TESTUSD_1m.json")
+
+    written = tmp_path / "config" / "models" / "TESTUSD_1m.json"
+    assert json.loads(written.read_text(encoding="utf-8")) == model
+    assert model["schema"] == list(FEATURE_SCHEMA)
+    for side in ("buy", "sell"):
+        assert len(model[side]["w"]) == len(FEATURE_SCHEMA)
+        assert np.isfinite([*model[side]["w"], model[side]["b"], *model[side]["calib"].values()]).all()
+
+    # Den exporterade modellen poängsätter samma matris som träningen byggde
+    ds = build_dataset_arrays(candles, horizon=10, tp=0.004, sl=0.004)
+    pm = ProbabilityModel()
+    pm.enabled = True
+    pm._loaded = True  # noqa: SLF001
+    pm.model_meta = model
+    probs = pm.predict_proba_batch(ds.X)
+    assert probs.shape == (len(ds), 3)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0)
+
+
+@pytest.mark.parametrize("out_path", ["../escape.json", "/tmp/abs.json", "config/models/model.txt"])
+def test_train_and_export_rejects_unsafe_paths(tmp_path, monkeypatch, out_path):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError):
+        train_and_export(_candles(120), horizon=10, tp=0.004, sl=0.004, out_path=out_path)
+    assert not list(tmp_path.rglob("*.json"))
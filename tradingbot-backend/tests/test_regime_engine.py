@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from indicators.regime import compute_regime, detect_regime
+from indicators.series import adx_series, ema_series, ema_z_series
+from services.incremental_indicators import EMAZState
+from services.regime_engine import RegimeEngine
+
+
+def _candles(n: int = 400, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.cumprod(1.0 + rng.normal(0.0, 0.01, n))
+    high = close * (1.0 + np.abs(rng.normal(0.0, 0.004, n)))
+    low = close * (1.0 - np.abs(rng.normal(0.0, 0.004, n)))
+    base = 1_700_000_000_000
+    return [[base + i * 60_000, float(close[i]), float(close[i]), float(high[i]), float(low[i]), 1.0] for i in range(n)]
+
+
+def test_emaz_state_matches_batch_series():
+    closes = [c[2] for c in _candles(700)]
+    state = EMAZState(fast=3, slow=7, z_win=200)
+    streamed = np.array([state.update(c) for c in closes])
+    np.testing.assert_allclose(streamed, ema_z_series(closes, 3, 7, 200), rtol=1e-6, atol=1e-6)
+
+
+def test_emaz_state_is_stable_on_flat_tail_after_volatility():
+    rng = np.random.default_rng(0)
+    # Volatil period följd av helt platta closes (illikvid/haltad symbol)
+    closes = np.concatenate([12345.0 * np.cumprod(1.0 + rng.normal(0.0, 0.02, 300)), np.full(400, 12345.0)])
+    slope = ema_series(closes, 3) - ema_series(closes, 7)
+    expected = np.array(
+        [
+            (slope[i] - slope[max(0, i - 199) : i + 1].mean()) / (slope[max(0, i - 199) : i + 1].std() + 1e-9)
+            for i in range(700)
+        ]
+    )
+    state = EMAZState(fast=3, slow=7, z_win=200)
+    streamed = np.array([state.update(float(c)) for c in closes])
+    np.testing.assert_allclose(streamed, expected, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(streamed, ema_z_series(closes, 3, 7, 200), rtol=1e-6, atol=1e-6)
+    assert abs(streamed[562]) < 1.0
+
+    flat = EMAZState(fast=3, slow=7, z_win=50)
+    assert [flat.update(12345.0) for _ in range(100)] == [0.0] * 100
+
+
+def test_streaming_updates_match_full_recompute():
+    candles = _candles(400)
+    engine = RegimeEngine()
+    # Kallstart med historik i REST-ordning (nyast först)
+    engine.seed("tTEST", "1m", list(reversed(candles[:100])))
+    for row in candles[100:]:
+        # Pågående bar uppdateras flera gånger innan den stängs
+        engine.on_candles("tTEST", "1m", [row[0], row[1], row[2] * 1.01, row[3], row[4], row[5]])
+        snap = engine.on_candles("tTEST", "1m", row)
+
+    closed = candles[:-1]
+    highs = [c[3] for c in closed]
+    lows = [c[4] for c in closed]
+    closes = [c[2] for c in closed]
+    assert snap.adx_value == adx_series(highs, lows, closes, 14)[-1]
+    assert snap.ema_z_value == pytest.approx(ema_z_series(closes, 3, 7, 200)[-1], rel=1e-6, abs=1e-6)
+    assert snap.regime == detect_regime(highs, lows, closes, engine.cfg)
+    assert snap.last_close == candles[-1][2]
+    assert snap.bars == len(closed)
+    assert engine.stats["seeds"] == 1
+
+
+def test_lookup_age_and_snapshot_resync():
+    engine = RegimeEngine()
+    candles = _candles(60)
+    assert engine.on_candles("tTEST", "1m", candles[0]) is None  # inget seed ännu
+    engine.on_candles("tTEST", "1m", list(reversed(candles)))  # WS-snapshot => seed
+    assert engine.get("tTEST", "1m").bars == 59
+    assert engine.get("tTEST", "1m", max_age_s=-1.0) is None
+    engine.invalidate("tTEST")
+    assert engine.get("tTEST", "1m") is None
+
+
+def test_compute_regime_returns_values_used_for_label():
+    candles = _candles(120)
+    highs, lows, closes = ([c[i] for c in candles] for i in (3, 4, 2))
+    cfg = {"ADX_HIGH": 30, "ADX_LOW": 15, "SLOPE_Z_HIGH": 1.0, "SLOPE_Z_LOW": 0.5}
+    res = compute_regime(highs, lows, closes, cfg)
+    assert res.regime == detect_regime(highs, lows, closes, cfg)
+    assert res.adx_value == adx_series(highs, lows, closes, 14)[-1]
+    assert res.ema_z_value == ema_z_series(closes, 3, 7, 200)[-1]
+    assert res.thresholds == {"adx_high": 30.0, "adx_low": 15.0, "slope_z_high": 1.0, "slope_z_low": 0.5}
+    assert compute_regime(highs[:10], lows[:10], closes[:10], cfg).adx_value is None
+
+
+def test_result_for_candles_is_memoized_per_last_candle():
+    engine = RegimeEngine()
+    candles = list(reversed(_candles(80)))
+    first = engine.result_for_candles("tTEST", "1m", candles)
+    assert engine.result_for_candles("tTEST", "1m", list(candles)) is first
+    assert first.last_mts == candles[0][0]
+    # Ny pågående close under samma mts => ny beräkning
+    moved = [[candles[0][0], candles[0][1], candles[0][2] * 1.05, candles[0][3] * 1.05, candles[0][4], 1.0]]
+    second = engine.result_for_candles("tTEST", "1m", moved + candles[1:])
+    assert second is not first and second.last_close == moved[0][2]
+    assert engine.get_stats()["memo_hits"] == 1
+    assert engine.result_for_candles("tTEST", "1m", candles[:10]) is None
@@ -0,0 +1,51 @@
+import json
+from datetime import UTC, datetime
+
+import numpy as np
+import pytest
+
+from services.compute_worker import ComputeWorker
+
+
+class _FakeData:
+    async def get_candles(self, _symbol: str, _timeframe: str, _limit: int):
+        rng = np.random.default_rng(1)
+        px = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, 400)))
+        return [[i * 60_000, float(p), float(p), float(p * 1.002), float(p * 0.998), 1.0] for i, p in enumerate(px)]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_retrain_runs_in_compute_worker(tmp_path, monkeypatch):
+    import services.compute_worker as cw
+    import services.market_data_facade as mdf
+    from services.metrics import metrics_store
+    from services.scheduler import SchedulerService, settings
+    from services.symbols import SymbolService
+
+    async def _no_refresh(_self):
+        return None
+
+    # Modellen skrivs under config/models relativt arbetskatalogen
+    monkeypatch.chdir(tmp_path)
+    worker = ComputeWorker(processes=1, default_timeout=60)
+    monkeypatch.setattr(cw, "get_compute_worker", lambda: worker)
+    monkeypatch.setattr(mdf, "get_market_data", _FakeData)
+    monkeypatch.setattr(SymbolService, "refresh", _no_refresh)
+    monkeypatch.setattr(settings, "PROB_RETRAIN_ENABLED", True)
+    monkeypatch.setattr(settings, "PROB_RETRAIN_SYMBOLS", "tTESTUSD")
+    monkeypatch.setattr(settings, "PROB_RETRAIN_TIMEFRAME", "1m")
+    monkeypatch.setattr(settings, "PROB_RETRAIN_OUTPUT_DIR", "config/models")
+    monkeypatch.setattr(settings, "PROB_MODEL_TIME_HORIZON", 10)
+    monkeypatch.setattr(settings, "PROB_MODEL_EV_THRESHOLD", 0.004)
+    monkeypatch.setitem(metrics_store, "prob_retrain", {})
+
+    sch = SchedulerService()
+    try:
+        await sch._maybe_run_prob_retraining(datetime.now(UTC))
+        assert metrics_store["prob_retrain"].get("events") == 1, metrics_store["prob_retrain"]
+        model = json.loads((tmp_path / "config" / "models" / "TESTUSD_1m.json").read_text(encoding="utf-8"))
+        assert len(model["buy"]["w"]) == len(model["schema"])
+        assert {"kind": "prob_retrain", "state": "done", "count": 1} in worker.get_stats()["jobs_total"]
+        assert sch._last_prob_retrain_at is not None
+    finally:
+        await worker.shutdown()
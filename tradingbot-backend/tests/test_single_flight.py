@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_fetch():
+    sf = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return [1, 2, 3]
+
+    results = await asyncio.gather(*(sf.do("candles", ("tBTCUSD", "1m", 50), fetch) for _ in range(10)))
+    assert calls == 1
+    assert all(r == [1, 2, 3] for r in results)
+
+    # Ny nyckel och nytt anrop efter att första flygningen landat
+    await sf.do("candles", ("tBTCUSD", "5m", 50), fetch)
+    await sf.do("candles", ("tBTCUSD", "1m", 50), fetch)
+    assert calls == 3
+
+    sf.note_hit("candles")
+    st = sf.get_stats()
+    assert st["inflight"] == 0
+    assert st["namespaces"]["candles"] == {"hits": 1, "misses": 3, "coalesced": 9}
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_and_cancelled_waiter_does_not_abort_fetch():
+    sf = SingleFlight()
+    gate = asyncio.Event()
+
+    async def boom():
+        await gate.wait()
+        raise RuntimeError("rest down")
+
+    waiters = [asyncio.create_task(sf.do("margin", "info", boom)) for _ in range(3)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert all(isinstance(r, RuntimeError) for r in results[1:])
+    assert sf.inflight() == 0
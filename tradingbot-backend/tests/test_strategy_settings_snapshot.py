@@ -0,0 +1,70 @@
+import builtins
+import json
+import os
+from typing import Any
+
+import services.strategy_settings as ss
+from services.strategy_settings import StrategySettingsService, reload_strategy_settings
+
+
+def _svc(tmp_path, base: dict, overrides: dict | None = None) -> StrategySettingsService:
+    svc = StrategySettingsService()
+    svc.file_path = str(tmp_path / "strategy_settings.json")
+    svc.overrides_path = str(tmp_path / "strategy_settings.overrides.json")
+    (tmp_path / "strategy_settings.json").write_text(json.dumps(base), encoding="utf-8")
+    if overrides is not None:
+        (tmp_path / "strategy_settings.overrides.json").write_text(json.dumps(overrides), encoding="utf-8")
+    return svc
+
+
+def test_repeated_reads_do_not_reopen_files(tmp_path, monkeypatch):
+    svc = _svc(tmp_path, {"ema_period": 21, "AUTO_REGIME_ENABLED": False}, {"tBTCUSD": {"rsi_period": 7}})
+    assert svc.get_settings().ema_period == 21
+
+    opened = []
+    real_open = builtins.open
+
+    def _counting_open(path: str, *args: Any, **kwargs: Any):
+        opened.append(str(path))
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", _counting_open)
+    for _ in range(500):
+        s = svc.get_settings(symbol="tBTCUSD")
+        assert s.rsi_period == 7 and s.ema_period == 21
+        assert svc.get_raw()["AUTO_REGIME_ENABLED"] is False
+    assert not [p for p in opened if p.startswith(str(tmp_path))]
+    assert svc._snapshot.stats["loads"] == 1
+
+
+def test_returned_settings_are_copies(tmp_path):
+    svc = _svc(tmp_path, {"ema_period": 10})
+    s = svc.get_settings()
+    s.ema_period = 99
+    assert svc.get_settings().ema_period == 10
+
+
+def test_mtime_change_and_reload_hook_invalidate(tmp_path, monkeypatch):
+    svc = _svc(tmp_path, {"atr_period": 14})
+    assert svc.get_settings().atr_period == 14
+
+    # Extern ändring inom stat-intervallet syns först efter reload-hooken
+    path = tmp_path / "strategy_settings.json"
+    path.write_text(json.dumps({"atr_period": 30}), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert svc.get_settings().atr_period == 14
+    reload_strategy_settings()
+    assert svc.get_settings().atr_period == 30
+
+    # Med stat-intervall 0 upptäcks mtime-ändringen direkt
+    monkeypatch.setattr(ss, "_STAT_INTERVAL_S", 0.0)
+    path.write_text(json.dumps({"atr_period": 5, "pad": "x"}), encoding="utf-8")
+    assert svc.get_settings().atr_period == 5
+
+
+def test_save_settings_reloads_snapshot(tmp_path):
+    svc = _svc(tmp_path, {"ema_period": 14})
+    svc.save_settings(ss.StrategySettings(ema_period=50), symbol="tETHUSD")
+    assert svc.get_settings(symbol="tETHUSD").ema_period == 50
+    assert svc.get_settings().ema_period == 14
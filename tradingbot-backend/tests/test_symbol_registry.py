@@ -0,0 +1,59 @@
+import pytest
+
+from services.symbols import SymbolRegistry, SymbolService
+
+
+def _registry():
+    reg = SymbolRegistry()
+    reg.load(["BTCUSD", "ETHUSD", "ALGUSD", "ADAUST", "DOGE:USD"], {"ALGO": "ALG"}, {"ALG": "ALGO"})
+    return reg
+
+
+def test_resolve_and_listed_rules():
+    reg = _registry()
+    assert reg.is_warm()
+    assert reg.resolve("tBTCUSD") == "tBTCUSD"
+    assert reg.resolve("tTESTBTC:TESTUSD") == "tBTCUSD"
+    assert reg.resolve("tALGOUSD") == "tALGUSD"  # alias
+    assert reg.resolve("tADAUSD") == "tADAUST"  # USD -> UST fallback
+    assert reg.resolve("tTESTADA:TESTUSDT") == "tADAUST"
+    assert reg.resolve("tXYZUSD") == "tXYZUSD"  # okänd: oförändrad
+    assert reg.listed("tALGOUSD") and reg.listed("tETHUSD")
+    assert not reg.listed("tXYZUSD")
+
+    # Förberäknade nycklar träffar tabellen direkt; okända memoiseras vid första anrop
+    hits = reg.stats["memo_hits"]
+    reg.resolve("tALGOUSD")
+    assert reg.stats["memo_hits"] == hits + 1
+    assert reg.resolve_many(["tTESTETH:TESTUSD", "tALGOUSD"]) == {
+        "tTESTETH:TESTUSD": "tETHUSD",
+        "tALGOUSD": "tALGUSD",
+    }
+
+    # Tom parlista (offline/CI): allt räknas som listat
+    empty = SymbolRegistry()
+    empty.load([], {}, {})
+    assert empty.listed("tANYUSD") and empty.resolve("tTESTSOL:TESTUSD") == "tSOLUSD"
+
+
+def test_reload_swaps_index_atomically():
+    reg = _registry()
+    old = reg.index
+    assert reg.resolve("tADAUSD") == "tADAUST"
+    reg.load(["ADAUSD"], {}, {})
+    # Gamla indexet är orört för läsare som redan höll referensen
+    assert old.resolved["tADAUSD"] == "tADAUST"
+    assert reg.resolve("tADAUSD") == "tADAUSD"
+    assert not reg.listed("tBTCUSD")
+
+
+@pytest.mark.asyncio
+async def test_symbol_service_facade_uses_registry(monkeypatch):
+    import services.symbols as sym_mod
+
+    reg = _registry()
+    monkeypatch.setattr(sym_mod, "symbol_registry", reg)
+    svc = SymbolService()
+    await svc.refresh()  # varm cache => ingen hämtning
+    assert svc.resolve("tALGOUSD") == "tALGUSD"
+    assert svc.listed("tBTCUSD") and "BTCUSD" in svc._pairs
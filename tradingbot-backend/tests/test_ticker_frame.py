@@ -0,0 +1,50 @@
+import pytest
+
+from services.bitfinex_websocket import bitfinex_ws
+from utils.ticker_frame import TickerFrame
+
+RAW = [100.0, 1.5, 100.5, 2.0, -1.0, -0.01, 100.2, 1234.0, 105.0, 95.0]
+
+
+def test_ticker_frame_is_dict_compatible():
+    frame = TickerFrame("tBTCUSD").update(RAW)
+    legacy = {
+        "symbol": "tBTCUSD",
+        "bid": 100.0,
+        "bid_size": 1.5,
+        "ask": 100.5,
+        "ask_size": 2.0,
+        "daily_change": -1.0,
+        "daily_change_relative": -0.01,
+        "last_price": 100.2,
+        "volume": 1234.0,
+        "high": 105.0,
+        "low": 95.0,
+    }
+    assert dict(frame) == legacy == frame.to_dict()
+    assert frame["last_price"] == 100.2 and frame.get("nope", 7) == 7
+    assert "bid" in frame and "nope" not in frame
+    with pytest.raises(KeyError):
+        frame["nope"]
+    # Korta frames (7 fält) fyller volume/high/low med 0 som tidigare
+    assert frame.update(RAW[:7]).get("high") == 0
+
+
+@pytest.mark.asyncio
+async def test_channel_handler_reuses_one_frame_per_symbol(monkeypatch):
+    seen = []
+    ws = bitfinex_ws.websocket
+    monkeypatch.setitem(bitfinex_ws._chan_callbacks, (ws, 4242), seen.append)
+    monkeypatch.setitem(bitfinex_ws._chan_info, (ws, 4242), {"channel": "ticker", "symbol": "tFRAMEUSD"})
+    monkeypatch.setattr(bitfinex_ws, "_ticker_frames", {})
+    # Inline-leverans så varje frame når callbacken (dispatch-köer coalescar tickers)
+    monkeypatch.setattr(bitfinex_ws, "_dispatch_enabled", False)
+
+    for i in range(100):
+        await bitfinex_ws._handle_channel_message([4242, [*RAW[:6], 100.0 + i, *RAW[7:]]])
+
+    assert len(seen) == 100
+    assert len({id(x) for x in seen}) == 1
+    frame = seen[-1]
+    assert isinstance(frame, TickerFrame)
+    assert frame.last_price == 199.0 and frame.updates == 100
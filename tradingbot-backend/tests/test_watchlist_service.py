@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import pytest
+
+import services.watchlist_service as wl
+
+
+class _StubWSFirst:
+    def __init__(self):
+        self.ticker_batches: list[list[str]] = []
+        self.single_tickers: list[str] = []
+        self.candle_reads: list[tuple[str, str]] = []
+
+    async def initialize(self):
+        return None
+
+    async def get_tickers(self, symbols):
+        self.ticker_batches.append(list(symbols))
+        # Sista symbolen saknas i bulk-svaret -> per-symbol fallback
+        return {s: {"symbol": s, "last_price": 100.0, "volume": 5.0} for s in symbols[:-1]}
+
+    async def get_ticker(self, symbol, force_fresh=False):  # noqa: ARG002
+        self.single_tickers.append(symbol)
+        return {"symbol": symbol, "last_price": 1.0, "volume": 1.0}
+
+    def has_fresh_candles(self, symbol, timeframe):  # noqa: ARG002
+        return True
+
+    async def get_candles(self, symbol, timeframe="1m", limit=50, force_fresh=False):  # noqa: ARG002
+        self.candle_reads.append((symbol, timeframe))
+        await asyncio.sleep(0.02)
+        return [[1700000000000 + i * 60_000, 100.0, 100.0 + i, 101.0 + i, 99.0 + i, 10.0] for i in range(limit)]
+
+    def get_indicator_snapshot(self, symbol, timeframe):  # noqa: ARG002
+        return None
+
+
+class _StubMargin:
+    calls = 0
+    delay = 0.0
+
+    async def get_symbol_margin_status_batch(self, symbols):
+        _StubMargin.calls += 1
+        await asyncio.sleep(_StubMargin.delay)
+        return {s: {"status": "ok"} for s in symbols}
+
+
+@pytest.fixture
+def stub_ws(monkeypatch):
+    stub = _StubWSFirst()
+    monkeypatch.setattr(wl, "get_ws_first_data_service", lambda: stub)
+    monkeypatch.setattr(wl, "_MS", _StubMargin)
+    monkeypatch.setattr(wl.symbol_registry, "resolve_many", lambda syms: {s: s for s in syms})
+    monkeypatch.setattr(wl.symbol_registry, "listed", lambda _s: True)
+    _StubMargin.calls = 0
+    _StubMargin.delay = 0.0
+    return stub
+
+
+@pytest.mark.asyncio
+async def test_build_watchlist_fans_out_and_keeps_order(stub_ws):
+    syms = [f"tSYM{i}USD" for i in range(100)]
+    t0 = time.perf_counter()
+    rows = await wl.WatchlistService().build_watchlist(",".join(syms), include_prob=True)
+    elapsed = time.perf_counter() - t0
+
+    assert [r["symbol"] for r in rows] == syms
+    # 200 candle-läsningar à 20 ms seriellt vore 4 s
+    assert elapsed < 1.0
+    assert stub_ws.ticker_batches == [syms]
+    assert stub_ws.single_tickers == [syms[-1]]
+    # prob återanvänder 1m-candles: exakt två läsningar per symbol
+    assert len(stub_ws.candle_reads) == 200
+    assert _StubMargin.calls == 1
+    assert rows[0]["last"] == 100.0 and rows[-1]["last"] == 1.0
+    assert rows[0]["margin_status"] == {"status": "ok"}
+    assert "prob" in rows[0]
+
+
+@pytest.mark.asyncio
+async def test_stream_watchlist_yields_every_row(stub_ws):
+    syms = ["tBTCUSD", "tETHUSD", "tBTCUSD"]
+    events = [ev async for ev in wl.WatchlistService().stream_watchlist(",".join(syms), False)]
+    assert sorted(ev["symbol"] for ev in events if ev["type"] == "row") == ["tBTCUSD", "tETHUSD"]
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_do_not_wait_for_margin_batch(stub_ws):
+    _StubMargin.delay = 0.3
+    syms = ["tBTCUSD", "tETHUSD", "tSOLUSD"]
+    t0 = time.perf_counter()
+    events = []
+    async for ev in wl.WatchlistService().stream_watchlist(",".join(syms), False):
+        events.append((time.perf_counter() - t0, ev))
+
+    rows = [(t, ev) for t, ev in events if ev["type"] == "row"]
+    margins = [(t, ev) for t, ev in events if ev["type"] == "margin"]
+    # Raderna kommer innan REST-batchen är klar, margin följer per symbol
+    assert len(rows) == 3 and all(t < 0.2 for t, _ in rows)
+    assert all(ev["margin_status"] is None for _, ev in rows)
+    assert sorted(ev["symbol"] for _, ev in margins) == sorted(syms)
+    assert all(t >= 0.3 and ev["margin_status"] == {"status": "ok"} for t, ev in margins)
+
+    # Icke-strömmande svar slår ihop båda
+    merged = await wl.WatchlistService().build_watchlist(",".join(syms), include_prob=False)
+    assert [r["margin_status"] for r in merged] == [{"status": "ok"}] * 3
+
+
+def test_watchlist_route_streams_ndjson(stub_ws, monkeypatch):
+    import json
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from rest import routes
+
+    monkeypatch.setattr(routes, "get_watchlist_service", lambda: wl.WatchlistService())
+    monkeypatch.setattr(routes.settings, "AUTH_REQUIRED", False)
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+    syms = ["tBTCUSD", "tETHUSD", "tSOLUSD"]
+
+    resp = client.get(f"{routes.router.prefix}/market/watchlist", params={"symbols": ",".join(syms), "stream": 1})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines() if line]
+    assert sorted(ev["symbol"] for ev in events if ev["type"] == "row") == sorted(syms)
+
+    resp = client.get(f"{routes.router.prefix}/market/watchlist", params={"symbols": ",".join(syms)})
+    assert [r["symbol"] for r in resp.json()] == syms
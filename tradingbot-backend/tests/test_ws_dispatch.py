@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from services.bitfinex_websocket import bitfinex_ws
+from services.ws_dispatch import ChannelDispatcher
+
+
+@pytest.mark.asyncio
+async def test_slow_lane_does_not_block_other_lanes():
+    d = ChannelDispatcher(maxlen=8)
+    release = asyncio.Event()
+    fast_seen = []
+
+    async def slow(_p):
+        await release.wait()
+
+    d.submit("ticker|tSLOW", slow, 1)
+    for i in range(5):
+        d.submit("ticker|tFAST", fast_seen.append, i)
+    await asyncio.sleep(0.01)
+    assert fast_seen == [0, 1, 2, 3, 4]
+    release.set()
+    await d.drain()
+    assert d.get_stats()["lanes"]["ticker|tSLOW"]["delivered"] == 1
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies():
+    d = ChannelDispatcher(maxlen=3)
+    got = {"c": [], "d": []}
+    for i in range(10):
+        d.submit("ticker|tX", got["c"].append, i, "coalesce")
+        d.submit("trades|tX", got["d"].append, i, "drop_oldest")
+    await d.drain()
+    assert got["c"] == [9]
+    assert got["d"] == [7, 8, 9]
+    st = d.get_stats()
+    assert st["lanes"]["ticker|tX"]["coalesced"] == 9
+    assert st["lanes"]["trades|tX"]["dropped"] == 7
+    assert st["totals"]["dropped"] == 7 and st["totals"]["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_read_loop_returns_before_slow_callback(monkeypatch):
+    release = asyncio.Event()
+    calls = []
+
+    async def slow_cb(t):
+        calls.append(t["last_price"])
+        await release.wait()
+
+    ws = bitfinex_ws.websocket
+    monkeypatch.setattr(bitfinex_ws, "_dispatch_enabled", True)
+    monkeypatch.setattr(bitfinex_ws, "_dispatcher", ChannelDispatcher(maxlen=16))
+    monkeypatch.setitem(bitfinex_ws._chan_callbacks, (ws, 5151), slow_cb)
+    monkeypatch.setitem(bitfinex_ws._chan_info, (ws, 5151), {"channel": "ticker", "symbol": "tDISPUSD"})
+
+    raw = [1.0, 1.0, 1.1, 1.0, 0.0, 0.0, 1.05, 10.0, 1.2, 0.9]
+    await asyncio.wait_for(bitfinex_ws._handle_channel_message([5151, raw]), 0.5)
+    await asyncio.sleep(0)
+    # Callbacken hänger; nya frames köas/coalescas utan att läsloopen väntar
+    for px in (2.0, 3.0):
+        await asyncio.wait_for(bitfinex_ws._handle_channel_message([5151, [*raw[:6], px, *raw[7:]]]), 0.5)
+    release.set()
+    await bitfinex_ws._dispatcher.drain()
+    assert calls == [1.05, 3.0]
+    lane = bitfinex_ws.get_pool_status()["dispatch"]["lanes"]["ticker|tDISPUSD"]
+    assert lane["coalesced"] == 1 and lane["policy"] == "coalesce"
+
+
+@pytest.mark.asyncio
+async def test_candles_are_lossless_and_lanes_pruned_on_unsubscribe(monkeypatch):
+    ws = bitfinex_ws.websocket
+    got = []
+    monkeypatch.setattr(bitfinex_ws, "_dispatch_enabled", True)
+    monkeypatch.setattr(bitfinex_ws, "_dispatcher", ChannelDispatcher(maxlen=2))
+    monkeypatch.setitem(bitfinex_ws._chan_callbacks, (ws, 6161), got.append)
+    monkeypatch.setitem(
+        bitfinex_ws._chan_info, (ws, 6161), {"channel": "candles", "key": "trade:1m:tCNDUSD", "symbol": "tCNDUSD"}
+    )
+    for i in range(10):
+        await bitfinex_ws._handle_channel_message([6161, [i, 1, 1, 1, 1, 1]])
+    await bitfinex_ws._dispatcher.drain()
+    assert [c[0] for c in got] == list(range(10))
+    lane = bitfinex_ws._dispatcher.get_stats()["lanes"]["candles|trade:1m:tCNDUSD"]
+    assert lane["policy"] == "lossless" and lane["dropped"] == 0
+
+    class _WS:
+        async def send(self, _msg):
+            return None
+
+    sock = _WS()
+    key = "candles|trade:1m:tCNDUSD"
+    monkeypatch.setitem(bitfinex_ws._sub_socket, key, sock)
+    monkeypatch.setitem(bitfinex_ws._chanid_by_subkey, (sock, key), 6161)
+    await bitfinex_ws.unsubscribe(key)
+    assert key not in bitfinex_ws._dispatcher.get_stats()["lanes"]
+
+
+@pytest.mark.asyncio
+async def test_policy_change_keeps_queue_under_running_drain():
+    d = ChannelDispatcher(maxlen=4)
+    release = asyncio.Event()
+    seen = []
+
+    async def cb(p):
+        seen.append(p)
+        if p == 0:
+            await release.wait()
+
+    d.submit("trades|tX", cb, 0)
+    await asyncio.sleep(0)
+    queue = d._lanes["trades|tX"].queue  # noqa: SLF001
+    for i in range(1, 4):
+        d.submit("trades|tX", cb, i, "drop_oldest")
+    # Byte till coalesce medan workern väntar: samma deque trimmas in-place
+    d.submit("trades|tX", cb, 4, "coalesce")
+    assert d._lanes["trades|tX"].queue is queue  # noqa: SLF001
+    release.set()
+    await d.drain()
+    assert seen == [0, 4]
+    assert d.get_stats()["lanes"]["trades|tX"]["coalesced"] == 3
+    assert d.remove("trades|tX") is True and d.remove("trades|tX") is False
@@ -0,0 +1,39 @@
+import pytest
+
+from services.bitfinex_websocket import bitfinex_ws
+from utils.json_optimizer import is_heartbeat_frame
+
+
+def test_heartbeat_detected_on_raw_frames():
+    assert is_heartbeat_frame('[17,"hb"]') and is_heartbeat_frame(b'[0,"hb"]')
+    assert not is_heartbeat_frame('[17,"cs",-123]')
+    assert not is_heartbeat_frame('[17,[1.0,2,3.5]]')
+    assert not is_heartbeat_frame('{"event":"info","msg":"hb"}')
+
+
+@pytest.mark.asyncio
+async def test_listen_loop_skips_heartbeats_and_counts_frames(monkeypatch):
+    class FakeWS:
+        def __init__(self, frames):
+            self._frames = list(frames)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if not self._frames:
+                raise StopAsyncIteration
+            return self._frames.pop(0)
+
+    handled = []
+
+    async def _fake_channel(data, ws=None):
+        handled.append(data)
+
+    monkeypatch.setattr(bitfinex_ws, "_handle_channel_message", _fake_channel)
+    ws = FakeWS(['[5,"hb"]', '[5,[1.0,2.0,3.0]]', b'[5,"hb"]', "not json", '[5,"hb"]'])
+    await bitfinex_ws._listen_loop(ws)
+
+    assert handled == [[5, [1.0, 2.0, 3.0]]]
+    st = bitfinex_ws._ingest_stats.pop(ws).to_dict()
+    assert st["frames"] == 5 and st["heartbeats"] == 3 and st["decode_errors"] == 1
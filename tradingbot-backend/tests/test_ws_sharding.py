@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+from services.bitfinex_websocket import bitfinex_ws
+from utils.consistent_hash import ConsistentHashRing
+
+SYMBOLS = [f"tSYM{i}USD" for i in range(200)]
+
+
+class DummyWS:
+    def __init__(self):
+        self.closed = False
+        self.sent = []
+
+    async def close(self):
+        self.closed = True
+
+    async def send(self, msg):
+        self.sent.append(json.loads(msg))
+
+
+def test_ring_is_stable_and_moves_few_keys():
+    ring3 = ConsistentHashRing(range(3))
+    ring4 = ConsistentHashRing(range(4))
+    owners = [ring3.get(s) for s in SYMBOLS]
+    assert owners == [ConsistentHashRing(range(3)).get(s) for s in SYMBOLS]
+    assert set(owners) == {0, 1, 2}
+    moved = sum(1 for s, o in zip(SYMBOLS, owners, strict=True) if ring4.get(s) != o)
+    # Ny nod tar bara över sin andel (~1/4), övriga symboler ligger kvar
+    assert moved < len(SYMBOLS) * 0.4
+    assert all(ring4.get(s) == 3 for s, o in zip(SYMBOLS, owners, strict=True) if ring4.get(s) != o)
+    assert list(ring3.iter_nodes("tBTCUSD"))[0] == ring3.get("tBTCUSD")
+    assert sorted(ring3.iter_nodes("tBTCUSD")) == [0, 1, 2]
+
+
+@pytest.fixture
+def sharded_pool(monkeypatch):
+    opened = []
+
+    async def _fake_open():
+        ws = DummyWS()
+        opened.append(ws)
+        return ws
+
+    monkeypatch.setattr(bitfinex_ws, "_pool_enabled", True)
+    monkeypatch.setattr(bitfinex_ws, "_pool_max_sockets", 3)
+    monkeypatch.setattr(bitfinex_ws, "_pool_max_subs", 25)
+    monkeypatch.setattr(bitfinex_ws, "_open_public_socket", _fake_open)
+    for name in ("_pool_public", "_pool_sub_counts", "_sub_socket", "_shard_sockets", "_shard_of_ws"):
+        monkeypatch.setattr(bitfinex_ws, name, type(getattr(bitfinex_ws, name))())
+    monkeypatch.setattr(bitfinex_ws, "_ring", None)
+    yield opened
+
+
+@pytest.mark.asyncio
+async def test_symbols_are_placed_by_hash_and_shard_reconnect_is_local(sharded_pool, monkeypatch):
+    ring = ConsistentHashRing(range(3))
+    placed = {}
+    for sym in SYMBOLS[:12]:
+        ws = await bitfinex_ws._get_public_socket(sym)
+        assert ws is await bitfinex_ws._get_public_socket(sym)
+        assert bitfinex_ws._shard_of_ws[ws] == ring.get(sym)
+        key = f"ticker|{sym}"
+        monkeypatch.setitem(bitfinex_ws.subscriptions, key, {"event": "subscribe", "channel": "ticker", "symbol": sym})
+        bitfinex_ws._sub_socket[key] = ws
+        bitfinex_ws._pool_sub_counts[ws] += 1
+        placed[sym] = ws
+    assert len(sharded_pool) == 3
+
+    victim = placed[SYMBOLS[0]]
+    shard = bitfinex_ws._shard_of_ws[victim]
+    others = [w for w in sharded_pool if w is not victim]
+    await bitfinex_ws._reconnect_shard(shard, victim)
+
+    fresh = bitfinex_ws._shard_sockets[shard]
+    assert fresh is sharded_pool[-1] and fresh is not victim
+    expected = sorted(s for s, w in placed.items() if w is victim)
+    assert sorted(m["symbol"] for m in fresh.sent) == expected
+    assert all(not w.sent for w in others)
+    assert bitfinex_ws._pool_sub_counts[fresh] == len(expected)
+
+
+@pytest.mark.asyncio
+async def test_same_chan_id_on_two_sockets_routes_by_source(monkeypatch):
+    a, b = DummyWS(), DummyWS()
+    got = []
+    monkeypatch.setattr(bitfinex_ws, "_dispatch_enabled", False)
+    monkeypatch.setitem(bitfinex_ws._chan_callbacks, (a, 9), lambda p: got.append(("a", p)))
+    monkeypatch.setitem(bitfinex_ws._chan_callbacks, (b, 9), lambda p: got.append(("b", p)))
+    monkeypatch.setitem(bitfinex_ws._chan_info, (a, 9), {"channel": "trades", "symbol": "tA"})
+    monkeypatch.setitem(bitfinex_ws._chan_info, (b, 9), {"channel": "trades", "symbol": "tB"})
+    await bitfinex_ws._route_frame(b, [9, "te", [1]])
+    await bitfinex_ws._route_frame(a, [9, "te", [2]])
+    assert got == [("b", "te"), ("a", "te")]
+
+
+@pytest.mark.asyncio
+async def test_failed_shard_reconnect_moves_or_releases_subs(sharded_pool, monkeypatch):
+    import types
+
+    async def _no_sleep(_s):
+        return None
+
+    monkeypatch.setattr(bitfinex_ws, "_asyncio", types.SimpleNamespace(sleep=_no_sleep))
+    monkeypatch.setattr(bitfinex_ws, "active_tickers", set())
+    placed = {}
+    for sym in SYMBOLS[:12]:
+        ws = await bitfinex_ws._get_public_socket(sym)
+        key = f"ticker|{sym}"
+        monkeypatch.setitem(bitfinex_ws.subscriptions, key, {"event": "subscribe", "channel": "ticker", "symbol": sym})
+        bitfinex_ws._sub_socket[key] = ws
+        bitfinex_ws._pool_sub_counts[ws] += 1
+        bitfinex_ws.active_tickers.add(sym)
+        placed[sym] = ws
+
+    async def _down():
+        return None
+
+    monkeypatch.setattr(bitfinex_ws, "_open_public_socket", _down)
+    victim = placed[SYMBOLS[0]]
+    orphans = sorted(s for s, w in placed.items() if w is victim)
+    await bitfinex_ws._reconnect_shard(bitfinex_ws._shard_of_ws[victim], victim)
+    # Friska shards tar över subsen
+    moved = sorted(m["symbol"] for w in sharded_pool if w is not victim for m in w.sent)
+    assert moved == orphans
+    assert all(f"ticker|{s}" in bitfinex_ws.subscriptions for s in orphans)
+
+    # Ingen frisk shard kvar -> subs släpps så att subscribe_ticker kan försöka igen
+    victim = bitfinex_ws._sub_socket[f"ticker|{SYMBOLS[0]}"]
+    orphans = [s for s in placed if bitfinex_ws._sub_socket.get(f"ticker|{s}") is victim]
+    assert orphans
+    for ws in sharded_pool:
+        ws.closed = ws is not victim
+    await bitfinex_ws._reconnect_shard(bitfinex_ws._shard_of_ws[victim], victim)
+    for sym in orphans:
+        assert f"ticker|{sym}" not in bitfinex_ws.subscriptions
+        assert sym not in bitfinex_ws.active_tickers
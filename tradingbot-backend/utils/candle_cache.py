@@ -1,20 +1,101 @@
+import asyncio
+import atexit
 import os
+import queue
 import sqlite3
-from collections.abc import Iterable
-from contextlib import closing
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
 from datetime import datetime, timedelta
 
 _DB_DEFAULT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "candles.sqlite3")
 
+_UPSERT_SQL = """
+    INSERT INTO candles(symbol, timeframe, mts, open, close, high, low, volume, cached_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(symbol, timeframe, mts) DO UPDATE SET
+        open=excluded.open,
+        close=excluded.close,
+        high=excluded.high,
+        low=excluded.low,
+        volume=excluded.volume,
+        cached_at=excluded.cached_at
+"""
+
+
+def _to_row(symbol: str, timeframe: str, c: list, cached_at: int) -> tuple | None:
+    # Bitfinex: [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]
+    try:
+        return (
+            symbol,
+            timeframe,
+            int(c[0]),
+            float(c[1]),
+            float(c[2]),
+            float(c[3]),
+            float(c[4]),
+            float(c[5]),
+            cached_at,
+        )
+    except Exception:
+        return None
+
 
 class CandleCache:
-    def __init__(self, db_path: str | None = None) -> None:
+    """
+    SQLite-backad candle-cache.
+
+    - En långlivad anslutning i WAL-läge delas av alla anrop (skyddad av lås),
+      i stället för en ny sqlite3.connect per operation.
+    - `store` skriver direkt med executemany.
+    - `store_buffered` lägger rader i en coalescing write-behind-buffert
+      (nyckel symbol/timeframe/mts, senaste värdet vinner) som flushas i
+      bakgrunden var `flush_interval_ms`, samt innan läsningar.
+    """
+
+    def __init__(self, db_path: str | None = None, flush_interval_ms: int = 1000) -> None:
         self.db_path = db_path or _DB_DEFAULT
+        self.flush_interval_ms = max(10, int(flush_interval_ms))
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn: sqlite3.Connection | None = None
+
+        # Write-behind-buffert
+        self._pending: dict[tuple[str, str, int], tuple] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._closed = False
+        self._write_stats = {
+            "flushes": 0,
+            "rows_flushed": 0,
+            "rows_buffered": 0,
+            "rows_coalesced": 0,
+            "last_flush_rows": 0,
+            "max_flush_rows": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Returnera den delade anslutningen (skapas vid behov). Anropas med self._lock."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5.0)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            except sqlite3.DatabaseError as e:
+                print(f"Candle cache PRAGMA note: {e}")
+            self._conn = conn
+        return self._conn
+
     def _init_db(self) -> None:
-        with closing(sqlite3.connect(self.db_path)) as conn:
+        with self._lock:
+            conn = self._connect()
             # Skapa tabellen om den inte finns
             conn.execute(
                 """
@@ -52,41 +133,141 @@ class CandleCache:
 
     def store(self, symbol: str, timeframe: str, candles: Iterable[list]) -> int:
         """Spara candles i cache. Returnerar antal upserts."""
-        count = 0
         cached_at = int(datetime.now().timestamp())
-        with closing(sqlite3.connect(self.db_path)) as conn:
-            cur = conn.cursor()
+        rows = [r for r in (_to_row(symbol, timeframe, c, cached_at) for c in candles) if r is not None]
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.executemany(_UPSERT_SQL, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return len(rows)
+
+    def store_buffered(self, symbol: str, timeframe: str, candles: Iterable[list]) -> int:
+        """
+        Lägg candles i write-behind-bufferten (ingen disk-I/O på anroparens väg).
+
+        Upprepade uppdateringar av samma (symbol, timeframe, mts) före nästa
+        flush slås ihop till en rad. Returnerar antal buffrade rader.
+        """
+        if self._closed:
+            return self.store(symbol, timeframe, candles)
+        cached_at = int(datetime.now().timestamp())
+        count = 0
+        with self._pending_lock:
             for c in candles:
-                # Bitfinex: [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]
-                try:
-                    mts, o, cl, hi, lo, vol = (
-                        int(c[0]),
-                        float(c[1]),
-                        float(c[2]),
-                        float(c[3]),
-                        float(c[4]),
-                        float(c[5]),
-                    )
-                except Exception:
+                row = _to_row(symbol, timeframe, c, cached_at)
+                if row is None:
                     continue
-                cur.execute(
-                    """
-                    INSERT INTO candles(symbol, timeframe, mts, open, close, high, low, volume, cached_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(symbol, timeframe, mts) DO UPDATE SET
-                        open=excluded.open,
-                        close=excluded.close,
-                        high=excluded.high,
-                        low=excluded.low,
-                        volume=excluded.volume,
-                        cached_at=excluded.cached_at
-                    """,
-                    (symbol, timeframe, mts, o, cl, hi, lo, vol, cached_at),
-                )
+                key = (symbol, timeframe, row[2])
+                if key in self._pending:
+                    self._write_stats["rows_coalesced"] += 1
+                self._pending[key] = row
                 count += 1
-            conn.commit()
+            self._write_stats["rows_buffered"] += count
+        if count:
+            self._ensure_flusher()
         return count
 
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._pending_lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="candle-cache-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._flush_event.wait(self.flush_interval_ms / 1000.0)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Candle cache flush note: {e}")
+
+    def flush(self) -> int:
+        """
+        Skriv alla buffrade rader i en transaktion. Returnerar antal rader.
+
+        self._lock tas före bytet av bufferten och hålls till commit, så en
+        samtidig läsare (som själv flushar) aldrig ser en tom buffert medan
+        raderna ännu inte finns i databasen. Låsordning: _lock -> _pending_lock.
+        """
+        with self._lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return 0
+                rows = list(self._pending.values())
+                self._pending = {}
+            t0 = time.perf_counter()
+            conn = self._connect()
+            try:
+                conn.executemany(_UPSERT_SQL, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                # Lägg tillbaka rader som inte hunnit ersättas av nyare värden
+                with self._pending_lock:
+                    for row in rows:
+                        self._pending.setdefault((row[0], row[1], row[2]), row)
+                raise
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with self._pending_lock:
+            st = self._write_stats
+            st["flushes"] += 1
+            st["rows_flushed"] += len(rows)
+            st["last_flush_rows"] = len(rows)
+            st["max_flush_rows"] = max(st["max_flush_rows"], len(rows))
+            st["last_flush_ms"] = round(elapsed_ms, 3)
+            st["max_flush_ms"] = round(max(st["max_flush_ms"], elapsed_ms), 3)
+            st["total_flush_ms"] += elapsed_ms
+        return len(rows)
+
+    def write_stats(self) -> dict:
+        """Statistik för write-behind-bufferten (flush-latens, rader per flush)."""
+        with self._pending_lock:
+            st = dict(self._write_stats)
+            pending = len(self._pending)
+        flushes = st["flushes"]
+        st["total_flush_ms"] = round(st["total_flush_ms"], 3)
+        st["avg_flush_ms"] = round(st["total_flush_ms"] / flushes, 3) if flushes else 0.0
+        st["avg_rows_per_flush"] = round(st["rows_flushed"] / flushes, 2) if flushes else 0.0
+        st["pending_rows"] = pending
+        st["flush_interval_ms"] = self.flush_interval_ms
+        return st
+
+    def close(self) -> None:
+        """Flusha bufferten och stäng den delade anslutningen."""
+        self._closed = True
+        self._flush_event.set()
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+
+    def oldest_mts(self, symbol: str, timeframe: str) -> int | None:
+        """Minsta mts i cache för symbol/timeframe (används av backfill)."""
+        self.flush()
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT MIN(mts) FROM candles WHERE symbol=? AND timeframe=?",
+                    (symbol, timeframe),
+                )
+                .fetchone()
+            )
+        return int(row[0]) if row and row[0] is not None else None
+
     def load(self, symbol: str, timeframe: str, limit: int = 100, max_age_minutes: int = 15) -> list[list]:
         """
         Läs senaste N candles från cache.
@@ -100,8 +281,10 @@ class CandleCache:
         """
         cutoff_time = int((datetime.now() - timedelta(minutes=max_age_minutes)).timestamp())
 
-        with closing(sqlite3.connect(self.db_path)) as conn:
-            rows = conn.execute(
+        # Read-your-writes: skriv ut väntande rader innan läsning
+        self.flush()
+        with self._lock:
+            cur = self._connect().execute(
                 """
                 SELECT mts, open, close, high, low, volume
                 FROM candles
@@ -110,7 +293,8 @@ class CandleCache:
                 LIMIT ?
                 """,
                 (symbol, timeframe, cutoff_time, int(limit)),
-            ).fetchall()
+            )
+            rows = cur.fetchall()
         return [[r[0], r[1], r[2], r[3], r[4], r[5]] for r in rows]
 
     def get_last(self, symbol: str, timeframe: str, max_age_minutes: int = 15) -> list | None:
@@ -132,7 +316,9 @@ class CandleCache:
         """Rensa gammal cached data. Returnerar antal rader som togs bort."""
         cutoff_time = int((datetime.now() - timedelta(hours=max_age_hours)).timestamp())
 
-        with closing(sqlite3.connect(self.db_path)) as conn:
+        self.flush()
+        with self._lock:
+            conn = self._connect()
             cur = conn.cursor()
             cur.execute("DELETE FROM candles WHERE cached_at < ?", (cutoff_time,))
             deleted_count = cur.rowcount
@@ -141,7 +327,14 @@ class CandleCache:
 
     def clear_symbol(self, symbol: str, timeframe: str | None = None) -> int:
         """Rensa cached data för en specifik symbol. Returnerar antal rader som togs bort."""
-        with closing(sqlite3.connect(self.db_path)) as conn:
+        with self._lock:
+            with self._pending_lock:
+                self._pending = {
+                    k: v
+                    for k, v in self._pending.items()
+                    if not (k[0] == symbol and (not timeframe or k[1] == timeframe))
+                }
+            conn = self._connect()
             cur = conn.cursor()
             if timeframe:
                 cur.execute(
@@ -156,7 +349,9 @@ class CandleCache:
 
     def stats(self, limit_symbols: int = 20) -> dict:
         """Returnera enkel statistik över cacheinnehållet."""
-        with closing(sqlite3.connect(self.db_path)) as conn:
+        self.flush()
+        with self._lock:
+            conn = self._connect()
             total_rows = conn.execute("SELECT COUNT(*) FROM candles").fetchone()[0]
             rows_by_pair = conn.execute(
                 """
@@ -176,11 +371,14 @@ class CandleCache:
             }
             for r in rows_by_pair
         ]
-        return {"total_rows": int(total_rows), "top": items}
+        return {"total_rows": int(total_rows), "top": items, "write_behind": self.write_stats()}
 
     def clear_all(self) -> int:
         """Rensa all cached data. Returnerar antal rader som togs bort."""
-        with closing(sqlite3.connect(self.db_path)) as conn:
+        with self._lock:
+            with self._pending_lock:
+                self._pending = {}
+            conn = self._connect()
             cur = conn.cursor()
             cur.execute("DELETE FROM candles")
             deleted_count = cur.rowcount
@@ -194,7 +392,9 @@ class CandleCache:
     def enforce_retention(self, max_days: int, max_rows_per_pair: int) -> int:
         """Ta bort gamla rader och begränsa per symbol/timeframe."""
         removed = 0
-        with closing(sqlite3.connect(self.db_path)) as conn:
+        self.flush()
+        with self._lock:
+            conn = self._connect()
             # 1) Rensa äldre än max_days
             if max_days and max_days > 0:
                 cutoff = int((datetime.utcnow() - timedelta(days=max_days)).timestamp() * 1000)
@@ -235,5 +435,193 @@ class CandleCache:
         return removed
 
 
+class AsyncCandleCache:
+    """
+    Icke-blockerande async-fasad för CandleCache.
+
+    Alla SQLite-anrop körs på en dedikerad worker-tråd som konsumerar en
+    begränsad kö; anroparen får en awaitable som löses via
+    `loop.call_soon_threadsafe`. Event-loopen gör alltså bara en kö-insättning
+    per operation. När kön är full väntar anroparen asynkront (backpressure)
+    i stället för att blockera loopen.
+
+    Metrics (`stats()`): ködjup (nu/max), antal operationer per typ,
+    kö-väntetid och exekveringstid på workern, samt fasadens egen tid på
+    loop-tråden ("loop_overhead": enqueue + leverans av resultat). Det är
+    inte loop-lag i stort; den mäts av utils.loop_lag.LoopLagMonitor.
+    """
+
+    _STOP = object()
+
+    def __init__(self, cache: CandleCache, max_queue: int = 1000) -> None:
+        self.cache = cache
+        self.max_queue = max(1, int(max_queue))
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: dict[str, Any] = {
+            "ops": {},
+            "errors": 0,
+            "queue_full_waits": 0,
+            "max_queue_depth": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "exec_ms_total": 0.0,
+            "exec_ms_max": 0.0,
+            "loop_overhead_ms_total": 0.0,
+            "loop_overhead_ms_max": 0.0,
+        }
+
+    # --- worker ---
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name="candle-cache-io", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            op, fn, args, loop, fut, enqueued_at = item
+            started = time.perf_counter()
+            try:
+                result, error = fn(*args), None
+            except Exception as e:
+                result, error = None, e
+            done = time.perf_counter()
+            self._record(op, started - enqueued_at, done - started, error is not None)
+            try:
+                loop.call_soon_threadsafe(self._deliver, fut, result, error)
+            except RuntimeError:
+                # Loopen är stängd – ingen att leverera till
+                pass
+
+    def _deliver(self, fut: asyncio.Future, result: Any, error: BaseException | None) -> None:
+        t0 = time.perf_counter()
+        if not fut.done():
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+        self._record_loop_overhead(time.perf_counter() - t0)
+
+    def _record(self, op: str, wait_s: float, exec_s: float, failed: bool) -> None:
+        wait_ms = wait_s * 1000.0
+        exec_ms = exec_s * 1000.0
+        with self._stats_lock:
+            st = self._stats
+            st["ops"][op] = st["ops"].get(op, 0) + 1
+            if failed:
+                st["errors"] += 1
+            st["wait_ms_total"] += wait_ms
+            st["wait_ms_max"] = max(st["wait_ms_max"], wait_ms)
+            st["exec_ms_total"] += exec_ms
+            st["exec_ms_max"] = max(st["exec_ms_max"], exec_ms)
+
+    def _record_loop_overhead(self, overhead_s: float) -> None:
+        overhead_ms = overhead_s * 1000.0
+        with self._stats_lock:
+            self._stats["loop_overhead_ms_total"] += overhead_ms
+            self._stats["loop_overhead_ms_max"] = max(self._stats["loop_overhead_ms_max"], overhead_ms)
+
+    async def _submit(self, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        while True:
+            t0 = time.perf_counter()
+            try:
+                self._queue.put_nowait((op, fn, args, loop, fut, t0))
+                self._record_loop_overhead(time.perf_counter() - t0)
+                break
+            except queue.Full:
+                with self._stats_lock:
+                    self._stats["queue_full_waits"] += 1
+                await asyncio.sleep(0.005)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+        return await fut
+
+    # --- API (speglar CandleCache) ---
+    async def load(self, symbol: str, timeframe: str, limit: int = 100, max_age_minutes: int = 15) -> list[list]:
+        return await self._submit("load", self.cache.load, symbol, timeframe, limit, max_age_minutes)
+
+    async def get_last(self, symbol: str, timeframe: str, max_age_minutes: int = 15) -> list | None:
+        return await self._submit("get_last", self.cache.get_last, symbol, timeframe, max_age_minutes)
+
+    async def store(self, symbol: str, timeframe: str, candles: Iterable[list]) -> int:
+        # Materialisera så att anroparen kan återanvända sin lista direkt
+        return await self._submit("store", self.cache.store, symbol, timeframe, list(candles))
+
+    def store_buffered(self, symbol: str, timeframe: str, candles: Iterable[list]) -> int:
+        """Write-behind kräver ingen disk-I/O; körs direkt på anroparens tråd."""
+        return self.cache.store_buffered(symbol, timeframe, candles)
+
+    async def oldest_mts(self, symbol: str, timeframe: str) -> int | None:
+        return await self._submit("oldest_mts", self.cache.oldest_mts, symbol, timeframe)
+
+    async def flush(self) -> int:
+        return await self._submit("flush", self.cache.flush)
+
+    async def stats(self, limit_symbols: int = 20) -> dict:
+        out = await self._submit("stats", self.cache.stats, limit_symbols)
+        out["async_io"] = self.io_stats()
+        return out
+
+    async def clear(self, symbol: str, timeframe: str | None = None) -> int:
+        return await self._submit("clear", self.cache.clear, symbol, timeframe)
+
+    async def clear_symbol(self, symbol: str, timeframe: str | None = None) -> int:
+        return await self._submit("clear", self.cache.clear_symbol, symbol, timeframe)
+
+    async def clear_all(self) -> int:
+        return await self._submit("clear_all", self.cache.clear_all)
+
+    async def enforce_retention(self, max_days: int, max_rows_per_pair: int) -> int:
+        return await self._submit("enforce_retention", self.cache.enforce_retention, max_days, max_rows_per_pair)
+
+    def io_stats(self) -> dict:
+        """Ködjup, latens och loop-overhead för worker-tråden."""
+        with self._stats_lock:
+            st = {k: (dict(v) if isinstance(v, dict) else v) for k, v in self._stats.items()}
+        total_ops = sum(st["ops"].values())
+        for key in ("wait_ms", "exec_ms", "loop_overhead_ms"):
+            st[f"{key}_avg"] = round(st[f"{key}_total"] / total_ops, 4) if total_ops else 0.0
+            st[f"{key}_total"] = round(st[f"{key}_total"], 3)
+            st[f"{key}_max"] = round(st[f"{key}_max"], 3)
+        st["queue_depth"] = self._queue.qsize()
+        st["max_queue"] = self.max_queue
+        st["total_ops"] = total_ops
+        st["worker_alive"] = bool(self._worker is not None and self._worker.is_alive())
+        return st
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stoppa worker-tråden efter att kön tömts."""
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return
+        self._queue.put(self._STOP)
+        worker.join(timeout=timeout)
+
+
+def _flush_interval_from_settings() -> int:
+    try:
+        from config.settings import settings
+
+        return int(getattr(settings, "CANDLE_CACHE_FLUSH_INTERVAL_MS", 1000) or 1000)
+    except Exception:
+        return 1000
+
+
 # Global instans
-candle_cache = CandleCache()
+candle_cache = CandleCache(flush_interval_ms=_flush_interval_from_settings())
+async_candle_cache = AsyncCandleCache(candle_cache)
+atexit.register(candle_cache.close)
+atexit.register(async_candle_cache.close)
@@ -0,0 +1,132 @@
+"""
+Candle Ring Buffer - TradingBot Backend
+
+Förallokerad kolumnbuffert (structure-of-arrays) för de senaste N candles
+per symbol/timeframe: mts (int64) samt open/close/high/low/volume (float64).
+
+- Uppdatering av pågående bar sker in-place (ingen allokering per tick).
+- Nya barer skrivs i slutet av en buffert med dubbel kapacitet; när den
+  tar slut flyttas de senaste barerna till början (amorterat O(1)).
+  Därmed är de senaste N barerna alltid ett sammanhängande intervall och
+  kan exponeras som NumPy-vyer utan kopiering.
+
+Vyer från `arrays()` pekar in i bufferten och är giltiga fram till nästa
+uppdatering – kopiera om de ska sparas längre.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# Kolumnordning enligt Bitfinex candle-format [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME]
+COLUMNS = ("mts", "open", "close", "high", "low", "volume")
+
+
+class CandleRingBuffer:
+    """Ringbuffert med kolumnarrayer för de senaste `capacity` candles."""
+
+    __slots__ = (
+        "_close",
+        "_end",
+        "_high",
+        "_low",
+        "_mts",
+        "_open",
+        "_start",
+        "_volume",
+        "capacity",
+        "stats",
+    )
+
+    def __init__(self, capacity: int = 500) -> None:
+        self.capacity = max(1, int(capacity))
+        size = 2 * self.capacity
+        self._mts = np.zeros(size, dtype=np.int64)
+        self._open = np.zeros(size, dtype=np.float64)
+        self._close = np.zeros(size, dtype=np.float64)
+        self._high = np.zeros(size, dtype=np.float64)
+        self._low = np.zeros(size, dtype=np.float64)
+        self._volume = np.zeros(size, dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self.stats = {"appends": 0, "updates": 0, "ignored": 0, "compactions": 0}
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_mts(self) -> int | None:
+        return int(self._mts[self._end - 1]) if self._end > self._start else None
+
+    def _columns(self) -> tuple[np.ndarray, ...]:
+        return (self._mts, self._open, self._close, self._high, self._low, self._volume)
+
+    def _compact(self) -> None:
+        # Behåll capacity-1 barer så att nästa append får plats
+        keep = min(len(self), self.capacity - 1)
+        src = self._end - keep
+        for col in self._columns():
+            col[:keep] = col[src : self._end]
+        self._start = 0
+        self._end = keep
+        self.stats["compactions"] += 1
+
+    def _write(self, i: int, mts: int, o: float, c: float, h: float, low: float, v: float) -> None:
+        self._mts[i] = mts
+        self._open[i] = o
+        self._close[i] = c
+        self._high[i] = h
+        self._low[i] = low
+        self._volume[i] = v
+
+    def upsert(self, mts: int, o: float, c: float, h: float, low: float, v: float) -> bool:
+        """
+        Lägg till eller uppdatera en bar.
+
+        Samma mts som senaste bar -> in-place uppdatering; nyare mts -> append;
+        äldre mts ignoreras. Returnerar True om baren lagrades.
+        """
+        mts = int(mts)
+        last = self.last_mts
+        if last is not None and mts == last:
+            self._write(self._end - 1, mts, o, c, h, low, v)
+            self.stats["updates"] += 1
+            return True
+        if last is not None and mts < last:
+            self.stats["ignored"] += 1
+            return False
+        if self._end == self._mts.size:
+            self._compact()
+        self._write(self._end, mts, o, c, h, low, v)
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+        self.stats["appends"] += 1
+        return True
+
+    def upsert_row(self, row: list | tuple) -> bool:
+        """Som `upsert` men för en rad i Bitfinex-format."""
+        return self.upsert(row[0], row[1], row[2], row[3], row[4], row[5])
+
+    def clear(self) -> None:
+        self._start = 0
+        self._end = 0
+
+    def arrays(self, n: int | None = None) -> dict[str, np.ndarray]:
+        """Zero-copy vyer (äldst -> nyast) för de senaste `n` barerna."""
+        size = len(self)
+        n = size if n is None else max(0, min(int(n), size))
+        lo = self._end - n
+        return {name: col[lo : self._end] for name, col in zip(COLUMNS, self._columns(), strict=True)}
+
+    def last_row(self) -> list | None:
+        """Senaste baren som lista [mts, open, close, high, low, volume]."""
+        if self._end == self._start:
+            return None
+        i = self._end - 1
+        return [int(self._mts[i]), *(float(col[i]) for col in self._columns()[1:])]
+
+    def to_list(self, n: int | None = None) -> list[list]:
+        """Materialisera de senaste `n` barerna som listor (för REST/JSON-gränser)."""
+        cols = self.arrays(n)
+        return [list(row) for row in zip(*(cols[name].tolist() for name in COLUMNS), strict=True)]
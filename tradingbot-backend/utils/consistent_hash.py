@@ -0,0 +1,71 @@
+"""
+Consistent Hash - TradingBot Backend
+
+Enkel hash-ring med virtuella noder. Används för att placera symboler på
+publika WS-sockets (shards) så att en symbol alltid hamnar på samma
+socket och att ändrat antal sockets bara flyttar en bråkdel av symbolerna.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from bisect import bisect_right
+from collections.abc import Hashable, Iterable, Iterator
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Hash-ring med `vnodes` virtuella noder per nod."""
+
+    def __init__(self, nodes: Iterable[Hashable] = (), vnodes: int = 64) -> None:
+        self.vnodes = max(1, int(vnodes))
+        self._nodes: list[Hashable] = []
+        self._points: list[int] = []
+        self._owners: list[Hashable] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list[Hashable]:
+        return list(self._nodes)
+
+    def add(self, node: Hashable) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        self._rebuild()
+
+    def remove(self, node: Hashable) -> None:
+        if node in self._nodes:
+            self._nodes.remove(node)
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        ring = sorted((_hash(f"{node}#{i}"), node) for node in self._nodes for i in range(self.vnodes))
+        self._points = [p for p, _ in ring]
+        self._owners = [n for _, n in ring]
+
+    def get(self, key: str) -> Hashable | None:
+        """Noden som äger `key` (None om ringen är tom)."""
+        if not self._points:
+            return None
+        i = bisect_right(self._points, _hash(key)) % len(self._points)
+        return self._owners[i]
+
+    def iter_nodes(self, key: str) -> Iterator[Hashable]:
+        """Distinkta noder i ringordning med start hos ägaren (för overflow)."""
+        if not self._points:
+            return
+        start = bisect_right(self._points, _hash(key))
+        seen: set = set()
+        n = len(self._points)
+        for off in range(n):
+            node = self._owners[(start + off) % n]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self._nodes):
+                    return
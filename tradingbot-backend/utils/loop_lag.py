@@ -0,0 +1,74 @@
+"""
+Loop Lag Monitor - mäter event loopens responsivitet.
+
+En bakgrundstask sover `interval` sekunder i taget och mäter hur mycket
+senare än utlovat den väcks. Blockerande arbete i loopen (CPU-tunga anrop,
+synkron I/O) syns direkt som lagg. Senaste, medel och max över ett
+glidande fönster exporteras som tradingbot_event_loop_lag_ms.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LoopLagMonitor:
+    """Periodisk sleep-probe; lagg i ms per prov."""
+
+    def __init__(self, interval: float = 0.5, window: int = 120) -> None:
+        self.interval = max(0.01, float(interval))
+        self._samples: deque[float] = deque(maxlen=max(1, int(window)))
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, lag_ms: float) -> None:
+        self._samples.append(max(0.0, float(lag_ms)))
+
+    async def _run(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record((time.perf_counter() - t0 - self.interval) * 1000.0)
+
+    def get_stats(self) -> dict[str, Any]:
+        samples = list(self._samples)
+        if not samples:
+            return {"samples": 0, "last_ms": None, "avg_ms": None, "max_ms": None}
+        return {
+            "samples": len(samples),
+            "last_ms": round(samples[-1], 3),
+            "avg_ms": round(sum(samples) / len(samples), 3),
+            "max_ms": round(max(samples), 3),
+        }
+
+
+_monitor: LoopLagMonitor | None = None
+
+
+def get_loop_lag_monitor() -> LoopLagMonitor:
+    global _monitor
+    if _monitor is None:
+        from config.settings import settings
+
+        interval_ms = int(getattr(settings, "LOOP_LAG_INTERVAL_MS", 500) or 500)
+        _monitor = LoopLagMonitor(interval=interval_ms / 1000.0)
+    return _monitor
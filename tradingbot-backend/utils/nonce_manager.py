@@ -1,68 +1,123 @@
+"""
+Nonce Manager - strikt ökande nonces per API-nyckel.
+
+Räknaren hålls i minnet. Till disk skrivs endast en reserverad övre gräns
+(high-water mark) per nyckel: när utdelade nonces når gränsen reserveras
+ett nytt block (RESERVE_BLOCK_US framåt) och gränsen skrivs innan noncen
+lämnas ut. Efter omstart fortsätter räknaren från den sparade gränsen, så
+ingen nonce kan återanvändas även om processen dog mitt i ett block.
+
+Nonces är mikrosekunder (max(nu, föregående + 1)), så en skrivning täcker
+antingen RESERVE_BLOCK_US av väggklockan eller lika många nonces under
+hög last – i stället för en läsning + skrivning av filen per signerat anrop.
+"""
+
 import json
+import os
 import time
 from pathlib import Path
 from threading import Lock
 
 # Använd utils-mappen för nonce-filen
 NONCE_FILE = Path(__file__).parent / ".nonce_tracker.json"
-_lock = Lock()
-
-
-def get_nonce(key_id: str) -> str:
-    """Returnerar en strikt ökande nonce per API-nyckel med mikrosekunder"""
-    # Använd mikrosekunder (16 siffror) för att säkerställa att vi alltid
-    # ligger över ev. historiska ms‑baserade nonces på servern
-    now = int(time.time() * 1_000_000)
-
-    with _lock:
+# Hur långt före utdelade nonces den sparade gränsen ligger (mikrosekunder ≈ 10 s)
+RESERVE_BLOCK_US = 10_000_000
+
+
+class NonceAllocator:
+    """In-memory nonce-räknare med blockvis reserverad high-water mark på disk."""
+
+    def __init__(self, path: Path = NONCE_FILE, block_us: int = RESERVE_BLOCK_US) -> None:
+        self.path = Path(path)
+        self.block_us = max(1, int(block_us))
+        self._lock = Lock()
+        self._last: dict[str, int] = {}  # key -> senast utdelade nonce
+        self._reserved: dict[str, int] = {}  # key -> sparad gräns (nonces < gräns är säkra)
+        self._loaded = False
+        self.writes = 0
+        self.issued = 0
+
+    def _load(self) -> None:
+        """Läs sparade gränser en gång; en korrupt fil ger start från nuvarande tid."""
+        self._loaded = True
         try:
-            if NONCE_FILE.exists():
-                with open(NONCE_FILE, encoding="utf-8") as f:
-                    content = f.read().strip()
-                    if not content:  # Tom fil
-                        data = {}
-                    else:
-                        data = json.loads(content)
-            else:
-                data = {}
-
-            last_nonce = data.get(key_id, 0)
-            # Säkerställ att ny nonce alltid är större än föregående
-            new_nonce = max(now, last_nonce + 1)
-            data[key_id] = new_nonce
-
-            # Skapa utils-mappen om den inte finns
-            NONCE_FILE.parent.mkdir(exist_ok=True)
-
-            # Windows-säker skrivning (utan atomisk replace som failar)
-            try:
-                with open(NONCE_FILE, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-            except (OSError, PermissionError):
-                # Fallback: direkt skrivning utan temp-fil
-                print(f"⚠️ Kunde inte skriva nonce-fil, använder fallback")
-                pass
-
-            return str(new_nonce)
-
-        except (OSError, json.JSONDecodeError, ValueError) as e:
-            # Om filen är korrupt, starta om med nuvarande tid
+            if not self.path.exists():
+                return
+            content = self.path.read_text(encoding="utf-8").strip()
+            data = json.loads(content) if content else {}
+            for key, val in (data or {}).items():
+                hwm = int(val or 0)
+                self._reserved[key] = hwm
+                # Allt under gränsen kan ha delats ut före omstart
+                self._last[key] = hwm
+        except (OSError, json.JSONDecodeError, ValueError, TypeError, AttributeError) as e:
             print(f"⚠️  Nonce-fil problem: {e}. Startar om med nuvarande tid.")
-            new_nonce = now
-            data = {key_id: new_nonce}
 
+    def _persist(self) -> None:
+        """Skriv alla gränser (anropas med låset taget, endast vid nytt block)."""
+        payload = json.dumps(self._reserved, separators=(",", ":"))
+        try:
+            self.path.parent.mkdir(exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
             try:
-                NONCE_FILE.parent.mkdir(exist_ok=True)
-                with open(NONCE_FILE, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
+                os.replace(tmp, self.path)
             except OSError:
-                print("❌ Kunde inte skapa nonce-fil. Använder nuvarande tid.")
+                # Windows: replace kan faila om filen är låst – skriv direkt i stället
+                with open(self.path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+            self.writes += 1
+        except (OSError, PermissionError):
+            print("⚠️ Kunde inte skriva nonce-fil, fortsätter med minnesräknare")
+
+    def _issue(self, key_id: str, candidate: int) -> int:
+        last = self._last.get(key_id, 0)
+        nonce = candidate if candidate > last else last + 1
+        if nonce >= self._reserved.get(key_id, 0):
+            self._reserved[key_id] = nonce + self.block_us
+            self._persist()
+        self._last[key_id] = nonce
+        self.issued += 1
+        return nonce
+
+    def next(self, key_id: str) -> int:
+        now = int(time.time() * 1_000_000)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return self._issue(key_id, now)
+
+    def bump(self, key_id: str, min_increment_micro: int = 1_000_000) -> int:
+        now = int(time.time() * 1_000_000)
+        inc = int(min_increment_micro)
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            target = max(self._last.get(key_id, 0) + inc, now + inc)
+            return self._issue(key_id, target)
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"issued": self.issued, "writes": self.writes, "keys": len(self._last)}
+
+
+_allocator = NonceAllocator()
 
-            return str(new_nonce)
+
+def get_nonce(key_id: str) -> str:
+    """Returnerar en strikt ökande nonce per API-nyckel med mikrosekunder"""
+    # Använd mikrosekunder (16 siffror) för att säkerställa att vi alltid
+    # ligger över ev. historiska ms‑baserade nonces på servern
+    return str(_allocator.next(key_id))
 
 
 def bump_nonce(key_id: str, min_increment_micro: int = 1_000_000) -> str:
-    """Bumpar lagrad nonce rejält för angiven key_id för att passera serverns cached värde.
+    """Bumpar nonce rejält för angiven key_id för att passera serverns cached värde.
 
     Detta används när Bitfinex svarar med "nonce: small" (10114). Vi höjer den lokala noncen
     med minst min_increment_micro och säkerställer att den även ligger över current time.
@@ -74,31 +129,4 @@ def bump_nonce(key_id: str, min_increment_micro: int = 1_000_000) -> str:
     Returns:
         str: Den nya bumpade noncen (som str)
     """
-    now = int(time.time() * 1_000_000)
-    with _lock:
-        try:
-            data = {}
-            if NONCE_FILE.exists():
-                try:
-                    with open(NONCE_FILE, encoding="utf-8") as f:
-                        content = f.read().strip()
-                        if content:
-                            data = json.loads(content)
-                except Exception:
-                    data = {}
-
-            last_nonce = int(data.get(key_id, 0) or 0)
-            target = max(last_nonce + int(min_increment_micro), now + int(min_increment_micro))
-            data[key_id] = target
-
-            NONCE_FILE.parent.mkdir(exist_ok=True)
-            try:
-                with open(NONCE_FILE, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=2)
-            except (OSError, PermissionError):
-                pass
-
-            return str(target)
-        except Exception:
-            # Fallback: returnera en bump på now + min_increment
-            return str(now + int(min_increment_micro))
+    return str(_allocator.bump(key_id, min_increment_micro))
@@ -0,0 +1,78 @@
+"""
+Single-flight - samkör samtidiga identiska förfrågningar.
+
+Första anroparen för en nyckel (namespace, key) startar hämtningen som en
+task; alla som kommer in medan den pågår väntar på samma resultat i stället
+för att göra egna REST-anrop. Posten tas bort när tasken är klar, så nästa
+anrop efter det hämtar på nytt (TTL-cachning sköts av anroparen).
+
+Tasken körs avskärmd (asyncio.shield): om en väntande anropare avbryts
+fortsätter hämtningen för de övriga. Fel propageras till alla väntande.
+
+Räknare per namespace:
+- hits: anroparens egen cache svarade (note_hit)
+- misses: nytt anrop startades
+- coalesced: anropet anslöt till ett pågående
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Nyckelad in-flight-registry per event loop."""
+
+    def __init__(self) -> None:
+        # (loop-id, namespace, key) -> task; tasks är loop-bundna
+        self._inflight: dict[tuple[int, str, Hashable], asyncio.Task[Any]] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _bucket(self, namespace: str) -> dict[str, int]:
+        bucket = self._stats.get(namespace)
+        if bucket is None:
+            bucket = {"hits": 0, "misses": 0, "coalesced": 0}
+            self._stats[namespace] = bucket
+        return bucket
+
+    def note_hit(self, namespace: str) -> None:
+        """Registrera en cache-träff hos anroparen (ingen hämtning behövdes)."""
+        self._bucket(namespace)["hits"] += 1
+
+    async def do(self, namespace: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Kör fn() en gång per pågående (namespace, key) och dela resultatet."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), namespace, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = loop.create_task(fn())  # type: ignore[arg-type]
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda t, k=flight_key: self._done(k, t))
+            self._bucket(namespace)["misses"] += 1
+        else:
+            self._bucket(namespace)["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _done(self, flight_key: tuple[int, str, Hashable], task: asyncio.Task[Any]) -> None:
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        # Markera undantaget som hämtat även om alla väntande avbröts
+        if not task.cancelled():
+            task.exception()
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "namespaces": {ns: dict(b) for ns, b in self._stats.items()},
+        }
+
+
+# Delad instans för marknadsdata (candles, configs, margin, regime, coordinator)
+single_flight = SingleFlight()
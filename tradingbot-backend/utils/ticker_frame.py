@@ -0,0 +1,92 @@
+"""
+Ticker Frame - TradingBot Backend
+
+Kompakt, muterbar post för senaste WS-ticker per symbol. En instans per
+symbol uppdateras in-place för varje frame i stället för att bygga en ny
+dict med 11 nycklar, vilket tar bort dict-churn på den hetaste vägen.
+
+TickerFrame implementerar Mapping-protokollet (get/[]/keys/items), så
+befintliga callbacks som läser `t.get("last_price")` fungerar oförändrat.
+En riktig dict skapas bara vid gränser (REST/Socket.IO) via `to_dict()`.
+Observera att instansen muteras vid nästa frame – spara `to_dict()` om
+ett ögonblicksvärde behövs.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+# Bitfinex ticker: [BID, BID_SIZE, ASK, ASK_SIZE, DAILY_CHANGE, DAILY_CHANGE_RELATIVE,
+#                   LAST_PRICE, VOLUME, HIGH, LOW]
+TICKER_FIELDS = (
+    "bid",
+    "bid_size",
+    "ask",
+    "ask_size",
+    "daily_change",
+    "daily_change_relative",
+    "last_price",
+    "volume",
+    "high",
+    "low",
+)
+_KEYS = ("symbol", *TICKER_FIELDS)
+_KEYSET = frozenset(_KEYS)
+
+
+class TickerFrame(Mapping):
+    """Senaste ticker för en symbol, uppdateras in-place."""
+
+    __slots__ = ("symbol", *TICKER_FIELDS, "updates")
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.bid = self.bid_size = self.ask = self.ask_size = None
+        self.daily_change = self.daily_change_relative = self.last_price = None
+        self.volume = self.high = self.low = 0
+        self.updates = 0
+
+    def update(self, raw: list | tuple) -> TickerFrame:
+        """Skriv en rå ticker-rad (minst 7 fält) in-place."""
+        n = len(raw)
+        self.bid = raw[0]
+        self.bid_size = raw[1]
+        self.ask = raw[2]
+        self.ask_size = raw[3]
+        self.daily_change = raw[4]
+        self.daily_change_relative = raw[5]
+        self.last_price = raw[6]
+        self.volume = raw[7] if n > 7 else 0
+        self.high = raw[8] if n > 8 else 0
+        self.low = raw[9] if n > 9 else 0
+        self.updates += 1
+        return self
+
+    # --- Mapping-protokoll (dict-kompatibel läsning utan allokering) ---
+    def __getitem__(self, key: str) -> Any:
+        if key in _KEYSET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in _KEYSET else default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _KEYSET
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_KEYS)
+
+    def __len__(self) -> int:
+        return len(_KEYS)
+
+    def keys(self):  # type: ignore[override]
+        return _KEYS
+
+    def to_dict(self) -> dict[str, Any]:
+        """Dict-vy för REST/Socket.IO-gränser."""
+        return {k: getattr(self, k) for k in _KEYS}
+
+    def __repr__(self) -> str:
+        return f"TickerFrame({self.symbol!r}, last_price={self.last_price!r}, updates={self.updates})"